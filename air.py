@@ -36,6 +36,8 @@ from typing import Any, Dict, Optional, Tuple, Union, List
 
 import pendulum
 
+import marine
+import om_plan
 from utils import _get  # HTTP-обёртка (_get_retry внутри)
 
 __all__ = ("get_air", "get_sst", "get_kp", "get_solar_wind")
@@ -150,15 +152,11 @@ def _src_iqair(lat: float, lon: float) -> Optional[Dict[str, Any]]:
         return None
 
 def _src_openmeteo(lat: float, lon: float) -> Optional[Dict[str, Any]]:
-    resp = _safe_http_get(
-        "https://air-quality-api.open-meteo.com/v1/air-quality",
-        latitude=lat, longitude=lon,
-        hourly="pm10,pm2_5,us_aqi", timezone="UTC",
-    )
-    if not resp or "hourly" not in resp:
+    # один air-quality запрос на точку — общий с пыльцой (om_plan)
+    h = om_plan.view("air", lat, lon).hourly_raw
+    if not h:
         return None
     try:
-        h = resp["hourly"]
         times = h.get("time", []) or []
         aqi_val  = _pick_nearest_hour(times, h.get("us_aqi", []) or [])
         pm25_val = _pick_nearest_hour(times, h.get("pm2_5", []) or [])
@@ -230,19 +228,9 @@ def get_air(lat: float, lon: float) -> Dict[str, Any]:
 # ───────────────────────── SST (по ближайшему часу) ─────────────────
 
 def get_sst(lat: float, lon: float) -> Optional[float]:
-    resp = _safe_http_get(
-        "https://marine-api.open-meteo.com/v1/marine",
-        latitude=lat, longitude=lon,
-        hourly="sea_surface_temperature", timezone="UTC",
-    )
-    if not resp or "hourly" not in resp:
-        return None
+    # marine.prefetch() заранее грузит все прибрежные точки одним запросом
     try:
-        h = resp["hourly"]
-        times = h.get("time", []) or []
-        vals  = h.get("sea_surface_temperature", []) or []
-        v = _pick_nearest_hour(times, vals)
-        return float(v) if isinstance(v, (int, float)) else None
+        return marine.sst_now(lat, lon)
     except Exception as e:
         logging.warning("Marine SST parse error: %s", e)
         return None
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+forecast.py — колоночное представление payload Open-Meteo/get_weather.
+
+Forecast.of(wm) строит объект один раз на payload (повторные вызовы с тем же
+dict возвращают готовый объект), поэтому post_common-хелперы, которые раньше
+каждый заново гоняли pendulum.parse по 48–168 строкам времени, работают с
+уже разобранной осью:
+
+• ось времени — array("q") epoch-секунд UTC. Метки без смещения трактуются
+  в TZ запроса (поле timezone payload Open-Meteo, с учётом перехода на
+  летнее время), иначе — со смещением utc_offset_seconds (0 — прежняя
+  семантика pendulum.parse); одинаковые строки у разных городов
+  разбираются один раз (lru_cache);
+• локальный индекс дней — для каждой TZ один раз: дата → индексы часов;
+  day_indices(D) и nearest_index(D, H) — поиск в словаре плюс арифметика
+  по регулярной сетке (O(1)), без перебора всех часов;
+• колонки — array("d") с NaN вместо None/нечисловых значений, с разрешением
+  алиасов (wind_speed_10m / windspeed_10m / windspeed …);
+• aggregate(tz) — суточные сводки (n/min/max/mean по всем почасовым
+  переменным, часовые окна, круговое среднее направления ветра, тренд
+  давления 06→12, значения daily-массивов) за один проход по колонкам,
+  сгруппированным по локальным суткам.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import pendulum
+
+NAN = float("nan")
+
+# Канонические имена → ключи payload в порядке предпочтения.
+HOURLY_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "wind_speed_10m": ("wind_speed_10m", "windspeed_10m", "windspeed", "wind_speed"),
+    "wind_direction_10m": ("wind_direction_10m", "winddirection_10m", "winddirection", "wind_dir_10m", "wind_dir"),
+    "wind_gusts_10m": ("wind_gusts_10m", "windgusts_10m", "wind_gusts"),
+    "surface_pressure": ("surface_pressure", "pressure"),
+    "uv_index": ("uv_index", "uv_index_clear_sky"),
+}
+DAILY_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "wind_speed_10m_max": ("wind_speed_10m_max", "windspeed_10m_max", "wind_speed_max", "windspeed_max"),
+    "wind_gusts_10m_max": ("wind_gusts_10m_max", "windgusts_10m_max", "wind_gust_max", "windgust_max"),
+    "weathercode": ("weathercode", "weather_code"),
+}
+
+_CACHE_MAX = 256
+_CACHE: Dict[int, Tuple[Dict[str, Any], "Forecast"]] = {}
+
+TzLike = Union["pendulum.Timezone", str]
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_epoch(raw: str, zone: Union[str, int]) -> Optional[int]:
+    """ISO-строка → epoch UTC; наивное время — в зоне zone (имя TZ или смещение, с)."""
+    tzinfo = pendulum.timezone(zone) if isinstance(zone, str) else dt.timezone(dt.timedelta(seconds=zone))
+    try:
+        t = dt.datetime.fromisoformat(raw)
+    except ValueError:
+        try:
+            return pendulum.parse(raw, tz=tzinfo).int_timestamp
+        except Exception:
+            return None
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=tzinfo)
+    return int(t.timestamp())
+
+
+def _payload_zone(payload: Dict[str, Any]) -> Union[str, int]:
+    name = payload.get("timezone")
+    if isinstance(name, str) and name and name.upper() not in ("UTC", "GMT"):
+        try:
+            pendulum.timezone(name)
+            return name
+        except Exception:
+            pass
+    try:
+        return int(payload.get("utc_offset_seconds") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def circular_mean_deg(deg_list: Sequence[float]) -> Optional[float]:
+    """Среднее направление (°) с учётом перехода 359→0; None, если векторы гасят друг друга."""
+    if not deg_list:
+        return None
+    x = sum(math.cos(math.radians(d)) for d in deg_list)
+    y = sum(math.sin(math.radians(d)) for d in deg_list)
+    if x == 0 and y == 0:
+        return None
+    ang = math.degrees(math.atan2(y, x))
+    return (ang + 360.0) % 360.0
+
+
+class Agg(NamedTuple):
+    n: int
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+
+
+_EMPTY_AGG = Agg(0, None, None, None)
+
+
+def _agg(values: Sequence[float]) -> Agg:
+    if not values:
+        return _EMPTY_AGG
+    total = math.fsum(values)
+    if total != total:  # есть пропуски (NaN) — отбрасываем только тогда
+        values = [v for v in values if v == v]
+        if not values:
+            return _EMPTY_AGG
+        total = math.fsum(values)
+    return Agg(len(values), min(values), max(values), total / len(values))
+
+
+@dataclass
+class DayAgg:
+    """Сводка по одним локальным суткам (результат Forecast.aggregate)."""
+
+    date: dt.date
+    idx: List[int]  # индексы часов суток в ряду
+    vars: Dict[str, Agg] = field(default_factory=dict)  # все почасовые колонки и канонические имена
+    windows: Dict[str, Dict[str, Agg]] = field(default_factory=dict)  # окно → переменная → Agg
+    wind_dir: Optional[float] = None  # круговое среднее wind_direction_10m
+    pressure_trend: Optional[float] = None  # surface_pressure 12:00 − 06:00, гПа
+    daily: Dict[str, Optional[float]] = field(default_factory=dict)  # daily-массивы на эту дату
+
+    def stat(self, var: str, kind: str = "max", window: Optional[str] = None) -> Optional[float]:
+        src = self.windows.get(window, {}) if window else self.vars
+        return getattr(src.get(var, _EMPTY_AGG), kind)
+
+    def values(self, var: str) -> Agg:
+        return self.vars.get(var, _EMPTY_AGG)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(raw: str) -> Optional[dt.date]:
+    try:
+        return dt.date.fromisoformat(raw[:10]) if len(raw) >= 10 else pendulum.parse(raw).date()
+    except Exception:
+        try:
+            return pendulum.parse(raw).date()
+        except Exception:
+            return None
+
+
+def _column(values: Any) -> array:
+    out = array("d")
+    for v in values if isinstance(values, (list, tuple)) else ():
+        try:
+            out.append(float(v) if v is not None else NAN)
+        except (TypeError, ValueError):
+            out.append(NAN)
+    return out
+
+
+def _tz(tz: TzLike) -> pendulum.Timezone:
+    return pendulum.timezone(tz) if isinstance(tz, str) else tz
+
+
+class Forecast:
+    """Разобранный payload прогноза; создавать через Forecast.of(wm)."""
+
+    def __init__(self, payload: Optional[Dict[str, Any]]) -> None:
+        self.payload: Dict[str, Any] = payload if isinstance(payload, dict) else {}
+        self.hourly_raw: Dict[str, Any] = self.payload.get("hourly") or {}
+        self.daily_raw: Dict[str, Any] = self.payload.get("daily") or {}
+        zone = self._zone = _payload_zone(self.payload)
+
+        raw_times = self.hourly_raw.get("time") or self.hourly_raw.get("time_local") or []
+        self.times = array("q")
+        self._valid: List[int] = []  # индексы с разобранным временем
+        for i, t in enumerate(raw_times):
+            e = _parse_epoch(str(t), zone) if t else None
+            self.times.append(e if e is not None else 0)
+            if e is not None:
+                self._valid.append(i)
+        steps = {self.times[b] - self.times[a] for a, b in zip(self._valid, self._valid[1:])}
+        # регулярная сетка (все часы разобраны, шаг один) → арифметика вместо перебора
+        self.step: Optional[int] = (
+            steps.pop() if len(steps) == 1 and len(self._valid) == len(self.times) and min(steps) > 0 else None
+        )
+
+        raw_days = self.daily_raw.get("time") or self.daily_raw.get("time_local") or self.daily_raw.get("date") or []
+        self.days: List[Optional[dt.date]] = [_parse_date(str(t)) if t else None for t in raw_days]
+        self._day_pos: Dict[dt.date, int] = {}
+        for i, d in enumerate(self.days):
+            if d is not None:
+                self._day_pos.setdefault(d, i)
+
+        self._hourly_cols: Dict[Tuple[str, ...], array] = {}
+        self._daily_cols: Dict[Tuple[str, ...], array] = {}
+        self._local_days: Dict[str, Dict[dt.date, List[int]]] = {}
+        self._local_hours: Dict[str, Dict[int, int]] = {}
+        self._aggs: Dict[Tuple[str, Tuple[Tuple[str, int, int], ...]], Dict[dt.date, DayAgg]] = {}
+        self._fingerprint = self._fp(self.payload)
+
+    # ───── построение и кэш ─────
+    @staticmethod
+    def _fp(payload: Dict[str, Any]) -> Tuple[int, int, int]:
+        hourly = payload.get("hourly") or {}
+        return id(hourly), id(payload.get("daily")), len(hourly.get("time") or hourly.get("time_local") or [])
+
+    @classmethod
+    def of(cls, wm: Union["Forecast", Dict[str, Any], None]) -> "Forecast":
+        """Forecast для payload: готовый объект, если этот dict уже разбирали и он не менялся."""
+        if isinstance(wm, Forecast):
+            return wm
+        if not isinstance(wm, dict):
+            return cls(None)
+        hit = _CACHE.get(id(wm))
+        if hit is not None and hit[0] is wm and hit[1]._fingerprint == cls._fp(wm):
+            return hit[1]
+        fc = cls(wm)
+        if len(_CACHE) >= _CACHE_MAX:
+            _CACHE.pop(next(iter(_CACHE)))
+        _CACHE[id(wm)] = (wm, fc)  # держим ссылку на dict, чтобы id не переиспользовался
+        return fc
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    # ───── колонки ─────
+    @staticmethod
+    def _resolve(raw: Dict[str, Any], names: Sequence[str], aliases: Dict[str, Tuple[str, ...]]) -> Any:
+        keys: List[str] = []
+        for name in names:
+            keys.extend(aliases.get(name, (name,)))
+        for key in keys:
+            arr = raw.get(key)
+            if arr:
+                return arr
+        return []
+
+    def hourly(self, *names: str) -> array:
+        """Почасовая колонка по первому непустому из names (с алиасами); NaN = нет значения."""
+        col = self._hourly_cols.get(names)
+        if col is None:
+            col = self._hourly_cols[names] = _column(self._resolve(self.hourly_raw, names, HOURLY_ALIASES))
+        return col
+
+    def daily(self, *names: str) -> array:
+        col = self._daily_cols.get(names)
+        if col is None:
+            col = self._daily_cols[names] = _column(self._resolve(self.daily_raw, names, DAILY_ALIASES))
+        return col
+
+    @staticmethod
+    def at(col: array, idx: Optional[int]) -> Optional[float]:
+        """col[idx] или None (нет индекса, вне диапазона, NaN)."""
+        if idx is None or not 0 <= idx < len(col):
+            return None
+        v = col[idx]
+        return None if math.isnan(v) else v
+
+    @staticmethod
+    def pick(col: array, idxs: Sequence[int]) -> List[float]:
+        """Значения col по индексам, без пропусков."""
+        n = len(col)
+        return [col[i] for i in idxs if i < n and not math.isnan(col[i])]
+
+    # ───── ось времени ─────
+    def _days_for(self, tz: TzLike) -> Dict[dt.date, List[int]]:
+        tz = _tz(tz)
+        index = self._local_days.get(tz.name)
+        if index is None:
+            index, hours = {}, {}
+            for i in self._valid:
+                local = dt.datetime.fromtimestamp(self.times[i], tz)
+                index.setdefault(local.date(), []).append(i)
+                hours[i] = local.hour
+            self._local_days[tz.name] = index
+            self._local_hours[tz.name] = hours
+        return index
+
+    def day_indices(self, date_obj: dt.date, tz: TzLike) -> List[int]:
+        """Индексы часов, попадающих в локальные сутки date_obj (в порядке ряда)."""
+        return self._days_for(tz).get(_plain_date(date_obj), [])
+
+    def nearest_index(self, date_obj: dt.date, hour: int, tz: TzLike) -> Optional[int]:
+        """Индекс часа локальных суток date_obj, ближайшего к hour:00 (при равенстве — более ранний)."""
+        idxs = self.day_indices(date_obj, tz)
+        if not idxs:
+            return None
+        d = _plain_date(date_obj)
+        target = pendulum.datetime(d.year, d.month, d.day, hour, 0, tz=_tz(tz)).int_timestamp
+        lo, hi = idxs[0], idxs[-1]
+        if self.step is not None and hi - lo + 1 == len(idxs):
+            j = lo + min(max((target - self.times[lo]) // self.step, 0), hi - lo)
+            if j < hi and abs(self.times[j + 1] - target) < abs(self.times[j] - target):
+                j += 1
+            return j
+        return min(idxs, key=lambda i: abs(self.times[i] - target))
+
+    def daily_index(self, date_obj: dt.date) -> Optional[int]:
+        return self._day_pos.get(_plain_date(date_obj))
+
+    def past_index(self, ts: int) -> Optional[int]:
+        """Индекс последнего часа не позже ts (epoch UTC); если все позже — первый."""
+        for i in reversed(self._valid):
+            if self.times[i] <= ts:
+                return i
+        return self._valid[0] if self._valid else None
+
+    def daily_moment(self, name: str, date_obj: dt.date, tz: TzLike) -> Optional[dt.datetime]:
+        """
+        Момент из daily-массива меток (sunrise/sunset), попадающий в локальные
+        сутки date_obj. Метки разбираются в TZ payload, поэтому ответ с
+        timezone=UTC тоже годится для местного рассвета.
+        """
+        tz = _tz(tz)
+        d = _plain_date(date_obj)
+        for raw in self.daily_raw.get(name) or []:
+            e = _parse_epoch(str(raw), self._zone) if raw else None
+            if e is None:
+                continue
+            local = dt.datetime.fromtimestamp(e, tz)
+            if local.date() == d:
+                return local
+        return None
+
+    # ───── суточные сводки ─────
+    def aggregate(
+        self, tz: TzLike, windows: Optional[Mapping[str, Tuple[int, int]]] = None
+    ) -> Dict[dt.date, DayAgg]:
+        """
+        Сводки по всем локальным суткам: для каждой почасовой колонки (и
+        канонического имени алиаса) — n/min/max/mean за сутки и за часовые
+        окна windows={"day": (9, 18), …} (границы включительно, локальный час).
+        Колонка проходится один раз: срез часов каждого дня сворачивается
+        встроенными min/max/fsum. В сводку попадают и дни, которые есть только
+        в daily-массивах. Кэш — по (TZ, windows).
+        """
+        tz = _tz(tz)
+        win = tuple(sorted((name, int(a), int(b)) for name, (a, b) in (windows or {}).items()))
+        key = (tz.name, win)
+        cached = self._aggs.get(key)
+        if cached is not None:
+            return cached
+
+        index = self._days_for(tz)
+        hours = self._local_hours[tz.name]
+        out: Dict[dt.date, DayAgg] = {d: DayAgg(d, idxs) for d, idxs in index.items()}
+        for d in self._day_pos:
+            out.setdefault(d, DayAgg(d, []))
+        # в окне: позиции внутри суток, чтобы резать уже выбранные значения дня
+        win_pos = {
+            d: {name: [k for k, i in enumerate(idxs) if a <= hours[i] <= b] for name, a, b in win}
+            for d, idxs in index.items()
+        }
+
+        columns: Dict[str, array] = {}
+        for name, raw in self.hourly_raw.items():
+            if name not in ("time", "time_local") and isinstance(raw, list):
+                columns[name] = self.hourly(name)
+        for canon in HOURLY_ALIASES:
+            col = self.hourly(canon)
+            if len(col):
+                columns[canon] = col
+
+        done: Dict[int, str] = {}  # алиасы делят одну колонку — сворачиваем её один раз
+        for name, col in columns.items():
+            first = done.setdefault(id(col), name)
+            if first != name:
+                for agg in out.values():
+                    if first in agg.vars:
+                        agg.vars[name] = agg.vars[first]
+                        for wvars in agg.windows.values():
+                            wvars[name] = wvars[first]
+                continue
+            n = len(col)
+            for d, idxs in index.items():
+                lo, hi = idxs[0], idxs[-1] + 1
+                if hi - lo == len(idxs) and hi <= n:
+                    day_vals = col[lo:hi]
+                else:
+                    day_vals = [col[i] if i < n else NAN for i in idxs]
+                agg = out[d]
+                agg.vars[name] = _agg(day_vals)
+                for wname, pos in win_pos[d].items():
+                    agg.windows.setdefault(wname, {})[name] = _agg([day_vals[k] for k in pos if k < len(day_vals)])
+
+        dirs = columns.get("wind_direction_10m")
+        prs = columns.get("surface_pressure")
+        for d, agg in out.items():
+            if dirs is not None and agg.idx:
+                agg.wind_dir = circular_mean_deg(self.pick(dirs, agg.idx))
+            if prs is not None and agg.idx:
+                p_noon = self.at(prs, self.nearest_index(d, 12, tz))
+                p_morn = self.at(prs, self.nearest_index(d, 6, tz))
+                if p_noon is not None and p_morn is not None:
+                    agg.pressure_trend = p_noon - p_morn
+            pos = self._day_pos.get(d)
+            if pos is not None:
+                for name, raw in self.daily_raw.items():
+                    if name not in ("time", "time_local", "date") and isinstance(raw, list):
+                        agg.daily[name] = self.at(self.daily(name), pos)
+                for canon in DAILY_ALIASES:
+                    agg.daily[canon] = self.at(self.daily(canon), pos)
+        self._aggs[key] = out
+        return out
+
+
+def _plain_date(d: Any) -> dt.date:
+    """pendulum.Date/DateTime → datetime.date (ключи индекса — обычные date)."""
+    if isinstance(d, dt.datetime):
+        d = d.date()
+    return dt.date(d.year, d.month, d.day)
@@ -12,6 +12,8 @@ gen_lunar_calendar.py
 • void_of_course: {start, end}  (UTC → Asia/Nicosia в JSON)
 • favorable_days / unfavorable_days – словари категорий месяца
 • month_voc   – список всех VoC месяца (локальное время)
+• ephemeris   – почасовая float32-сетка долгот Солнца/Луны
+                (см. lunar_ephemeris.py) для интерполяции без swisseph
 """
 
 import os, json, math, asyncio, re
@@ -20,10 +22,13 @@ from typing  import Dict, Any, List, Tuple
 
 import pendulum, swisseph as swe
 from gpt import gpt_complete  # общая обёртка LLM
+from lunar_ephemeris import EphemerisSamples, sample_month
 
 # ───── настройки ────────────────────────────────────────────────────────────
 TZ = pendulum.timezone("Asia/Nicosia")
 SKIP_SHORT = os.getenv("GEN_SKIP_SHORT", "").strip().lower() in ("1","true","yes","on")
+# один запрос на весь месяц вместо ~30 (GEN_SHORT_BATCH=0 — старый режим «по дню»)
+SHORT_BATCH = os.getenv("GEN_SHORT_BATCH", "1").strip().lower() in ("1","true","yes","on")
 DEBUG_VOC  = os.getenv("DEBUG_VOC",   "").strip().lower() in ("1","true","yes","on")
 MIN_VOC_MIN = int(os.getenv("MIN_VOC_MINUTES", "0") or 0)   # порог для вывода месячного списка
 
@@ -83,9 +88,12 @@ def sun_lon(jd: float) -> float:
 def moon_sign_idx(jd: float) -> int:
     return int(moon_lon(jd) // 30) % 12
 
-def compute_phase(jd: float) -> Tuple[str,int,str]:
-    lon_s = sun_lon(jd)
-    lon_m = moon_lon(jd)
+def compute_phase_from_samples(eph: EphemerisSamples, jd: float) -> Tuple[str,int,str]:
+    """Фаза, освещённость и знак на момент jd из заранее посчитанной сетки (без swe)."""
+    ts = (jd - 2440587.5) * 86400
+    return _phase_from_lons(eph.sun_longitude(ts), eph.moon_longitude(ts))
+
+def _phase_from_lons(lon_s: float, lon_m: float) -> Tuple[str,int,str]:
     ang   = (lon_m - lon_s) % 360
     illum = int(round((1 - math.cos(math.radians(ang))) / 2 * 100))
     name  = phase_name(ang)
@@ -222,7 +230,8 @@ async def gpt_short(date: str, phase: str) -> List[str]:
         "Пиши по-русски. Не упоминай название месяца."
     )
     try:
-        txt = gpt_complete(prompt=prompt, system=system, temperature=0.65, max_tokens=300)
+        txt = gpt_complete(prompt=prompt, system=system, temperature=0.65, max_tokens=300,
+                           cache_site="lunar_short")
         lines = [ _sanitize_ru(l).strip() for l in (txt or "").splitlines() if _sanitize_ru(l).strip() ]
         if len(lines) >= 2:
             return lines[:3]
@@ -230,6 +239,70 @@ async def gpt_short(date: str, phase: str) -> List[str]:
         pass
     return FALLBACK_SHORT[:]
 
+def _clean_advice(items: Any) -> List[str] | None:
+    """Список строк-советов из LLM → санитизированные 2–3 строки или None."""
+    if not isinstance(items, list):
+        return None
+    lines = [_sanitize_ru(str(x)) for x in items if isinstance(x, str)]
+    lines = [l for l in lines if l]
+    return lines[:3] if len(lines) >= 2 else None
+
+def _parse_batch_json(txt: str) -> Dict[str, Any]:
+    """Достаёт JSON-объект из ответа (допускаем ```json-обёртку и текст вокруг)."""
+    m = re.search(r"\{.*\}", txt or "", re.S)
+    if not m:
+        return {}
+    try:
+        data = json.loads(m.group(0))
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+async def gpt_short_batch(days: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """
+    Советы на все дни месяца одним запросом: days = [(YYYY-MM-DD, фаза), ...].
+    Возвращает только валидные дни; пропущенные/битые добирает вызывающий код.
+    """
+    if not days:
+        return {}
+    system = (
+        "Ты пишешь очень краткие практичные рекомендации на русском языке. "
+        "Без англицизмов и штампов. Без префиксов типа 'Совет:'. "
+        "Отвечай только JSON-объектом без пояснений."
+    )
+    listing = "\n".join(f"{d}: {ph}" for d, ph in days)
+    prompt = (
+        "Действуй как профессиональный астролог, который хорошо знает как звезды и луна влияют на человека, ты очень хочешь помогать людям делать их жизнь лучше, но при этом ты ценишь каждое слово, ты краток будто каждое слово дорого стоит.\n"
+        f"Даты и фазы Луны:\n{listing}\n\n"
+        "Для КАЖДОЙ даты дай 3 лаконичных рекомендации, каждая — одна строка с emoji: "
+        "💼 (работа), ⛔ (отложить), 🪄 (ритуал). Пиши по-русски. Не упоминай название месяца.\n"
+        'Формат: {"YYYY-MM-DD": ["💼 ...", "⛔ ...", "🪄 ..."], ...} — ключи ровно как в списке.'
+    )
+    try:
+        txt = gpt_complete(prompt=prompt, system=system, temperature=0.65,
+                           max_tokens=90 * len(days) + 200, cache_site="lunar_short")
+    except Exception:
+        return {}
+    data = _parse_batch_json(txt)
+    wanted = {d for d, _ in days}
+    out: Dict[str, List[str]] = {}
+    for key, items in data.items():
+        lines = _clean_advice(items)
+        if key in wanted and lines:
+            out[key] = lines
+    return out
+
+async def _collect_short_advice(days: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """Батч на месяц, затем по-дневные запросы только для пропущенных/битых дней."""
+    ready = await gpt_short_batch(days) if SHORT_BATCH else {}
+    missing = [(d, ph) for d, ph in days if d not in ready]
+    if SHORT_BATCH:
+        print(f"ℹ️ советы: батч {len(ready)}/{len(days)}, добор по дням: {len(missing)}")
+    if missing:
+        per_day = await asyncio.gather(*(gpt_short(d, ph) for d, ph in missing))
+        ready.update({d: adv for (d, _), adv in zip(missing, per_day)})
+    return ready
+
 async def gpt_long(name: str, month: str) -> str:
     system = (
         "Ты пишешь краткие (1–2 предложения) пояснения на русском. "
@@ -242,7 +315,8 @@ async def gpt_long(name: str, month: str) -> str:
         "Тон экспертный, вдохновляющий, уверенный, конкретный."
     )
     try:
-        txt = gpt_complete(prompt=prompt, system=system, temperature=0.7, max_tokens=400)
+        txt = gpt_complete(prompt=prompt, system=system, temperature=0.7, max_tokens=400,
+                           cache_site="lunar_long")
         if txt:
             return _sanitize_ru(txt.strip())
     except Exception:
@@ -322,8 +396,12 @@ async def generate(year: int, month: int) -> Dict[str,Any]:
     # список всех VoC (UTC), затем используем для каждого дня
     all_voc = find_voc_intervals_for_month(first, last)
 
+    # одна почасовая сетка Солнце/Луна на месяц (+запас) вместо swe на каждый день
+    eph = sample_month(year, month)
+
     cal: Dict[str,Any] = {}
-    long_tasks, short_tasks = {}, []
+    long_tasks: Dict[str, asyncio.Task] = {}
+    short_days: List[Tuple[str, str]] = []
 
     d = first
     while d <= last:
@@ -331,14 +409,14 @@ async def generate(year: int, month: int) -> Dict[str,Any]:
         jd = swe.julday(d.year, d.month, d.day, 0.0)
 
         # лунные данные
-        name, illum, sign = compute_phase(jd)
+        name, illum, sign = compute_phase_from_samples(eph, jd)
         emoji      = EMO[name]
         phase_time = jd2dt(jd).in_tz(TZ).to_iso8601_string()
 
         # советы
         short = FALLBACK_SHORT[:] if SKIP_SHORT else []
         if not SKIP_SHORT:
-            short_tasks.append(asyncio.create_task(gpt_short(d.to_date_string(), name)))
+            short_days.append((d.to_date_string(), name))
         if name not in long_tasks:
             long_tasks[name] = asyncio.create_task(gpt_long(name, ""))
 
@@ -371,10 +449,10 @@ async def generate(year: int, month: int) -> Dict[str,Any]:
         d = d.add(days=1)
 
     # собрать короткие советы (если не отключены)
-    if not SKIP_SHORT and short_tasks:
-        short_ready = await asyncio.gather(*short_tasks)
-        for idx, day in enumerate(sorted(cal)):
-            cal[day]["advice"] = short_ready[idx]
+    if not SKIP_SHORT and short_days:
+        short_ready = await _collect_short_advice(short_days)
+        for day, advice in short_ready.items():
+            cal[day]["advice"] = advice
 
     # раздать длинные описания по всем дням одной фазы
     for ph_name, tsk in long_tasks.items():
@@ -402,7 +480,10 @@ async def generate(year: int, month: int) -> Dict[str,Any]:
         if (e - s).total_seconds() >= max(0, MIN_VOC_MIN*60)
     ]
 
-    return {"days": cal, "month_voc": month_voc}
+    ephemeris = eph.to_json()
+    ephemeris["phase_events"] = eph.phase_instants()
+
+    return {"days": cal, "month_voc": month_voc, "ephemeris": ephemeris}
 
 # ───── entry-point ────────────────────────────────────────────────────────
 async def _main():
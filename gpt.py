@@ -5,11 +5,23 @@ gpt.py
 
 Обёртка LLM для VayboMeter (Kaliningrad):
 
-- Порядок провайдеров: OpenAI → Gemini → Groq.
+- Базовый порядок провайдеров: OpenAI → Gemini → Groq; реальный порядок
+  кандидатов provider:model берётся из персистентного табло здоровья
+  (llm_health.json: доля успехов с затуханием, p50/p95 задержки, последняя
+  ошибка квоты) — быстрые и надёжные раньше, недавно упёршиеся в лимит — в конец.
+- Режим с дедлайном (deadline_s или бюджет поста llm_budget_start): первый
+  кандидат стартует сразу, следующий — через GPT_HEDGE_DELAY_S параллельно
+  (или сразу после ошибки); берётся первый непустой ответ. Бюджет исчерпан —
+  мгновенно "" и вызывающий код берёт детерминированный фолбэк.
 - При 429/insufficient_quota у OpenAI отключаем OpenAI на весь текущий запуск,
   чтобы не «стучать» повторно в платный провайдер.
 - Gemini перебираем по стабильной цепочке primary → fallback, а затем (если нужно) идём в Groq.
 - Контракт gpt_blurb(culprit) сохранён: возвращает (summary: str, tips: List[str]).
+- Кэш ответов: вызовы с cache_site=... кэшируются на диске по sha256 от
+  (system, prompt, temperature, max_tokens, набор провайдеров/моделей) с TTL
+  на каждую точку вызова (CACHE_TTL_BY_SITE, GPT_CACHE_TTL_<SITE>). Размер
+  хранилища ограничен GPT_CACHE_MAX_ENTRIES; GPT_CACHE_BYPASS=1 или
+  cache_bypass=True — читать мимо кэша (свежий ответ всё равно сохраняется).
 
 Важно про Gemini:
 - В OpenAI-совместимом эндпоинте Gemini требуется заголовок Authorization: Bearer <API_KEY>.
@@ -19,10 +31,20 @@ gpt.py
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import os
+import queue
 import random
-from typing import List, Optional, Tuple
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import snapshots
+import tracing
 
 log = logging.getLogger(__name__)
 
@@ -146,11 +168,22 @@ def _is_model_not_found(err: Exception) -> bool:
 
 
 def _gemini_models_available(cli: "OpenAI") -> Optional[set[str]]:
-    """Пытаемся получить список моделей Gemini через /models."""
-    global _GEMINI_MODEL_SET
+    """
+    Список моделей Gemini: память процесса → дисковый кэш (GPT_GEMINI_MODELS_TTL)
+    → /models. Так эндпоинт /models дёргается не чаще раза в TTL, а не на каждый вызов.
+    """
+    global _GEMINI_MODEL_SET, _GEMINI_DISABLED_FOR_RUN
     if _GEMINI_MODEL_SET is not None:
         return _GEMINI_MODEL_SET
 
+    cached = _health_state().get("gemini_models")
+    if isinstance(cached, dict) and time.time() - float(cached.get("ts") or 0) <= GPT_GEMINI_MODELS_TTL:
+        names_cached = cached.get("names")
+        if isinstance(names_cached, list) and names_cached:
+            _GEMINI_MODEL_SET = {str(n) for n in names_cached}
+            log.info("Gemini models: %d from cache", len(_GEMINI_MODEL_SET))
+            return _GEMINI_MODEL_SET
+
     try:
         models = cli.models.list()
         names: set[str] = set()
@@ -161,6 +194,8 @@ def _gemini_models_available(cli: "OpenAI") -> Optional[set[str]]:
         _GEMINI_MODEL_SET = names if names else set()
         if names:
             log.info("Gemini models.list(): %d models", len(names))
+            _health_state()["gemini_models"] = {"ts": time.time(), "names": sorted(names)}
+            _health_save()
         else:
             log.warning("Gemini models.list(): empty list")
         return _GEMINI_MODEL_SET
@@ -174,49 +209,456 @@ def _gemini_models_available(cli: "OpenAI") -> Optional[set[str]]:
         return None
 
 
+# ── кэш ответов ───────────────────────────────────────────────────────────
+def _env_truthy(name: str) -> bool:
+    return (os.getenv(name) or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+GPT_CACHE_PATH = Path(
+    os.getenv("GPT_CACHE_PATH")
+    or Path(os.getenv("VAYBOMETER_CACHE_DIR") or ".cache") / "llm_cache.json"
+)
+GPT_CACHE_MAX_ENTRIES = int(os.getenv("GPT_CACHE_MAX_ENTRIES", "256") or 256)
+
+# TTL (секунды) по точкам вызова; вызов без cache_site не кэшируется.
+CACHE_TTL_BY_SITE: Dict[str, float] = {
+    "astro_bullets": 24 * 3600,   # post_common._astro_llm_bullets: одна дата — один ответ
+    "blurb": 6 * 3600,            # gpt_blurb: dry-run → боевой пост в пределах утра/вечера
+    "lunar_short": 7 * 24 * 3600,  # gen_lunar_calendar: перезапуск генерации месяца
+    "lunar_long": 7 * 24 * 3600,
+}
+
+_CACHE_STATS: Dict[str, int] = {"hit": 0, "miss": 0, "store": 0}
+
+
+def _provider_family() -> str:
+    """Сигнатура настроенных провайдеров/моделей: смена конфигурации = другой ключ кэша."""
+    parts: List[str] = []
+    if OPENAI_KEY:
+        parts.append(f"openai:{OPENAI_MODEL}")
+    if GEMINI_KEY:
+        parts.append("gemini:" + ",".join(GEMINI_MODELS))
+    if GROQ_KEY:
+        parts.append("groq:" + ",".join(GROQ_MODELS))
+    return "|".join(parts)
+
+
+def _prompt_key(system: Optional[str], prompt: str, temperature: float, max_tokens: int) -> str:
+    """Ключ снимка запуска: только сам запрос — повтор не зависит от набора ключей API."""
+    raw = json.dumps([system or "", prompt, round(float(temperature), 3), int(max_tokens)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_key(system: Optional[str], prompt: str, temperature: float, max_tokens: int) -> str:
+    raw = json.dumps(
+        [system or "", prompt, round(float(temperature), 3), int(max_tokens), _provider_family()],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_ttl(site: str) -> float:
+    env = (os.getenv(f"GPT_CACHE_TTL_{site.upper()}") or "").strip()
+    if env:
+        try:
+            return float(env)
+        except ValueError:
+            log.warning("LLM cache: bad GPT_CACHE_TTL_%s=%r, using default", site.upper(), env)
+    return float(CACHE_TTL_BY_SITE.get(site, 0))
+
+
+def _cache_load() -> Dict[str, Any]:
+    try:
+        data = json.loads(GPT_CACHE_PATH.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _cache_save(data: Dict[str, Any]) -> None:
+    if len(data) > GPT_CACHE_MAX_ENTRIES:
+        newest = sorted(data.items(), key=lambda kv: kv[1].get("ts", 0), reverse=True)
+        data = dict(newest[:GPT_CACHE_MAX_ENTRIES])
+    try:
+        GPT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = GPT_CACHE_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, GPT_CACHE_PATH)
+    except Exception as e:
+        log.warning("LLM cache: write failed: %s", e)
+
+
+def _cache_get(key: str, ttl: float) -> Optional[str]:
+    rec = _cache_load().get(key)
+    if not isinstance(rec, dict):
+        return None
+    if time.time() - float(rec.get("ts") or 0) > ttl:
+        return None
+    text = rec.get("text")
+    return text if isinstance(text, str) and text else None
+
+
+def _cache_put(key: str, site: str, text: str, ttl: float) -> None:
+    now = time.time()
+    data = {
+        k: v
+        for k, v in _cache_load().items()
+        if isinstance(v, dict) and now - float(v.get("ts") or 0) <= float(v.get("ttl") or ttl)
+    }
+    data[key] = {"ts": now, "ttl": ttl, "site": site, "text": text}
+    _cache_save(data)
+    _CACHE_STATS["store"] += 1
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    """Счётчики кэша за текущий запуск: hit/miss/store и доля попаданий."""
+    total = _CACHE_STATS["hit"] + _CACHE_STATS["miss"]
+    return {**_CACHE_STATS, "hit_rate": round(_CACHE_STATS["hit"] / total, 3) if total else 0.0}
+
+
+def _log_cache_event(kind: str, site: str) -> None:
+    _CACHE_STATS[kind] += 1
+    tracing.incr(f"cache_{kind}s")
+    st = llm_cache_stats()
+    log.info(
+        "LLM cache %s (site=%s) — hits %d/%d, rate %.0f%%",
+        kind, site, st["hit"], st["hit"] + st["miss"], st["hit_rate"] * 100,
+    )
+
+
+# ── табло здоровья провайдеров ─────────────────────────────────────────────
+# Персистентная статистика по каждой паре provider:model между запусками:
+# успехи/ошибки с экспоненциальным затуханием, последние задержки (p50/p95)
+# и последняя ошибка квоты/лимита. По ней gpt_complete упорядочивает
+# кандидатов по ожидаемой задержке и пропускает недавно упёршиеся в лимит.
+GPT_HEALTH_PATH = Path(
+    os.getenv("GPT_HEALTH_PATH")
+    or Path(os.getenv("VAYBOMETER_CACHE_DIR") or ".cache") / "llm_health.json"
+)
+GPT_HEALTH_HALF_LIFE_S = float(os.getenv("GPT_HEALTH_HALF_LIFE_S", str(3 * 24 * 3600)))
+GPT_RATE_LIMIT_COOLDOWN_S = float(os.getenv("GPT_RATE_LIMIT_COOLDOWN_S", "900"))
+GPT_QUOTA_COOLDOWN_S = float(os.getenv("GPT_QUOTA_COOLDOWN_S", str(6 * 3600)))
+GPT_LATENCY_PRIOR_S = float(os.getenv("GPT_LATENCY_PRIOR_S", "8"))
+GPT_GEMINI_MODELS_TTL = float(os.getenv("GPT_GEMINI_MODELS_TTL", str(24 * 3600)))
+_HEALTH_MIN_SAMPLES = 3
+_HEALTH_MAX_LATENCIES = 50
+
+_HEALTH: Optional[Dict[str, Any]] = None
+_HEALTH_LOCK = threading.RLock()
+
+
+def _health_state() -> Dict[str, Any]:
+    global _HEALTH
+    if _HEALTH is None:
+        try:
+            data = json.loads(GPT_HEALTH_PATH.read_text(encoding="utf-8"))
+            _HEALTH = data if isinstance(data, dict) else {}
+        except Exception:
+            _HEALTH = {}
+        _HEALTH.setdefault("models", {})
+    return _HEALTH
+
+
+def _health_save() -> None:
+    try:
+        GPT_HEALTH_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = GPT_HEALTH_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_health_state(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, GPT_HEALTH_PATH)
+    except Exception as e:
+        log.warning("LLM health: write failed: %s", e)
+
+
+def _decayed(rec: Dict[str, Any], now: float) -> Tuple[float, float]:
+    k = 0.5 ** (max(0.0, now - float(rec.get("updated") or now)) / GPT_HEALTH_HALF_LIFE_S)
+    return float(rec.get("ok") or 0) * k, float(rec.get("fail") or 0) * k
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    vals = sorted(values)
+    return vals[min(len(vals) - 1, int(round(q * (len(vals) - 1))))]
+
+
+def _health_record(provider: str, model: str, *, ok: bool, latency: Optional[float] = None,
+                   err: Optional[Exception] = None) -> None:
+    with _HEALTH_LOCK:
+        _health_record_locked(provider, model, ok=ok, latency=latency, err=err)
+
+
+def _health_record_locked(provider: str, model: str, *, ok: bool, latency: Optional[float],
+                          err: Optional[Exception]) -> None:
+    now = time.time()
+    rec = _health_state()["models"].setdefault(f"{provider}:{model}", {})
+    ok_n, fail_n = _decayed(rec, now)
+    rec["ok"], rec["fail"], rec["updated"] = ok_n + (1 if ok else 0), fail_n + (0 if ok else 1), now
+    if ok and latency is not None:
+        rec["lat"] = (list(rec.get("lat") or []) + [round(latency, 3)])[-_HEALTH_MAX_LATENCIES:]
+    if err is not None and _is_quota_or_rate_limit(err):
+        msg = str(err).lower()
+        rec["quota_ts"] = now
+        rec["quota_kind"] = "quota" if ("insufficient_quota" in msg or "quota" in msg) else "rate"
+        rec["quota_msg"] = str(err)[:200]
+    _health_save()
+
+
+def _health_cooldown_left(provider: str, model: str, now: Optional[float] = None) -> float:
+    """Сколько секунд ещё пропускать модель после ошибки квоты/лимита (0 — можно звать)."""
+    now = time.time() if now is None else now
+    rec = _health_state()["models"].get(f"{provider}:{model}") or {}
+    ts = rec.get("quota_ts")
+    if not ts:
+        return 0.0
+    span = GPT_QUOTA_COOLDOWN_S if rec.get("quota_kind") == "quota" else GPT_RATE_LIMIT_COOLDOWN_S
+    return max(0.0, float(ts) + span - now)
+
+
+def _expected_latency(provider: str, model: str, now: Optional[float] = None) -> float:
+    """
+    p50 задержки (пока замеров меньше _HEALTH_MIN_SAMPLES — GPT_LATENCY_PRIOR_S),
+    делённый на долю успехов. Задержки пишутся только по успехам, поэтому
+    доля успехов применяется и к приору: модель, которая только падает,
+    уходит в хвост, а не держится на приоре.
+    """
+    now = time.time() if now is None else now
+    rec = _health_state()["models"].get(f"{provider}:{model}") or {}
+    lat = list(rec.get("lat") or [])
+    base = _percentile(lat, 0.5) if len(lat) >= _HEALTH_MIN_SAMPLES else GPT_LATENCY_PRIOR_S
+    ok_n, fail_n = _decayed(rec, now)
+    if ok_n + fail_n <= 0:
+        return base
+    return base / max(ok_n / (ok_n + fail_n), 0.1)
+
+
+def provider_health_report() -> Dict[str, Dict[str, Any]]:
+    """Снимок табло: success_rate, p50/p95 задержки, последняя ошибка квоты."""
+    now = time.time()
+    out: Dict[str, Dict[str, Any]] = {}
+    for key, rec in sorted(_health_state()["models"].items()):
+        ok_n, fail_n = _decayed(rec, now)
+        lat = list(rec.get("lat") or [])
+        provider, _, model = key.partition(":")
+        out[key] = {
+            "success_rate": round(ok_n / (ok_n + fail_n), 3) if ok_n + fail_n else None,
+            "p50_s": _percentile(lat, 0.5),
+            "p95_s": _percentile(lat, 0.95),
+            "last_quota_error": rec.get("quota_msg"),
+            "cooldown_s": round(_health_cooldown_left(provider, model, now)),
+        }
+    return out
+
+
+# ── дедлайн, хеджирование и бюджет поста ──────────────────────────────────
+GPT_HEDGE_DELAY_S = float(os.getenv("GPT_HEDGE_DELAY_S", "4"))
+GPT_POST_BUDGET_S = float(os.getenv("GPT_POST_BUDGET_S", "45"))
+GPT_BLURB_DEADLINE_S = float(os.getenv("GPT_BLURB_DEADLINE_S", "15"))
+
+_BUDGET_DEADLINE: Optional[float] = None  # time.monotonic() конца бюджета поста
+
+
+def llm_budget_start(seconds: Optional[float] = None) -> None:
+    """
+    Открывает общий бюджет на все LLM-вызовы одного поста (по умолчанию
+    GPT_POST_BUDGET_S). seconds <= 0 снимает ограничение.
+    """
+    global _BUDGET_DEADLINE
+    seconds = GPT_POST_BUDGET_S if seconds is None else float(seconds)
+    _BUDGET_DEADLINE = time.monotonic() + seconds if seconds > 0 else None
+
+
+def llm_budget_left() -> Optional[float]:
+    """Остаток бюджета поста в секундах (None — бюджет не открыт)."""
+    if _BUDGET_DEADLINE is None:
+        return None
+    return max(0.0, _BUDGET_DEADLINE - time.monotonic())
+
+
+def _effective_deadline(deadline_s: Optional[float]) -> Optional[float]:
+    deadline = time.monotonic() + float(deadline_s) if deadline_s is not None else None
+    if _BUDGET_DEADLINE is not None:
+        deadline = _BUDGET_DEADLINE if deadline is None else min(deadline, _BUDGET_DEADLINE)
+    return deadline
+
+
+def _gpt_complete_hedged(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    deadline: float,
+    hedge_delay_s: float,
+) -> str:
+    """
+    Кандидаты из _route_candidates() запускаются в фоновых потоках: следующий —
+    через hedge_delay_s, если предыдущий ещё не ответил, или сразу после его
+    ошибки. Первый непустой ответ побеждает; по дедлайну возвращаем "".
+    Опоздавшие потоки (daemon) досчитываются в фоне и только пишут табло.
+    """
+    cands = _route_candidates()
+    results: "queue.Queue[Tuple[_Candidate, str]]" = queue.Queue()
+    launched = pending = 0
+
+    def _run(cand: _Candidate) -> None:
+        try:
+            text = _call_candidate(cand, messages, temperature, max_tokens)
+        except Exception as e:  # _call_candidate сам ловит ошибки провайдера
+            log.warning("LLM: %s:%s crashed: %s", cand.provider, cand.model, e)
+            text = ""
+        results.put((cand, text))
+
+    def _launch() -> bool:
+        nonlocal launched, pending
+        while launched < len(cands):
+            cand = cands[launched]
+            launched += 1
+            if _provider_disabled(cand.provider):
+                continue
+            threading.Thread(target=_run, args=(cand,), daemon=True, name=f"llm-{cand.provider}").start()
+            pending += 1
+            return True
+        return False
+
+    _launch()
+    next_hedge = time.monotonic() + hedge_delay_s
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            log.warning("LLM: deadline reached with %d request(s) in flight → fallback", pending)
+            return ""
+        wait_until = min(deadline, next_hedge) if launched < len(cands) else deadline
+        try:
+            cand, text = results.get(timeout=max(0.0, wait_until - now))
+        except queue.Empty:
+            if time.monotonic() >= next_hedge and _launch():
+                log.info("LLM: hedge → %s:%s", cands[launched - 1].provider, cands[launched - 1].model)
+                next_hedge = time.monotonic() + hedge_delay_s
+            continue
+        pending -= 1
+        if text:
+            return text
+        if _launch():
+            next_hedge = time.monotonic() + hedge_delay_s
+    return ""
+
+
+def _complete(
+    prompt: str,
+    system: Optional[str],
+    temperature: float,
+    max_tokens: int,
+    deadline_s: Optional[float],
+    hedge_delay_s: Optional[float],
+) -> str:
+    deadline = _effective_deadline(deadline_s)
+    if deadline is None:
+        return _gpt_complete_providers(prompt, system, temperature, max_tokens)
+    if deadline - time.monotonic() <= 0:
+        log.warning("LLM: post budget exhausted → deterministic fallback")
+        return ""
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    hedge = GPT_HEDGE_DELAY_S if hedge_delay_s is None else float(hedge_delay_s)
+    return _gpt_complete_hedged(messages, temperature, max_tokens, deadline, hedge)
+
+
 # ── общая обёртка ─────────────────────────────────────────────────────────
 def gpt_complete(
     prompt: str,
     system: Optional[str] = None,
     temperature: float = 0.7,
     max_tokens: int = 600,
+    *,
+    cache_site: Optional[str] = None,
+    cache_bypass: bool = False,
+    deadline_s: Optional[float] = None,
+    hedge_delay_s: Optional[float] = None,
 ) -> str:
     """
-    Универсальный вызов LLM. Пробует по очереди: OpenAI → Gemini → Groq.
-    Возвращает text или "" (если все провайдеры недоступны).
-    """
-    global _OPENAI_DISABLED_FOR_RUN, _GEMINI_DISABLED_FOR_RUN
+    Универсальный вызов LLM. Кандидаты provider:model — в порядке табло
+    здоровья (_route_candidates; базовый порядок OpenAI → Gemini → Groq только
+    без истории). Возвращает text или "" (если все провайдеры недоступны).
 
+    cache_site — имя точки вызова из CACHE_TTL_BY_SITE: включает дисковый кэш
+    с TTL этой точки. cache_bypass (или GPT_CACHE_BYPASS=1) пропускает чтение.
+
+    deadline_s (или открытый llm_budget_start) включает хеджированный режим:
+    не дольше min(deadline_s, остаток бюджета) секунд, второй провайдер
+    подключается через hedge_delay_s (по умолчанию GPT_HEDGE_DELAY_S).
+    """
     if not prompt or not str(prompt).strip():
         return ""
 
-    messages = []
-    if system:
-        messages.append({"role": "system", "content": system})
-    messages.append({"role": "user", "content": prompt})
+    # снимок запуска (snapshots.py): ответ уходит в архив, при повторе — из него
+    with tracing.span("llm", site=cache_site or ""):
+        return snapshots.memo(
+            "llm",
+            _prompt_key(system, prompt, temperature, max_tokens),
+            lambda: _gpt_complete_cached(
+                prompt, system, temperature, max_tokens, cache_site, cache_bypass, deadline_s, hedge_delay_s
+            ),
+        )
+
+
+def _gpt_complete_cached(
+    prompt: str,
+    system: Optional[str],
+    temperature: float,
+    max_tokens: int,
+    cache_site: Optional[str],
+    cache_bypass: bool,
+    deadline_s: Optional[float],
+    hedge_delay_s: Optional[float],
+) -> str:
+    ttl = _cache_ttl(cache_site) if cache_site else 0.0
+    if ttl <= 0:
+        return _complete(prompt, system, temperature, max_tokens, deadline_s, hedge_delay_s)
+
+    key = _cache_key(system, prompt, temperature, max_tokens)
+    if not (cache_bypass or _env_truthy("GPT_CACHE_BYPASS")):
+        cached = _cache_get(key, ttl)
+        if cached is not None:
+            _log_cache_event("hit", cache_site)
+            return cached
+    _log_cache_event("miss", cache_site)
+
+    text = _complete(prompt, system, temperature, max_tokens, deadline_s, hedge_delay_s)
+    if text:
+        _cache_put(key, cache_site, text, ttl)
+    return text
+
+
+@dataclass
+class _Candidate:
+    provider: str  # "openai" | "gemini" | "groq"
+    model: str
+    client: Any
 
-    # 1) OpenAI
+
+def _provider_disabled(provider: str) -> bool:
+    if provider == "openai":
+        return _OPENAI_DISABLED_FOR_RUN
+    if provider == "gemini":
+        return _GEMINI_DISABLED_FOR_RUN
+    return False
+
+
+def _route_candidates() -> List[_Candidate]:
+    """
+    Все доступные пары provider:model. Базовый порядок — OpenAI → Gemini → Groq
+    (внутри — primary → fallback); затем сортировка по ожидаемой задержке
+    из табло здоровья (без истории порядок сохраняется). Модели в cooldown после
+    429/квоты уходят в конец и используются только как последний шанс.
+    """
+    global _GEMINI_DISABLED_FOR_RUN
+
+    base: List[_Candidate] = []
     if not _OPENAI_DISABLED_FOR_RUN:
         cli = _openai_client()
         if cli:
-            try:
-                r = cli.chat.completions.create(
-                    model=OPENAI_MODEL,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
-                text = (r.choices[0].message.content or "").strip()
-                if text:
-                    return text
-            except Exception as e:
-                if _is_quota_or_rate_limit(e):
-                    _OPENAI_DISABLED_FOR_RUN = True
-                    log.warning("OpenAI quota/rate-limit → disable for this run: %s", e)
-                else:
-                    log.warning("OpenAI error: %s", e)
-
-    # 2) Gemini
+            base.append(_Candidate("openai", OPENAI_MODEL, cli))
+
     if (not _GEMINI_DISABLED_FOR_RUN) and GEMINI_KEY:
         cli = _gemini_openai_compat_client()
         if cli:
@@ -227,70 +669,93 @@ def gpt_complete(
                 candidates = preferred + rest
             else:
                 candidates = GEMINI_MODELS[:]
-
-            for mdl in candidates:
-                try:
-                    request = {
-                        "model": mdl,
-                        "messages": messages,
-                        "max_tokens": max_tokens,
-                    }
-                    # Gemini 3.x rejects the legacy temperature/top-p/top-k
-                    # controls. Keep temperature only for the 2.5 fallback,
-                    # which preserves the previous behavior there.
-                    if not mdl.startswith("gemini-3"):
-                        request["temperature"] = temperature
-                    r = cli.chat.completions.create(**request)
-                    text = (r.choices[0].message.content or "").strip()
-                    if text:
-                        log.info("LLM: Gemini ok (model=%s)", mdl)
-                        return text
-                except Exception as e:
-                    msg = str(e).lower()
-                    if "missing authorization" in msg or "unauth" in msg or "401" in msg:
-                        _GEMINI_DISABLED_FOR_RUN = True
-                        log.warning("Gemini auth error → disable for this run: %s", e)
-                        break
-                    if _is_model_not_found(e):
-                        log.warning("Gemini model %s not found/unsupported, trying next.", mdl)
-                        continue
-                    if _is_quota_or_rate_limit(e):
-                        log.warning("Gemini rate/quota on %s, trying next.", mdl)
-                        continue
-                    log.warning("Gemini error on %s: %s", mdl, e)
-                    continue
+            base.extend(_Candidate("gemini", mdl, cli) for mdl in candidates)
         else:
             _GEMINI_DISABLED_FOR_RUN = True
             log.warning("Gemini client unavailable — disabling for this run")
     elif not GEMINI_KEY:
         log.info("Gemini skipped: GEMINI_API_KEY is not set")
 
-    # 3) Groq
     cli = _groq_client()
     if cli:
-        for mdl in GROQ_MODELS:
-            try:
-                log.info("LLM: Groq trying model=%s", mdl)
-                r = cli.chat.completions.create(
-                    model=mdl,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
-                text = (r.choices[0].message.content or "").strip()
-                if text:
-                    log.info("LLM: Groq ok (model=%s)", mdl)
-                    return text
-            except Exception as e:
-                if _is_model_not_found(e):
-                    log.warning("Groq model %s unavailable, trying next.", mdl)
-                    continue
-                if _is_quota_or_rate_limit(e):
-                    log.warning("Groq rate/quota on %s, trying next.", mdl)
-                    continue
-                log.warning("Groq error on %s: %s", mdl, e)
-                continue
+        base.extend(_Candidate("groq", mdl, cli) for mdl in GROQ_MODELS)
+
+    now = time.time()
+    ready: List[Tuple[float, int, _Candidate]] = []
+    cooling: List[_Candidate] = []
+    for idx, cand in enumerate(base):
+        left = _health_cooldown_left(cand.provider, cand.model, now)
+        if left > 0:
+            log.info("LLM: %s:%s in rate-limit cooldown (%.0fs left), deferring", cand.provider, cand.model, left)
+            cooling.append(cand)
+            continue
+        ready.append((_expected_latency(cand.provider, cand.model, now), idx, cand))
+    ready.sort(key=lambda t: (t[0], t[1]))
+    return [c for _score, _idx, c in ready] + cooling
+
+
+def _call_candidate(cand: _Candidate, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """Один запрос к кандидату; ошибки логируются и пишутся в табло, наружу — "" при неудаче."""
+    global _OPENAI_DISABLED_FOR_RUN, _GEMINI_DISABLED_FOR_RUN
+
+    request: Dict[str, Any] = {"model": cand.model, "messages": messages, "max_tokens": max_tokens}
+    # Gemini 3.x rejects the legacy temperature/top-p/top-k controls. Keep
+    # temperature only for the 2.5 fallback, which preserves the previous
+    # behavior there.
+    if not (cand.provider == "gemini" and cand.model.startswith("gemini-3")):
+        request["temperature"] = temperature
+    if cand.provider == "groq":
+        log.info("LLM: Groq trying model=%s", cand.model)
+
+    t0 = time.monotonic()
+    try:
+        r = cand.client.chat.completions.create(**request)
+        text = (r.choices[0].message.content or "").strip()
+    except Exception as e:
+        _health_record(cand.provider, cand.model, ok=False, err=e)
+        msg = str(e).lower()
+        if cand.provider == "openai":
+            if _is_quota_or_rate_limit(e):
+                _OPENAI_DISABLED_FOR_RUN = True
+                log.warning("OpenAI quota/rate-limit → disable for this run: %s", e)
+            else:
+                log.warning("OpenAI error: %s", e)
+            return ""
+        name = "Gemini" if cand.provider == "gemini" else "Groq"
+        if cand.provider == "gemini" and ("missing authorization" in msg or "unauth" in msg or "401" in msg):
+            _GEMINI_DISABLED_FOR_RUN = True
+            log.warning("Gemini auth error → disable for this run: %s", e)
+        elif _is_model_not_found(e):
+            log.warning("%s model %s not found/unsupported, trying next.", name, cand.model)
+        elif _is_quota_or_rate_limit(e):
+            log.warning("%s rate/quota on %s, trying next.", name, cand.model)
+        else:
+            log.warning("%s error on %s: %s", name, cand.model, e)
+        return ""
 
+    _health_record(cand.provider, cand.model, ok=bool(text), latency=time.monotonic() - t0)
+    if text and cand.provider != "openai":
+        log.info("LLM: %s ok (model=%s)", "Gemini" if cand.provider == "gemini" else "Groq", cand.model)
+    return text
+
+
+def _gpt_complete_providers(
+    prompt: str,
+    system: Optional[str],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+
+    for cand in _route_candidates():
+        if _provider_disabled(cand.provider):
+            continue
+        text = _call_candidate(cand, messages, temperature, max_tokens)
+        if text:
+            return text
     return ""
 
 
@@ -379,8 +844,11 @@ ASTRO_HEALTH_FALLBACK: List[str] = [
 ]
 
 
-def gpt_blurb(culprit: str) -> Tuple[str, List[str]]:
-    """Возвращает (summary: str, tips: List[str])."""
+def gpt_blurb(culprit: str, *, deadline_s: Optional[float] = GPT_BLURB_DEADLINE_S) -> Tuple[str, List[str]]:
+    """
+    Возвращает (summary: str, tips: List[str]).
+    Не ждёт LLM дольше deadline_s — иначе локальные советы из CULPRITS/ASTRO_HEALTH_FALLBACK.
+    """
     culprit = (culprit or "").strip() or "погоду"
     culprit_lower = culprit.lower().strip()
 
@@ -405,13 +873,15 @@ def gpt_blurb(culprit: str) -> Tuple[str, List[str]]:
 
     if culprit_lower in CULPRITS:
         tips_pool = CULPRITS[culprit_lower]["tips"]
-        text = gpt_complete(prompt=_make_prompt(culprit), temperature=0.7, max_tokens=500)
+        text = gpt_complete(prompt=_make_prompt(culprit), temperature=0.7, max_tokens=500,
+                            cache_site="blurb", deadline_s=deadline_s)
         if not text:
             return f"Если завтра что-то пойдёт не так, вините {culprit}! 😉", random.sample(tips_pool, 3)
         lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
         return _from_lines(culprit, lines, tips_pool)
 
-    text = gpt_complete(prompt=_make_prompt(culprit), temperature=0.7, max_tokens=500)
+    text = gpt_complete(prompt=_make_prompt(culprit), temperature=0.7, max_tokens=500,
+                        cache_site="blurb", deadline_s=deadline_s)
     if not text:
         return f"Если завтра что-то пойдёт не так, вините {culprit}! 😉", random.sample(ASTRO_HEALTH_FALLBACK, 3)
 
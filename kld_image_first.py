@@ -9,6 +9,7 @@ import subprocess
 from pathlib import Path
 from typing import Any, Callable, Mapping, Sequence
 
+import tracing
 from kld_visual_policy import scene_macro_family, seasonal_guard_label
 
 
@@ -123,116 +124,122 @@ def run_image_first_publication(
     if mode not in {"morning", "evening"}:
         raise ValueError("mode must be morning or evening")
 
-    result: dict[str, Any] = {
-        "result": "not_attempted",
-        "backend": "none",
-        "error_type": "",
-        "error_message": "",
-        "telegram_image_sent": False,
-        "telegram_image_message_id": None,
-        "history_recorded": False,
-        "cover_attempted": False,
-        "provider_error": None,
-        "dedup_results": [],
-        "preview_succeeded": False,
-        "text_sent": False,
-        "telegram_text_message_ids": [],
-        "mode": mode,
-        "visual_decision": None,
-    }
-    _write_json(result_path, result)
-    _write_json(
-        prompt_metadata_path,
-        {"status": "not_built", "mode": mode, "reason": "FORMAT_V2 preview has not completed"},
-    )
-
-    print(f"Building {mode} FORMAT_V2 for image-first mode:", " ".join(preview_cmd))
-    try:
-        preview = run_process(
-            list(preview_cmd),
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
-    except Exception as exc:
-        Path(preview_log_path).write_text(f"{type(exc).__name__}: {exc}\n", encoding="utf-8")
-        result.update(error_type=type(exc).__name__, error_message=str(exc))
+    # Run manifest lives next to image_result.json; the preview and image
+    # subprocesses append their own sections to it.
+    with tracing.run("image_first", Path(result_path).with_name(tracing.MANIFEST_NAME), mode=mode):
+        result: dict[str, Any] = {
+            "result": "not_attempted",
+            "backend": "none",
+            "error_type": "",
+            "error_message": "",
+            "telegram_image_sent": False,
+            "telegram_image_message_id": None,
+            "history_recorded": False,
+            "cover_attempted": False,
+            "provider_error": None,
+            "dedup_results": [],
+            "preview_succeeded": False,
+            "text_sent": False,
+            "telegram_text_message_ids": [],
+            "mode": mode,
+            "visual_decision": None,
+        }
         _write_json(result_path, result)
-        raise
-
-    preview_output = str(preview.stdout or "")
-    print(preview_output, end="")
-    Path(preview_log_path).write_text(preview_output, encoding="utf-8")
-    if int(preview.returncode) != 0:
-        result.update(
-            error_type="PreviewProcessError",
-            error_message=f"FORMAT_V2 preview exited with {preview.returncode}",
-            preview_returncode=int(preview.returncode),
+        _write_json(
+            prompt_metadata_path,
+            {"status": "not_built", "mode": mode, "reason": "FORMAT_V2 preview has not completed"},
         )
-        _write_json(result_path, result)
-        raise subprocess.CalledProcessError(int(preview.returncode), list(preview_cmd))
 
-    try:
-        block = extract_format_v2_message(preview_output)
-    except ValueError as exc:
-        result.update(error_type=type(exc).__name__, error_message=str(exc))
+        print(f"Building {mode} FORMAT_V2 for image-first mode:", " ".join(preview_cmd))
+        try:
+            with tracing.span("preview"):
+                preview = run_process(
+                    list(preview_cmd),
+                    text=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                )
+        except Exception as exc:
+            Path(preview_log_path).write_text(f"{type(exc).__name__}: {exc}\n", encoding="utf-8")
+            result.update(error_type=type(exc).__name__, error_message=str(exc))
+            _write_json(result_path, result)
+            raise
+
+        preview_output = str(preview.stdout or "")
+        print(preview_output, end="")
+        Path(preview_log_path).write_text(preview_output, encoding="utf-8")
+        if int(preview.returncode) != 0:
+            result.update(
+                error_type="PreviewProcessError",
+                error_message=f"FORMAT_V2 preview exited with {preview.returncode}",
+                preview_returncode=int(preview.returncode),
+            )
+            _write_json(result_path, result)
+            raise subprocess.CalledProcessError(int(preview.returncode), list(preview_cmd))
+
+        try:
+            block = extract_format_v2_message(preview_output)
+        except ValueError as exc:
+            result.update(error_type=type(exc).__name__, error_message=str(exc))
+            _write_json(result_path, result)
+            raise
+
+        Path(message_path).write_text(block + "\n", encoding="utf-8")
+        result["preview_succeeded"] = True
         _write_json(result_path, result)
-        raise
-
-    Path(message_path).write_text(block + "\n", encoding="utf-8")
-    result["preview_succeeded"] = True
-    _write_json(result_path, result)
 
-    print(f"Running {mode} image send:", " ".join(image_cmd))
-    try:
-        image_process = run_process(list(image_cmd))
-        image_returncode = int(image_process.returncode)
-    except Exception as exc:
-        image_returncode = -1
-        result.update(
-            result="failed_nonfatal",
-            backend="none",
-            error_type=type(exc).__name__,
-            error_message=str(exc),
-        )
-    else:
-        tool_result = _load_json(result_path)
-        if tool_result:
-            result.update(tool_result)
-        elif image_returncode != 0:
+        print(f"Running {mode} image send:", " ".join(image_cmd))
+        try:
+            with tracing.span("image"):
+                image_process = run_process(list(image_cmd))
+            image_returncode = int(image_process.returncode)
+        except Exception as exc:
+            image_returncode = -1
             result.update(
                 result="failed_nonfatal",
                 backend="none",
-                error_type="ImageProcessError",
-                error_message=f"image tool exited with {image_returncode}",
+                error_type=type(exc).__name__,
+                error_message=str(exc),
             )
-    result["image_process_returncode"] = image_returncode
-    result["visual_decision"] = _visual_decision(
-        result,
-        _load_json(prompt_metadata_path),
-        mode=mode,
-    )
+        else:
+            tool_result = _load_json(result_path)
+            if tool_result:
+                result.update(tool_result)
+            elif image_returncode != 0:
+                result.update(
+                    result="failed_nonfatal",
+                    backend="none",
+                    error_type="ImageProcessError",
+                    error_message=f"image tool exited with {image_returncode}",
+                )
+        result["image_process_returncode"] = image_returncode
+        result["visual_decision"] = _visual_decision(
+            result,
+            _load_json(prompt_metadata_path),
+            mode=mode,
+        )
 
-    if image_returncode != 0 or not result.get("telegram_image_sent"):
-        print("::warning::KLD image unavailable; text publication continued.")
+        if image_returncode != 0 or not result.get("telegram_image_sent"):
+            print("::warning::KLD image unavailable; text publication continued.")
 
-    print(f"Sending {mode} extracted text after image...")
-    try:
-        message_ids = list(send_text(str(message_path)) or [])
-    except Exception as exc:
-        result.update(
-            text_sent=False,
-            text_error_type=type(exc).__name__,
-            text_error_message=str(exc),
-        )
-        _write_json(result_path, result)
-        raise
+        print(f"Sending {mode} extracted text after image...")
+        try:
+            with tracing.span("send_text"):
+                message_ids = list(send_text(str(message_path)) or [])
+        except Exception as exc:
+            result.update(
+                text_sent=False,
+                text_error_type=type(exc).__name__,
+                text_error_message=str(exc),
+            )
+            _write_json(result_path, result)
+            raise
 
-    result["text_sent"] = True
-    result["telegram_text_message_ids"] = message_ids
-    _write_json(result_path, result)
-    print(f"KLD extracted text sent: chunks={len(message_ids) if message_ids else 1}")
-    return result
+        result["text_sent"] = True
+        result["telegram_text_message_ids"] = message_ids
+        _write_json(result_path, result)
+        print(f"KLD extracted text sent: chunks={len(message_ids) if message_ids else 1}")
+        return result
 
 
 __all__ = [
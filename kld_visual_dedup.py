@@ -13,6 +13,7 @@ import os
 from pathlib import Path
 from typing import Any
 
+import tracing
 from kld_image_content_guard import inspect_kld_provider_image
 from kld_visual_policy import scene_macro_family, scene_policy_rejection
 
@@ -258,11 +259,13 @@ def evaluate_kld_visual_candidate(
     # Local covers are deterministic cards and are validated semantically by
     # kld_informative_cover.py. The provider content guard is for AI images.
     if str(scene_family or "") != "local_informative_cover":
-        verdict = inspect_kld_provider_image(
-            image_path,
-            scene_family=scene_family,
-            target_date=target_date,
-        )
+        with tracing.span("content_guard", scene_family=str(scene_family or "")) as guard_span:
+            verdict = inspect_kld_provider_image(
+                image_path,
+                scene_family=scene_family,
+                target_date=target_date,
+            )
+            guard_span.set(valid=verdict.valid, reason=verdict.reason)
         verdict_payload = verdict.to_dict()
         if not verdict.valid:
             return KldVisualDuplicateResult(
@@ -5,13 +5,21 @@
 lunar.py  • функция get_day_lunar_info для поста и для генерации месячного календаря.
 Ожидает файл lunar_calendar.json в корне репозитория, 
 куда ежемесячно записывается подробный календарь.
+
+get_moment_lunar_info — фаза/освещённость на любой момент по сетке эфемерид
+(блок "ephemeris", см. lunar_ephemeris.py).
 """
 
 from __future__ import annotations
 import json
 from pathlib import Path
 import pendulum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+from lunar_ephemeris import EphemerisSamples, load_ephemeris
+
+_CALENDAR = Path(__file__).parent / "lunar_calendar.json"
+_EPHEMERIS_CACHE: Dict[str, Tuple[float, Optional[EphemerisSamples]]] = {}
 
 def get_day_lunar_info(d: pendulum.Date) -> Optional[Dict[str, Any]]:
     """
@@ -49,6 +57,37 @@ def get_day_lunar_info(d: pendulum.Date) -> Optional[Dict[str, Any]]:
     return rec
 
 
+def _calendar_ephemeris() -> Optional[EphemerisSamples]:
+    """Сетка из lunar_calendar.json; файл перечитывается только после смены mtime."""
+    try:
+        mtime = _CALENDAR.stat().st_mtime
+    except OSError:
+        return None
+    cached = _EPHEMERIS_CACHE.get("calendar")
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_ephemeris(_CALENDAR))
+        _EPHEMERIS_CACHE["calendar"] = cached
+    return cached[1]
+
+
+def get_moment_lunar_info(when: Any, ephemeris: Optional[EphemerisSamples] = None) -> Optional[Dict[str, Any]]:
+    """
+    Фазовый угол, освещённость и знак Луны на произвольный момент when
+    (aware datetime / pendulum / unix-секунды) — интерполяцией по сетке
+    ephemeris (по умолчанию — блок "ephemeris" из lunar_calendar.json),
+    без вызовов swisseph. Если сетки нет или момент вне её, возвращает None.
+    """
+    eph = ephemeris if ephemeris is not None else _calendar_ephemeris()
+    if eph is None or not eph.covers(when):
+        return None
+    return {
+        "phase_angle": round(eph.phase_angle(when), 2),
+        "illumination": round(eph.illumination(when), 1),
+        "sign_index": eph.sign_index(when),
+        "waxing": eph.is_waxing(when),
+    }
+
+
 # Локальный тест
 if __name__ == "__main__":
     today = pendulum.now().date()
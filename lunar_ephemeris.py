@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+lunar_ephemeris.py
+──────────────────────────────────────────────────────────────────────────────
+Плотная сетка эфемерид Солнца/Луны на месяц.
+
+Вместо двух скалярных swe.calc_ut на каждый день месяц семплируется одним
+проходом (по умолчанию шаг 1 час, запас ±2 суток у границ месяца). Хранятся
+компактные float32-массивы долгот Солнца и Луны; освещённость считается
+из интерполированного фазового угла и не хранится.
+gen_lunar_calendar кладёт их в lunar_calendar.json под ключом "ephemeris",
+после чего любой потребитель интерполирует фазовый угол, освещённость,
+знак Луны и точные моменты главных фаз без swisseph.
+
+swisseph нужен только для sample_ephemeris(); чтение/интерполяция — чистый Python.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import math
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+DEFAULT_STEP_MINUTES = 60
+MARGIN_DAYS = 2
+
+# главные фазы: угол элонгации Луны от Солнца → ключ
+PRINCIPAL_PHASES: Tuple[Tuple[float, str], ...] = (
+    (0.0, "new"),
+    (90.0, "first_quarter"),
+    (180.0, "full"),
+    (270.0, "last_quarter"),
+)
+
+
+# ───── helpers ──────────────────────────────────────────────────────────────
+def _to_ts(when: Any) -> float:
+    """datetime/pendulum (aware или naive-UTC) или число → unix-секунды."""
+    if isinstance(when, (int, float)):
+        return float(when)
+    if getattr(when, "tzinfo", None) is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return float(when.timestamp())
+
+
+def _lerp_angle(a: float, b: float, frac: float) -> float:
+    """Линейная интерполяция угла по кратчайшей дуге, результат в [0, 360)."""
+    d = (b - a + 180.0) % 360.0 - 180.0
+    return (a + d * frac) % 360.0
+
+
+def illumination_from_angle(angle: float) -> float:
+    """Фазовый угол (элонгация, °) → освещённая доля диска, %."""
+    return (1.0 - math.cos(math.radians(angle))) / 2.0 * 100.0
+
+
+def _pack(arr: array) -> str:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return base64.b64encode(arr.tobytes()).decode("ascii")
+
+
+def _unpack(data: str) -> array:
+    arr = array("f")
+    arr.frombytes(base64.b64decode(data))
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+# ───── модель ───────────────────────────────────────────────────────────────
+@dataclass
+class EphemerisSamples:
+    """Равномерная сетка: t_i = start_ts + i * step_s (UTC)."""
+
+    start_ts: int
+    step_s: int
+    sun: array
+    moon: array
+
+    def __len__(self) -> int:
+        return len(self.moon)
+
+    @property
+    def end_ts(self) -> int:
+        return self.start_ts + (len(self) - 1) * self.step_s
+
+    def covers(self, when: Any) -> bool:
+        ts = _to_ts(when)
+        return len(self) > 1 and self.start_ts <= ts <= self.end_ts
+
+    def _locate(self, ts: float) -> Tuple[int, float]:
+        if not self.covers(ts):
+            raise ValueError(f"ephemeris: {ts} вне сетки [{self.start_ts}, {self.end_ts}]")
+        pos = (ts - self.start_ts) / self.step_s
+        i = min(int(pos), len(self) - 2)
+        return i, pos - i
+
+    # ── интерполяция ──
+    def sun_longitude(self, when: Any) -> float:
+        i, frac = self._locate(_to_ts(when))
+        return _lerp_angle(self.sun[i], self.sun[i + 1], frac)
+
+    def moon_longitude(self, when: Any) -> float:
+        i, frac = self._locate(_to_ts(when))
+        return _lerp_angle(self.moon[i], self.moon[i + 1], frac)
+
+    def phase_angle(self, when: Any) -> float:
+        i, frac = self._locate(_to_ts(when))
+        a = (self.moon[i] - self.sun[i]) % 360.0
+        b = (self.moon[i + 1] - self.sun[i + 1]) % 360.0
+        return _lerp_angle(a, b, frac)
+
+    def illumination(self, when: Any) -> float:
+        """Освещённость, % — из интерполированного фазового угла (точнее линейной интерполяции по сетке)."""
+        return illumination_from_angle(self.phase_angle(when))
+
+    def sign_index(self, when: Any) -> int:
+        return int(self.moon_longitude(when) // 30) % 12
+
+    def is_waxing(self, when: Any) -> bool:
+        return self.phase_angle(when) < 180.0
+
+    # ── события ──
+    def phase_instants(self) -> List[Dict[str, Any]]:
+        """
+        Точные (до интерполяции внутри шага) моменты главных фаз на сетке:
+        [{"phase": "full", "ts": 1786..., "utc": "2026-08-28T04:18:00Z"}, ...].
+        """
+        out: List[Dict[str, Any]] = []
+        prev = (self.moon[0] - self.sun[0]) % 360.0
+        for i in range(1, len(self)):
+            cur = (self.moon[i] - self.sun[i]) % 360.0
+            step = (cur - prev) % 360.0  # Луна обгоняет Солнце ≈12–15°/сутки
+            for target, key in PRINCIPAL_PHASES:
+                off = (target - prev) % 360.0
+                if 0.0 < off <= step:
+                    ts = self.start_ts + (i - 1 + off / step) * self.step_s
+                    ts_i = int(round(ts))
+                    out.append({
+                        "phase": key,
+                        "ts": ts_i,
+                        "utc": datetime.fromtimestamp(ts_i, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    })
+            prev = cur
+        return out
+
+    # ── сериализация ──
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "v": FORMAT_VERSION,
+            "start_ts": int(self.start_ts),
+            "step_s": int(self.step_s),
+            "count": len(self),
+            "sun_lon": _pack(self.sun),
+            "moon_lon": _pack(self.moon),
+        }
+
+    @classmethod
+    def from_json(cls, obj: Dict[str, Any]) -> "EphemerisSamples":
+        if int(obj.get("v") or 0) != FORMAT_VERSION:
+            raise ValueError(f"ephemeris: неизвестная версия формата {obj.get('v')!r}")
+        # "illum" в файлах прежних генераций не читается: освещённость — из угла
+        sun, moon = _unpack(obj["sun_lon"]), _unpack(obj["moon_lon"])
+        count = int(obj.get("count") or 0)
+        if not (len(sun) == len(moon) == count):
+            raise ValueError("ephemeris: длины массивов не совпадают")
+        return cls(int(obj["start_ts"]), int(obj["step_s"]), sun, moon)
+
+
+# ───── семплирование (swisseph) ─────────────────────────────────────────────
+def sample_ephemeris(start: Any, end: Any, step_minutes: int = DEFAULT_STEP_MINUTES) -> EphemerisSamples:
+    """Один проход swe.calc_ut по сетке [start, end] с шагом step_minutes."""
+    import swisseph as swe
+
+    step_s = int(step_minutes) * 60
+    start_ts = int(_to_ts(start))
+    end_ts = int(_to_ts(end))
+    count = max(2, (end_ts - start_ts) // step_s + 1)
+    jd0 = start_ts / 86400.0 + 2440587.5
+    dstep = step_s / 86400.0
+
+    sun, moon = array("f"), array("f")
+    for i in range(count):
+        jd = jd0 + i * dstep
+        sun.append(swe.calc_ut(jd, swe.SUN)[0][0])
+        moon.append(swe.calc_ut(jd, swe.MOON)[0][0])
+    return EphemerisSamples(start_ts, step_s, sun, moon)
+
+
+def sample_month(year: int, month: int, step_minutes: int = DEFAULT_STEP_MINUTES) -> EphemerisSamples:
+    """Сетка на календарный месяц (UTC) с запасом MARGIN_DAYS с обеих сторон."""
+    first = datetime(year, month, 1, tzinfo=timezone.utc)
+    nxt = datetime(year + (month == 12), month % 12 + 1, 1, tzinfo=timezone.utc)
+    return sample_ephemeris(
+        first - timedelta(days=MARGIN_DAYS),
+        nxt + timedelta(days=MARGIN_DAYS),
+        step_minutes,
+    )
+
+
+# ───── загрузка для потребителей ────────────────────────────────────────────
+def ephemeris_from_calendar(data: Any) -> Optional[EphemerisSamples]:
+    """Блок "ephemeris" из уже прочитанного lunar_calendar.json; None, если его нет/битый."""
+    block = data.get("ephemeris") if isinstance(data, dict) else None
+    if not isinstance(block, dict):
+        return None
+    try:
+        return EphemerisSamples.from_json(block)
+    except Exception:
+        return None
+
+
+def load_ephemeris(path: str | Path = "lunar_calendar.json") -> Optional[EphemerisSamples]:
+    """Читает блок "ephemeris" из lunar_calendar.json; None, если его нет/битый."""
+    p = Path(path)
+    if not p.is_absolute() and not p.exists():
+        p = Path(__file__).parent / p
+    try:
+        data = json.loads(p.read_text("utf-8"))
+    except Exception:
+        return None
+    return ephemeris_from_calendar(data)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+marine.py
+~~~~~~~~~
+
+Морские данные (высота и период волны, температура воды) для прибрежных точек.
+
+• prefetch(points)                    — все точки одним multi-location запросом
+  к marine-api Open-Meteo (через om_plan, ответы кэшируются на запуск);
+• wave_at(lat, lon, date, hour, tz)   — (высота, период) в ближайший к hour:00 час;
+• wave_day_max(lat, lon, date, tz)    — максимум высоты волны за локальные сутки;
+• sst_now(lat, lon)                   — SST по ближайшему прошедшему часу (UTC).
+
+Ось времени каждой точки разбирается один раз (Forecast.of); точка, которой
+не было в prefetch, догружается одиночным запросом.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import math
+import time
+from typing import Iterable, Optional, Tuple
+
+import om_plan
+from forecast import Forecast, TzLike
+
+
+def prefetch(points: Iterable[Tuple[float, float]]) -> None:
+    """Загрузить волны и SST для всех points одним запросом."""
+    pts = list(points)
+    if pts:
+        om_plan.fetch_many("marine", pts)
+
+
+def _view(lat: float, lon: float) -> Forecast:
+    return om_plan.view("waves", lat, lon)
+
+
+def wave_at(
+    lat: float, lon: float, date_obj: dt.date, hour: int, tz: TzLike
+) -> Tuple[Optional[float], Optional[float]]:
+    fc = _view(lat, lon)
+    idx = fc.nearest_index(date_obj, hour, tz)
+    if idx is None:
+        return None, None
+    return fc.at(fc.hourly("wave_height"), idx), fc.at(fc.hourly("wave_period"), idx)
+
+
+def wave_day_max(lat: float, lon: float, date_obj: dt.date, tz: TzLike) -> Optional[float]:
+    day = _view(lat, lon).aggregate(tz).get(date_obj)
+    return day.stat("wave_height") if day else None
+
+
+def sst_now(lat: float, lon: float) -> Optional[float]:
+    fc = om_plan.view("sst", lat, lon)
+    col = fc.hourly("sea_surface_temperature")
+    v = fc.at(col, fc.past_index(int(time.time()) // 3600 * 3600))
+    return v if v is not None and math.isfinite(v) and v >= 0 else None
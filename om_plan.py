@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+om_plan.py
+~~~~~~~~~~
+
+Планировщик запросов к Open-Meteo на один запуск.
+
+Разделы поста объявляют, какие почасовые переменные им нужны (PLAN), а
+планировщик на точку делает ровно один запрос на API — air-quality (воздух +
+пыльца) и marine (волны + SST) — с объединением всех переменных. Ответ
+отдаётся разделам как Forecast (колонки/оси времени из forecast.py) и живёт
+OM_PLAN_TTL_S секунд; параллельные запросы одной точки ждут первый.
+
+fetch_many() берёт сразу несколько точек одним запросом (Open-Meteo
+принимает latitude/longitude списком) и раскладывает ответы по кэшу точек —
+так marine.prefetch получает волны и SST всех прибрежных городов разом.
+
+Прогноз погоды (api.open-meteo.com/v1/forecast) собирает weather.get_weather —
+он уже один на точку; сюда он только отчитывается через count_url(). Итог по
+числу запросов за запуск — request_counts() / log_request_counts() (пишется
+и при выходе из процесса, если запросы были).
+
+    fc = om_plan.view("pollen", lat, lon)     # Forecast с birch/grass/ragweed
+    fc.hourly_raw["birch_pollen"]
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import tracing
+from forecast import Forecast
+from utils import _get
+
+OM_PLAN_TTL_S = float(os.getenv("OM_PLAN_TTL_S", "600"))
+
+URLS: Dict[str, str] = {
+    "forecast": "https://api.open-meteo.com/v1/forecast",
+    "air": "https://air-quality-api.open-meteo.com/v1/air-quality",
+    "marine": "https://marine-api.open-meteo.com/v1/marine",
+}
+
+# раздел → (API, почасовые переменные)
+PLAN: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "air": ("air", ("pm10", "pm2_5", "us_aqi")),
+    "pollen": ("air", ("birch_pollen", "grass_pollen", "ragweed_pollen")),
+    "waves": ("marine", ("wave_height", "wave_period")),
+    "sst": ("marine", ("sea_surface_temperature",)),
+}
+
+_LOCK = threading.Lock()
+_KEY_LOCKS: Dict[Tuple[str, float, float], threading.Lock] = {}
+_CACHE: Dict[Tuple[str, float, float], Tuple[float, Set[str], Dict[str, Any]]] = {}
+_COUNTS: Dict[str, int] = {}
+
+
+# ───────────────────────── учёт запросов ─────────────────────────
+def count(api: str) -> None:
+    with _LOCK:
+        _COUNTS[api] = _COUNTS.get(api, 0) + 1
+
+
+def count_url(url: str) -> None:
+    """Учесть запрос, сделанный в обход планировщика (по URL)."""
+    for api, base in URLS.items():
+        if url.startswith(base):
+            count(api)
+            return
+
+
+def request_counts() -> Dict[str, int]:
+    with _LOCK:
+        return dict(_COUNTS)
+
+
+def log_request_counts() -> None:
+    counts = request_counts()
+    if counts:
+        total = sum(counts.values())
+        parts = ", ".join(f"{api}={n}" for api, n in sorted(counts.items()))
+        logging.info("Open-Meteo: %d запрос(ов) за запуск (%s)", total, parts)
+
+
+def reset() -> None:
+    """Новый «запуск»: сбросить кэш и счётчики (тесты, долгоживущие процессы)."""
+    with _LOCK:
+        _CACHE.clear()
+        _COUNTS.clear()
+
+
+atexit.register(log_request_counts)
+
+
+# ───────────────────────── выборка ─────────────────────────
+def _api_vars(api: str) -> Set[str]:
+    return {v for sec_api, names in PLAN.values() if sec_api == api for v in names}
+
+
+def fetch(api: str, lat: float, lon: float, variables: Tuple[str, ...] = ()) -> Optional[Dict[str, Any]]:
+    """
+    Сырой ответ API на точку: один запрос со всеми переменными PLAN для этого
+    API (плюс variables). Повторный вызов в пределах TTL берёт кэш; если
+    запрошенных переменных в кэше нет — перезапрос с объединённым набором.
+    """
+    key = (api, round(float(lat), 4), round(float(lon), 4))
+    with _LOCK:
+        lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        hit = _CACHE.get(key)
+        wanted = _api_vars(api) | set(variables)
+        if hit and time.monotonic() - hit[0] < OM_PLAN_TTL_S and wanted <= hit[1]:
+            tracing.incr("cache_hits")
+            return hit[2]
+        tracing.incr("cache_misses")
+        if hit:
+            wanted |= hit[1]
+        count(api)
+        try:
+            resp = _get(
+                URLS[api],
+                latitude=lat,
+                longitude=lon,
+                hourly=",".join(sorted(wanted)),
+                timezone="UTC",
+            )
+        except Exception as e:
+            logging.warning("om_plan: %s — HTTP error: %s", api, e)
+            resp = None
+        if not isinstance(resp, dict) or "hourly" not in resp:
+            return None  # неудачу не кэшируем: следующий раздел попробует снова
+        _CACHE[key] = (time.monotonic(), wanted, resp)
+        return resp
+
+
+def fetch_many(
+    api: str, points: Iterable[Tuple[float, float]], variables: Tuple[str, ...] = ()
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Ответы API для нескольких точек: всё, чего нет в кэше, — одним
+    multi-location запросом; результат в порядке points.
+    """
+    pts = [(round(float(la), 4), round(float(lo), 4)) for la, lo in points]
+    wanted = _api_vars(api) | set(variables)
+    now = time.monotonic()
+    with _LOCK:
+        missing = []
+        for la, lo in dict.fromkeys(pts):
+            hit = _CACHE.get((api, la, lo))
+            if not (hit and now - hit[0] < OM_PLAN_TTL_S and wanted <= hit[1]):
+                missing.append((la, lo))
+    if len(missing) > 1:
+        count(api)
+        try:
+            resp = _get(
+                URLS[api],
+                latitude=",".join(str(la) for la, _lo in missing),
+                longitude=",".join(str(lo) for _la, lo in missing),
+                hourly=",".join(sorted(wanted)),
+                timezone="UTC",
+            )
+        except Exception as e:
+            logging.warning("om_plan: %s — HTTP error: %s", api, e)
+            resp = None
+        answers = resp if isinstance(resp, list) and len(resp) == len(missing) else []
+        with _LOCK:
+            for (la, lo), one in zip(missing, answers):
+                if isinstance(one, dict) and "hourly" in one:
+                    _CACHE[(api, la, lo)] = (time.monotonic(), wanted, one)
+    # кэш уже заполнен; одиночные и несостоявшиеся точки — обычным fetch
+    return [fetch(api, la, lo, variables) for la, lo in pts]
+
+
+def view(section: str, lat: float, lon: float) -> Forecast:
+    """Forecast раздела section (см. PLAN); пустой, если API не ответил."""
+    api, variables = PLAN[section]
+    return Forecast.of(fetch(api, lat, lon, variables))
@@ -21,6 +21,7 @@ import math
 import logging
 from typing import Dict, Any, Optional, List, Union
 
+import om_plan
 from utils import _get  # ваша HTTP-обёртка
 
 # ───────────────────────── Логирование / таймаут ────────────────────────────
@@ -91,21 +92,13 @@ def get_pollen(lat: float = DEFAULT_LAT, lon: float = DEFAULT_LON) -> Optional[D
     Запрашивает концентрации пыльцы (birch, grass, ragweed) из Open-Meteo Air Quality API.
     Возвращает None при любой ошибке или словарь с данными (см. шапку файла).
     """
-    url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-    params = {
-        "latitude":  lat,
-        "longitude": lon,
-        "hourly":    "birch_pollen,grass_pollen,ragweed_pollen",
-        "timezone":  "UTC",
-    }
-
-    j = _safe_http_get(url, **params)
-    if not j or "hourly" not in j:
+    # запрос air-quality общий с air._src_openmeteo (om_plan)
+    h = om_plan.view("pollen", lat, lon).hourly_raw
+    if not h:
         logging.debug("pollen: нет hourly в ответе")
         return None
 
     try:
-        h = j["hourly"]
         times: List[str] = h.get("time", []) or []
         birch: List[Union[float, None]]   = h.get("birch_pollen", [])   or []
         grass: List[Union[float, None]]   = h.get("grass_pollen", [])   or []
@@ -25,7 +25,6 @@ import os
 import re
 import json
 import html
-import math
 import logging
 import datetime as dt
 from pathlib import Path
@@ -42,8 +41,16 @@ from utils   import compass, get_fact
 from weather import get_sunrise_sunset, get_visibility_weather, get_weather
 from air     import get_air, get_sst, get_kp, get_solar_wind
 from pollen  import get_pollen
-from radiation import get_radiation
+from radiation import get_radiation, station_stats
+from send_pipeline import IMAGE_DEADLINE_S, Deadline, in_thread, send_photo_file, wait_or_none
+from tg_delivery import delivery_for
+from sensor_stats import MIN_SAMPLES as STATS_MIN_SAMPLES, describe_latest
 from earthquakes import build_kld_quake_line, get_recent_earthquakes_kld
+import marine
+import regional_grid
+import section_scheduler
+import tracing
+from forecast import DAILY_ALIASES, DayAgg, Forecast
 from visibility_context import (
     KldVisibilityContext,
     build_kld_visibility_line,
@@ -53,15 +60,11 @@ from visibility_context import (
 )
 
 try:
-    from gpt import gpt_blurb, gpt_complete  # type: ignore
+    from gpt import gpt_blurb, gpt_complete, llm_budget_start  # type: ignore
 except Exception:
     gpt_blurb = None      # type: ignore
     gpt_complete = None   # type: ignore
-
-try:
-    import requests  # type: ignore
-except Exception:
-    requests = None  # type: ignore
+    llm_budget_start = None  # type: ignore
 
 # Картинки для KLD
 try:
@@ -98,6 +101,11 @@ _ASTRO_OFFSET_ENV = os.getenv("ASTRO_OFFSET")
 def _default_day_offset(mode: str) -> int:
     return 0 if (mode or "").strip().lower() == "morning" else 1
 
+def _day_offset_for(mode: str) -> int:
+    """DAY_OFFSET из ENV, иначе — по режиму поста."""
+    explicit = _int_env(_DAY_OFFSET_ENV)
+    return explicit if explicit is not None else _default_day_offset(mode)
+
 def _int_env(v: Optional[str]) -> Optional[int]:
     if v is None:
         return None
@@ -139,6 +147,7 @@ UVI_WARN_FROM = float(os.getenv("UVI_WARN_FROM", "6"))
 # LLM-параметры
 USE_DAILY_LLM    = os.getenv("DISABLE_LLM_DAILY", "").strip().lower() not in ("1", "true", "yes", "on")
 ASTRO_LLM_TEMP   = float(os.getenv("ASTRO_LLM_TEMP", "0.7"))
+ASTRO_LLM_DEADLINE_S = float(os.getenv("ASTRO_LLM_DEADLINE_S", "15"))
 
 # ────────────────────────── базовые константы ──────────────────────────
 NBSP = "\u00A0"
@@ -395,145 +404,59 @@ def _kp_global_swpc() -> Tuple[Optional[float], str, Optional[int], str]:
     return k, status, age_min, src2
 
 # ────────────────────────── Open-Meteo helpers ──────────────────────────
-def _hourly_times(wm: Dict[str, Any]) -> List[pendulum.DateTime]:
-    hourly = wm.get("hourly") or {}
-    times = hourly.get("time") or hourly.get("time_local") or []
-    out: List[pendulum.DateTime] = []
-    for t in times:
-        try:
-            out.append(pendulum.parse(str(t)))
-        except Exception:
-            pass
-    return out
-
-def _daily_times(wm: Dict[str, Any]) -> List[pendulum.Date]:
-    daily = wm.get("daily") or {}
-    times = daily.get("time") or daily.get("time_local") or []
-    out: List[pendulum.Date] = []
-    for t in times:
-        try:
-            out.append(pendulum.parse(str(t)).date())
-        except Exception:
-            pass
-    return out
+# Хелперы принимают payload get_weather или уже готовый Forecast: время
+# разбирается один раз на payload (см. forecast.py).
+WeatherLike = Union[Dict[str, Any], Forecast]
 
 def _daily_index_for_offset(
-    wm: Dict[str, Any],
+    wm: WeatherLike,
     tz: pendulum.Timezone,
     offset_days: int,
 ) -> Optional[int]:
-    times = _daily_times(wm)
-    if not times:
+    fc = Forecast.of(wm)
+    if not fc.days:
         return None
-    target = pendulum.today(tz).add(days=offset_days).date()
-    try:
-        return times.index(target)
-    except ValueError:
-        tstr = target.to_date_string()
-        for i, d in enumerate(times):
-            try:
-                if getattr(d, "to_date_string", None) and d.to_date_string() == tstr:
-                    return i
-            except Exception:
-                continue
-    return None
+    return fc.daily_index(pendulum.today(tz).add(days=offset_days).date())
 
-def _nearest_index_for_day(
-    times: List[pendulum.DateTime],
-    date_obj: pendulum.Date,
-    prefer_hour: int,
-    tz: pendulum.Timezone,
-) -> Optional[int]:
-    if not times:
-        return None
-    target = pendulum.datetime(
-        date_obj.year, date_obj.month, date_obj.day, prefer_hour, 0, tz=tz
-    )
-    best_i, best_diff = None, None
-    for i, dt_ in enumerate(times):
-        try:
-            dl = dt_.in_tz(tz)
-        except Exception:
-            dl = dt_
-        if dl.date() != date_obj:
-            continue
-        diff = abs((dl - target).total_seconds())
-        if best_diff is None or diff < best_diff:
-            best_i, best_diff = i, diff
-    return best_i
+def _day_agg(wm: WeatherLike, tz: pendulum.Timezone, date_obj) -> DayAgg:
+    """Суточная сводка Forecast.aggregate на дату (пустая, если дня нет в ряду)."""
+    fc = Forecast.of(wm)
+    return fc.aggregate(tz).get(date_obj) or DayAgg(date_obj, [])
 
-def _circular_mean_deg(deg_list: List[float]) -> Optional[float]:
-    if not deg_list:
-        return None
-    x = sum(math.cos(math.radians(d)) for d in deg_list)
-    y = sum(math.sin(math.radians(d)) for d in deg_list)
-    if x == 0 and y == 0:
-        return None
-    ang = math.degrees(math.atan2(y, x))
-    return (ang + 360.0) % 360.0
+def _trend_arrow(diff: Optional[float]) -> str:
+    if diff is None:
+        return "→"
+    return "↑" if diff >= 0.3 else "↓" if diff <= -0.3 else "→"
 
 def pick_header_metrics_for_offset(
-    wm: Dict[str, Any], tz: pendulum.Timezone, offset_days: int
+    wm: WeatherLike, tz: pendulum.Timezone, offset_days: int
 ) -> Tuple[Optional[float], Optional[int], Optional[int], str]:
-    hourly = wm.get("hourly") or {}
-    times  = _hourly_times(wm)
-    tgt    = pendulum.now(tz).add(days=offset_days).date()
-    idx_noon = _nearest_index_for_day(times, tgt, 12, tz)
-    idx_morn = _nearest_index_for_day(times, tgt, 6, tz)
-
-    spd_kmh = hourly.get("wind_speed_10m") or hourly.get("windspeed_10m") or []
-    dir_deg = hourly.get("wind_direction_10m") or hourly.get("winddirection_10m") or []
-    prs     = hourly.get("surface_pressure") or []
-
-    wind_ms = None
-    wind_dir = None
-    press_val = None
-    trend = "→"
-    try:
-        if idx_noon is not None:
-            if idx_noon < len(spd_kmh):
-                wind_ms = float(spd_kmh[idx_noon]) / 3.6
-            if idx_noon < len(dir_deg):
-                wind_dir = int(round(float(dir_deg[idx_noon])))
-            if idx_noon < len(prs):
-                press_val = int(round(float(prs[idx_noon])))
-            if idx_morn is not None and idx_morn < len(prs) and idx_noon < len(prs):
-                diff = float(prs[idx_noon]) - float(prs[idx_morn])
-                trend = "↑" if diff >= 0.3 else "↓" if diff <= -0.3 else "→"
-    except Exception:
-        pass
+    fc = Forecast.of(wm)
+    tgt = pendulum.now(tz).add(days=offset_days).date()
+    idx_noon = fc.nearest_index(tgt, 12, tz)
+
+    spd_kmh = fc.at(fc.hourly("wind_speed_10m", "windspeed_10m"), idx_noon)
+    wdir = fc.at(fc.hourly("wind_direction_10m", "winddirection_10m"), idx_noon)
+    p_noon = fc.at(fc.hourly("surface_pressure"), idx_noon)
+
+    wind_ms = spd_kmh / 3.6 if spd_kmh is not None else None
+    wind_dir = int(round(wdir)) if wdir is not None else None
+    press_val = int(round(p_noon)) if p_noon is not None else None
+    trend = _trend_arrow(_day_agg(fc, tz, tgt).pressure_trend)
     return wind_ms, wind_dir, press_val, trend
 
 def pick_tomorrow_header_metrics(
-    wm: Dict[str, Any], tz: pendulum.Timezone
+    wm: WeatherLike, tz: pendulum.Timezone
 ) -> Tuple[Optional[float], Optional[int], Optional[int], str]:
-    hourly = wm.get("hourly") or {}
-    times = _hourly_times(wm)
+    fc = Forecast.of(wm)
     tomorrow = pendulum.now(tz).add(days=1).date()
 
-    spd_arr = _pick(
-        hourly,
-        "windspeed_10m",
-        "windspeed",
-        "wind_speed_10m",
-        "wind_speed",
-        default=[],
-    )
-    dir_arr = _pick(
-        hourly,
-        "winddirection_10m",
-        "winddirection",
-        "wind_dir_10m",
-        "wind_dir",
-        default=[],
-    )
-    prs_arr = hourly.get("surface_pressure", []) or hourly.get("pressure", [])
+    spd_arr = fc.hourly("windspeed_10m", "windspeed", "wind_speed_10m", "wind_speed")
+    dir_arr = fc.hourly("winddirection_10m", "winddirection", "wind_dir_10m", "wind_dir")
+    prs_arr = fc.hourly("surface_pressure", "pressure")
 
-    if times:
-        idx_noon = _nearest_index_for_day(times, tomorrow, prefer_hour=12, tz=tz)
-        idx_morn = _nearest_index_for_day(times, tomorrow, prefer_hour=6, tz=tz)
-    else:
-        idx_noon = idx_morn = None
+    idx_noon = fc.nearest_index(tomorrow, 12, tz)
+    day = _day_agg(fc, tz, tomorrow)
 
     wind_ms = None
     wind_dir = None
@@ -541,56 +464,26 @@ def pick_tomorrow_header_metrics(
     trend = "→"
 
     if idx_noon is not None:
-        try:
-            spd = float(spd_arr[idx_noon]) if idx_noon < len(spd_arr) else None
-        except Exception:
-            spd = None
-        try:
-            wdir = float(dir_arr[idx_noon]) if idx_noon < len(dir_arr) else None
-        except Exception:
-            wdir = None
-        try:
-            p_noon = float(prs_arr[idx_noon]) if idx_noon < len(prs_arr) else None
-        except Exception:
-            p_noon = None
-        try:
-            p_morn = float(prs_arr[idx_morn]) if (
-                idx_morn is not None and idx_morn < len(prs_arr)
-            ) else None
-        except Exception:
-            p_morn = None
+        spd = fc.at(spd_arr, idx_noon)
+        wdir = fc.at(dir_arr, idx_noon)
+        p_noon = fc.at(prs_arr, idx_noon)
 
         wind_ms  = kmh_to_ms(spd) if isinstance(spd,  (int, float)) else None
         wind_dir = int(round(wdir)) if isinstance(wdir, (int, float)) else None
         press_val = int(round(p_noon)) if isinstance(p_noon, (int, float)) else None
-        if isinstance(p_noon, (int, float)) and isinstance(p_morn, (int, float)):
-            diff = p_noon - p_morn
-            trend = "↑" if diff >= 0.3 else "↓" if diff <= -0.3 else "→"
+        trend = _trend_arrow(day.pressure_trend)
 
-    if wind_ms is None and times:
-        idxs = [i for i, t in enumerate(times) if t.in_tz(tz).date() == tomorrow]
-        if idxs:
-            try:
-                speeds = [float(spd_arr[i]) for i in idxs if i < len(spd_arr)]
-            except Exception:
-                speeds = []
-            try:
-                dirs = [float(dir_arr[i]) for i in idxs if i < len(dir_arr)]
-            except Exception:
-                dirs = []
-            try:
-                prs = [float(prs_arr[i]) for i in idxs if i < len(prs_arr)]
-            except Exception:
-                prs = []
-            if speeds:
-                wind_ms = kmh_to_ms(sum(speeds) / len(speeds))
-            mean_dir = _circular_mean_deg(dirs)
-            wind_dir = int(round(mean_dir)) if mean_dir is not None else wind_dir
-            if prs:
-                press_val = int(round(sum(prs) / len(prs)))
+    if wind_ms is None and day.idx:
+        mean_spd = day.stat("wind_speed_10m", "mean")
+        mean_prs = day.stat("surface_pressure", "mean")
+        if mean_spd is not None:
+            wind_ms = kmh_to_ms(mean_spd)
+        wind_dir = int(round(day.wind_dir)) if day.wind_dir is not None else wind_dir
+        if mean_prs is not None:
+            press_val = int(round(mean_prs))
 
     if wind_ms is None or wind_dir is None or press_val is None:
-        cur = (wm.get("current") or wm.get("current_weather") or {})
+        cur = (fc.payload.get("current") or fc.payload.get("current_weather") or {})
         if wind_ms is None:
             spd = _pick(
                 cur,
@@ -624,57 +517,35 @@ def _fetch_temps_for_offset(
 
 
 def _temps_for_offset_from_weather(
-    wm: Dict[str, Any], tz: pendulum.Timezone, offset_days: int
+    wm: WeatherLike, tz: pendulum.Timezone, offset_days: int
 ) -> Tuple[Optional[float], Optional[float], Optional[int]]:
-    daily = wm.get("daily") or {}
-
-    idx = _daily_index_for_offset(wm, tz, offset_days)
+    fc = Forecast.of(wm)
+    idx = _daily_index_for_offset(fc, tz, offset_days)
     if idx is None:
         return None, None, None
 
-    def _num(arr, i):
-        try:
-            v = arr[i]
-            return float(v) if v is not None else None
-        except Exception:
-            return None
-
-    tmax = _num(daily.get("temperature_2m_max", []), idx)
-    tmin = _num(daily.get("temperature_2m_min", []), idx)
-    wc   = None
-    try:
-        arr_wc = daily.get("weathercode") or []
-        if isinstance(arr_wc, list) and idx < len(arr_wc):
-            wc = int(arr_wc[idx]) if arr_wc[idx] is not None else None
-    except Exception:
-        wc = None
-    return tmax, tmin, wc
+    tmax = fc.at(fc.daily("temperature_2m_max"), idx)
+    tmin = fc.at(fc.daily("temperature_2m_min"), idx)
+    wc = fc.at(fc.daily("weathercode"), idx)
+    return tmax, tmin, int(wc) if wc is not None else None
 
 
 def _daily_wind_kmh_for_offset(
-    wm: Dict[str, Any], tz: pendulum.Timezone, offset_days: int, *, gust: bool = False
+    wm: WeatherLike, tz: pendulum.Timezone, offset_days: int, *, gust: bool = False
 ) -> Optional[float]:
-    daily = wm.get("daily") or {}
-    idx = _daily_index_for_offset(wm, tz, offset_days)
+    fc = Forecast.of(wm)
+    idx = _daily_index_for_offset(fc, tz, offset_days)
     if idx is None:
         return None
-    keys = (
-        ("wind_gusts_10m_max", "windgusts_10m_max", "wind_gust_max", "windgust_max")
-        if gust
-        else ("wind_speed_10m_max", "windspeed_10m_max", "wind_speed_max", "windspeed_max")
-    )
-    for key in keys:
-        arr = daily.get(key) or []
-        try:
-            value = arr[idx]
-            if value is not None:
-                return float(value)
-        except Exception:
-            continue
+    # алиасы по очереди: первый, где на этот день есть значение
+    for key in DAILY_ALIASES["wind_gusts_10m_max" if gust else "wind_speed_10m_max"]:
+        value = fc.at(fc.daily(key), idx)
+        if value is not None:
+            return value
     return None
 
 
-def _weather_core_for_offset(wm: Dict[str, Any], tz: pendulum.Timezone, offset_days: int) -> bool:
+def _weather_core_for_offset(wm: WeatherLike, tz: pendulum.Timezone, offset_days: int) -> bool:
     t_day, t_night, _ = _temps_for_offset_from_weather(wm, tz, offset_days)
     wind_ms, _wind_dir, _press, _trend = pick_header_metrics_for_offset(wm, tz, offset_days)
     if wind_ms is None:
@@ -682,6 +553,12 @@ def _weather_core_for_offset(wm: Dict[str, Any], tz: pendulum.Timezone, offset_d
     return isinstance(t_day, (int, float)) and isinstance(t_night, (int, float)) and isinstance(wind_ms, (int, float))
 
 
+def _section(name: str, fn, *args, **kwargs):
+    """Вызов источника раздела поста под спаном section.<name> (см. tracing.py)."""
+    with tracing.span(f"section.{name}"):
+        return fn(*args, **kwargs)
+
+
 def _get_weather_with_retry(
     lat: float,
     lon: float,
@@ -695,7 +572,8 @@ def _get_weather_with_retry(
     total = max(1, int(attempts))
     for attempt in range(1, total + 1):
         try:
-            wm = get_weather(lat, lon) or {}
+            # повтор — мимо кэша единого прогноза: неполный ответ не должен залипать
+            wm = get_weather(lat, lon, fresh=attempt > 1) or {}
         except Exception as exc:
             wm = {}
             logging.warning("%s: weather source failed on attempt %s/%s: %s", source_label, attempt, total, exc)
@@ -706,6 +584,7 @@ def _get_weather_with_retry(
             return wm
         logging.warning("%s: weather source incomplete on attempt %s/%s", source_label, attempt, total)
         if attempt < total:
+            tracing.incr("retries")
             time.sleep(max(0.0, float(backoff_s)))
     return last or {}
 
@@ -772,25 +651,18 @@ def _kld_visibility_for_post(
     return context, line
 
 def day_night_stats(lat: float, lon: float, tz: str = "UTC") -> Dict[str, Optional[float]]:
-    wm = get_weather(lat, lon) or {}
-    daily = wm.get("daily") or {}
+    fc = Forecast.of(get_weather(lat, lon) or {})
     tz_obj = pendulum.timezone(tz)
 
-    idx = _daily_index_for_offset(wm, tz_obj, 1)
+    idx = _daily_index_for_offset(fc, tz_obj, 1)
     if idx is None:
         return {}
 
-    def _num(arr, i):
-        try:
-            return float(arr[i]) if i < len(arr) and arr[i] is not None else None
-        except Exception:
-            return None
-
     return {
-        "t_day_max": _num(daily.get("temperature_2m_max", []), idx),
-        "t_night_min": _num(daily.get("temperature_2m_min", []), idx),
-        "rh_min": _num(daily.get("relative_humidity_2m_min", []), idx),
-        "rh_max": _num(daily.get("relative_humidity_2m_max", []), idx),
+        "t_day_max": fc.at(fc.daily("temperature_2m_max"), idx),
+        "t_night_min": fc.at(fc.daily("temperature_2m_min"), idx),
+        "rh_min": fc.at(fc.daily("relative_humidity_2m_min"), idx),
+        "rh_max": fc.at(fc.daily("relative_humidity_2m_max"), idx),
     }
 
 def fetch_tomorrow_temps(
@@ -800,47 +672,20 @@ def fetch_tomorrow_temps(
     return tmax, tmin
 
 # === шторм-флаги ==================
-def _tomorrow_hourly_indices(wm: Dict[str, Any], tz: pendulum.Timezone) -> List[int]:
-    times = _hourly_times(wm)
-    tom = pendulum.now(tz).add(days=1).date()
-    idxs: List[int] = []
-    for i, dt_ in enumerate(times):
-        try:
-            if dt_.in_tz(tz).date() == tom:
-                idxs.append(i)
-        except Exception:
-            pass
-    return idxs
-
-def storm_flags_for_tomorrow(wm: Dict[str, Any], tz: pendulum.Timezone) -> Dict[str, Any]:
-    hourly = wm.get("hourly") or {}
-    idxs = _tomorrow_hourly_indices(wm, tz)
-    if not idxs:
+def storm_flags_for_tomorrow(wm: WeatherLike, tz: pendulum.Timezone) -> Dict[str, Any]:
+    day = _day_agg(wm, tz, pendulum.now(tz).add(days=1).date())
+    if not day.idx:
         return {"warning": False}
 
-    def _arr(*names, default=None):
-        v = _pick(hourly, *names, default=default)
-        return v if isinstance(v, list) else []
-
-    def _vals(arr):
-        out = []
-        for i in idxs:
-            if i < len(arr):
-                try:
-                    out.append(float(arr[i]))
-                except Exception:
-                    pass
-        return out
-
-    speeds_kmh = _vals(_arr("windspeed_10m", "windspeed", "wind_speed_10m", "wind_speed", default=[]))
-    gusts_kmh  = _vals(_arr("windgusts_10m", "wind_gusts_10m", "wind_gusts", default=[]))
-    rain_mm_h  = _vals(_arr("rain", default=[]))
-    tprob      = _vals(_arr("thunderstorm_probability", default=[]))
-
-    max_speed_ms = kmh_to_ms(max(speeds_kmh)) if speeds_kmh else None
-    max_gust_ms  = kmh_to_ms(max(gusts_kmh))  if gusts_kmh  else None
-    heavy_rain   = (max(rain_mm_h) >= 8.0) if rain_mm_h else False
-    thunder      = (max(tprob) >= 60) if tprob else False
+    speed_kmh = day.stat("wind_speed_10m")
+    gust_kmh  = day.stat("wind_gusts_10m")
+    rain_mm_h = day.stat("rain")
+    tprob     = day.stat("thunderstorm_probability")
+
+    max_speed_ms = kmh_to_ms(speed_kmh) if speed_kmh is not None else None
+    max_gust_ms  = kmh_to_ms(gust_kmh)  if gust_kmh  is not None else None
+    heavy_rain   = rain_mm_h is not None and rain_mm_h >= 8.0
+    thunder      = tprob is not None and tprob >= 60
 
     reasons = []
     if isinstance(max_speed_ms, (int, float)) and max_speed_ms >= 13:
@@ -965,6 +810,7 @@ def get_schumann_with_fallback() -> Dict[str, Any]:
                 "freq": payload.get("freq"),
                 "status": payload.get("status") or _schu_freq_status(payload.get("freq"))[0],
                 "status_code": payload.get("status_code") or _schu_freq_status(payload.get("freq"))[1],
+                "stats": (payload.get("stats") or {}).get("freq"),
             }
     except Exception:
         pass
@@ -978,6 +824,9 @@ def schumann_line(s: Dict[str, Any]) -> Optional[str]:
         return None
     f = s.get("freq")
     fstr = f"{f:.2f} Гц" if isinstance(f, (int, float)) else "н/д"
+    stats = s.get("stats")
+    if stats and stats.get("unusual"):
+        fstr += f", необычно для последних 7 дней {stats['direction']}"
     return f"{s.get('status', 'н/д')} • Шуман: {fstr}"
 
 # ────────────────────────── Safecast/радиация ──────────────────────────
@@ -998,10 +847,25 @@ def load_safecast() -> Optional[Dict[str, Any]]:
             continue
         now_ts = pendulum.now("UTC").int_timestamp
         if now_ts - int(ts) <= 24 * 3600:
+            sc.setdefault("_path", str(p))
             return sc
     return None
 
-def _pm_level(pm25: Optional[float], pm10: Optional[float]) -> Tuple[str, str]:
+def _unusual_high(stats: Optional[Dict[str, Any]]) -> bool:
+    """describe() из sensor_stats: значение необычно высокое для последних 7 дней."""
+    return bool(stats and stats.get("unusual") and stats.get("direction") == "↑")
+
+def _pm_level(
+    pm25: Optional[float],
+    pm10: Optional[float],
+    stats25: Optional[Dict[str, Any]] = None,
+    stats10: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str]:
+    """
+    Уровень по фиксированным порогам PM; если значение в «норме», но необычно
+    высокое для последних 7 дней (stats25/stats10 — describe() sensor_stats),
+    уровень поднимается до «умеренный».
+    """
     def l25(x: float) -> int:
         return 0 if x <= 15 else 1 if x <= 35 else 2 if x <= 55 else 3
     def l10(x: float) -> int:
@@ -1013,13 +877,22 @@ def _pm_level(pm25: Optional[float], pm10: Optional[float]) -> Tuple[str, str]:
         worst = max(worst, l10(float(pm10)))
     if worst < 0:
         return "⚪", "н/д"
+    if worst == 0 and (_unusual_high(stats25) or _unusual_high(stats10)):
+        worst = 1
     return (
         ["🟢", "🟡", "🟠", "🔴"][worst],
         ["низкий", "умеренный", "высокий", "очень высокий"][worst],
     )
 
-def _rad_risk(usvh: float) -> Tuple[str, str]:
+def _rad_risk(usvh: float, stats: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """
+    Фиксированные пороги µSv/h — абсолютная шкала; значение ниже порога, но
+    необычно высокое для последних 7 дней (stats — describe() sensor_stats),
+    считается «повышенным».
+    """
     if usvh <= 0.15:
+        if _unusual_high(stats):
+            return "🟡", "повышенный"
         return "🟢", "низкий"
     if usvh <= 0.30:
         return "🟡", "повышенный"
@@ -1034,6 +907,11 @@ def safecast_summary_line() -> Optional[str]:
     if not isinstance(usvh, (int, float)) and isinstance(cpm, (int, float)):
         usvh = float(cpm) * CPM_TO_USVH
     baseline = sc.get("baseline_usvh") or sc.get("radiation_baseline_usvh") or sc.get("usual_usvh")
+    # «обычно» и «необычно для 7 дней» — из инкрементальной статистики рядом с файлом
+    stats = describe_latest(sc["_path"], "radiation_usvh", usvh) \
+        if sc.get("_path") and isinstance(usvh, (int, float)) else None
+    if not isinstance(baseline, (int, float)) and stats and stats["n"] >= STATS_MIN_SAMPLES:
+        baseline = stats["median"]
     if not isinstance(usvh, (int, float)) or not isinstance(baseline, (int, float)):
         logging.info("Safecast KLD omitted: missing radiation value or baseline")
         return None
@@ -1045,7 +923,11 @@ def safecast_summary_line() -> Optional[str]:
         logging.info("Safecast KLD omitted: stale or missing timestamp age_min=%s", age_min)
         return None
     parts: List[str] = []
-    em, lbl = _pm_level(pm25, pm10)
+    pm_stats = {
+        k: describe_latest(sc["_path"], k, v) if sc.get("_path") and isinstance(v, (int, float)) else None
+        for k, v in (("pm25", pm25), ("pm10", pm10))
+    }
+    em, lbl = _pm_level(pm25, pm10, pm_stats["pm25"], pm_stats["pm10"])
     pm_parts = []
     if isinstance(pm25, (int, float)):
         pm_parts.append(f"PM₂.₅ {pm25:.0f}")
@@ -1053,7 +935,7 @@ def safecast_summary_line() -> Optional[str]:
         pm_parts.append(f"PM₁₀ {pm10:.0f}")
     if pm_parts:
         parts.append(f"{em} {lbl} · " + " | ".join(pm_parts))
-    r_em, r_lbl = _rad_risk(float(usvh))
+    r_em, r_lbl = _rad_risk(float(usvh), stats)
     delta = float(usvh) - float(baseline)
     if delta >= 0.02:
         interp = f"немного выше локального фона, {r_em} {r_lbl}"
@@ -1061,6 +943,8 @@ def safecast_summary_line() -> Optional[str]:
         interp = f"ниже локального фона, {r_em} {r_lbl}"
     else:
         interp = f"около локального фона, {r_em} {r_lbl}"
+    if stats and stats["unusual"]:
+        interp += f"; необычно для последних 7 дней {stats['direction']}"
     age_txt = f"{age_min} мин назад" if age_min < 180 else f"{age_min // 60}ч назад"
     parts.append(
         f"{float(usvh):.2f} μSv/h, обычно {float(baseline):.2f} — {interp}; замер {age_txt}"
@@ -1071,9 +955,10 @@ def safecast_summary_line() -> Optional[str]:
 
 def radiation_line(lat: float, lon: float) -> Optional[str]:
     data = get_radiation(lat, lon) or {}
-    dose = data.get("dose")
+    dose = data.get("dose", data.get("val"))  # get_radiation отдаёт значение в "val"
     if isinstance(dose, (int, float)):
-        em, lbl = _rad_risk(float(dose))
+        # «необычно для 7 дней» — по готовому состоянию ближайшей станции radiation_collect
+        em, lbl = _rad_risk(float(dose), station_stats(lat, lon, float(dose)))
         return f"{em} Радиация: {float(dose):.3f} μSv/h — {lbl}"
     return None
 
@@ -1145,33 +1030,16 @@ def uvi_advice(uvi: float) -> str:
     return ""
 
 def uvi_for_offset(
-    wm: Dict[str, Any], tz: pendulum.Timezone, offset_days: int
+    wm: WeatherLike, tz: pendulum.Timezone, offset_days: int
 ) -> Dict[str, Optional[float | str]]:
-    daily = wm.get("daily") or {}
-    hourly = wm.get("hourly") or {}
+    fc = Forecast.of(wm)
     date_obj = pendulum.today(tz).add(days=offset_days).date()
-    times = hourly.get("time") or hourly.get("time_local") or []
-    uvi_arr = hourly.get("uv_index") or hourly.get("uv_index_clear_sky") or []
-    uvi_now = None
-    try:
-        if times and uvi_arr:
-            uvi_now = float(uvi_arr[0]) if isinstance(uvi_arr[0], (int, float)) else None
-    except Exception:
-        uvi_now = None
+    uvi_arr = fc.hourly("uv_index")
+    uvi_now = fc.at(uvi_arr, 0) if len(fc) else None
 
-    uvi_max = None
-    try:
-        dts = _daily_times(wm)
-        if dts and date_obj in dts:
-            idx = dts.index(date_obj)
-            uvi_max = float((daily.get("uv_index_max") or [None])[idx])  # type: ignore
-    except Exception:
-        pass
-    if uvi_max is None and times and uvi_arr:
-        vals = []
-        for t, v in zip(times, uvi_arr):
-            if t and str(t).startswith(date_obj.to_date_string()) and isinstance(v, (int, float)):
-                vals.append(float(v))
+    uvi_max = fc.at(fc.daily("uv_index_max"), fc.daily_index(date_obj))
+    if uvi_max is None:
+        vals = fc.pick(uvi_arr, fc.day_indices(date_obj, tz))
         if vals:
             uvi_max = max(vals)
     return {"uvi": uvi_now, "uvi_max": uvi_max}
@@ -1230,55 +1098,31 @@ def fx_morning_line(date_local: pendulum.DateTime, tz: pendulum.Timezone) -> Opt
     )
 
 # ────────────────────────── «шторм/итого» ──────────────────────────
-def _day_indices(wm: Dict[str, Any], tz: pendulum.Timezone, offset: int) -> List[int]:
-    times = _hourly_times(wm)
-    date_obj = pendulum.today(tz).add(days=offset).date()
-    idxs = []
-    for i, dt_ in enumerate(times):
-        try:
-            if dt_.in_tz(tz).date() == date_obj:
-                idxs.append(i)
-        except Exception:
-            pass
-    return idxs
-
-def _vals(arr, idxs):
-    out = []
-    for i in idxs:
-        if i < len(arr) and arr[i] is not None:
-            try:
-                out.append(float(arr[i]))
-            except Exception:
-                pass
-    return out
+def _storm_maxima(wm: WeatherLike, tz: pendulum.Timezone) -> Optional[Tuple[float, float, float]]:
+    """Максимумы порывов (м/с), дождя (мм/ч) и вероятности грозы (%) за день DAY_OFFSET."""
+    day = _day_agg(wm, tz, pendulum.today(tz).add(days=DAY_OFFSET).date())
+    if not day.idx:
+        return None
+    return (
+        (day.stat("wind_gusts_10m") or 0) / 3.6,
+        day.stat("rain") or 0,
+        day.stat("thunderstorm_probability") or 0,
+    )
 
-def storm_short_text(wm: Dict[str, Any], tz: pendulum.Timezone) -> str:
-    hourly = wm.get("hourly") or {}
-    idxs = _day_indices(wm, tz, DAY_OFFSET)
-    if not idxs:
+def storm_short_text(wm: WeatherLike, tz: pendulum.Timezone) -> str:
+    maxima = _storm_maxima(wm, tz)
+    if maxima is None:
         return "без шторма"
-    gusts = _vals(hourly.get("wind_gusts_10m") or hourly.get("windgusts_10m") or [], idxs)
-    rain  = _vals(hourly.get("rain") or [], idxs)
-    thp   = _vals(hourly.get("thunderstorm_probability") or [], idxs)
-    if (
-        (max(gusts, default=0) / 3.6 >= STORM_GUST_MS)
-        or (max(rain, default=0) >= ALERT_RAIN_MM_H)
-        or (max(thp, default=0) >= ALERT_TSTORM_PROB_PC)
-    ):
+    g_max, r_max, t_max = maxima
+    if g_max >= STORM_GUST_MS or r_max >= ALERT_RAIN_MM_H or t_max >= ALERT_TSTORM_PROB_PC:
         return "шторм"
     return "без шторма"
 
-def storm_alert_line(wm: Dict[str, Any], tz: pendulum.Timezone) -> Optional[str]:
-    hourly = wm.get("hourly") or {}
-    idxs = _day_indices(wm, tz, DAY_OFFSET)
-    if not idxs:
+def storm_alert_line(wm: WeatherLike, tz: pendulum.Timezone) -> Optional[str]:
+    maxima = _storm_maxima(wm, tz)
+    if maxima is None:
         return None
-    gust_kmh = _vals(hourly.get("wind_gusts_10m") or hourly.get("windgusts_10m") or [], idxs)
-    rain     = _vals(hourly.get("rain") or [], idxs)
-    thp      = _vals(hourly.get("thunderstorm_probability") or [], idxs)
-    g_max = max(gust_kmh, default=0) / 3.6
-    r_max = max(rain, default=0)
-    t_max = max(thp, default=0)
+    g_max, r_max, t_max = maxima
     parts = []
     if g_max >= ALERT_GUST_MS:
         parts.append(f"ветер: порывы до {int(round(g_max))} м/с")
@@ -1320,35 +1164,8 @@ def _fetch_wave_for_tomorrow(
     tz_obj: pendulum.Timezone,
     prefer_hour: int = 12,
 ) -> Tuple[Optional[float], Optional[float]]:
-    if not requests:
-        return None, None
     try:
-        url = "https://marine-api.open-meteo.com/v1/marine"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "hourly": "wave_height,wave_period",
-            "timezone": tz_obj.name,
-        }
-
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        j = r.json()
-        hourly = j.get("hourly") or {}
-        times = [pendulum.parse(t) for t in (hourly.get("time") or []) if t]
-        idx = _nearest_index_for_day(
-            times,
-            pendulum.now(tz_obj).add(days=1).date(),
-            prefer_hour,
-            tz_obj,
-        )
-        if idx is None:
-            return None, None
-        h = hourly.get("wave_height") or []
-        p = hourly.get("wave_period") or []
-        w_h = float(h[idx]) if idx < len(h) and h[idx] is not None else None
-        w_t = float(p[idx]) if idx < len(p) and p[idx] is not None else None
-        return w_h, w_t
+        return marine.wave_at(lat, lon, pendulum.now(tz_obj).add(days=1).date(), prefer_hour, tz_obj)
     except Exception as e:
         logging.warning("marine fetch failed: %s", e)
         return None, None
@@ -1364,22 +1181,10 @@ def _water_highlights(
     wind_ms, wind_dir, _, _ = pick_tomorrow_header_metrics(wm, tz_obj)
     wave_h, _ = _fetch_wave_for_tomorrow(la, lo, tz_obj)
 
-    def _gust_at_noon(wm_: Dict[str, Any], tz_: pendulum.Timezone) -> Optional[float]:
-        hourly = wm_.get("hourly") or {}
-        times = _hourly_times(wm_)
-        idx = _nearest_index_for_day(
-            times,
-            pendulum.now(tz_).add(days=1).date(),
-            12,
-            tz_,
-        )
-        arr = _pick(hourly, "windgusts_10m", "wind_gusts_10m", "wind_gusts", default=[])
-        if idx is not None and idx < len(arr):
-            try:
-                return kmh_to_ms(float(arr[idx]))
-            except Exception:
-                return None
-        return None
+    def _gust_at_noon(wm_: WeatherLike, tz_: pendulum.Timezone) -> Optional[float]:
+        fc = Forecast.of(wm_)
+        idx = fc.nearest_index(pendulum.now(tz_).add(days=1).date(), 12, tz_)
+        return kmh_to_ms(fc.at(fc.hourly("windgusts_10m", "wind_gusts_10m", "wind_gusts"), idx))
 
     gust = _gust_at_noon(wm, tz_obj)
 
@@ -1593,7 +1398,8 @@ def _astro_llm_bullets(date_key: str, phase_name: str, percent: int | None, sign
     )
 
     try:
-        resp = gpt_complete(prompt=prompt, system=system, temperature=0.6, max_tokens=220)
+        resp = gpt_complete(prompt=prompt, system=system, temperature=0.6, max_tokens=220,
+                            cache_site="astro_bullets", deadline_s=ASTRO_LLM_DEADLINE_S)
     except Exception:
         resp = None
 
@@ -1884,6 +1690,7 @@ def _collect_morning_region_temperatures(
         rows.append(("Калининград", float(kaliningrad_high), low))
 
     seen = {"калининград"}
+    pairs: list[tuple[str, tuple[float, float]]] = []
     for city, coords in list(sea_cities or []) + list(other_cities or []):
         city_name = str(city or "").strip()
         key = city_name.casefold()
@@ -1892,21 +1699,32 @@ def _collect_morning_region_temperatures(
         seen.add(key)
         try:
             lat, lon = coords
-            wm = _get_weather_with_retry(
-                float(lat),
-                float(lon),
-                source_label=f"KLD morning regional weather: {city_name}",
-                validator=lambda data: all(
-                    isinstance(value, (int, float))
-                    for value in _temps_for_offset_from_weather(data, tz_obj, DAY_OFFSET)[:2]
-                ),
-                attempts=2,
-                backoff_s=0.2,
-            )
-            high, low, _code = _temps_for_offset_from_weather(wm, tz_obj, DAY_OFFSET)
+            pairs.append((city_name, (float(lat), float(lon))))
         except Exception as exc:
             logging.warning("KLD morning regional weather unavailable for %s: %s", city_name, exc)
-            continue
+
+    def _fetch(lat: float, lon: float) -> Tuple[Optional[float], Optional[float], Optional[int]]:
+        wm = _get_weather_with_retry(
+            lat,
+            lon,
+            source_label=f"KLD morning regional weather: {lat:.3f},{lon:.3f}",
+            validator=lambda data: all(
+                isinstance(value, (int, float))
+                for value in _temps_for_offset_from_weather(data, tz_obj, DAY_OFFSET)[:2]
+            ),
+            attempts=2,
+            backoff_s=0.2,
+        )
+        return _temps_for_offset_from_weather(wm, tz_obj, DAY_OFFSET)
+
+    # Калининград уже запрошен целиком — опорная точка сетки без запроса
+    known = {}
+    if rows:
+        known["Калининград"] = ((KLD_LAT, KLD_LON), (rows[0][1], rows[0][2], None))
+    values, _report = regional_grid.city_values(pairs, _fetch, known=known)
+
+    for city_name, _coords in pairs:
+        high, low, _code = values.get(city_name, (None, None, None))
         if not isinstance(high, (int, float)):
             continue
         rows.append(
@@ -1937,12 +1755,46 @@ def build_message_morning_compact(
     fact_text = fact_text.strip()
     fact_line = f"🌾 Доброе утро! {fact_text}" if fact_text else "🌾 Доброе утро!"
 
-    wm_klg = _get_weather_with_retry(
+    # Все источники разделов — сразу и параллельно, под общим дедлайном
+    # (свежие → кэш прошлых запусков → раздел опускается; см. section_scheduler.py).
+    plan = section_scheduler.SectionPlan("morning", day=date_local.to_date_string())
+    plan.start(
+        "weather",
+        _get_weather_with_retry,
         KLD_LAT,
         KLD_LON,
         source_label="KLD morning Kaliningrad weather",
         validator=lambda wm: _weather_core_for_offset(wm, tz_obj, DAY_OFFSET),
+        max_age_h=6,
+    )
+    plan.start("fx", fx_morning_line, pendulum.now(tz_obj), tz_obj, max_age_h=12)
+    plan.start(
+        "sunset",
+        get_sunrise_sunset,
+        KLD_LAT,
+        KLD_LON,
+        tz_obj.name,
+        DAY_OFFSET,
+        usable=lambda v: bool(v and v[1]),
+        max_age_h=12,
     )
+    plan.start("air", get_air, KLD_LAT, KLD_LON, max_age_h=12)
+    plan.start("pollen", get_pollen, max_age_h=12)
+    plan.start("kp", _kp_global_swpc, usable=lambda v: isinstance(v[0], (int, float)), max_age_h=6)
+    plan.start("solar_wind", get_solar_wind, max_age_h=3)
+    plan.start("safecast", safecast_summary_line, usable=section_scheduler.always)
+    plan.start("radiation", radiation_line, KLD_LAT, KLD_LON)
+    if SHOW_SCHUMANN and not DISABLE_SCHUMANN:
+        plan.start(
+            "schumann",
+            get_schumann_with_fallback,
+            usable=lambda v: v.get("status_code") == "green" or isinstance(v.get("freq"), (int, float)),
+            max_age_h=12,
+        )
+    plan.start("quakes", _kld_quake_line_24h, usable=section_scheduler.always)
+    plan.start("astro", build_astro_section, date_local=date_local, tz_local=tz_obj.name, max_age_h=12)
+
+    wm_klg = plan.get("weather", {})
     t_day, t_night, wcode = _temps_for_offset_from_weather(wm_klg, tz_obj, DAY_OFFSET)
     if t_day is None or t_night is None:
         t_day, t_night, wcode = _fetch_temps_for_offset(KLD_LAT, KLD_LON, tz_obj.name, DAY_OFFSET)
@@ -1951,27 +1803,27 @@ def build_message_morning_compact(
         wind_ms = kmh_to_ms(_daily_wind_kmh_for_offset(wm_klg, tz_obj, DAY_OFFSET))
 
     gust = None
-    try:
-        times = _hourly_times(wm_klg)
-        hourly = wm_klg.get("hourly") or {}
-        idx_noon = _nearest_index_for_day(times, date_local.add(days=DAY_OFFSET).date(), 12, tz_obj)
-        arr = hourly.get("wind_gusts_10m") or hourly.get("windgusts_10m") or []
-        if idx_noon is not None and idx_noon < len(arr):
-            gust = float(arr[idx_noon]) / 3.6
-    except Exception:
-        pass
+    fc_klg = Forecast.of(wm_klg)
+    idx_noon = fc_klg.nearest_index(date_local.add(days=DAY_OFFSET).date(), 12, tz_obj)
+    gust_kmh = fc_klg.at(fc_klg.hourly("wind_gusts_10m", "windgusts_10m"), idx_noon)
+    if gust_kmh is not None:
+        gust = gust_kmh / 3.6
     if gust is None:
         gust = kmh_to_ms(_daily_wind_kmh_for_offset(wm_klg, tz_obj, DAY_OFFSET, gust=True))
 
     regional_city_temperatures = []
     if _env_on("FORMAT_V2", False):
-        regional_city_temperatures = _collect_morning_region_temperatures(
+        plan.start(
+            "region_temps",
+            _collect_morning_region_temperatures,
             sea_cities,
             other_cities,
             tz_obj,
             kaliningrad_high=t_day,
             kaliningrad_low=t_night,
+            max_age_h=12,
         )
+        regional_city_temperatures = plan.get("region_temps", [])
 
     desc = code_desc(wcode) or "—"
     tday_i   = int(round(t_day))   if isinstance(t_day, (int, float)) else None
@@ -1989,17 +1841,12 @@ def build_message_morning_compact(
     kal_line = f"Погода: 🏙️ Калининград — {temp_txt} • {desc} • {wind_txt} • {press_txt}."
 
     # Курсы
-    fx_line = fx_morning_line(pendulum.now(tz_obj), tz_obj)
+    fx_line = plan.get("fx")
 
     # Закат сегодня
     sunset_line = None
     try:
-        _sunrise, sunset = get_sunrise_sunset(
-            KLD_LAT,
-            KLD_LON,
-            tz_obj.name,
-            DAY_OFFSET,
-        )
+        _sunrise, sunset = plan.get("sunset", (None, None))
         if sunset:
             sunset_line = f"🌇 Закат сегодня: {sunset}"
         else:
@@ -2008,7 +1855,7 @@ def build_message_morning_compact(
         logging.info("KLD morning: не удалось получить время заката: %s", e)
 
     # Воздух
-    air = get_air(KLD_LAT, KLD_LON) or {}
+    air = plan.get("air") or {}
     try:
         aqi = air.get("aqi")
         aqi_i = int(round(float(aqi))) if isinstance(aqi, (int, float)) else "н/д"
@@ -2023,7 +1870,7 @@ def build_message_morning_compact(
 
     pm25_int = _int_or_nd(air.get("pm25"))
     pm10_int = _int_or_nd(air.get("pm10"))
-    pollen = get_pollen() or {}
+    pollen = plan.get("pollen") or {}
     pollen_risk = str(pollen.get("risk")).strip() if pollen.get("risk") else ""
 
     air_risk = aqi_risk_ru(aqi)
@@ -2036,16 +1883,21 @@ def build_message_morning_compact(
     if pollen_risk:
         air_line += f" • 🌿 пыльца: {pollen_risk}"
 
-    visibility_context, visibility_line = _kld_visibility_for_post(
+    plan.start(
+        "visibility",
+        _kld_visibility_for_post,
         wm_klg,
         air,
         post_type="morning",
         target_date=date_local.add(days=DAY_OFFSET).to_date_string(),
         tz_name=tz_obj.name,
+        usable=lambda v: v[0] is not None or bool(v[1]),
+        cache=False,
     )
+    visibility_context, visibility_line = plan.get("visibility", (None, None))
 
     # УФ — только если есть смысл
-    uvi_info = uvi_for_offset(wm_klg, tz_obj, DAY_OFFSET)
+    uvi_info = _section("uv", uvi_for_offset, wm_klg, tz_obj, DAY_OFFSET)
     uvi_line = None
     try:
         uvi_val = None
@@ -2061,13 +1913,13 @@ def build_message_morning_compact(
         pass
 
     # Космопогода (утром показываем по умолчанию)
-    kp_val, kp_status, kp_age_min, _kp_src = _kp_global_swpc()
+    kp_val, kp_status, kp_age_min, _kp_src = plan.get("kp", (None, "н/д", None, "n/d"))
     age_txt = ""
     if isinstance(kp_age_min, int):
         age_txt = f", 🕓 {kp_age_min // 60}ч назад" if kp_age_min > 180 else f", 🕓 {kp_age_min} мин назад"
     kp_chunk = f"Кр {kp_val:.1f} ({kp_status}{age_txt})" if isinstance(kp_val, (int, float)) else "Кр н/д"
 
-    sw = get_solar_wind() or {}
+    sw = plan.get("solar_wind") or {}
     v = sw.get("speed_kms")
     n = sw.get("density")
     vtxt = f"v {float(v):.0f} км/с" if isinstance(v, (int, float)) else None
@@ -2078,10 +1930,11 @@ def build_message_morning_compact(
 
     storm_line_alert = storm_alert_line(wm_klg, tz_obj)
 
-    sc_line = safecast_summary_line()
-    official_rad = radiation_line(KLD_LAT, KLD_LON)
+    sc_line = plan.get("safecast")
+    official_rad = plan.get("radiation")
 
-    schu_line = schumann_line(get_schumann_with_fallback()) if (SHOW_SCHUMANN and not DISABLE_SCHUMANN) else None
+    schu = plan.get("schumann")
+    schu_line = schumann_line(schu) if schu else None
 
     storm_short = storm_short_text(wm_klg, tz_obj)
 
@@ -2114,7 +1967,9 @@ def build_message_morning_compact(
         P.append(visibility_line)
     if sunset_line:
         P.append(sunset_line)
-    P.append(build_astro_section(date_local=date_local, tz_local=tz_obj.name))
+    astro = plan.get("astro")
+    if astro:
+        P.append(astro)
     if SHOW_SPACE:
         P.append(space_line)
     if storm_line_alert:
@@ -2124,9 +1979,10 @@ def build_message_morning_compact(
         P.append(" • ".join(sc_block_parts))
     if schu_line:
         P.append(schu_line)
-    quake_line = _kld_quake_line_24h()
+    quake_line = plan.get("quakes")
     if quake_line:
         P.append(quake_line)
+    plan.finish()
 
     P.append("")
     P.append(itogo)
@@ -2156,9 +2012,14 @@ def build_message_legacy_evening(
     header = f"<b>🌅 {region_name}: погода на завтра ({date_weather.format('DD.MM.YYYY')})</b>"
     P: List[str] = [header]
 
-    wm_main = get_weather(KLD_LAT, KLD_LON) or {}
+    wm_main = _section("weather", get_weather, KLD_LAT, KLD_LON) or {}
+    # волны и SST всех морских городов — одним marine-запросом
+    try:
+        _section("marine", marine.prefetch, [coords for _city, coords in _iter_city_pairs(sea_cities)])
+    except Exception as e:
+        logging.warning("marine prefetch failed: %s", e)
 
-    stats = day_night_stats(KLD_LAT, KLD_LON, tz=tz_name)
+    stats = _section("day_night", day_night_stats, KLD_LAT, KLD_LON, tz=tz_name)
     t_day_max = stats.get("t_day_max")
     t_night_min = stats.get("t_night_min")
     rh_min = stats.get("rh_min")
@@ -2269,23 +2130,28 @@ def build_message_legacy_evening(
 
         P.append("———")
 
-    temps_oth: Dict[str, Tuple[float, float, int]] = {}
-    for city, (la, lo) in (other_cities or []):
+    # не-морские города: при REGION_GRID=1 — по опорным точкам, морские
+    # города и Калининград (уже запрошены целиком) идут в сетку бесплатно
+    known = {
+        city: (sea_lookup[city], (d, n, wcx)) for city, (d, n, wcx, _sst) in temps_sea.items()
+    }
+    if t_day_max is not None and t_night_min is not None:
+        known["Калининград"] = ((KLD_LAT, KLD_LON), (t_day_max, t_night_min, wcode))
+
+    def _tomorrow(la: float, lo: float) -> Tuple[Optional[float], Optional[float], Optional[int]]:
         tmax, tmin = fetch_tomorrow_temps(la, lo, tz=tz_name)
-        if tmax is None:
-            continue
+        _d, _n, wcx = _temps_for_offset_from_weather(get_weather(la, lo) or {}, tz_obj, 1)
+        return tmax, tmin, wcx
 
-        wcx = 0
-        try:
-            wmx = get_weather(la, lo) or {}
-            didx = _daily_index_for_offset(wmx, tz_obj, 1)
-            arr = (wmx.get("daily") or {}).get("weathercode") or []
-            if isinstance(didx, int) and isinstance(arr, list) and didx < len(arr) and arr[didx] is not None:
-                wcx = int(arr[didx])
-        except Exception:
-            wcx = 0
+    oth_values, _report = _section(
+        "region_temps", regional_grid.city_values, _iter_city_pairs(other_cities), _tomorrow, known=known
+    )
 
-        temps_oth[city] = (tmax, tmin or tmax, wcx)
+    temps_oth: Dict[str, Tuple[float, float, int]] = {}
+    for city, (tmax, tmin, wcx) in oth_values.items():
+        if tmax is None:
+            continue
+        temps_oth[city] = (tmax, tmin or tmax, wcx or 0)
 
     if temps_oth:
         P.append("🔥 <b>Тёплые города, °C (топ-3)</b>")
@@ -2302,7 +2168,9 @@ def build_message_legacy_evening(
 
     # Рассвет и астрособытия завтрашнего дня
     try:
-        sunrise, _sunset = get_sunrise_sunset(
+        sunrise, _sunset = _section(
+            "sunrise",
+            get_sunrise_sunset,
             KLD_LAT,
             KLD_LON,
             tz_name,
@@ -2315,13 +2183,15 @@ def build_message_legacy_evening(
     except Exception as e:
         logging.info("KLD evening: не удалось получить время рассвета: %s", e)
     date_for_astro = pendulum.today(tz_obj).add(days=ASTRO_OFFSET)
-    P.append(build_astro_section(date_local=date_for_astro, tz_local=tz_name))
+    P.append(_section("astro", build_astro_section, date_local=date_for_astro, tz_local=tz_name))
     P.append("———")
 
     # (2) Вечером блоки воздуха/космопогоды/Шумана скрыты — остаются только рекомендации.
-    air = get_air(KLD_LAT, KLD_LON) or {}
-    schu_state = {} if (DISABLE_SCHUMANN) else get_schumann_with_fallback()
-    visibility_context, visibility_line = _kld_visibility_for_post(
+    air = _section("air", get_air, KLD_LAT, KLD_LON) or {}
+    schu_state = {} if (DISABLE_SCHUMANN) else _section("schumann", get_schumann_with_fallback)
+    visibility_context, visibility_line = _section(
+        "visibility",
+        _kld_visibility_for_post,
         wm_main,
         air,
         post_type="evening",
@@ -2332,7 +2202,7 @@ def build_message_legacy_evening(
     if visibility_line:
         P.append(visibility_line)
         P.append("———")
-    quake_line = _kld_quake_line_24h()
+    quake_line = _section("quakes", _kld_quake_line_24h)
     if quake_line:
         P.append(quake_line)
         P.append("———")
@@ -2372,22 +2242,35 @@ def build_message(
     other_cities,
     tz: Union[pendulum.Timezone, str],
     mode: Optional[str] = None,
+    day_offset: Optional[int] = None,
 ) -> str:
+    """
+    Текст поста режима mode. day_offset — смещение дня, уже посчитанное
+    вызывающим (send_common_post отдаёт то же значение картинке); None — из
+    ENV или по режиму.
+    """
     effective_mode = (mode or POST_MODE or "evening").strip().lower()
 
+    # общий бюджет на LLM-вызовы поста: по исчерпании — детерминированные фолбэки
+    if llm_budget_start:
+        llm_budget_start()
+
     global DAY_OFFSET, ASTRO_OFFSET
-    if _int_env(_DAY_OFFSET_ENV) is None:
+    if day_offset is not None:
+        DAY_OFFSET = int(day_offset)
+    elif _int_env(_DAY_OFFSET_ENV) is None:
         DAY_OFFSET = _default_day_offset(effective_mode)
     if _int_env(_ASTRO_OFFSET_ENV) is None:
         ASTRO_OFFSET = int(DAY_OFFSET)
 
-    if effective_mode == "morning":
-        return build_message_morning_compact(
+    with tracing.span("build_message", mode=effective_mode):
+        if effective_mode == "morning":
+            return build_message_morning_compact(
+                region_name, sea_label, sea_cities, other_label, other_cities, tz
+            )
+        return build_message_legacy_evening(
             region_name, sea_label, sea_cities, other_label, other_cities, tz
         )
-    return build_message_legacy_evening(
-        region_name, sea_label, sea_cities, other_label, other_cities, tz
-    )
 
 # ────────────────────────── Mood для KLD-картинки ──────────────────────────
 def _pick_ref_coords(
@@ -2473,6 +2356,36 @@ def _as_tz(tz: Union[pendulum.Timezone, str]) -> pendulum.Timezone:
     except Exception:
         return pendulum.timezone("Europe/Kaliningrad")
 
+def _prepare_common_evening_image(tz, sea_cities, other_cities, day_offset: int) -> Optional[str]:
+    """
+    Блокирующая часть: промпт + генерация картинки вечернего поста (в фоновом
+    потоке). day_offset передаётся явно: build_message в соседнем потоке
+    переписывает глобальный DAY_OFFSET.
+    """
+    tz_obj = _as_tz(tz)
+    sea_pairs = _iter_city_pairs(sea_cities)
+    other_pairs = _iter_city_pairs(other_cities)
+    marine_mood, inland_mood, astro_mood_en = _build_kld_image_moods_for_evening(
+        tz_obj=tz_obj,
+        sea_pairs=sea_pairs,
+        other_pairs=other_pairs,
+    )
+    today = pendulum.today(tz_obj).add(days=day_offset).date()
+    prompt, style_name = build_kld_evening_prompt(
+        date=today,
+        marine_mood=marine_mood,
+        inland_mood=inland_mood,
+        astro_mood_en=astro_mood_en,
+    )
+
+    img_dir = Path("kld_images")
+    img_dir.mkdir(parents=True, exist_ok=True)
+
+    safe_style = re.sub(r"[^a-zA-Z0-9_-]+", "_", str(style_name) if style_name else "default")
+    img_file = img_dir / f"kld_evening_{today.isoformat()}_{safe_style}.jpg"
+
+    return generate_astro_image(prompt, str(img_file))  # type: ignore[call-arg]
+
 async def send_common_post(
     bot: Bot,
     chat_id: int,
@@ -2484,90 +2397,71 @@ async def send_common_post(
     tz,
     mode: Optional[str] = None,
 ) -> None:
-    msg = build_message(
+    """
+    Текст и картинка готовятся параллельно в фоновых потоках (event loop не
+    блокируется); текст уходит сразу, фото — следом, если успело к
+    POST_IMAGE_DEADLINE_S.
+    """
+    try:
+        effective_mode = (mode or os.getenv("POST_MODE") or os.getenv("MODE") or "evening").lower()
+    except Exception:
+        effective_mode = "evening"
+    day_offset = _day_offset_for(effective_mode)
+
+    msg_fut = in_thread(
+        build_message,
         region_name=region_name,
         sea_label=sea_label,
         sea_cities=sea_cities,
         other_label=other_label,
         other_cities=other_cities,
         tz=tz,
-        mode=mode,
+        mode=effective_mode,
+        day_offset=day_offset,
+        name="build-message",
     )
 
-    try:
-        effective_mode = (mode or os.getenv("POST_MODE") or os.getenv("MODE") or "evening").lower()
-    except Exception:
-        effective_mode = "evening"
-
     kld_img_env = os.getenv("KLD_IMG_ENABLED", "1")
     enable_img = kld_img_env.strip().lower() not in ("0", "false", "no", "off")
 
-    img_path: Optional[str] = None
-
+    img_fut = None
+    deadline = None
     if (
         enable_img
         and effective_mode.startswith("evening")
         and generate_astro_image is not None
         and build_kld_evening_prompt is not None
     ):
-        try:
-            tz_obj = _as_tz(tz)
-            sea_pairs = _iter_city_pairs(sea_cities)
-            other_pairs = _iter_city_pairs(other_cities)
-            marine_mood, inland_mood, astro_mood_en = _build_kld_image_moods_for_evening(
-                tz_obj=tz_obj,
-                sea_pairs=sea_pairs,
-                other_pairs=other_pairs,
-            )
-            today = pendulum.today(tz_obj).add(days=DAY_OFFSET).date()
-            prompt, style_name = build_kld_evening_prompt(
-                date=today,
-                marine_mood=marine_mood,
-                inland_mood=inland_mood,
-                astro_mood_en=astro_mood_en,
-            )
-
-            img_dir = Path("kld_images")
-            img_dir.mkdir(parents=True, exist_ok=True)
-
-            safe_style = re.sub(r"[^a-zA-Z0-9_-]+", "_", str(style_name) if style_name else "default")
-            img_file = img_dir / f"kld_evening_{today.isoformat()}_{safe_style}.jpg"
-
-            img_path = generate_astro_image(prompt, str(img_file))  # type: ignore[call-arg]
-        except Exception:
-            img_path = None
+        # бюджет картинки — от начала её генерации, не от сборки текста
+        deadline = Deadline(IMAGE_DEADLINE_S)
+        img_fut = in_thread(
+            _prepare_common_evening_image, tz, sea_cities, other_cities, day_offset, name="kld-image"
+        )
 
-    if img_path and Path(img_path).exists():
-        try:
-            await bot.send_message(
-                chat_id=chat_id,
-                text=msg,
-                parse_mode=constants.ParseMode.HTML,
-                disable_web_page_preview=True,
-            )
-        except Exception:
-            pass
-        try:
-            caption = (os.getenv("KLD_IMG_CAPTION") or "Визуальный вайб завтрашнего вечера над Балтикой🌊").strip()
-            if len(caption) > 900:
-                caption = caption[:900].rstrip() + "…"
-            with open(img_path, "rb") as f:
-                await bot.send_photo(
-                    chat_id=chat_id,
-                    photo=f,
-                    caption=caption,
-                    parse_mode=constants.ParseMode.HTML,
-                )
-            return
-        except Exception:
-            return
+    msg = await msg_fut
+    try:
+        await delivery_for(bot).call(
+            "send_message",
+            chat_id,
+            text=msg,
+            parse_mode=constants.ParseMode.HTML,
+            disable_web_page_preview=True,
+        )
+    except Exception:
+        if img_fut is None:
+            raise
+        logging.exception("send_common_post: текст не отправлен, пробуем фото")
 
-    await bot.send_message(
-        chat_id=chat_id,
-        text=msg,
-        parse_mode=constants.ParseMode.HTML,
-        disable_web_page_preview=True,
-    )
+    if img_fut is None:
+        return
+    img_path = await wait_or_none(img_fut, deadline, "KLD image")
+    try:
+        caption = (os.getenv("KLD_IMG_CAPTION") or "Визуальный вайб завтрашнего вечера над Балтикой🌊").strip()
+        if len(caption) > 900:
+            caption = caption[:900].rstrip() + "…"
+        await send_photo_file(bot, chat_id, img_path, caption, parse_mode=constants.ParseMode.HTML)
+    except Exception:
+        return
 
 async def main_common(
     bot: Bot,
@@ -15,13 +15,17 @@ import argparse
 import asyncio
 import logging
 import secrets
-from typing import Dict, Any, Tuple, Union, Optional
+from typing import Dict, Any, Sequence, Tuple, Union, Optional
 from pathlib import Path
 
 import pendulum
 from telegram import Bot, constants
 
+import snapshots
+import tracing
 from post_common import build_message, fx_morning_line  # type: ignore
+from send_pipeline import IMAGE_DEADLINE_S, Deadline, in_thread, wait_or_none
+from tg_delivery import delivery_for
 from weather_text import STORM_GUST_MS
 from weather_text import clause_has_confirmed_storm as _clause_has_confirmed_storm
 from weather_text import extract_max_gust_ms
@@ -215,6 +219,13 @@ async def _send_fx_only(
     except Exception as e:
         logging.warning("FX: save cache failed: %s", e)
 
+def _chat_arg(raw: str) -> Union[int, str]:
+    raw = str(raw).strip()
+    try:
+        return int(raw)
+    except Exception:
+        return raw
+
 def resolve_chat_id(args_chat: str, to_test: bool) -> Union[int, str]:
     chat_override = (args_chat or "").strip() or os.getenv("CHANNEL_ID_OVERRIDE", "").strip()
     if chat_override:
@@ -354,29 +365,23 @@ def _seed_for_image(base_date: pendulum.DateTime, *, style_name: str) -> Optiona
     return abs(hash(key)) % 2_000_000_000
 
 
-async def _maybe_send_kld_image(
-    bot: Bot,
-    chat_id: Union[int, str],
+def _prepare_kld_image(
     base_date: "pendulum.DateTime",
-    mode: str,
-    dry_run: bool,
     *,
     msg_text: str,
-) -> None:
-    if mode != "evening":
-        return
-
+) -> Optional[Tuple[str, str]]:
+    """Блокирующая часть: промпт, генерация, оверлеи → (путь, подпись) или None."""
     try:
         from image_prompt_kld import build_kld_evening_prompt, get_lunar_meta  # type: ignore
     except Exception as e:
         logging.info("KLD image: image_prompt_kld недоступен — картинка пропущена (%s)", e)
-        return
+        return None
 
     try:
         import imagegen
     except Exception as e:
         logging.info("KLD image: imagegen.py недоступен — картинка пропущена (%s)", e)
-        return
+        return None
 
     overlay_mod = None
     try:
@@ -385,84 +390,118 @@ async def _maybe_send_kld_image(
     except Exception:
         overlay_mod = None
 
-    try:
-        storm_line = _extract_storm_warning(msg_text)
-        storm_on = bool(storm_line)
-
-        tomorrow = base_date.date().add(days=1)
-        lunar = get_lunar_meta(tomorrow)
-
-        force_style = None
-        if storm_on:
-            force_style = "sea_dunes"
-        elif getattr(lunar, "is_full_or_new", False):
-            force_style = "moon_goddess"
-
-        prompt, style_name = build_kld_evening_prompt(
-            date=base_date.date(),
-            marine_mood=("storm warning, strong gusts, waves" if storm_on else ""),
-            inland_mood=("windy cold night" if storm_on else ""),
-            astro_mood_en=getattr(lunar, "phrase_en", "") or "",
-            force_style=force_style,
-            storm=storm_on,
-            final_format_v2_message=msg_text,
-        )
+    storm_line = _extract_storm_warning(msg_text)
+    storm_on = bool(storm_line)
+
+    tomorrow = base_date.date().add(days=1)
+    lunar = get_lunar_meta(tomorrow)
+
+    force_style = None
+    if storm_on:
+        force_style = "sea_dunes"
+    elif getattr(lunar, "is_full_or_new", False):
+        force_style = "moon_goddess"
+
+    prompt, style_name = build_kld_evening_prompt(
+        date=base_date.date(),
+        marine_mood=("storm warning, strong gusts, waves" if storm_on else ""),
+        inland_mood=("windy cold night" if storm_on else ""),
+        astro_mood_en=getattr(lunar, "phrase_en", "") or "",
+        force_style=force_style,
+        storm=storm_on,
+        final_format_v2_message=msg_text,
+    )
 
-        seed = _seed_for_image(base_date, style_name=style_name)
-        img_path = imagegen.generate_kld_evening_image(prompt=prompt, style_name=style_name, seed=seed)
-        logging.info("KLD image: local image ready: %s", img_path)
+    seed = _seed_for_image(base_date, style_name=style_name)
+    img_path = imagegen.generate_kld_evening_image(prompt=prompt, style_name=style_name, seed=seed)
+    logging.info("KLD image: local image ready: %s", img_path)
 
-        final_path = img_path
+    final_path = img_path
 
-        if overlay_mod:
-            try:
-                from PIL import Image  # type: ignore
-                src = Path(img_path)
-                out = src.with_name(src.stem + "_ov.jpg")
-
-                im = Image.open(src).convert("RGB")
-
-                if storm_on and hasattr(overlay_mod, "overlay_storm_window"):
-                    data = overlay_mod.StormData(
-                        title="Штормовое предупреждение",
-                        subtitle=(storm_line or "Сильный ветер и порывы на побережье"),
-                        icon="⚠️",
-                    )
-                    im = overlay_mod.overlay_storm_window(im, data, anchor="top_left")
-
-                if (not storm_on) and getattr(lunar, "is_full_or_new", False) and hasattr(overlay_mod, "overlay_moon_badge"):
-                    phase = getattr(lunar, "phase_key", "") or ""
-                    sign = getattr(lunar, "sign_en", "") or ""
-                    glyph = ZODIAC_GLYPH.get(sign, "✶")
-                    caption = getattr(lunar, "phrase_en", "") or ""
-                    if caption:
-                        caption = caption.replace(" in ", " • ")
-                    data = overlay_mod.MoonData(phase=phase, zodiac=glyph, caption=caption)
-                    im = overlay_mod.overlay_moon_badge(im, data, anchor="top_right")
-
-                im.save(out, format="JPEG", quality=92, optimize=True)
-                final_path = str(out)
-                logging.info("KLD image: overlay applied -> %s", final_path)
-            except Exception:
-                logging.exception("KLD image: overlay failed (continue with base image)")
+    if overlay_mod:
+        try:
+            from PIL import Image  # type: ignore
+            src = Path(img_path)
+            out = src.with_name(src.stem + "_ov.jpg")
+
+            im = Image.open(src).convert("RGB")
+
+            if storm_on and hasattr(overlay_mod, "overlay_storm_window"):
+                data = overlay_mod.StormData(
+                    title="Штормовое предупреждение",
+                    subtitle=(storm_line or "Сильный ветер и порывы на побережье"),
+                    icon="⚠️",
+                )
+                im = overlay_mod.overlay_storm_window(im, data, anchor="top_left")
+
+            if (not storm_on) and getattr(lunar, "is_full_or_new", False) and hasattr(overlay_mod, "overlay_moon_badge"):
+                phase = getattr(lunar, "phase_key", "") or ""
+                sign = getattr(lunar, "sign_en", "") or ""
+                glyph = ZODIAC_GLYPH.get(sign, "✶")
+                caption = getattr(lunar, "phrase_en", "") or ""
+                if caption:
+                    caption = caption.replace(" in ", " • ")
+                data = overlay_mod.MoonData(phase=phase, zodiac=glyph, caption=caption)
+                im = overlay_mod.overlay_moon_badge(im, data, anchor="top_right")
+
+            im.save(out, format="JPEG", quality=92, optimize=True)
+            final_path = str(out)
+            logging.info("KLD image: overlay applied -> %s", final_path)
+        except Exception:
+            logging.exception("KLD image: overlay failed (continue with base image)")
 
-        if dry_run:
-            logging.info("KLD image: DRY-RUN — отправка картинки пропущена")
-            return
+    if storm_on:
+        caption = "⚠️ Визуальный вайб: штормовое предупреждение над Балтикой"
+    elif getattr(lunar, "is_full_or_new", False):
+        caption = f"🌙 Визуальный вайб: {getattr(lunar,'phrase_en','Moon')} над Балтикой"
+    else:
+        caption = "Визуальный вайб завтрашнего вечера над Балтикой 🌊"
+    return final_path, caption
+
+
+async def _maybe_send_kld_image(
+    bot: Bot,
+    chat_id: Union[int, str, Sequence[Union[int, str]]],
+    base_date: "pendulum.DateTime",
+    mode: str,
+    dry_run: bool,
+    *,
+    msg_text: str,
+    deadline: Optional[Deadline] = None,
+    prepared: "Optional[asyncio.Future[Optional[Tuple[str, str]]]]" = None,
+) -> None:
+    """
+    Генерация — в фоновом потоке (event loop свободен), отправка — не позже
+    дедлайна. prepared — уже запущенная генерация (main_kld стартует её сразу
+    после сборки текста, параллельно с его отправкой). chat_id может быть
+    списком: фото грузится один раз, остальные чаты получают его file_id.
+    """
+    if mode != "evening":
+        return
 
-        if storm_on:
-            caption = "⚠️ Визуальный вайб: штормовое предупреждение над Балтикой"
-        elif getattr(lunar, "is_full_or_new", False):
-            caption = f"🌙 Визуальный вайб: {getattr(lunar,'phrase_en','Moon')} над Балтикой"
-        else:
-            caption = "Визуальный вайб завтрашнего вечера над Балтикой 🌊"
+    deadline = deadline or Deadline(IMAGE_DEADLINE_S)
+    if prepared is None:
+        prepared = in_thread(_prepare_kld_image, base_date, msg_text=msg_text, name="kld-image")
+    ready = await wait_or_none(prepared, deadline, "KLD image")
+    if not ready:
+        return
+    final_path, caption = ready
 
-        with open(final_path, "rb") as f:
-            msg = await bot.send_photo(chat_id=chat_id, photo=f, caption=caption)
+    if dry_run:
+        logging.info("KLD image: DRY-RUN — отправка картинки пропущена")
+        return
 
-        logging.info("KLD image: photo sent: chat=%s message_id=%s", getattr(msg.chat, "id", "?"), getattr(msg, "message_id", "?"))
+    if not final_path or not Path(final_path).exists():
+        return
+    chats = list(chat_id) if isinstance(chat_id, (list, tuple)) else [chat_id]
+    try:
+        sent = await delivery_for(bot).send_photo(chats, final_path, caption)
     except Exception:
         logging.exception("KLD image: ошибка при генерации/отправке картинки")
+        return
+    for chat, msg in sent.items():
+        if msg is not None and not isinstance(msg, BaseException):
+            logging.info("KLD image: photo sent: chat=%s message_id=%s", chat, getattr(msg, "message_id", "?"))
 
 
 class _TodayPatch:
@@ -502,6 +541,18 @@ async def main_kld() -> None:
     parser.add_argument("--fx-only", action="store_true")
     parser.add_argument("--to-test", action="store_true")
     parser.add_argument("--chat-id", type=str, default="")
+    parser.add_argument(
+        "--also-chat",
+        action="append",
+        default=[],
+        help="Ещё один чат для того же поста (можно несколько); фото грузится один раз.",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        default="",
+        help="Собрать пост офлайн из снимка (путь или latest, см. snapshots.py); без отправки.",
+    )
     args = parser.parse_args()
 
     tz = pendulum.timezone(TZ_STR)
@@ -511,8 +562,18 @@ async def main_kld() -> None:
     if args.for_tomorrow:
         base_date = base_date.add(days=1)
 
+    snap_path = snapshots.resolve(args.replay, label=f"kld-{args.mode}") if args.replay else None
+    if snap_path is not None:
+        # режим и «сейчас» — как в записанном запуске
+        meta = snapshots.load(snap_path).get("meta") or {}
+        args.mode = meta.get("mode") or args.mode
+        base_date = pendulum.parse(meta["base_date"]).in_tz(tz) if meta.get("base_date") else base_date
+        args.dry_run = True
+        logging.info("REPLAY: %s", snap_path)
+
     mode = (args.mode or "evening").lower().strip()
     logging.info("Режим поста: %s", mode)
+    tracing.note(mode=mode, dry_run=bool(args.dry_run), replay=snap_path is not None)
 
     day_offset = 0 if mode == "morning" else 1
     os.environ["POST_MODE"] = mode
@@ -533,6 +594,7 @@ async def main_kld() -> None:
         os.environ["SHOW_SCHUMANN"] = "0"
 
     chat_id = resolve_chat_id(args.chat_id, args.to_test)
+    chat_ids = [chat_id] + [_chat_arg(c) for c in args.also_chat if str(c).strip()]
     bot = Bot(token=TOKEN_KLG)
 
     with _TodayPatch(base_date):
@@ -540,14 +602,34 @@ async def main_kld() -> None:
             await _send_fx_only(bot, chat_id, base_date, tz, dry_run=args.dry_run)
             return
 
-        msg = build_message(
-            region_name="Калининградская область",
-            sea_label=SEA_LABEL,
-            sea_cities=SEA_CITIES_ORDERED,
-            other_label=OTHER_LABEL,
-            other_cities=OTHER_CITIES_ALL,
-            tz=TZ_STR,
+        session = (
+            snapshots.replaying(snap_path)
+            if snap_path is not None
+            else snapshots.recording(f"kld-{mode}", mode=mode, base_date=base_date.isoformat())
         )
+        with session as snap:
+            # десятки блокирующих HTTP-запросов — в фоновом потоке, не в event loop
+            msg_fut = in_thread(
+                build_message,
+                region_name="Калининградская область",
+                sea_label=SEA_LABEL,
+                sea_cities=SEA_CITIES_ORDERED,
+                other_label=OTHER_LABEL,
+                other_cities=OTHER_CITIES_ALL,
+                tz=TZ_STR,
+                name="build-message",
+            )
+            me_task = None if args.dry_run else asyncio.ensure_future(bot.get_me())
+            try:
+                msg = await msg_fut
+            except BaseException:
+                if me_task is not None:
+                    me_task.cancel()
+                raise
+            if isinstance(snap, snapshots.Replayer):
+                snapshots.report_match(snap, msg)
+            elif snap is not None:
+                snap.text = msg
 
         if args.echo or args.dry_run:
             print("\n===== ECHO MESSAGE BEGIN =====\n")
@@ -557,18 +639,34 @@ async def main_kld() -> None:
                 logging.info("DRY-RUN: отправка пропущена")
                 return
 
-        await bot.get_me()
-
-        m = await bot.send_message(
-            chat_id=chat_id,
-            text=msg,
-            parse_mode=constants.ParseMode.HTML,
-            disable_web_page_preview=True,
-        )
-        logging.info("Sent OK: chat=%s message_id=%s", getattr(m.chat, "id", "?"), getattr(m, "message_id", "?"))
-
-        await _maybe_send_kld_image(bot, chat_id, base_date, mode, args.dry_run, msg_text=msg)
+        # картинка генерируется, пока уходит текст; её бюджет — от этого момента
+        image_job = None
+        deadline = Deadline(IMAGE_DEADLINE_S)
+        if mode == "evening":
+            image_job = in_thread(_prepare_kld_image, base_date, msg_text=msg, name="kld-image")
+
+        await me_task
+
+        with tracing.span("send_text"):
+            sent = await delivery_for(bot).send_text(
+                chat_ids,
+                [msg],
+                parse_mode=constants.ParseMode.HTML,
+                disable_web_page_preview=True,
+            )
+        for chat, res in sent.items():
+            if isinstance(res, BaseException):
+                if chat == chat_id:
+                    raise res
+                continue  # зеркальный чат: ошибка уже в логе, основной пост ушёл
+            logging.info("Sent OK: chat=%s message_id=%s", chat, getattr(res[0], "message_id", "?"))
+
+        with tracing.span("image"):
+            await _maybe_send_kld_image(
+                bot, chat_ids, base_date, mode, args.dry_run, msg_text=msg, deadline=deadline, prepared=image_job
+            )
 
 
 if __name__ == "__main__":
-    asyncio.run(main_kld())
+    with tracing.run("post_kld"):
+        asyncio.run(main_kld())
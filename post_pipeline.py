@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+post_pipeline.py — декларативный конвейер пост-обработки текста поста.
+
+• LineDoc — общий изменяемый документ: строки + текст, каждое представление
+  строится лениво и только после изменения. Индекс по первому символу строки
+  (find) позволяет этапу, которому нужны 2–3 строки с известным префиксом,
+  не сканировать весь текст.
+• Stage — этап: имя, функция, режим (morning/evening/любой), env-флаги
+  включения. Выключенный этап не вызывается вовсе; POSTPROC_SKIP=a,b
+  выключает этапы по имени (для отладки).
+• run_stages — прогон с замером времени каждого этапа (и спаном tracing);
+  при POSTPROC_DEBUG=1 в лог идёт unified diff каждого изменившего текст этапа.
+
+Семантика строк совпадает со str.splitlines()/"\n".join(): этап, который
+раньше возвращал "\n".join(lines), вызывает doc.set_lines(...) или
+doc.normalize(); ранний выход без изменений оставляет текст байт-в-байт.
+"""
+
+from __future__ import annotations
+
+import difflib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import tracing
+
+
+def _env_on(name: str) -> bool:
+    return str(os.getenv(name) or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+# ───── документ ─────
+class LineDoc:
+    """Текст поста как список строк; text/lines/индекс пересчитываются лениво."""
+
+    def __init__(self, text: Any = "") -> None:
+        self._text: Optional[str] = str(text or "")
+        self._lines: Optional[List[str]] = None
+        self._heads: Optional[Dict[str, List[int]]] = None
+        self._normal = False
+        self.version = 0
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self._lines or [])
+        return self._text
+
+    @property
+    def lines(self) -> List[str]:
+        """Строки текущего текста (не изменять на месте — только set_lines)."""
+        if self._lines is None:
+            self._lines = self.text.splitlines()
+        return self._lines
+
+    def set_text(self, text: str) -> None:
+        text = str(text or "")
+        if self._text is not None and text == self._text:
+            return
+        self._text, self._lines, self._heads = text, None, None
+        self._normal = False
+        self.version += 1
+
+    def set_lines(self, lines: List[str]) -> None:
+        """Новый текст = "\\n".join(lines) (строки без переводов строк внутри)."""
+        lines = list(lines)
+        self._text, self._heads = None, None
+        # splitlines("a\\n") теряет хвостовую пустую строку — храним только точный текст
+        self._lines = None if lines and lines[-1] == "" else lines
+        if self._lines is None:
+            self._text = "\n".join(lines)
+        self._normal = self._lines is not None
+        self.version += 1
+
+    def normalize(self) -> None:
+        """Эквивалент "\\n".join(text.splitlines()) — то, что делает любой split/join-этап."""
+        if self._normal:
+            return
+        lines = self.lines
+        if self._text is not None and "\n".join(lines) == self._text:
+            self._normal = True
+            return
+        self.set_lines(lines)
+
+    def find(self, prefixes: Sequence[str] | str) -> List[int]:
+        """Индексы строк, у которых strip() начинается с одного из prefixes."""
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        prefixes = tuple(prefixes)
+        if self._heads is None:
+            heads: Dict[str, List[int]] = {}
+            for idx, line in enumerate(self.lines):
+                s = line.strip()
+                if s:
+                    heads.setdefault(s[0], []).append(idx)
+            self._heads = heads
+        out: List[int] = []
+        for head in {p[0] for p in prefixes if p}:
+            out.extend(i for i in self._heads.get(head, ()) if self.lines[i].strip().startswith(prefixes))
+        return sorted(out)
+
+    def first(self, prefixes: Sequence[str] | str) -> Optional[int]:
+        found = self.find(prefixes)
+        return found[0] if found else None
+
+    @classmethod
+    def apply(cls, text: Any, fn: Callable[["LineDoc"], None]) -> str:
+        """Обёртка для строкового API: text → fn(doc) → text."""
+        doc = cls(text)
+        fn(doc)
+        return doc.text
+
+
+# ───── этапы ─────
+@dataclass(frozen=True)
+class Stage:
+    """
+    fn(text, ctx) -> str (kind="text") или fn(doc, ctx) -> None (kind="doc").
+    mode: "morning" | "evening" | "" (любой); flags: этап включён, если
+    включён любой из env-флагов (пусто — всегда).
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    kind: str = "text"
+    mode: str = ""
+    flags: Tuple[str, ...] = ()
+
+    def enabled(self, mode: str, skip: Sequence[str] = ()) -> bool:
+        if self.name in skip:
+            return False
+        is_morning = str(mode or "").startswith("morn")
+        if self.mode == "morning" and not is_morning:
+            return False
+        if self.mode == "evening" and is_morning:
+            return False
+        return not self.flags or any(_env_on(f) for f in self.flags)
+
+
+@dataclass
+class StageRun:
+    name: str
+    status: str  # "changed" | "same" | "off"
+    ms: float = 0.0
+    diff: List[str] = field(default_factory=list)
+
+
+def run_stages(
+    text: Any,
+    stages: Sequence[Stage],
+    ctx: Any,
+    *,
+    mode: str = "",
+    runs: Optional[List[StageRun]] = None,
+    debug: Optional[bool] = None,
+) -> str:
+    """Прогоняет stages над общим LineDoc; в runs (если передан) — отчёт по этапам."""
+    debug = _env_on("POSTPROC_DEBUG") if debug is None else debug
+    skip = [s.strip() for s in str(os.getenv("POSTPROC_SKIP") or "").split(",") if s.strip()]
+    doc = LineDoc(text)
+    for stage in stages:
+        if not stage.enabled(mode, skip):
+            if runs is not None:
+                runs.append(StageRun(stage.name, "off"))
+            continue
+        before_version = doc.version
+        before = doc.text if debug else None
+        started = time.perf_counter()
+        with tracing.span(f"postprocess.{stage.name}"):
+            if stage.kind == "doc":
+                stage.fn(doc, ctx)
+            else:
+                doc.set_text(stage.fn(doc.text, ctx))
+        ms = (time.perf_counter() - started) * 1000
+        changed = doc.version != before_version and (before is None or doc.text != before)
+        run = StageRun(stage.name, "changed" if changed else "same", ms)
+        if debug and changed:
+            run.diff = list(difflib.unified_diff(before.splitlines(), doc.text.splitlines(), stage.name, stage.name, n=0, lineterm=""))
+            logging.info("postprocess %s (%.2f ms):\n%s", stage.name, ms, "\n".join(run.diff))
+        if runs is not None:
+            runs.append(run)
+    return doc.text
+
+
+def format_runs(runs: Sequence[StageRun]) -> str:
+    """Таблица «этап — статус — мс» для вывода в консоль."""
+    width = max((len(r.name) for r in runs), default=0)
+    rows = [f"{r.name:<{width}}  {r.status:<7}  {r.ms:8.3f} ms" for r in runs]
+    total = sum(r.ms for r in runs)
+    rows.append(f"{'total':<{width}}  {'':<7}  {total:8.3f} ms")
+    return "\n".join(rows)
@@ -7,11 +7,12 @@ removes lines that look broken, stale, or low-trust before a post is sent.
 """
 from __future__ import annotations
 
+import bisect
 import html
 import os
 import re
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Callable, List
 
 TG_MESSAGE_LIMIT = 4096
 _SAFE_CHUNK_LIMIT = 3800
@@ -76,6 +77,26 @@ def _line_is_separator(line: str) -> bool:
     return bool(s) and set(s) <= {"—", "-", "─"}
 
 
+LineRule = Callable[[str, List[str]], str]
+
+
+def _sub(pattern: str, repl: Any, flags: int = 0, needle: str = "") -> LineRule:
+    """re.sub rule; needle is a literal the pattern cannot match without (skips the regex)."""
+    rx = re.compile(pattern, flags)
+    if not needle:
+        return lambda line, _issues: rx.sub(repl, line)
+    if flags & re.I:
+        return lambda line, _issues: rx.sub(repl, line) if needle in line.casefold() else line
+    return lambda line, _issues: rx.sub(repl, line) if needle in line else line
+
+
+def _replace(old: str, new: str) -> LineRule:
+    return lambda line, _issues: line.replace(old, new)
+
+
+_SHORE_RX = re.compile(r"\b\((N|NE|E|SE|S|SW|W|NW)/(onshore|offshore|cross)\)\b", re.I)
+
+
 def _replace_shore_terms(line: str, issues: list[str]) -> str:
     def repl(match: re.Match[str]) -> str:
         d = match.group(1).upper()
@@ -85,37 +106,42 @@ def _replace_shore_terms(line: str, issues: list[str]) -> str:
         issues.append(f"translated shore note: ({d}/{shore})")
         return f"({d_ru}, {shore_ru})"
 
-    return re.sub(
-        r"\b\((N|NE|E|SE|S|SW|W|NW)/(onshore|offshore|cross)\)\b",
-        repl,
-        line,
-        flags=re.I,
-    )
+    return _SHORE_RX.sub(repl, line) if "/" in line else line
+
+
+# Compiled once; applied in order to every line as (line, issues) -> line.
+_NORMALIZE_RULES: tuple[LineRule, ...] = (
+    lambda line, _issues: line.rstrip(),
+    _sub(r"\s+/None\b", "", re.I, "/none"),
+    _sub(r"\((?:N|NE|E|SE|S|SW|W|NW)?/?None\)", "", re.I, "none)"),
+    _replace_shore_terms,
+    _replace(" • —", ""),
+    _replace(" • -", ""),
+    _replace(" — —", " —"),
+    _replace(" - -", " -"),
+    _sub(r"\bпорывы\s+до\s+(\d+)\s*м/с\s*(\d+)\s*м/с\b", r"порывы до \1\2 м/с", re.I, "порывы"),
+    _sub(r"\bпорывы\s*[—-]\s*(\d+(?:[\.,]\d+)?)(?![\d\.,])(?:\s*м/с)?", r"порывы до \1 м/с", re.I, "порывы"),
+    _sub(r"\bпорывы\s+до\s+(\d+(?:[\.,]\d+)?)(?![\d\.,])(?:\s*м/с)?", r"порывы до \1 м/с", re.I, "порывы"),
+    _sub(r"\s*•\s*[—-]\s*•\s*", " • ", 0, "•"),
+    _sub(r"\s{2,}", " "),
+    lambda line, _issues: line.strip(),
+    _sub(r"^✅\s*(?:В целом|Общий фон):\s*благоприятный день\.?$", "✅ Астроритм: благоприятный.", re.I, "✅"),
+)
+
+# literal (casefolded) that each drop pattern cannot match without, in table order
+_DROP_NEEDLES = ("kp", "кр", "/none", "full", "sagittarius", "#", "освещ", "луна")
+_DROP_RULES = tuple(
+    (needle, rx, reason)
+    for needle, (rx, reason) in zip(_DROP_NEEDLES, _FORBIDDEN_PATTERNS + _DROP_LINE_PATTERNS, strict=True)
+)
+_NON_LETTERS_RX = re.compile(r"[^A-Za-zА-Яа-яЁё]+")
 
 
 def _normalize_line(line: str, issues: list[str] | None = None) -> str:
     issues = issues if issues is not None else []
     original = line
-    line = line.rstrip()
-    line = re.sub(r"\s+/None\b", "", line, flags=re.I)
-    line = re.sub(r"\((?:N|NE|E|SE|S|SW|W|NW)?/?None\)", "", line, flags=re.I)
-    line = _replace_shore_terms(line, issues)
-    line = line.replace(" • —", "")
-    line = line.replace(" • -", "")
-    line = line.replace(" — —", " —")
-    line = line.replace(" - -", " -")
-    line = re.sub(r"\bпорывы\s+до\s+(\d+)\s*м/с\s*(\d+)\s*м/с\b", r"порывы до \1\2 м/с", line, flags=re.I)
-    line = re.sub(r"\bпорывы\s*[—-]\s*(\d+(?:[\.,]\d+)?)(?![\d\.,])(?:\s*м/с)?", r"порывы до \1 м/с", line, flags=re.I)
-    line = re.sub(r"\bпорывы\s+до\s+(\d+(?:[\.,]\d+)?)(?![\d\.,])(?:\s*м/с)?", r"порывы до \1 м/с", line, flags=re.I)
-    line = re.sub(r"\s*•\s*[—-]\s*•\s*", " • ", line)
-    line = re.sub(r"\s{2,}", " ", line)
-    line = line.strip()
-    line = re.sub(
-        r"^✅\s*(?:В целом|Общий фон):\s*благоприятный день\.?$",
-        "✅ Астроритм: благоприятный.",
-        line,
-        flags=re.I,
-    )
+    for rule in _NORMALIZE_RULES:
+        line = rule(line, issues)
     if original.strip() != line and not (issues and issues[-1].startswith("translated shore note")):
         issues.append(f"normalized line: {original.strip()[:120]}")
     return line
@@ -126,15 +152,13 @@ def _line_should_drop(line: str) -> tuple[bool, str | None]:
     if not stripped:
         return False, None
 
-    for rx, reason in _FORBIDDEN_PATTERNS:
-        if rx.search(stripped):
-            return True, reason
-
-    for rx, reason in _DROP_LINE_PATTERNS:
-        if rx.search(stripped):
+    folded = stripped.casefold()
+    for needle, rx, reason in _DROP_RULES:
+        if needle in folded and rx.search(stripped):
             return True, reason
 
-    last_word = re.sub(r"[^A-Za-zА-Яа-яЁё]+", "", stripped.split()[-1]).lower() if stripped.split() else ""
+    words = stripped.split()
+    last_word = _NON_LETTERS_RX.sub("", words[-1]).lower() if words else ""
     if last_word in _BROKEN_TAILS:
         return True, f"clipped tail: {last_word}"
 
@@ -145,45 +169,6 @@ def _score_label(score: float) -> str:
     return "отлично" if score >= 8.7 else "хорошо" if score >= 7 else "с оговорками" if score >= 5.5 else "бережный режим"
 
 
-def _cap_kld_morning_score(text: str) -> str:
-    s = str(text or "")
-    if "Калининград сегодня" not in s or "завтра" in s.lower():
-        return s
-    line = next((x.strip() for x in s.splitlines() if x.strip().startswith("✨ VayboMeter:") and "/10" in x), "")
-    m = re.search(r"VayboMeter:\s*(\d+(?:[\.,]\d+)?)\s*/\s*10", line)
-    if not m:
-        return s
-    score = float(m.group(1).replace(",", "."))
-    low = s.lower()
-    gusts: list[float] = []
-    for raw in re.findall(r"порывы\s+до\s*(\d+(?:[\.,]\d+)?)", s, flags=re.I):
-        try:
-            gusts.append(float(raw.replace(",", ".")))
-        except Exception:
-            pass
-    max_gust = max(gusts) if gusts else 0.0
-    water_wind = "ветер у воды" in low or "у воды ветер" in low or max_gust >= 6
-    cap = 10.0
-    if any(x in low for x in ("морось", "дожд", "ливень")):
-        cap = min(cap, 7.2)
-    if "уф" in low and "высок" in low and water_wind:
-        cap = min(cap, 8.3)
-    if max_gust >= 8:
-        cap = min(cap, 8.4)
-    if water_wind or "свеж" in low:
-        cap = min(cap, 8.6)
-    if score <= cap:
-        return s
-    repl = re.sub(
-        r"(VayboMeter:\s*)\d+(?:[\.,]\d+)?(/10\s+—\s*)[^;\.\n]+",
-        rf"\g<1>{cap:.1f}\g<2>{_score_label(cap)}",
-        line,
-    )
-    if water_wind and "ветер" not in repl.lower():
-        repl = repl.rstrip(".") + ", у воды ветер заметнее."
-    return s.replace(line, repl, 1)
-
-
 def _kld_temp_emoji(t: float) -> str:
     if t >= 25:
         return "😎"
@@ -196,7 +181,13 @@ def _kld_temp_emoji(t: float) -> str:
     return "🥶"
 
 
-def _fix_kld_temperature_emojis(text: str) -> str:
+_TEMP_LINE_RX = re.compile(
+    r"^(?P<prefix>\s*)(?:" + "|".join(re.escape(x) for x in _TEMP_PREFIXES) + r")\s+"
+    r"(?P<city>[^:\n]+:\s*)(?P<temp>-?\d+(?:[\.,]\d+)?)/"
+)
+
+
+def _fix_kld_temperature_emoji(line: str, _issues: list[str]) -> str:
     def repl(match: re.Match[str]) -> str:
         prefix = match.group("prefix") or ""
         city_part = match.group("city") or ""
@@ -207,90 +198,165 @@ def _fix_kld_temperature_emojis(text: str) -> str:
             return match.group(0)
         return f"{prefix}{_kld_temp_emoji(t)} {city_part}{match.group('temp')}/"
 
-    emoji_alt = "|".join(re.escape(x) for x in _TEMP_PREFIXES)
-    pattern = re.compile(
-        rf"^(?P<prefix>\s*)(?:{emoji_alt})\s+(?P<city>[^:\n]+:\s*)(?P<temp>-?\d+(?:[\.,]\d+)?)/",
-        flags=re.M,
-    )
-    return pattern.sub(repl, str(text or ""))
+    return _TEMP_LINE_RX.sub(repl, line, count=1)
+
 
+# Applied to every kept line after the drop check.
+_POLISH_RULES: tuple[LineRule, ...] = (
+    _fix_kld_temperature_emoji,
+    _replace("🧜‍♂️ SUP: только опытным", "🧜‍♂️ SUP: только для опытных"),
+)
 
-def _polish_sup_wording(text: str) -> str:
-    return str(text or "").replace("🧜‍♂️ SUP: только опытным", "🧜‍♂️ SUP: только для опытных")
+_GUST_RX = re.compile(r"порывы\s+до\s*(\d+(?:[\.,]\d+)?)", re.I)
+_SCORE_RX = re.compile(r"VayboMeter:\s*(\d+(?:[\.,]\d+)?)\s*/\s*10")
+_SCORE_LABEL_RX = re.compile(r"(VayboMeter:\s*)\d+(?:[\.,]\d+)?(/10\s+—\s*)[^;\.\n]+")
 
 
-def _move_safecast_before_hashtags(text: str) -> str:
-    if _env_on("FORMAT_V2") and "Калининград сегодня" in str(text or ""):
-        return text
-    lines = str(text or "").splitlines()
+@dataclass
+class _TextFacts:
+    """Whole-text conditions collected line by line during the single pass."""
+
+    kld_today: bool = False
+    tomorrow: bool = False
+    main_scenario: bool = False
+    rain: bool = False
+    uv: bool = False
+    high: bool = False
+    fresh: bool = False
+    water_wind_words: bool = False
+    max_gust: float = 0.0
+
+    def see(self, line: str) -> None:
+        low = line.lower()
+        self.kld_today = self.kld_today or "Калининград сегодня" in line
+        self.tomorrow = self.tomorrow or "завтра" in low
+        self.main_scenario = self.main_scenario or "🧭 <b>Главный сценарий" in line
+        self.rain = self.rain or any(x in low for x in ("морось", "дожд", "ливень"))
+        self.uv = self.uv or "уф" in low
+        self.high = self.high or "высок" in low
+        self.fresh = self.fresh or "свеж" in low
+        self.water_wind_words = self.water_wind_words or "ветер у воды" in low or "у воды ветер" in low
+        for raw in _GUST_RX.findall(line):
+            try:
+                self.max_gust = max(self.max_gust, float(raw.replace(",", ".")))
+            except Exception:
+                pass
+
+
+def _cap_kld_morning_score(lines: list[str], facts: _TextFacts) -> list[str]:
+    if not facts.kld_today or facts.tomorrow:
+        return lines
+    line = next((x.strip() for x in lines if x.strip().startswith("✨ VayboMeter:") and "/10" in x), "")
+    m = _SCORE_RX.search(line)
+    if not m:
+        return lines
+    score = float(m.group(1).replace(",", "."))
+    water_wind = facts.water_wind_words or facts.max_gust >= 6
+    cap = 10.0
+    if facts.rain:
+        cap = min(cap, 7.2)
+    if facts.uv and facts.high and water_wind:
+        cap = min(cap, 8.3)
+    if facts.max_gust >= 8:
+        cap = min(cap, 8.4)
+    if water_wind or facts.fresh:
+        cap = min(cap, 8.6)
+    if score <= cap:
+        return lines
+    repl = _SCORE_LABEL_RX.sub(rf"\g<1>{cap:.1f}\g<2>{_score_label(cap)}", line)
+    if water_wind and "ветер" not in repl.lower():
+        repl = repl.rstrip(".") + ", у воды ветер заметнее."
+    idx = next(i for i, x in enumerate(lines) if line in x)
+    lines[idx] = lines[idx].replace(line, repl, 1)
+    return lines
+
+
+def _move_safecast_before_hashtags(lines: list[str], facts: _TextFacts) -> list[str]:
+    if _env_on("FORMAT_V2") and facts.kld_today:
+        return lines
     safecast = [line for line in lines if line.strip().startswith("🧪")]
     if not safecast:
-        return text
+        return lines
     kept = [line for line in lines if not line.strip().startswith("🧪")]
     hash_idx = next((idx for idx, line in enumerate(kept) if line.strip().startswith("#")), -1)
     if hash_idx < 0:
-        return "\n".join(kept + ([""] if kept and kept[-1].strip() else []) + safecast)
+        return kept + ([""] if kept and kept[-1].strip() else []) + safecast
     insert = []
     if hash_idx > 0 and kept[hash_idx - 1].strip():
         insert.append("")
     insert.extend(safecast)
     insert.append("")
-    return "\n".join(kept[:hash_idx] + insert + kept[hash_idx:])
+    return kept[:hash_idx] + insert + kept[hash_idx:]
 
 
-def _promote_vaybometer_after_title(text: str) -> str:
+def _promote_vaybometer_after_title(lines: list[str]) -> list[str]:
     if not _env_on("FORMAT_V2"):
-        return text
-    lines = str(text or "").splitlines()
-    score_idx = next((idx for idx, line in enumerate(lines) if line.strip().startswith("✨ VayboMeter") and "/10" in line), -1)
+        return lines
+    # a trailing blank line does not survive a join/splitlines round trip
+    work = lines[:-1] if lines and not lines[-1] else lines
+    score_idx = next((idx for idx, line in enumerate(work) if line.strip().startswith("✨ VayboMeter") and "/10" in line), -1)
     if score_idx <= 0:
-        return text
-    title_idx = next((idx for idx, line in enumerate(lines) if line.strip().startswith("<b>🌅")), -1)
+        return lines
+    title_idx = next((idx for idx, line in enumerate(work) if line.strip().startswith("<b>🌅")), -1)
     if title_idx < 0 or score_idx == title_idx + 1:
-        return text
-    score_line = lines.pop(score_idx)
+        return lines
+    work = list(work)
+    score_line = work.pop(score_idx)
     insert_at = title_idx + 1
-    while insert_at < len(lines) and not lines[insert_at].strip():
+    while insert_at < len(work) and not work[insert_at].strip():
         insert_at += 1
-    lines.insert(insert_at, score_line)
-    return "\n".join(lines)
+    work.insert(insert_at, score_line)
+    return work
+
+
+_MORNING_SPACED_MARKERS = (
+    "🌡 Ощущается:",
+    "💱",
+    "🏭",
+    "🧲",
+    "✅ План:",
+    "🧪",
+    "#",
+)
+
+
+def _strip_blank_edges(lines: list[str]) -> list[str]:
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return lines[start:end]
 
 
-def _apply_kld_morning_spacing(text: str) -> str:
+def _apply_kld_morning_spacing(lines: list[str], facts: _TextFacts) -> list[str]:
     if not _env_on("FORMAT_V2_MORNING_SPACING"):
-        return text
-    s = str(text or "").strip()
-    if "Калининград сегодня" not in s or "🧭 <b>Главный сценарий" in s or "завтра" in s.lower():
-        return text
-
-    markers_before = (
-        "🌡 Ощущается:",
-        "💱",
-        "🏭",
-        "🧲",
-        "✅ План:",
-        "🧪",
-        "#",
-    )
-    lines = s.splitlines()
+        return lines
+    if not facts.kld_today or facts.main_scenario or facts.tomorrow:
+        return lines
     out: list[str] = []
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith(markers_before) and out and out[-1].strip():
+    for line in _strip_blank_edges(lines):
+        if line.strip().startswith(_MORNING_SPACED_MARKERS) and out and out[-1].strip():
             out.append("")
+        elif not line and out and not out[-1]:
+            continue  # collapse runs of blank lines
         out.append(line)
-    spaced = "\n".join(out).strip()
-    return re.sub(r"\n{3,}", "\n\n", spaced)
+    return out
 
 
 def sanitize_post_text(text: str) -> SafetyResult:
-    raw_lines = str(text or "").splitlines()
+    """
+    One streaming pass over the lines: normalize → drop → polish, collecting
+    the whole-text facts on the way; the structural moves (score cap, Safecast
+    block, VayboMeter promotion, morning spacing) then work on line indices.
+    """
     out: list[str] = []
     issues: list[str] = []
+    facts = _TextFacts()
 
     prev_sep = False
     blank_seen = False
-    for raw in raw_lines:
+    for raw in str(text or "").splitlines():
         line = _normalize_line(raw, issues)
         drop, reason = _line_should_drop(line)
         if drop:
@@ -309,6 +375,9 @@ def sanitize_post_text(text: str) -> SafetyResult:
             issues.append("collapsed duplicate separator")
             continue
 
+        for rule in _POLISH_RULES:
+            line = rule(line, issues)
+        facts.see(line)
         out.append(line)
         blank_seen = False
         prev_sep = is_sep
@@ -316,15 +385,11 @@ def sanitize_post_text(text: str) -> SafetyResult:
     while out and (not out[-1].strip() or _line_is_separator(out[-1])):
         out.pop()
 
-    safe = "\n".join(out).strip()
-    safe = re.sub(r"\n{3,}", "\n\n", safe)
-    safe = _cap_kld_morning_score(safe)
-    safe = _fix_kld_temperature_emojis(safe)
-    safe = _polish_sup_wording(safe)
-    safe = _move_safecast_before_hashtags(safe)
-    safe = _promote_vaybometer_after_title(safe)
-    safe = _apply_kld_morning_spacing(safe)
-    return SafetyResult(text=safe, issues=issues)
+    out = _cap_kld_morning_score(out, facts)
+    out = _move_safecast_before_hashtags(out, facts)
+    out = _promote_vaybometer_after_title(out)
+    out = _apply_kld_morning_spacing(out, facts)
+    return SafetyResult(text="\n".join(out), issues=issues)
 
 
 def _structure_summary(text: str) -> str:
@@ -378,43 +443,156 @@ def _structure_summary(text: str) -> str:
     return f"✅ Structure validator: all required blocks found. Length: {length} chars. Compact: {compact}."
 
 
+# Tags accepted by the Bot API with parse_mode=HTML; only these are balanced.
+_TG_HTML_TAGS = frozenset(
+    {"b", "strong", "i", "em", "u", "ins", "s", "strike", "del", "span", "tg-spoiler", "a", "code", "pre", "blockquote", "tg-emoji"}
+)
+_ASTRAL_RX = re.compile("[\U00010000-\U0010FFFF]")
+_HTML_ATOM_RX = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^<>]*>|&(?:#\d+|#x[0-9a-fA-F]+|[a-zA-Z]\w*);")
+
+
+def utf16_len(text: str) -> int:
+    """Length as Telegram counts it: UTF-16 code units (astral emoji count twice)."""
+    return len(str(text or "").encode("utf-16-le")) // 2
+
+
 def split_telegram_text(text: str, limit: int = _SAFE_CHUNK_LIMIT) -> list[str]:
+    """Split a Telegram HTML post into chunks of at most ``limit`` UTF-16 units.
+
+    The raw HTML is measured, which is an upper bound for what Telegram counts.
+    Cuts never land inside a tag or an entity. Tags still open at a cut are
+    closed at the end of that chunk and reopened at the start of the next one.
+    Each chunk ends at the last paragraph break that fits. Failing that, it
+    ends at the last newline, then the last space, in the second half of the
+    window. Then at any newline or space, and only then mid-word.
+    """
     text = str(text or "").strip()
     if not text:
         return []
-    if len(text) <= limit:
+    if utf16_len(text) <= limit:
         return [text]
-
-    chunks: list[str] = []
-    cur: list[str] = []
-    cur_len = 0
-    for para in re.split(r"(\n\n+)", text):
-        if not para:
-            continue
-        add_len = len(para)
-        if cur and cur_len + add_len > limit:
-            chunks.append("".join(cur).strip())
-            cur = [para]
-            cur_len = add_len
+    return list(_iter_html_chunks(text, limit))
+
+
+def _iter_html_chunks(text: str, limit: int):
+    # Only break candidates, tags and entities are visited, via rfind and
+    # bisect over precomputed offsets. Every chunk searches back from its
+    # window end, so the tail that the next chunk rescans holds no paragraph
+    # break, or is under half a window. Two consecutive chunks therefore cover
+    # a full window, and the total work is O(n).
+    n = len(text)
+    astral = [m.start() for m in _ASTRAL_RX.finditer(text)]
+    atoms = list(_HTML_ATOM_RX.finditer(text))
+    starts = [m.start() for m in atoms]
+
+    def units(i: int) -> int:
+        return i + bisect.bisect_left(astral, i)
+
+    def atom_starting(i: int) -> Any:
+        k = bisect.bisect_left(starts, i)
+        return atoms[k] if k < len(starts) and starts[k] == i else None
+
+    def inside_atom(i: int) -> Any:
+        k = bisect.bisect_left(starts, i) - 1
+        return atoms[k] if k >= 0 and atoms[k].end() > i else None
+
+    # open-tag stack (and the width of its closing tags) right after each atom
+    stacks: list = []
+    stack: tuple = ()
+    for m in atoms:
+        if m.group(2) is not None:
+            stack = _tag_step(stack, m)
+        stacks.append((stack, _close_width(stack)) if not stacks or stacks[-1][0] is not stack else stacks[-1])
+
+    def open_at(i: int) -> tuple:
+        k = bisect.bisect_left(starts, i) - 1
+        return stacks[k] if k >= 0 else ((), 0)
+
+    pos = 0
+    while pos < n:
+        stack = open_at(pos)[0]  # open Telegram tags at pos: ((name, raw_open_tag), ...)
+        opening = "".join(raw for _, raw in stack)
+        budget = limit - utf16_len(opening)
+        base = units(pos)
+
+        def fits(cut: int) -> bool:
+            return units(cut) - base + open_at(cut)[1] <= budget
+
+        # first visible character: a cut before it would leave an empty chunk
+        vis = pos
+        while vis < n:
+            atom = atom_starting(vis)
+            if atom is not None and atom.group(2) is not None:
+                vis = atom.end()
+            elif text[vis].isspace():
+                vis += 1
+            else:
+                break
+        if vis >= n:
+            return
+        if units(n) - base <= budget and fits(n):
+            yield opening + text[pos:]
+            return
+
+        end = min(n, pos + budget)
+        while end > pos and units(end) - base > budget:
+            end -= max(1, (units(end) - base - budget) // 2)
+
+        def last(find: Callable[[int], int], accept: Callable[[int], bool] = lambda _c: True) -> Any:
+            c = find(end)
+            while c > vis:
+                if accept(c) and inside_atom(c) is None and fits(c):
+                    return c
+                c = find(c)
+            return None
+
+        def is_para(c: int) -> bool:
+            j = c + 1
+            while j < n and text[j] in " \t":
+                j += 1
+            return j < n and text[j] == "\n"
+
+        late = base + budget // 2
+        line = last(lambda hi: text.rfind("\n", pos, hi))
+        para = last(lambda hi: text.rfind("\n", pos, hi), is_para) if line is not None else None
+        space = last(lambda hi: text.rfind(" ", pos, hi))
+        for cut in (
+            para,
+            line if line is not None and units(line) >= late else None,
+            space if space is not None and units(space) >= late else None,
+            line,
+            space,
+        ):
+            if cut is not None:
+                break
         else:
-            cur.append(para)
-            cur_len += add_len
-    if cur:
-        chunks.append("".join(cur).strip())
-
-    final: list[str] = []
-    for ch in chunks:
-        while len(ch) > limit:
-            cut = ch.rfind("\n", 0, limit)
-            if cut < limit // 2:
-                cut = ch.rfind(" ", 0, limit)
-            if cut < limit // 2:
-                cut = limit
-            final.append(ch[:cut].strip())
-            ch = ch[cut:].strip()
-        if ch:
-            final.append(ch)
-    return final
+            cut = end
+            while cut > vis and (inside_atom(cut) is not None or not fits(cut)):
+                atom = inside_atom(cut)
+                cut = atom.start() if atom is not None else cut - 1
+            if cut <= vis:  # one atom wider than the window: take it anyway
+                atom = atom_starting(vis)
+                cut = atom.end() if atom is not None else vis + 1
+        yield opening + text[pos:cut].rstrip() + "".join(f"</{name}>" for name, _ in reversed(open_at(cut)[0]))
+        pos = cut
+        while pos < n and text[pos].isspace():
+            pos += 1
+
+
+def _tag_step(stack: tuple, m: "re.Match[str]") -> tuple:
+    name = m.group(2).lower()
+    if name not in _TG_HTML_TAGS:
+        return stack
+    if not m.group(1):
+        return stack + ((name, m.group(0)),)
+    for depth in range(len(stack) - 1, -1, -1):
+        if stack[depth][0] == name:
+            return stack[:depth]
+    return stack
+
+
+def _close_width(stack: tuple) -> int:
+    return sum(len(name) + 3 for name, _ in stack)
 
 
 def validation_summary(result: SafetyResult) -> str:
@@ -1,18 +1,23 @@
 # radiation.py
 """
 radiation.py  •  get_radiation(lat, lon) → dict | None
-Полёт: сначала «живые» источники → fallback на radiation_hourly.json
+Полёт: сначала «живые» источники → fallback на историю radiation_collect
+(radiation_hourly.bin, при его отсутствии — radiation_hourly.json)
 """
 from __future__ import annotations
-import json, time, math, logging, pathlib
-from typing import Dict, Any, Optional
+import time, math, logging, pathlib, re
+from typing import Dict, Any, Iterator, Optional
 
 import requests
 
+from sensor_stats import StatsBook, stats_path_for
+from timeseries import load_json_list, open_series
+
 CACHE = pathlib.Path(__file__).parent / "radiation_hourly.json"
+RAD_COLUMNS = [("lat", "f"), ("lon", "f"), ("val", "f")]
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
-__all__ = ["get_radiation", "try_radmon", "try_eurdep"]
+__all__ = ["get_radiation", "station_stats", "try_radmon", "try_eurdep"]
 
 # ───────────────────────── утилиты ─────────────────────────
 def _haversine(lat1, lon1, lat2, lon2) -> float:
@@ -63,12 +68,37 @@ def try_radmon(lat: float, lon: float) -> Optional[float]:
 def try_eurdep(lat: float, lon: float) -> Optional[float]:
     return _try_eurdep(lat, lon)
 
+def _history_reverse() -> Iterator[Dict[str, Any]]:
+    """Точки истории от новых к старым; бинарный ряд читается с хвоста."""
+    store = open_series(str(CACHE), RAD_COLUMNS)
+    if store is None:
+        yield from reversed(load_json_list(str(CACHE)))
+    else:
+        yield from store.iter_reverse()
+
+def station_key(lat: float, lon: float) -> str:
+    """Ключ ряда станции в radiation_hourly.stats.json (пишет radiation_collect)."""
+    return f"val@{lat:.2f},{lon:.2f}"
+
+def station_stats(lat: float, lon: float, value: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """describe() γ-фона ближайшей станции (<150 км) из готового состояния sensor_stats."""
+    book = StatsBook(stats_path_for(str(CACHE)))
+    best, dmin = None, 150.0
+    for key, st in book.series.items():
+        m = re.fullmatch(r"val@(-?[\d.]+),(-?[\d.]+)", key)
+        if not m or not len(st):
+            continue
+        dx = _haversine(lat, lon, float(m.group(1)), float(m.group(2)))
+        if dx < dmin:
+            best, dmin = st, dx
+    return best.describe(value) if best is not None else None
+
 # ───────────────────────── API для постов ─────────────────────────
 def get_radiation(lat: float, lon: float) -> Dict[str, Any] | None:
     """
     Возвращает:
       {'val': 0.11, 'trend': '↑|↓|→', 'cached': False|True}  или None
-    Приоритет: live источники → кэш radiation_hourly.json.
+    Приоритет: live источники → история radiation_collect.
     """
     val_live = _try_radmon(lat, lon)
     if val_live is None:
@@ -79,11 +109,15 @@ def get_radiation(lat: float, lon: float) -> Dict[str, Any] | None:
 
     # fallback: история (вторая свежая точка для тренда)
     try:
-        arr = json.loads(CACHE.read_text())
-        pts = [p for p in arr if _haversine(lat, lon, p["lat"], p["lon"]) < 150]
+        pts = []
+        for p in _history_reverse():
+            if _haversine(lat, lon, p["lat"], p["lon"]) < 150:
+                pts.append(p)
+                if len(pts) == 2:
+                    break
         if len(pts) >= 2:
-            last = pts[-1]["val"]
-            prev = pts[-2]["val"]
+            last = pts[0]["val"]
+            prev = pts[1]["val"]
             if None not in (last, prev):
                 delta = last - prev
                 trend = "↑" if delta > 0.005 else "↓" if delta < -0.005 else "→"
@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 """
 Запускать кроном/Workflow раз в час.
-Добавляет свежий замер γ-фона в radiation_hourly.json
+Добавляет свежий замер γ-фона в историю radiation_hourly.bin
+(бинарный ряд timeseries.py; при первом запуске переносится из radiation_hourly.json).
 Формат одной записи:
 {
   "ts": 1717935600,        # Unix-время замера
@@ -10,34 +11,64 @@
   "lon": 20.45,
   "val": 0.11              # μSv/h  (None, если н/д)
 }
+
+  python radiation_collect.py                # добавить точки по станциям
+  python radiation_collect.py --export-json  # выгрузить историю в radiation_hourly.json
 """
-import json, time, logging, pathlib, sys
+import os, time, logging, pathlib, sys
 from typing import Optional
-from radiation import _try_radmon, _try_eurdep
+from radiation import RAD_COLUMNS, _try_radmon, _try_eurdep, station_key
+from sensor_stats import StatsBook, stats_path_for
+from timeseries import TimeSeriesStore, bin_path_for, open_series
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 CACHE = pathlib.Path(__file__).parent / "radiation_hourly.json"
-CACHE.touch(exist_ok=True)
+MAX_LEN = int(os.getenv("RAD_MAX_LEN", "1000"))             # храним максимум N последних точек
+MAX_AGE_DAYS = float(os.getenv("RAD_MAX_AGE_DAYS", "0"))    # 0 — без ограничения по возрасту
+
+def open_history(create: bool = False) -> Optional[TimeSeriesStore]:
+    """История замеров; None, если .bin ещё нет и create=False."""
+    return open_series(str(CACHE), RAD_COLUMNS, create=create)
 
 def get_gamma(lat: float, lon: float) -> Optional[float]:
     """два источника подряд, None если оба молчат"""
     return _try_radmon(lat, lon) or _try_eurdep(lat, lon)
 
 def append_point(lat: float, lon: float) -> None:
-    arr = []
     try:
-        txt = CACHE.read_text() or "[]"
-        arr = json.loads(txt)
-    except Exception:
-        logging.warning("cant parse cache – overwrite")
+        store = open_history(create=True)
+    except ValueError as e:
+        logging.warning("cant parse history (%s) – overwrite", e)
+        os.remove(bin_path_for(str(CACHE)))
+        store = TimeSeriesStore(bin_path_for(str(CACHE)), RAD_COLUMNS)
 
     val = get_gamma(lat, lon)
-    arr.append({"ts": int(time.time()), "lat": lat, "lon": lon, "val": val})
-    # храним максимум 1000 последних точек
-    CACHE.write_text(json.dumps(arr[-1000:], ensure_ascii=False, indent=2))
+    # несколько станций могут прийти в одну секунду — append, а не upsert
+    store.append({"ts": max(int(time.time()), (store.last() or {}).get("ts", 0)), "lat": lat, "lon": lon, "val": val})
+    store.retain(max_len=MAX_LEN, max_age_s=int(MAX_AGE_DAYS * 86400) or None)
     logging.info("new point: %s μSv/h", val)
+    _update_stats(store, lat, lon, val)
+
+def _same_station(p: dict, lat: float, lon: float) -> bool:
+    return p.get("lat") is not None and abs(p["lat"] - lat) < 0.01 and abs(p["lon"] - lon) < 0.01
+
+def _update_stats(store: TimeSeriesStore, lat: float, lon: float, val: Optional[float]) -> None:
+    """Инкрементальная статистика γ-фона станции (radiation_hourly.stats.json)."""
+    try:
+        last = store.last()
+        book = StatsBook(stats_path_for(str(CACHE)))
+        book.update(station_key(lat, lon), last["ts"], val,
+                    seed=lambda since: [(p["ts"], p["val"]) for p in store.range(since, last["ts"])
+                                        if _same_station(p, lat, lon)])
+        book.save()
+    except Exception as e:
+        logging.warning("stats update failed: %s", e)
 
 if __name__ == "__main__":
+    if "--export-json" in sys.argv[1:]:
+        store = open_history(create=True)
+        print(f"exported {store.export_json(str(CACHE))} points -> {CACHE}")
+        sys.exit(0)
     # при желании перечислите несколько станций
     append_point(54.71, 20.45)   # Калининград
     append_point(34.70, 33.02)   # Лимассол
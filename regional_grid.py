@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+regional_grid.py
+~~~~~~~~~~~~~~~~
+
+Региональная сетка: температуры городов области по нескольким опорным точкам.
+
+Города списка «не-морских» стоят в 20–30 км друг от друга, а в пост из их
+прогноза идут только tmax/tmin (и код погоды). Вместо полного прогноза на
+каждый город:
+
+• опорные точки (anchors) выбираются жадно «самая далёкая от уже выбранных»,
+  начиная с точек, чьи значения уже известны (Калининград, морские города —
+  они всё равно запрашиваются целиком);
+• для остальных городов tmax/tmin — плоский тренд по опорным точкам (МНК)
+  плюс обратно-взвешенные по расстоянию (IDW) остатки, код погоды — от
+  ближайшей опорной точки;
+• точность проверяется leave-one-out по опорным точкам (каждая
+  восстанавливается по остальным — это реальные полные прогнозы) и,
+  при REGION_GRID_CHECK > 0, прямым запросом самых удалённых от сетки городов;
+• если ошибка больше REGION_GRID_TOL_C — все города запрашиваются напрямую.
+
+Режим включается REGION_GRID=1; без него city_values() просто опрашивает
+каждый город. accuracy_report() сравнивает сетку с полными запросами по всем
+городам (python regional_grid.py — на списке Калининградской области).
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import tracing
+
+Point = Tuple[float, float]
+Values = Tuple[Optional[float], Optional[float], Optional[int]]  # tmax, tmin, weathercode
+Fetch = Callable[[float, float], Values]
+
+
+def _env_on(name: str, default: bool) -> bool:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return str(v).strip().lower() in ("1", "true", "yes", "on")
+
+
+REGION_GRID_ANCHORS = int(os.getenv("REGION_GRID_ANCHORS", "6"))
+REGION_GRID_TOL_C = float(os.getenv("REGION_GRID_TOL_C", "1.5"))
+REGION_GRID_CHECK = int(os.getenv("REGION_GRID_CHECK", "1"))
+REGION_GRID_WORKERS = int(os.getenv("REGION_GRID_WORKERS", "4"))
+
+
+def enabled() -> bool:
+    return _env_on("REGION_GRID", False)
+
+
+@dataclass
+class GridReport:
+    mode: str = "direct"                  # grid | direct | fallback
+    anchors: List[str] = field(default_factory=list)
+    requests: int = 0                     # сколько городов запрошено напрямую
+    errors: Dict[str, float] = field(default_factory=dict)  # город → |Δ|, °C
+    tolerance: float = REGION_GRID_TOL_C
+
+    @property
+    def max_error(self) -> Optional[float]:
+        return max(self.errors.values()) if self.errors else None
+
+    def summary(self) -> str:
+        err = self.max_error
+        err_txt = f"{err:.1f}°C" if err is not None else "н/д"
+        return (
+            f"regional grid: {self.mode}, опорных {len(self.anchors)}, "
+            f"запросов {self.requests}, max |Δ| {err_txt} (допуск {self.tolerance:.1f}°C)"
+        )
+
+
+# ───────────────────────── геометрия ─────────────────────────
+def distance_km(a: Point, b: Point) -> float:
+    """Равнопромежуточная проекция — на масштабе области точнее 0.1%."""
+    lat_mid = math.radians((a[0] + b[0]) / 2)
+    dx = (b[1] - a[1]) * 111.32 * math.cos(lat_mid)
+    dy = (b[0] - a[0]) * 110.57
+    return math.hypot(dx, dy)
+
+
+def pick_anchors(points: Sequence[Point], k: int, *, seeds: Sequence[Point] = ()) -> List[int]:
+    """
+    Индексы k опорных точек из points: каждая следующая — самая далёкая от
+    уже выбранных (и от seeds). Без seeds первая — ближайшая к центру.
+    """
+    if k <= 0 or not points:
+        return []
+    chosen: List[int] = []
+    nearest = [min((distance_km(p, s) for s in seeds), default=math.inf) for p in points]
+    if not seeds:
+        c = (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+        first = min(range(len(points)), key=lambda i: distance_km(points[i], c))
+        chosen.append(first)
+        nearest = [distance_km(p, points[first]) for p in points]
+    while len(chosen) < min(k, len(points)):
+        i = max((j for j in range(len(points)) if j not in chosen), key=lambda j: nearest[j])
+        chosen.append(i)
+        nearest = [min(d, distance_km(p, points[i])) for d, p in zip(nearest, points)]
+    return chosen
+
+
+def idw(target: Point, samples: Sequence[Tuple[Point, float]], power: float = 2.0) -> Optional[float]:
+    """Обратно-взвешенное по расстоянию среднее; совпадение с опорной — её значение."""
+    num = den = 0.0
+    for p, v in samples:
+        d = distance_km(target, p)
+        if d < 1e-6:
+            return v
+        w = d ** -power
+        num += w * v
+        den += w
+    return num / den if den else None
+
+
+def _plane(samples: Sequence[Tuple[Point, float]]) -> Optional[Callable[[Point], float]]:
+    """
+    Плоскость v = a + b·x + c·y (МНК, x/y — км от первой точки): общий
+    градиент «побережье → восток», который одна IDW на краях сетки занижает.
+    """
+    if len(samples) < 4:
+        return None
+    origin = samples[0][0]
+
+    def xy(p: Point) -> Tuple[float, float]:
+        return (
+            (p[1] - origin[1]) * 111.32 * math.cos(math.radians(origin[0])),
+            (p[0] - origin[0]) * 110.57,
+        )
+
+    m = [[0.0] * 4 for _ in range(3)]
+    for p, v in samples:
+        x, y = xy(p)
+        row = (1.0, x, y)
+        for i in range(3):
+            for j in range(3):
+                m[i][j] += row[i] * row[j]
+            m[i][3] += row[i] * v
+    for col in range(3):  # Гаусс с выбором главного элемента
+        piv = max(range(col, 3), key=lambda r: abs(m[r][col]))
+        if abs(m[piv][col]) < 1e-9:
+            return None  # точки на одной прямой
+        m[col], m[piv] = m[piv], m[col]
+        for r in range(3):
+            if r != col:
+                f = m[r][col] / m[col][col]
+                m[r] = [a - f * b for a, b in zip(m[r], m[col])]
+    a, b, c = (m[i][3] / m[i][i] for i in range(3))
+
+    def at(p: Point) -> float:
+        x, y = xy(p)
+        return a + b * x + c * y
+
+    return at
+
+
+def _detrended_idw(target: Point, samples: Sequence[Tuple[Point, float]]) -> Optional[float]:
+    """IDW остатков поверх плоского тренда; без тренда — обычная IDW."""
+    trend = _plane(samples)
+    if trend is None:
+        return idw(target, samples)
+    rest = idw(target, [(p, v - trend(p)) for p, v in samples])
+    return trend(target) + rest if rest is not None else None
+
+
+def _interpolate(target: Point, anchors: Dict[str, Tuple[Point, Values]]) -> Values:
+    tmax = _detrended_idw(target, [(p, v[0]) for p, v in anchors.values() if v[0] is not None])
+    tmin = _detrended_idw(target, [(p, v[1]) for p, v in anchors.values() if v[1] is not None])
+    coded = [(p, v[2]) for p, v in anchors.values() if v[2] is not None]
+    code = min(coded, key=lambda pv: distance_km(target, pv[0]))[1] if coded else None
+    return tmax, tmin, code
+
+
+def _error(a: Values, b: Values) -> Optional[float]:
+    diffs = [abs(x - y) for x, y in zip(a[:2], b[:2]) if x is not None and y is not None]
+    return max(diffs) if diffs else None
+
+
+def _fetch_all(fetch: Fetch, cities: Sequence[Tuple[str, Point]]) -> Dict[str, Values]:
+    def one(item: Tuple[str, Point]) -> Values:
+        name, (lat, lon) = item
+        try:
+            return fetch(lat, lon)
+        except Exception as exc:
+            logging.warning("regional grid: %s — запрос не удался: %s", name, exc)
+            return None, None, None
+
+    with ThreadPoolExecutor(max_workers=max(1, REGION_GRID_WORKERS)) as pool:
+        jobs = [pool.submit(tracing.bind(one), item) for item in cities]  # спаны — под разделом
+        return {name: job.result() for (name, _p), job in zip(cities, jobs)}
+
+
+# ───────────────────────── основной вход ─────────────────────────
+def city_values(
+    cities: Sequence[Tuple[str, Point]],
+    fetch: Fetch,
+    *,
+    known: Optional[Dict[str, Tuple[Point, Values]]] = None,
+    grid: Optional[bool] = None,
+) -> Tuple[Dict[str, Values], GridReport]:
+    """
+    (tmax, tmin, weathercode) для каждого города cities.
+
+    known — уже полученные полные прогнозы {имя: (координаты, значения)};
+    они служат опорными точками бесплатно. grid=None — по REGION_GRID.
+    """
+    cities = [(name, (float(la), float(lo))) for name, (la, lo) in cities]
+    report = GridReport()
+    use_grid = enabled() if grid is None else grid
+    known_ok = {
+        n: (p, v) for n, (p, v) in (known or {}).items() if v[0] is not None and v[1] is not None
+    }
+
+    n_new = REGION_GRID_ANCHORS
+    if not use_grid or len(cities) <= n_new + REGION_GRID_CHECK:
+        out = _fetch_all(fetch, cities)
+        report.requests = len(cities)
+        return out, report
+
+    points = [p for _name, p in cities]
+    idx = pick_anchors(points, n_new, seeds=[p for p, _v in known_ok.values()])
+    fetched = _fetch_all(fetch, [cities[i] for i in idx])
+    report.requests = len(fetched)
+    anchors = dict(known_ok)
+    for i in idx:
+        name, p = cities[i]
+        if fetched[name][0] is not None and fetched[name][1] is not None:
+            anchors[name] = (p, fetched[name])
+    report.anchors = list(anchors)
+
+    def fallback(reason: str) -> Tuple[Dict[str, Values], GridReport]:
+        rest = [c for c in cities if c[0] not in fetched]
+        fetched.update(_fetch_all(fetch, rest))
+        report.requests += len(rest)
+        report.mode = "fallback"
+        logging.info("%s → прямые запросы (%s)", report.summary(), reason)
+        return {name: fetched[name] for name, _ in cities}, report
+
+    if len(anchors) < 3:
+        return fallback("мало опорных точек")
+
+    # leave-one-out: каждая опорная точка — по остальным
+    for name, (p, v) in anchors.items():
+        others = {n: a for n, a in anchors.items() if n != name}
+        err = _error(_interpolate(p, others), v)
+        if err is not None:
+            report.errors[name] = err
+
+    # контроль: самые удалённые от сетки города — прямым запросом
+    rest = [c for c in cities if c[0] not in fetched]
+    far = sorted(rest, key=lambda c: -min(distance_km(c[1], p) for p, _v in anchors.values()))
+    checked = _fetch_all(fetch, far[:max(0, REGION_GRID_CHECK)])
+    report.requests += len(checked)
+    fetched.update(checked)
+    for name, v in checked.items():
+        err = _error(_interpolate(dict(cities)[name], anchors), v)
+        if err is not None:
+            report.errors[name] = err
+
+    if report.max_error is not None and report.max_error > REGION_GRID_TOL_C:
+        return fallback("ошибка выше допуска")
+
+    out: Dict[str, Values] = {}
+    for name, p in cities:
+        out[name] = fetched[name] if name in fetched else _interpolate(p, anchors)
+    report.mode = "grid"
+    logging.info("%s для %d городов", report.summary(), len(cities))
+    return out, report
+
+
+def accuracy_report(
+    cities: Sequence[Tuple[str, Point]],
+    fetch: Fetch,
+    *,
+    known: Optional[Dict[str, Tuple[Point, Values]]] = None,
+) -> Dict[str, Tuple[Values, Values, Optional[float]]]:
+    """
+    Сетка против полных запросов по всем городам: {город: (сетка, прямой, |Δ|)}.
+    Опорные точки выбираются как в city_values(), допуск не применяется.
+    """
+    cities = [(name, (float(la), float(lo))) for name, (la, lo) in cities]
+    direct = _fetch_all(fetch, cities)
+    known_ok = {
+        n: (p, v) for n, (p, v) in (known or {}).items() if v[0] is not None and v[1] is not None
+    }
+    points = [p for _name, p in cities]
+    n_new = REGION_GRID_ANCHORS
+    anchors = dict(known_ok)
+    for i in pick_anchors(points, n_new, seeds=[p for p, _v in known_ok.values()]):
+        anchors[cities[i][0]] = (points[i], direct[cities[i][0]])
+    rows = {}
+    for name, p in cities:
+        gridded = direct[name] if name in anchors else _interpolate(p, anchors)
+        rows[name] = (gridded, direct[name], _error(gridded, direct[name]))
+    return rows
+
+
+if __name__ == "__main__":
+    import pendulum
+
+    from post_common import _fetch_temps_for_offset
+    from post_kld import OTHER_CITIES_ALL, TZ_STR
+
+    logging.basicConfig(level=logging.INFO)
+    rows = accuracy_report(OTHER_CITIES_ALL, lambda la, lo: _fetch_temps_for_offset(la, lo, TZ_STR, 1))
+    print(f"Сетка против полных запросов, завтра ({pendulum.today(TZ_STR).add(days=1).to_date_string()}):")
+    for name, (g, d, err) in rows.items():
+        print(f"  {name:<16} сетка {g[0]!s:>6}/{g[1]!s:<6} прямой {d[0]!s:>6}/{d[1]!s:<6} |Δ| {err}")
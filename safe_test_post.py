@@ -6,7 +6,7 @@ from __future__ import annotations
 import argparse
 import asyncio
 from collections.abc import Mapping
-from dataclasses import asdict, is_dataclass
+from dataclasses import asdict, dataclass, is_dataclass
 import json
 import logging
 import os
@@ -17,9 +17,13 @@ from typing import Union
 import pendulum
 from telegram import Bot, constants
 
+import snapshots
+import tracing
 from editorial_voice import build_evening_human_line, build_morning_human_line
 from post_common import build_message
+from post_pipeline import LineDoc, Stage, StageRun, format_runs, run_stages
 from post_safety import sanitize_post_text, split_telegram_text, validation_summary
+from tg_delivery import TelegramDelivery
 from visibility_context import (
     visibility_air_penalty,
     visibility_condition_from_text,
@@ -1114,13 +1118,15 @@ def _sensor_line_from_legacy(legacy_text: str) -> str:
 
 
 def _soften_private_sensor_wording(v2_text: str) -> str:
-    lines: list[str] = []
-    for line in str(v2_text or "").splitlines():
-        stripped = line.strip()
-        if stripped.startswith("🧪") and not _sensor_line_from_legacy(stripped):
-            continue
-        lines.append(line)
-    return "\n".join(lines)
+    return LineDoc.apply(v2_text, _soften_private_sensor_doc)
+
+
+def _soften_private_sensor_doc(doc: LineDoc, _ctx: object = None) -> None:
+    drop = {idx for idx in doc.find("🧪") if not _sensor_line_from_legacy(doc.lines[idx].strip())}
+    if not drop:
+        doc.normalize()
+        return
+    doc.set_lines([line for idx, line in enumerate(doc.lines) if idx not in drop])
 
 
 def _replace_sensor_lines(v2_text: str, line_to_add: str) -> str:
@@ -1195,16 +1201,27 @@ def _apply_confidence_polish(v2_text: str) -> str:
     )
 
 
+_ASTRO_HEADERS = ("🌙 <b>Астроритм", "☀️ <b>Солнце", "🌅 <b>Солнце и ритм")
+
+
 def _apply_astro_cleanup(v2_text: str) -> str:
     if not _env_on("FORMAT_V2_ASTRO_CLEANUP"):
         return v2_text
-    lines = str(v2_text or "").splitlines()
-    out: list[str] = []
+    return LineDoc.apply(v2_text, _astro_cleanup_doc)
+
+
+def _astro_cleanup_doc(doc: LineDoc, _ctx: object = None) -> None:
+    start = doc.first(_ASTRO_HEADERS)
+    if start is None:  # без заголовка астроблока строки не трогаются
+        doc.normalize()
+        return
+    lines = doc.lines
+    out: list[str] = list(lines[:start])
     in_astro = False
     astro_details = 0
-    for line in lines:
+    for line in lines[start:]:
         stripped = line.strip()
-        if stripped.startswith(("🌙 <b>Астроритм", "☀️ <b>Солнце", "🌅 <b>Солнце и ритм")):
+        if stripped.startswith(_ASTRO_HEADERS):
             in_astro = True
             astro_details = 0
             out.append(line)
@@ -1233,17 +1250,25 @@ def _apply_astro_cleanup(v2_text: str) -> str:
             if astro_details > 7:
                 continue
         out.append(line)
-    return "\n".join(out)
+    doc.set_lines(out)
 
 
 def _apply_compact(v2_text: str) -> str:
     if not _env_on("FORMAT_V2_COMPACT"):
         return v2_text
-    lines = str(v2_text or "").splitlines()
-    out: list[str] = []
+    return LineDoc.apply(v2_text, _compact_doc)
+
+
+def _compact_doc(doc: LineDoc, _ctx: object = None) -> None:
+    start = doc.first(("🧭 <b>Главный сценарий", "🧜‍♂️ Отлично:"))
+    if start is None:
+        doc.normalize()
+        return
+    lines = doc.lines
+    out: list[str] = list(lines[:start])
     in_main = False
     main_text_seen = 0
-    for line in lines:
+    for line in lines[start:]:
         stripped = line.strip()
         if stripped.startswith("🧭 <b>Главный сценарий"):
             in_main = True
@@ -1259,7 +1284,7 @@ def _apply_compact(v2_text: str) -> str:
         if stripped.startswith("🧜‍♂️ Отлично:"):
             continue
         out.append(line)
-    return "\n".join(out)
+    doc.set_lines(out)
 
 
 def _inject_after_anchor(v2_text: str, line_to_add: str, anchors: tuple[str, ...]) -> str:
@@ -1353,7 +1378,14 @@ def _valid_best_window_line(line: str) -> bool:
 
 
 def _remove_invalid_best_window(v2_text: str) -> str:
-    return "\n".join(line for line in str(v2_text or "").splitlines() if _valid_best_window_line(line))
+    return LineDoc.apply(v2_text, _remove_invalid_best_window_doc)
+
+
+def _remove_invalid_best_window_doc(doc: LineDoc, _ctx: object = None) -> None:
+    if "Лучшее окно:" not in doc.text:
+        doc.normalize()
+        return
+    doc.set_lines([line for line in doc.lines if _valid_best_window_line(line)])
 
 
 def _inject_morning_score(v2_text: str, mode: str) -> str:
@@ -1450,28 +1482,59 @@ def _inject_morning_smart_plan(v2_text: str, mode: str) -> str:
     return _replace_plan(v2_text, _kld_smart_plan_line(v2_text))
 
 
-def _apply_format_v2_safe_postprocess(v2_raw: str, raw_msg: str, legacy_text: str, mode: str) -> str:
-    out = _apply_morning_raw_context(v2_raw, raw_msg, mode)
-    out = _inject_morning_feels(out, mode)
-    out = _inject_morning_best_window(out, mode)
-    out = _inject_morning_score(out, mode)
-    out = _inject_evening_score(out, mode)
-    out = _inject_sensor_line(out, raw_msg or legacy_text)
-    out = _apply_format_v2_test_polish(out)
-    out = _apply_confidence_polish(out)
-    out = _insert_main_nuance(out)
-    out = _apply_editorial_voice(out, mode)
-    out = _apply_astro_cleanup(out)
-    out = _apply_score_conclusion(out)
-    out = _inject_morning_smart_plan(out, mode)
-    out = _apply_compact(out)
-    out = _finalize_kld_morning_safe_text(out, raw_msg, legacy_text, mode)
-    if mode.startswith("morn"):
-        out = _remove_invalid_best_window(out)
-        out = _soften_private_sensor_wording(out)
-    else:
-        out = _finalize_kld_evening_safe_text(out, mode)
-    return out
+@dataclass(frozen=True)
+class _PostprocessCtx:
+    raw_msg: str
+    legacy_text: str
+    mode: str
+
+
+# Порядок = порядок применения. mode/flags дублируют проверки внутри функций,
+# чтобы выключенный этап не вызывался вовсе (и был виден в отчёте как "off").
+_V2_POSTPROCESS_STAGES: tuple[Stage, ...] = (
+    Stage("raw_context", lambda t, c: _apply_morning_raw_context(t, c.raw_msg, c.mode), mode="morning"),
+    Stage("feels", lambda t, c: _inject_morning_feels(t, c.mode), mode="morning", flags=("MORNING_FEELS_LIKE",)),
+    Stage("best_window", lambda t, c: _inject_morning_best_window(t, c.mode), mode="morning", flags=("MORNING_BEST_WINDOW",)),
+    Stage("morning_score", lambda t, c: _inject_morning_score(t, c.mode), mode="morning", flags=("MORNING_VAYBOMETER_SCORE",)),
+    Stage("evening_score", lambda t, c: _inject_evening_score(t, c.mode), mode="evening", flags=("EVENING_VAYBOMETER_SCORE",)),
+    Stage(
+        "sensor_line",
+        lambda t, c: _inject_sensor_line(t, c.raw_msg or c.legacy_text),
+        flags=("FORMAT_V2_SENSOR_LINE", "FORMAT_V2_TEST_SENSOR", "FORMAT_V2_TEST_SAFECAST"),
+    ),
+    Stage("test_polish", lambda t, c: _apply_format_v2_test_polish(t), flags=("FORMAT_V2_POLISH", "FORMAT_V2_TEST_POLISH")),
+    Stage("confidence_polish", lambda t, c: _apply_confidence_polish(t), flags=("FORMAT_V2_CONFIDENCE_POLISH",)),
+    Stage("main_nuance", lambda t, c: _insert_main_nuance(t), flags=("FORMAT_V2_MAIN_NUANCE",)),
+    Stage("editorial_voice", lambda t, c: _apply_editorial_voice(t, c.mode)),
+    Stage("astro_cleanup", _astro_cleanup_doc, kind="doc", flags=("FORMAT_V2_ASTRO_CLEANUP",)),
+    Stage(
+        "score_conclusion",
+        lambda t, c: _apply_score_conclusion(t),
+        flags=("FORMAT_V2_SCORE_CONCLUSION", "FORMAT_V2_TEST_CONCLUSION"),
+    ),
+    Stage("smart_plan", lambda t, c: _inject_morning_smart_plan(t, c.mode), mode="morning", flags=("MORNING_SMART_PLAN",)),
+    Stage("compact", _compact_doc, kind="doc", flags=("FORMAT_V2_COMPACT",)),
+    Stage(
+        "finalize_morning",
+        lambda t, c: _finalize_kld_morning_safe_text(t, c.raw_msg, c.legacy_text, c.mode),
+        mode="morning",
+    ),
+    Stage("invalid_best_window", _remove_invalid_best_window_doc, kind="doc", mode="morning"),
+    Stage("soften_sensor", _soften_private_sensor_doc, kind="doc", mode="morning"),
+    Stage("finalize_evening", lambda t, c: _finalize_kld_evening_safe_text(t, c.mode), mode="evening"),
+)
+
+
+def _apply_format_v2_safe_postprocess(
+    v2_raw: str,
+    raw_msg: str,
+    legacy_text: str,
+    mode: str,
+    runs: list[StageRun] | None = None,
+) -> str:
+    """Все этапы пост-обработки FORMAT_V2 над одним LineDoc; runs — тайминги по этапам."""
+    ctx = _PostprocessCtx(raw_msg=raw_msg, legacy_text=legacy_text, mode=mode)
+    return run_stages(v2_raw, _V2_POSTPROCESS_STAGES, ctx, mode=mode, runs=runs)
 
 
 def resolve_chat_id(args_chat: str, to_test: bool) -> Union[int, str]:
@@ -1518,6 +1581,45 @@ class _TodayPatch:
         return False
 
 
+def _build_safe_post(args, mode: str, base_date: pendulum.DateTime, use_format_v2: bool):
+    """Legacy build + sanitizing (+ FORMAT_V2 post-processing): everything a snapshot covers."""
+    with _TodayPatch(base_date):
+        raw_msg = build_message(
+            region_name="Калининградская область",
+            sea_label=SEA_LABEL,
+            sea_cities=SEA_CITIES_ORDERED,
+            other_label=OTHER_LABEL,
+            other_cities=OTHER_CITIES_ALL,
+            tz=TZ_STR,
+            mode=mode,
+        )
+
+    visibility_context = getattr(raw_msg, "visibility_context", None)
+    _write_visibility_context_sidecar(
+        args.visibility_context_out,
+        visibility_context,
+        mode=mode,
+    )
+
+    with tracing.span("sanitize"):
+        legacy_result = sanitize_post_text(raw_msg)
+    final_result = legacy_result
+    v2_raw = ""
+    stage_runs: list[StageRun] = []
+
+    if use_format_v2:
+        from format_v2 import build_format_v2
+        with tracing.span("format_v2"):
+            v2_raw = build_format_v2("Калининградская область", mode, legacy_result.text)
+        with tracing.span("postprocess"):
+            v2_raw = _apply_format_v2_safe_postprocess(v2_raw, raw_msg, legacy_result.text, mode, runs=stage_runs)
+            final_result = sanitize_post_text(v2_raw)
+            final_text = _finalize_kld_morning_safe_text(final_result.text, raw_msg, legacy_result.text, mode)
+        if final_text != final_result.text:
+            final_result = type(final_result)(text=final_text, issues=final_result.issues)
+    return raw_msg, legacy_result, final_result, v2_raw, stage_runs
+
+
 async def main() -> None:
     parser = argparse.ArgumentParser(description="Safe post builder for Kaliningrad VayboMeter")
     parser.add_argument("--mode", choices=["morning", "evening"], default=os.getenv("POST_MODE", "evening"))
@@ -1525,6 +1627,12 @@ async def main() -> None:
     parser.add_argument("--for-tomorrow", action="store_true")
     parser.add_argument("--to-test", action="store_true")
     parser.add_argument("--chat-id", default="")
+    parser.add_argument(
+        "--also-chat",
+        action="append",
+        default=[],
+        help="Send the same chunks to another chat too (repeatable); chats are served concurrently.",
+    )
     parser.add_argument("--format-v2", action="store_true", help="Build scenario-style FORMAT_V2 text after legacy sanitizing.")
     parser.add_argument(
         "--visibility-context-out",
@@ -1533,12 +1641,33 @@ async def main() -> None:
     )
     parser.add_argument("--send", action="store_true", help="Actually send to CHANNEL_ID_TEST / --chat-id. Omit for dry-run.")
     parser.add_argument("--no-test-label", action="store_true", help="Do not prepend the 'Test safe post' label when sending.")
+    parser.add_argument(
+        "--stage-timings",
+        action="store_true",
+        help="Print per-stage FORMAT_V2 post-processing timings (also on POSTPROC_DEBUG=1).",
+    )
+    parser.add_argument(
+        "--replay",
+        default="",
+        help="Rebuild the post offline from a snapshot (path or 'latest', see snapshots.py); never sends.",
+    )
     args = parser.parse_args()
 
+    snap_path = snapshots.resolve(args.replay, label=f"safe-{args.mode}") if args.replay else None
+    replay_meta: dict = {}
+    if snap_path is not None:
+        # mode, FORMAT_V2 and "now" come from the recorded run
+        replay_meta = snapshots.load(snap_path).get("meta") or {}
+        args.mode = replay_meta.get("mode") or args.mode
+        args.format_v2 = bool(replay_meta.get("format_v2", args.format_v2))
+        args.send = False
+        logging.info("REPLAY: %s", snap_path)
+
     mode = (args.mode or "evening").strip().lower()
     os.environ["POST_MODE"] = mode
     use_format_v2 = bool(args.format_v2 or _env_on("FORMAT_V2"))
     os.environ["FORMAT_V2"] = "1" if use_format_v2 else "0"
+    tracing.note(mode=mode, format_v2=use_format_v2, replay=snap_path is not None)
     day_offset = 0 if mode == "morning" else 1
     os.environ["DAY_OFFSET"] = str(day_offset)
     os.environ["ASTRO_OFFSET"] = str(day_offset)
@@ -1555,43 +1684,35 @@ async def main() -> None:
     base_date = pendulum.parse(args.date).in_tz(tz) if args.date else pendulum.now(tz)
     if args.for_tomorrow:
         base_date = base_date.add(days=1)
-
-    with _TodayPatch(base_date):
-        raw_msg = build_message(
-            region_name="Калининградская область",
-            sea_label=SEA_LABEL,
-            sea_cities=SEA_CITIES_ORDERED,
-            other_label=OTHER_LABEL,
-            other_cities=OTHER_CITIES_ALL,
-            tz=TZ_STR,
-            mode=mode,
+    if replay_meta.get("base_date"):
+        base_date = pendulum.parse(replay_meta["base_date"]).in_tz(tz)
+
+    session = (
+        snapshots.replaying(snap_path)
+        if snap_path is not None
+        else snapshots.recording(
+            f"safe-{mode}", mode=mode, base_date=base_date.isoformat(), format_v2=use_format_v2
         )
-
-    visibility_context = getattr(raw_msg, "visibility_context", None)
-    _write_visibility_context_sidecar(
-        args.visibility_context_out,
-        visibility_context,
-        mode=mode,
     )
-
-    legacy_result = sanitize_post_text(raw_msg)
-    final_result = legacy_result
-    final_label = "SAFE MESSAGE"
+    with session as snap:
+        raw_msg, legacy_result, final_result, v2_raw, stage_runs = _build_safe_post(
+            args, mode, base_date, use_format_v2
+        )
+        if isinstance(snap, snapshots.Replayer):
+            snapshots.report_match(snap, final_result.text)
+        elif snap is not None:
+            snap.text = final_result.text
+    final_label = "FORMAT_V2 MESSAGE" if use_format_v2 else "SAFE MESSAGE"
 
     if use_format_v2:
-        from format_v2 import build_format_v2
-        v2_raw = build_format_v2("Калининградская область", mode, legacy_result.text)
-        v2_raw = _apply_format_v2_safe_postprocess(v2_raw, raw_msg, legacy_result.text, mode)
-        final_result = sanitize_post_text(v2_raw)
-        final_text = _finalize_kld_morning_safe_text(final_result.text, raw_msg, legacy_result.text, mode)
-        if final_text != final_result.text:
-            final_result = type(final_result)(text=final_text, issues=final_result.issues)
-        final_label = "FORMAT_V2 MESSAGE"
         print("\n===== FORMAT_V2 RAW BEGIN =====\n")
         print(v2_raw)
         print("\n===== FORMAT_V2 RAW END =====\n")
         print("\n===== FORMAT_V2 SAFETY SUMMARY =====\n")
         print(validation_summary(final_result))
+        if args.stage_timings or _env_on("POSTPROC_DEBUG"):
+            print("\n===== POSTPROCESS STAGES =====\n")
+            print(format_runs(stage_runs))
 
     chunks = split_telegram_text(final_result.text)
 
@@ -1611,21 +1732,29 @@ async def main() -> None:
     if not TOKEN_KLG:
         raise SystemExit("TELEGRAM_TOKEN_KLG не задан")
     chat_id = resolve_chat_id(args.chat_id, args.to_test)
+    chat_ids = [chat_id] + [resolve_chat_id(c, False) for c in args.also_chat if str(c).strip()]
     bot = Bot(token=TOKEN_KLG)
+    texts = []
     for idx, chunk in enumerate(chunks, start=1):
         if args.no_test_label:
-            text = chunk
+            texts.append(chunk)
         else:
             prefix = f"<b>Test safe post {idx}/{len(chunks)}</b>\n" if len(chunks) > 1 else "<b>Test safe post</b>\n"
-            text = prefix + chunk
-        await bot.send_message(
-            chat_id=chat_id,
-            text=text,
+            texts.append(prefix + chunk)
+    # куски уходят подряд в темпе чата (RetryAfter обрабатывается), чаты — параллельно
+    with tracing.span("send_text", chunks=len(texts)):
+        sent = await TelegramDelivery(bot).send_text(
+            chat_ids,
+            texts,
             parse_mode=constants.ParseMode.HTML,
             disable_web_page_preview=True,
         )
-    logging.info("SAFE TEST sent: chat=%s chunks=%d format_v2=%s", chat_id, len(chunks), use_format_v2)
+    failed = [c for c, res in sent.items() if isinstance(res, BaseException)]
+    if chat_id in failed:
+        raise sent[chat_id]
+    logging.info("SAFE TEST sent: chats=%s chunks=%d format_v2=%s failed=%s", list(sent), len(chunks), use_format_v2, failed)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    with tracing.run("safe_test_post"):
+        asyncio.run(main())
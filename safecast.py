@@ -6,12 +6,14 @@ safecast.py — сбор последних измерений радиации
 Поведение:
 - Берёт точку (SC_LAT/SC_LON) и радиус (SC_DISTANCE_KM), окно (SC_SINCE_HOURS).
 - Тянет измерения, фильтрует по µSv/h | uSv/h | nSv/h, конвертирует к µSv/h.
-- Берёт самое свежее, сохраняет в историю JSON (SC_FILE).
+- Берёт самое свежее, сохраняет в историю (бинарный ряд timeseries.py рядом
+  с SC_FILE: x.json → x.bin; старый JSON переносится при первой записи).
 - Запись дополняется полем "region" (если SC_REGION задан).
 
 CLI:
   python safecast.py --collect   # обновить историю
   python safecast.py --once      # распечатать последний валидный замер
+  python safecast.py --export-json  # выгрузить историю в SC_FILE (JSON-список)
 
 Окружение:
   SC_LAT, SC_LON                  — широта/долгота (обязательно)
@@ -23,6 +25,7 @@ CLI:
   SC_USER_AGENT                   — UA для запросов
   SC_FILE                         — имя файла истории
   SC_MAX_LEN                      — макс. длина истории (дефолт 5000)
+  SC_MAX_AGE_DAYS                 — макс. возраст записей, сутки (дефолт 0 — без ограничения)
   SC_REGION                       — человекочитаемая метка региона (добавляется в запись)
 
 Доп. сетевые настройки (устойчивость):
@@ -32,12 +35,15 @@ CLI:
 """
 
 from __future__ import annotations
-import os, sys, json, time, datetime as dt
+import os, sys, json, math, time, datetime as dt
 from typing import Any, Dict, List, Optional, Tuple
 import urllib.parse
 import requests
 from requests import exceptions as req_exc
 
+from sensor_stats import StatsBook, stats_path_for
+from timeseries import TimeSeriesStore, load_json_list, open_series
+
 ISO8601 = "%Y-%m-%dT%H:%M:%SZ"
 
 def env(name: str, default: Optional[str]=None) -> Optional[str]:
@@ -209,37 +215,82 @@ def collapse_latest(measurements: List[Dict[str, Any]], region: Optional[str]) -
     recs.sort(key=lambda x: x["ts"], reverse=True)
     return recs[0]
 
+# ─────── История ───────
+
+SC_COLUMNS = [("uSv_h", "f"), ("lat", "f"), ("lon", "f"), ("id", "i"),
+              ("unit_raw", "e"), ("src", "e"), ("region", "e")]
+SC_ENUMS = {"src": ["safecast"]}
+
+def _store_record(r: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        ts = int(float(r.get("ts")))
+    except Exception:
+        return None
+    return {"ts": ts, **{name: r.get(name) for name, _t in SC_COLUMNS}}
+
+def _with_ver(r: Dict[str, Any]) -> Dict[str, Any]:
+    out = {"ts": r["ts"], "uSv_h": r.get("uSv_h"), "lat": r.get("lat"), "lon": r.get("lon"),
+           "id": r.get("id"), "unit_raw": r.get("unit_raw"), "src": r.get("src"), "ver": 1}
+    if r.get("region"):
+        out["region"] = r["region"]
+    return out
+
+def _latest(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    return b
+
+def open_history(path: str, create: bool = False) -> Optional[TimeSeriesStore]:
+    return open_series(path, SC_COLUMNS, enums=SC_ENUMS, to_record=_store_record,
+                       merge=_latest, create=create)
+
 def load_history(path: str) -> List[Dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
+        store = open_history(path)
     except Exception:
         return []
+    return [_with_ver(r) for r in store.read_all()] if store else load_json_list(path)
 
 def save_history(path: str, items: List[Dict[str, Any]]) -> None:
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, separators=(",", ": "))
-    os.replace(tmp, path)
-
-def append_history(path: str, rec: Dict[str, Any], max_len: int) -> Tuple[bool, List[Dict[str, Any]]]:
-    items = load_history(path)
-    for it in items[-10:][::-1]:
-        if it.get("ts") == rec.get("ts") and it.get("uSv_h") == rec.get("uSv_h"):
-            return False, items
-    items.append(rec)
-    if len(items) > max_len:
-        items = items[-max_len:]
-    save_history(path, items)
-    return True, items
+    """Полная атомарная перезапись истории (компакция)."""
+    store = open_history(path, create=True)
+    rows = [rr for rr in map(_store_record, items) if rr is not None]
+    store.rewrite(sorted(rows, key=lambda r: r["ts"]))
+
+def append_history(path: str, rec: Dict[str, Any], max_len: int,
+                   max_age_s: Optional[int] = None) -> Tuple[bool, List[Dict[str, Any]]]:
+    """
+    Upsert по ts (тот же ts с тем же значением — без изменений).
+    Возвращает (изменилось ли, хвост истории из последних записей).
+    """
+    rr = _store_record(rec)
+    store = open_history(path, create=True)
+    changed = False
+    if rr is not None:
+        old = store.range(rr["ts"], rr["ts"] + 1)
+        a, b = (old[-1].get("uSv_h") if old else None), rr.get("uSv_h")
+        # float32 в хранилище: сравниваем с допуском, а не ==
+        same = bool(old) and (a == b or (a is not None and b is not None and math.isclose(a, b, rel_tol=1e-6)))
+        if not same:
+            store.upsert(rr, merge=_latest)
+            store.retain(max_len=max_len, max_age_s=max_age_s)
+            changed = True
+            _update_stats(path, store, rr)
+    return changed, [_with_ver(r) for r in store.tail(10)]
+
+def _update_stats(path: str, store: TimeSeriesStore, rr: Dict[str, Any]) -> None:
+    """Инкрементальная статистика µSv/h рядом с историей (x.stats.json)."""
+    try:
+        book = StatsBook(stats_path_for(path))
+        book.update("uSv_h", rr["ts"], rr.get("uSv_h"),
+                    seed=lambda since: [(r["ts"], r.get("uSv_h")) for r in store.range(since, rr["ts"])])
+        book.save()
+    except Exception as e:
+        print(f"stats update failed: {e}", file=sys.stderr)
 
 def collect() -> int:
     base_url = env("SC_BASE_URL", "https://api.safecast.org")
     sc_file  = env("SC_FILE", "safecast_radiation.json")
     max_len  = int(env("SC_MAX_LEN", "5000") or "5000")
+    max_age  = int(float(env("SC_MAX_AGE_DAYS", "0") or "0") * 86400) or None
     per_page = int(env("SC_PER_PAGE", "1000") or "1000")
     max_pages= int(env("SC_MAX_PAGES", "10") or "10")
     ua       = env("SC_USER_AGENT", "vaybometer/1.0 (+github actions)")
@@ -268,7 +319,7 @@ def collect() -> int:
         print("collect: no valid µSv/h data in time window")
         return 0
 
-    changed, items = append_history(sc_file, latest, max_len)
+    changed, items = append_history(sc_file, latest, max_len, max_age)
     ts = latest["ts"]; v = latest["uSv_h"]
     rg = latest.get("region")
     suffix = f" region={rg}" if rg else ""
@@ -308,7 +359,12 @@ def main(argv: List[str]) -> int:
         return collect()
     if len(argv) > 1 and argv[1] == "--once":
         return print_once()
-    print("Usage: python safecast.py --collect|--once", file=sys.stderr)
+    if len(argv) > 1 and argv[1] == "--export-json":
+        sc_file = env("SC_FILE", "safecast_radiation.json")
+        n = open_history(sc_file, create=True).export_json(sc_file, extra={"ver": 1})
+        print(f"export: {n} records -> {sc_file}")
+        return 0
+    print("Usage: python safecast.py --collect|--once|--export-json", file=sys.stderr)
     return 1
 
 if __name__ == "__main__":
@@ -13,22 +13,31 @@ schumann.py — сбор и выдача данных для «Шумана» (v
       * сохранённый HTML (GCI_SAVED_HTML)
     Можно маппить GCI power → amp (SCHU_MAP_GCI_POWER_TO_AMP=1)
   - (опц.) TSU (страница живости, без чисел)
-• Запись в файл истории (SCHU_FILE, по умолчанию schumann_hourly.json).
+• История — бинарный ряд фиксированной ширины (timeseries.py) рядом с SCHU_FILE:
+  schumann_hourly.json → schumann_hourly.bin (ts:int32, freq/amp/h7 float32,
+  src enum). Почасовой upsert — O(1), get_schumann() читает только хвост.
+  JSON (SCHU_FILE) — совместимый экспорт (--export-json); если .bin ещё нет,
+  он создаётся из JSON при первой записи.
 • Forward-fill амплитуды при src=='cache' (если раньше была валидная amp).
 • H7: поля h7_amp/h7_spike оставлены под будущее.
 • get_schumann() возвращает freq/amp/trend/status/h7/interpretation.
 
 CLI:
   --collect          собрать одну точку и сохранить в историю
-  --fix-history      нормализовать и дедуплицировать историю
+  --fix-history      нормализовать и дедуплицировать историю (компакция .bin)
+  --export-json      выгрузить историю в SCHU_FILE (JSON-список, как раньше)
   --print            вывести итог get_schumann() (для отладки CI)
 """
 
 from __future__ import annotations
 import os, sys, re, json, time, math, calendar
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urljoin
 
+from sensor_stats import StatsBook, describe_latest, stats_path_for
+from timeseries import TimeSeriesStore, load_json_list, open_series
+
 try:
     import requests
     from requests.adapters import HTTPAdapter
@@ -45,6 +54,7 @@ ALLOW_CACHE = os.getenv("SCHU_ALLOW_CACHE_ON_FAIL", "1") == "1"
 AMP_SCALE    = float(os.getenv("SCHU_AMP_SCALE", "1"))
 TREND_WINDOW = int(os.getenv("SCHU_TREND_WINDOW", "24"))
 TREND_DELTA  = float(os.getenv("SCHU_TREND_DELTA", "0.1"))
+TREND_Z      = float(os.getenv("SCHU_TREND_Z", "1"))     # порог тренда в z при накопленной статистике
 
 # Диапазоны
 FREQ_MIN = float(os.getenv("SCHU_FREQ_MIN", "0"))
@@ -85,8 +95,12 @@ BREAKER_FILE      = ".schu_breaker.json"
 BREAKER_THRESHOLD = int(os.getenv("SCHU_BREAKER_THRESHOLD", "3"))
 BREAKER_COOLDOWN  = int(os.getenv("SCHU_BREAKER_COOLDOWN",  "1800"))
 
-# Директория для дампов
+# Директория для дампов и кэша путей GCI
 CACHE_DIR = ".cache"
+
+# Кэш найденных iframe URL / json_rel GCI (меняются редко): обычный запуск идёт сразу в JSON
+GCI_DISCOVERY_FILE = os.getenv("SCHU_GCI_DISCOVERY_FILE", os.path.join(CACHE_DIR, "schu_gci_discovery.json"))
+GCI_DISCOVERY_TTL  = int(os.getenv("SCHU_GCI_DISCOVERY_TTL", str(7 * 86400)))
 if DEBUG:
     try:
         os.makedirs(CACHE_DIR, exist_ok=True)
@@ -106,18 +120,52 @@ def _now_hour_ts_utc() -> int:
     t = time.gmtime()
     return int(calendar.timegm((t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, 0, 0)))
 
-def _load_history(path: str) -> List[Dict[str, Any]]:
+# ─────── Хранилище истории ───────
+
+SCHU_COLUMNS = [("freq", "f"), ("amp", "f"), ("h7_amp", "f"), ("h7_spike", "b"), ("src", "e")]
+SCHU_SRC_ENUM = [
+    "gci_json", "live", "custom", "gci_live", "gci_saved", "gci_iframe", "tsu_live", "cache",
+    "none", "gci_fail", "gci_disabled", "gci_circuit_open", "custom_fail", "tsu_fail", "tsu_disabled",
+]
+
+def _store_record(r: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        ts = int(float(r.get("ts")))
     except Exception:
-        return []
+        return None
+    return {"ts": ts, "freq": r.get("freq"), "amp": r.get("amp"), "h7_amp": r.get("h7_amp"),
+            "h7_spike": r.get("h7_spike"), "src": r.get("src")}
+
+def _with_ver(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {"ts": r["ts"], "freq": r.get("freq"), "amp": r.get("amp"), "h7_amp": r.get("h7_amp"),
+            "h7_spike": r.get("h7_spike"), "ver": 2, "src": r.get("src")}
 
-def _write_history(path: str, items: List[Dict[str, Any]]) -> None:
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False)
-    os.replace(tmp, path)
+def _open_store(path: str, create: bool = False) -> Optional[TimeSeriesStore]:
+    """
+    Бинарная история для path. Если .bin ещё нет: при create=True он
+    создаётся и заполняется из JSON (миграция), иначе возвращается None.
+    """
+    return open_series(path, SCHU_COLUMNS, enums={"src": SCHU_SRC_ENUM},
+                       to_record=_store_record, merge=_better_record, create=create)
+
+def _load_history(path: str) -> List[Dict[str, Any]]:
+    store = _open_store(path)
+    if store is None:
+        return load_json_list(path)
+    return [_with_ver(r) for r in store.read_all()]
+
+def _iter_history_reverse(path: str):
+    """История от новых к старым; с .bin читается только нужный хвост."""
+    store = _open_store(path)
+    if store is None:
+        yield from reversed(load_json_list(path))
+        return
+    for r in store.iter_reverse():
+        yield _with_ver(r)
+
+def export_history_json(path: str, out_path: Optional[str] = None) -> int:
+    store = _open_store(path, create=True)
+    return store.export_json(out_path or path, extra={"ver": 2}) if store else 0
 
 def _dump(name: str, content: str | bytes):
     if not DEBUG:
@@ -146,26 +194,31 @@ def _better_record(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
     return b
 
 def upsert_record(path: str, rec: Dict[str, Any], max_len: Optional[int] = None) -> None:
-    try:
-        ts = int(rec.get("ts"))
-    except Exception:
+    """O(1) для текущего часа: дозапись или слияние с последней записью на месте."""
+    rr = _store_record(rec)
+    if rr is None:
         return
-    hist = _load_history(path)
-    merged: Dict[int, Dict[str, Any]] = {}
-    for r in hist:
-        try:
-            t = int(r.get("ts"))
-        except Exception:
-            continue
-        merged[t] = r if t not in merged else _better_record(merged[t], r)
-    merged[ts] = rec if ts not in merged else _better_record(merged[ts], rec)
-    out = [merged[t] for t in sorted(merged)]
-    if isinstance(max_len, int) and max_len > 0 and len(out) > max_len:
-        out = out[-max_len:]
-    _write_history(path, out)
+    store = _open_store(path, create=True)
+    out = store.upsert(rr, merge=_better_record)
+    if isinstance(max_len, int) and max_len > 0:
+        store.retain(max_len=max_len)
+    _update_stats(path, store, out)
+
+STATS_KEYS = ("freq", "amp")
+
+def _update_stats(path: str, store: TimeSeriesStore, rec: Dict[str, Any]) -> None:
+    """Инкрементальная статистика freq/amp рядом с историей (x.stats.json)."""
+    try:
+        book = StatsBook(stats_path_for(path))
+        for key in STATS_KEYS:
+            book.update(key, rec["ts"], rec.get(key),
+                        seed=lambda since, k=key: [(r["ts"], r.get(k)) for r in store.range(since, rec["ts"])])
+        book.save()
+    except Exception as e:
+        print(f"stats update failed: {e}", file=sys.stderr)
 
 def last_known_amp(path: str) -> Optional[float]:
-    for r in reversed(_load_history(path)):
+    for r in _iter_history_reverse(path):
         v = r.get("amp")
         if isinstance(v, (int, float)):
             return float(v)
@@ -257,18 +310,20 @@ def extract_json_from_iframe_inline(html: str | None) -> Optional[Any]:
             continue
     return None
 
-def _flatten_numbers_with_paths(obj: Any, path: Tuple[str, ...] = ()) -> List[Tuple[Tuple[str, ...], float]]:
-    """Разворачивает все числа в JSON вместе с путём до них — для эвристики по станциям."""
-    out: List[Tuple[Tuple[str, ...], float]] = []
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            out.extend(_flatten_numbers_with_paths(v, path + (str(k),)))
-    elif isinstance(obj, list):
-        for i, v in enumerate(obj):
-            out.extend(_flatten_numbers_with_paths(v, path + (str(i),)))
-    elif isinstance(obj, (int, float)) and math.isfinite(obj):
-        out.append((path, float(obj)))
-    return out
+def _flatten_numbers_with_paths(obj: Any, path: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], float]]:
+    """
+    Потоковый обход JSON: (путь, число) в порядке документа, без промежуточного
+    списка и без рекурсии (глубокие payload'ы не упираются в лимит стека).
+    """
+    stack: List[Tuple[Any, Tuple[str, ...]]] = [(obj, path)]
+    while stack:
+        node, p = stack.pop()
+        if isinstance(node, dict):
+            stack.extend((v, p + (str(k),)) for k, v in reversed(list(node.items())))
+        elif isinstance(node, list):
+            stack.extend((node[i], p + (str(i),)) for i in range(len(node) - 1, -1, -1))
+        elif isinstance(node, (int, float)) and not isinstance(node, bool) and math.isfinite(node):
+            yield p, float(node)
 
 def _numbers_near_station(json_obj: Any, station: str) -> List[float]:
     """
@@ -276,28 +331,46 @@ def _numbers_near_station(json_obj: Any, station: str) -> List[float]:
     Подходит для структур вида {"GCI001": 12.3} или {"stations":{"GCI001":{"power":[... , 7.8]}}} и т.п.
     """
     station_lc = station.lower()
-    vals: List[float] = []
-    for path, num in _flatten_numbers_with_paths(json_obj):
-        if any(station_lc in p.lower() for p in path):
-            vals.append(num)
-    return vals
+    return [num for path, num in _flatten_numbers_with_paths(json_obj)
+            if any(station_lc in p.lower() for p in path)]
 
 def _aggregate_stations_power(json_obj: Any, stations: List[str]) -> Optional[float]:
-    """Среднее по доступным станциям из списка. Берём последнее число по каждой станции."""
-    per_station: List[float] = []
-    for st in stations:
-        cand = _numbers_near_station(json_obj, st)
-        if cand:
-            per_station.append(cand[-1])  # последнее как «актуальное»
+    """
+    Среднее по доступным станциям из списка. Берём последнее число по каждой станции.
+    Один проход: совпадения станций и ключа 'power' наследуются от родителя,
+    так что каждый ключ проверяется один раз, а не для каждого числа под ним.
+    """
+    names = [st.lower() for st in stations]
+    last: List[Optional[float]] = [None] * len(names)
+    power_last: Optional[float] = None
+    # (узел, битовая маска станций на пути, есть ли 'power' на пути)
+    stack: List[Tuple[Any, int, bool]] = [(json_obj, 0, False)]
+    while stack:
+        node, mask, power = stack.pop()
+        if isinstance(node, dict):
+            children = []
+            for k, v in node.items():
+                kl = str(k).lower()
+                m = mask
+                for i, name in enumerate(names):
+                    if name in kl:
+                        m |= 1 << i
+                children.append((v, m, power or kl == "power"))
+            stack.extend(reversed(children))
+        elif isinstance(node, list):
+            stack.extend((node[i], mask, power) for i in range(len(node) - 1, -1, -1))
+        elif isinstance(node, (int, float)) and not isinstance(node, bool) and math.isfinite(node):
+            num = float(node)
+            for i in range(len(names)):
+                if mask >> i & 1:
+                    last[i] = num
+            if power:
+                power_last = num
+    per_station = [v for v in last if v is not None]
     if per_station:
         return sum(per_station) / len(per_station)
-    # как фоллбэк: поле 'power' без указания станции
-    # попробуем вытащить последнее число по ключу 'power'
-    flat = _flatten_numbers_with_paths(json_obj)
-    power_like = [num for path, num in flat if any("power" == p.lower() for p in path)]
-    if power_like:
-        return power_like[-1]
-    return None
+    # как фоллбэк: последнее число по ключу 'power' без указания станции
+    return power_last
 
 # ─────── Источники ───────
 
@@ -347,9 +420,81 @@ def get_from_custom() -> Tuple[Optional[float], Optional[float], str]:
     amp  = deep_find_number(data, "amp", "amplitude", "power")
     return freq, amp, "custom"
 
+# ─────── GCI: кэш путей и цепочка запросов ───────
+
+def _gci_discovery_load() -> Optional[Dict[str, Any]]:
+    try:
+        with open(GCI_DISCOVERY_FILE, "r", encoding="utf-8") as f:
+            st = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(st, dict) or not st.get("json_url"):
+        return None
+    if time.time() - float(st.get("ts") or 0) > GCI_DISCOVERY_TTL:
+        return None
+    return st
+
+def _gci_discovery_save(iframe_url: str, json_rel: str, json_url: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(GCI_DISCOVERY_FILE) or ".", exist_ok=True)
+        tmp = GCI_DISCOVERY_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"iframe_url": iframe_url, "json_rel": json_rel, "json_url": json_url,
+                       "ts": int(time.time())}, f, ensure_ascii=False)
+        os.replace(tmp, GCI_DISCOVERY_FILE)
+    except Exception:
+        pass
+
+def _gci_discovery_drop() -> None:
+    try:
+        os.remove(GCI_DISCOVERY_FILE)
+    except Exception:
+        pass
+
+def _get_text(url: Optional[str], dump_name: Optional[str] = None) -> Optional[str]:
+    if not url:
+        return None
+    r = _get(url)
+    if r and r.status_code == 200:
+        if dump_name:
+            _dump(dump_name, r.text)
+        return r.text
+    return None
+
+def _gci_power_from_json_url(json_url: str) -> Optional[float]:
+    rj = _get(json_url)
+    if not (rj and rj.status_code == 200):
+        return None
+    try:
+        data = rj.json()
+    except Exception:
+        return None
+    if data is None:
+        return None
+    try:
+        _dump("gci_json.json", json.dumps(data, ensure_ascii=False))
+    except Exception:
+        pass
+    power = _aggregate_stations_power(data, GCI_STATIONS)  # среднее по станциям
+    return float(power) if isinstance(power, (int, float)) else None
+
+def _gci_power_from_inline(html: Optional[str], dump_name: str) -> Optional[float]:
+    data_inline = extract_json_from_iframe_inline(html)
+    if data_inline is None:
+        return None
+    try:
+        _dump(dump_name, json.dumps(data_inline, ensure_ascii=False))
+    except Exception:
+        pass
+    power = _aggregate_stations_power(data_inline, GCI_STATIONS)
+    return float(power) if isinstance(power, (int, float)) else None
+
 def get_gci_power() -> Tuple[Optional[float], str]:
     """
     Основной путь: страница → iframe → data-load-json-from → power_levels.php JSON.
+    Найденный URL JSON кэшируется (GCI_DISCOVERY_FILE, TTL GCI_DISCOVERY_TTL),
+    поэтому обычный запуск — один запрос прямо к JSON. Если прямой путь
+    не сработал, страница и iframe запрашиваются параллельно.
     Возвращает (power, src), где power — то, что далее маппим в amp.
     """
     if not GCI_ENABLE or not requests:
@@ -357,23 +502,23 @@ def get_gci_power() -> Tuple[Optional[float], str]:
     if not breaker_allow():
         return None, "gci_circuit_open"
 
-    page_html = None
-    # 1) страница (обёртка)
-    if GCI_PAGE_URL:
-        r = _get(GCI_PAGE_URL)
-        if r and r.status_code == 200:
-            page_html = r.text
-            _dump("gci_page.html", page_html)
+    # 0) кэшированный путь к JSON
+    cached = _gci_discovery_load()
+    if cached:
+        power = _gci_power_from_json_url(cached["json_url"])
+        if power is not None:
+            breaker_ok()
+            return power, "gci_json"
+        _gci_discovery_drop()
+
+    # 1–2) страница (обёртка) и iframe по умолчанию — параллельно
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        f_page = pool.submit(_get_text, GCI_PAGE_URL, "gci_page.html")
+        f_iframe = pool.submit(_get_text, GCI_IFRAME_URL, "gci_iframe.html")
+        page_html, default_iframe_html = f_page.result(), f_iframe.result()
 
     iframe_url = extract_iframe_src(page_html) or GCI_IFRAME_URL
-
-    # 2) iframe HTML
-    iframe_html = None
-    if iframe_url:
-        rr = _get(iframe_url)
-        if rr and rr.status_code == 200:
-            iframe_html = rr.text
-            _dump("gci_iframe.html", iframe_html)
+    iframe_html = default_iframe_html if iframe_url == GCI_IFRAME_URL else _get_text(iframe_url, "gci_iframe.html")
 
     # 3) извлечь относительный путь к JSON (power_levels.php)
     json_rel = extract_json_path_from_iframe(iframe_html)
@@ -387,46 +532,22 @@ def get_gci_power() -> Tuple[Optional[float], str]:
             pass
 
     # 4) запросить JSON напрямую
-    if json_rel:
+    if json_rel and iframe_url:
         json_url = urljoin(iframe_url, json_rel)
-        rj = _get(json_url)
-        if rj and rj.status_code == 200:
-            try:
-                data = rj.json()
-            except Exception:
-                data = None
-            if data is not None:
-                try:
-                    _dump("gci_json.json", json.dumps(data, ensure_ascii=False))
-                except Exception:
-                    pass
-                power = _aggregate_stations_power(data, GCI_STATIONS)  # среднее по станциям
-                if isinstance(power, (int, float)):
-                    breaker_ok()
-                    return float(power), "gci_json"
-
-    # 5) глубокий фоллбэк: попытка достать inline JSON из iframe
-    data_inline = extract_json_from_iframe_inline(iframe_html)
-    if data_inline is not None:
-        try:
-            _dump("gci_iframe_inline.json", json.dumps(data_inline, ensure_ascii=False))
-        except Exception:
-            pass
-        power = _aggregate_stations_power(data_inline, GCI_STATIONS)
-        if isinstance(power, (int, float)):
+        power = _gci_power_from_json_url(json_url)
+        if power is not None:
+            _gci_discovery_save(iframe_url, json_rel, json_url)
             breaker_ok()
-            return float(power), "gci_iframe"
-
-    # 6) отдельный запрос только iframe (если шаги выше не сработали)
-    rr2 = _get(GCI_IFRAME_URL)
-    if rr2 and rr2.status_code == 200:
-        _dump("gci_iframe_only.html", rr2.text)
-        data_inline2 = extract_json_from_iframe_inline(rr2.text)
-        if data_inline2 is not None:
-            power = _aggregate_stations_power(data_inline2, GCI_STATIONS)
-            if isinstance(power, (int, float)):
-                breaker_ok()
-                return float(power), "gci_iframe"
+            return power, "gci_json"
+
+    # 5) глубокий фоллбэк: inline JSON из iframe
+    power = _gci_power_from_inline(iframe_html, "gci_iframe_inline.json")
+    if power is None and iframe_url != GCI_IFRAME_URL:
+        # 6) iframe по умолчанию — он уже скачан параллельно, повторный запрос не нужен
+        power = _gci_power_from_inline(default_iframe_html, "gci_iframe_only.json")
+    if power is not None:
+        breaker_ok()
+        return power, "gci_iframe"
 
     breaker_bad()
     return None, "gci_fail"
@@ -547,7 +668,17 @@ def gentle_interpretation(code: str) -> str:
         "red": "Сильные отклонения — прислушивайтесь к самочувствию и снижайте перегрузки."
     }.get(code, "")
 
-def _trend_arrow(vals: List[float], delta: float = TREND_DELTA) -> str:
+def _trend_arrow(vals: List[float], delta: float = TREND_DELTA,
+                 stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Тренд последнего значения. Есть состояние sensor_stats (describe) — по
+    отклонению от медианы 7 дней в MAD-σ (или от EWMA в σ) с порогом TREND_Z;
+    иначе — по разнице с простым средним окна (delta).
+    """
+    if stats:
+        score = stats.get("robust_z") if stats.get("robust_z") is not None else stats.get("z")
+        if isinstance(score, (int, float)):
+            return "↑" if score >= TREND_Z else "↓" if score <= -TREND_Z else "→"
     if len(vals) < 2:
         return "→"
     last = vals[-1]
@@ -561,8 +692,20 @@ def _trend_arrow(vals: List[float], delta: float = TREND_DELTA) -> str:
 # ─────── Публичное API ───────
 
 def get_schumann() -> Dict[str, Any]:
-    hist = _load_history(DEF_FILE)
-    if not hist:
+    # хвост истории: последняя запись + окно тренда (без чтения всего файла)
+    window = max(TREND_WINDOW, 2)
+    last: Optional[Dict[str, Any]] = None
+    freq_series: List[float] = []
+    for r in _iter_history_reverse(DEF_FILE):
+        if last is None:
+            last = r
+        if isinstance(r.get("freq"), (int, float)):
+            freq_series.append(r["freq"])
+            if len(freq_series) >= window:
+                break
+    freq_series.reverse()
+
+    if last is None:
         return {
             "freq": None, "amp": None, "trend": "→", "trend_text": "стабильно",
             "status": "🟡 колебания", "status_code": "yellow",
@@ -570,12 +713,13 @@ def get_schumann() -> Dict[str, Any]:
             "interpretation": gentle_interpretation("yellow"), "cached": True
         }
 
-    # тренд по частоте (как раньше; частота может быть константой 7.83 — тогда «стабильно»)
-    freq_series = [r.get("freq") for r in hist if isinstance(r.get("freq"), (int, float))]
-    freq_series = freq_series[-max(TREND_WINDOW, 2):] if freq_series else []
-    trend = _trend_arrow(freq_series) if freq_series else "→"
+    # «необычно для последних 7 дней» — из готового состояния sensor_stats
+    stats = {k: (describe_latest(DEF_FILE, k, last.get(k)) if isinstance(last.get(k), (int, float)) else None)
+             for k in STATS_KEYS}
+    # тренд по частоте: относительно 7-дневной статистики, пока её нет — к среднему окна
+    # (частота может быть константой 7.83 — тогда «стабильно»)
+    trend = _trend_arrow(freq_series, stats=stats["freq"]) if freq_series else "→"
 
-    last = hist[-1]
     freq, amp = last.get("freq"), last.get("amp")
     status, status_code = classify_freq_status(freq)
 
@@ -586,13 +730,16 @@ def get_schumann() -> Dict[str, Any]:
         "h7_text": format_h7(last.get("h7_amp"), last.get("h7_spike")),
         "interpretation": gentle_interpretation(status_code),
         "cached": (last.get("src") == "cache"),
-        "h7_amp": last.get("h7_amp"), "h7_spike": last.get("h7_spike")
+        "h7_amp": last.get("h7_amp"), "h7_spike": last.get("h7_spike"),
+        "stats": stats,
     }
 
 # ─────── История ───────
 
 def fix_history(path: str) -> Tuple[int, int]:
-    hist = _load_history(path)
+    """Компакция на месте: нормализация, дедупликация и сортировка бинарной истории."""
+    store = _open_store(path, create=True)
+    hist = store.read_all()
     old = len(hist)
     by_ts: Dict[int, Dict[str, Any]] = {}
     for r in hist:
@@ -607,8 +754,8 @@ def fix_history(path: str) -> Tuple[int, int]:
         rr.setdefault("h7_amp", None)
         rr.setdefault("h7_spike", None)
         by_ts[ts] = rr if ts not in by_ts else _better_record(by_ts[ts], rr)
-    cleaned = [by_ts[k] for k in sorted(by_ts)]
-    _write_history(path, cleaned)
+    cleaned = [_store_record(by_ts[k]) for k in sorted(by_ts)]
+    store.rewrite(cleaned)
     return old, len(cleaned)
 
 # ─────── CLI ───────
@@ -629,6 +776,10 @@ def _cmd_fix_history():
     old, new = fix_history(DEF_FILE)
     print(f"fix-history: {old} -> {new}; file={DEF_FILE}")
 
+def _cmd_export_json():
+    n = export_history_json(DEF_FILE)
+    print(f"export-json: {n} records -> {DEF_FILE}")
+
 def _cmd_print():
     state = get_schumann()
     print(json.dumps(state, ensure_ascii=False, indent=2))
@@ -639,6 +790,8 @@ def main():
         _cmd_collect(); return
     if "--fix-history" in args:
         _cmd_fix_history(); return
+    if "--export-json" in args:
+        _cmd_export_json(); return
     if "--print" in args:
         _cmd_print(); return
     # По умолчанию — просто одна выборка (как в старых версиях)
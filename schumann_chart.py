@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+schumann_chart.py — графики амплитуды Шумана (48 ч и 7 суток) на Pillow.
+
+• Данные — хвост бинарной истории schumann (timeseries.py), без чтения всего файла.
+• Картинка = слой осей/сетки + слой данных. Правая граница окна выровнена
+  по шагу делений (6 ч для 48h, сутки для 7d), поэтому слой осей меняется
+  только при сдвиге делений или шкалы Y и кэшируется (память + PNG в
+  SCHU_CHART_CACHE_DIR).
+• В PNG пишется подпись данных (vb-data-sig); если новых часовых точек нет,
+  файл не перерисовывается вовсе.
+• Время рендера логируется; tools/bench_schumann_chart.py — бенчмарк.
+
+CLI:
+  python schumann_chart.py                    # обновить schumann_amp_48h.png и schumann_amp_7d.png
+  python schumann_chart.py --force            # перерисовать, даже если данные не менялись
+  python schumann_chart.py --history X.json --out-dir DIR
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+WIDTH, HEIGHT = 1600, 640
+PAD_L, PAD_R, PAD_T, PAD_B = 110, 40, 100, 90
+GAP_S = 3 * 3600  # разрыв линии, если между точками больше 3 ч
+
+BG = (255, 255, 255, 255)
+GRID = (225, 228, 234, 255)
+AXIS = (90, 96, 110, 255)
+TEXT = (40, 44, 52, 255)
+LINE = (31, 119, 180, 255)
+
+CACHE_DIR = os.getenv("SCHU_CHART_CACHE_DIR", os.path.join(".cache", "schumann_charts"))
+SIG_KEY = "vb-data-sig"
+
+# имя → (часов в окне, шаг делений по X, файл)
+CHARTS: Dict[str, Tuple[int, int, str]] = {
+    "48h": (48, 6 * 3600, "schumann_amp_48h.png"),
+    "7d": (7 * 24, 24 * 3600, "schumann_amp_7d.png"),
+}
+
+Point = Tuple[int, float]
+
+_AXES_MEM: Dict[str, Any] = {}
+
+
+# ───── шрифты/шкалы ─────
+def _font(size: int):
+    from PIL import ImageFont
+
+    for name in (
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation2/LiberationSans-Regular.ttf",
+        "C:/Windows/Fonts/arial.ttf",
+    ):
+        if Path(name).exists():
+            return ImageFont.truetype(name, size=size)
+    return ImageFont.load_default()
+
+
+def _nice_range(lo: float, hi: float, ticks: int = 6) -> Tuple[float, float, float]:
+    """Шкала Y с «круглым» шагом; небольшие колебания данных не меняют шкалу."""
+    if not (math.isfinite(lo) and math.isfinite(hi)):
+        lo, hi = 0.0, 1.0
+    if hi - lo < 1e-9:
+        lo, hi = lo - 0.5, hi + 0.5
+    raw = (hi - lo) / ticks
+    mag = 10 ** math.floor(math.log10(raw))
+    step = next(m * mag for m in (1, 2, 2.5, 5, 10) if m * mag >= raw)
+    return math.floor(lo / step) * step, math.ceil(hi / step) * step, step
+
+
+def _window(last_ts: int, hours: int, tick_s: int) -> Tuple[int, int]:
+    """Окно [t0, t1], t1 — ближайшее деление не раньше last_ts."""
+    t1 = -(-int(last_ts) // tick_s) * tick_s
+    return t1 - hours * 3600, t1
+
+
+def _x(ts: float, t0: int, t1: int) -> float:
+    return PAD_L + (ts - t0) / (t1 - t0) * (WIDTH - PAD_L - PAD_R)
+
+
+def _y(v: float, y0: float, y1: float) -> float:
+    return HEIGHT - PAD_B - (v - y0) / (y1 - y0) * (HEIGHT - PAD_T - PAD_B)
+
+
+# ───── слой осей (кэшируется) ─────
+def _axes_key(t0: int, t1: int, tick_s: int, y0: float, y1: float, ystep: float) -> str:
+    raw = f"{WIDTH}x{HEIGHT}|{t0}|{t1}|{tick_s}|{y0:.6g}|{y1:.6g}|{ystep:.6g}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _draw_axes(t0: int, t1: int, tick_s: int, y0: float, y1: float, ystep: float):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGBA", (WIDTH, HEIGHT), BG)
+    d = ImageDraw.Draw(img)
+    small = _font(18)
+    left, right, top, bottom = PAD_L, WIDTH - PAD_R, PAD_T, HEIGHT - PAD_B
+
+    n = int(round((y1 - y0) / ystep))
+    for i in range(n + 1):
+        v = y0 + i * ystep
+        y = _y(v, y0, y1)
+        d.line((left, y, right, y), fill=GRID, width=1)
+        label = f"{v:g}"
+        w = d.textlength(label, font=small)
+        d.text((left - 12 - w, y - 11), label, fill=TEXT, font=small)
+
+    fmt = "%H:%M\n%d.%m" if tick_s < 86400 else "%d.%m"
+    for ts in range(t0, t1 + 1, tick_s):
+        x = _x(ts, t0, t1)
+        d.line((x, top, x, bottom), fill=GRID, width=1)
+        label = datetime.fromtimestamp(ts, tz=timezone.utc).strftime(fmt)
+        d.multiline_text((x, bottom + 8), label, fill=TEXT, font=small, anchor="ma", align="center")
+
+    d.rectangle((left, top, right, bottom), outline=AXIS, width=2)
+    d.text((right, HEIGHT - 8), "Time (UTC)", fill=AXIS, font=small, anchor="rd")
+    d.text((12, top - 34), "Amplitude (pT)", fill=AXIS, font=small)
+    return img
+
+
+def _axes_layer(t0: int, t1: int, tick_s: int, y0: float, y1: float, ystep: float,
+                cache_dir: Optional[str]) -> Tuple[Any, bool]:
+    """(слой, из кэша ли) — память → PNG на диске → отрисовка."""
+    from PIL import Image
+
+    key = _axes_key(t0, t1, tick_s, y0, y1, ystep)
+    if key in _AXES_MEM:
+        return _AXES_MEM[key], True
+    path = os.path.join(cache_dir, f"axes_{key}.png") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            img = Image.open(path).convert("RGBA")
+            _AXES_MEM[key] = img
+            return img, True
+        except Exception:
+            pass
+    img = _draw_axes(t0, t1, tick_s, y0, y1, ystep)
+    _AXES_MEM[key] = img
+    if path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            img.save(path + ".tmp", format="PNG")
+            os.replace(path + ".tmp", path)
+        except Exception:
+            pass
+    return img, False
+
+
+# ───── слой данных ─────
+def _draw_data(base, pts: Sequence[Point], t0: int, t1: int, y0: float, y1: float, title: str):
+    from PIL import ImageDraw
+
+    img = base.copy()
+    d = ImageDraw.Draw(img)
+    seg: List[Tuple[float, float]] = []
+    prev_ts: Optional[int] = None
+    for ts, v in pts:
+        xy = (_x(ts, t0, t1), _y(v, y0, y1))
+        if prev_ts is not None and ts - prev_ts > GAP_S:
+            if len(seg) > 1:
+                d.line(seg, fill=LINE, width=3, joint="curve")
+            seg = []
+        seg.append(xy)
+        prev_ts = ts
+    if len(seg) > 1:
+        d.line(seg, fill=LINE, width=3, joint="curve")
+    r = 2.5
+    for ts, v in pts:
+        x, y = _x(ts, t0, t1), _y(v, y0, y1)
+        d.ellipse((x - r, y - r, x + r, y + r), fill=LINE)
+    d.text((12, 18), title, fill=TEXT, font=_font(24))
+    return img
+
+
+def _signature(pts: Sequence[Point], t0: int, t1: int) -> str:
+    h = hashlib.sha1(f"{t0}|{t1}|{WIDTH}x{HEIGHT}".encode())
+    for ts, v in pts:
+        h.update(f"{ts}:{v:.4f};".encode())
+    return h.hexdigest()[:20]
+
+
+def _stored_signature(path: str) -> Optional[str]:
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            return (getattr(img, "text", None) or img.info).get(SIG_KEY)
+    except Exception:
+        return None
+
+
+def render_chart(
+    points: Sequence[Point],
+    hours: int,
+    tick_s: int,
+    out_path: str,
+    *,
+    cache_dir: Optional[str] = CACHE_DIR,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Рисует график амплитуды за последние hours часов.
+    → {"status": "rendered"|"unchanged"|"skipped", "n", "axes_cached", "ms"}.
+    """
+    from PIL import PngImagePlugin
+
+    started = time.perf_counter()
+    pts = [(int(t), float(v)) for t, v in points if isinstance(v, (int, float)) and math.isfinite(v)]
+    if not pts:
+        return {"status": "skipped", "n": 0, "axes_cached": False, "ms": 0.0}
+    t0, t1 = _window(pts[-1][0], hours, tick_s)
+    pts = [p for p in pts if p[0] >= t0]
+    if len(pts) < 2:
+        return {"status": "skipped", "n": len(pts), "axes_cached": False, "ms": 0.0}
+
+    sig = _signature(pts, t0, t1)
+    if not force and os.path.exists(out_path) and _stored_signature(out_path) == sig:
+        return {"status": "unchanged", "n": len(pts), "axes_cached": True,
+                "ms": (time.perf_counter() - started) * 1000}
+
+    vals = [v for _t, v in pts]
+    y0, y1, ystep = _nice_range(min(vals), max(vals))
+    axes, cached = _axes_layer(t0, t1, tick_s, y0, y1, ystep, cache_dir)
+    title = f"Schumann amplitude (last {hours}h, UTC) — n={len(pts)}; last={vals[-1]:.2f}"
+    img = _draw_data(axes, pts, t0, t1, y0, y1, title)
+
+    meta = PngImagePlugin.PngInfo()
+    meta.add_text(SIG_KEY, sig)
+    tmp = out_path + ".tmp"
+    img.save(tmp, format="PNG", pnginfo=meta)
+    os.replace(tmp, out_path)
+    return {"status": "rendered", "n": len(pts), "axes_cached": cached,
+            "ms": (time.perf_counter() - started) * 1000}
+
+
+# ───── точки из истории ─────
+def load_points(history_path: str, hours: int) -> List[Point]:
+    """(ts, amp) за последние hours часов (+ запас на выравнивание окна)."""
+    import schumann
+    from timeseries import load_json_list
+
+    store = schumann._open_store(history_path)
+    if store is not None:
+        last = store.last()
+        if last is None:
+            return []
+        rows = store.range(last["ts"] - (hours + 24) * 3600)
+    else:
+        rows = load_json_list(history_path)
+    out: List[Point] = []
+    for r in rows:
+        try:
+            ts = int(float(r.get("ts")))
+        except Exception:
+            continue
+        if isinstance(r.get("amp"), (int, float)):
+            out.append((ts, float(r["amp"])))
+    out.sort()
+    return out
+
+
+def render_all(history_path: str, out_dir: str = ".", *, force: bool = False,
+               cache_dir: Optional[str] = CACHE_DIR) -> Dict[str, Dict[str, Any]]:
+    hours_max = max(h for h, _t, _f in CHARTS.values())
+    points = load_points(history_path, hours_max)
+    return {
+        name: render_chart(points, hours, tick_s, os.path.join(out_dir, fname), cache_dir=cache_dir, force=force)
+        for name, (hours, tick_s, fname) in CHARTS.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Schumann amplitude charts (48h/7d)")
+    ap.add_argument("--history", default=os.getenv("SCHU_FILE", "schumann_hourly.json"))
+    ap.add_argument("--out-dir", default=".")
+    ap.add_argument("--force", action="store_true")
+    args = ap.parse_args(argv)
+    for name, res in render_all(args.history, args.out_dir, force=args.force).items():
+        print(f"chart {name}: {res['status']} n={res['n']} axes_cached={res['axes_cached']} {res['ms']:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
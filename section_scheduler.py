@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+section_scheduler.py — разделы поста параллельно и под одним дедлайном.
+
+Источники разделов (курсы, закат, воздух, пыльца, Kp, солнечный ветер,
+Шуман, Safecast, радиация, землетрясения, астро) стартуют сразу все, каждый
+в своём daemon-потоке, и ждутся не дольше общего дедлайна, отсчитанного от
+создания плана (SECTIONS_DEADLINE_S). Раздел рендерится:
+
+  • fresh   — из свежих данных, если они пришли вовремя и пригодны (usable);
+  • cached  — из последнего удачного результата прошлых запусков, если он
+              не старше max_age_h и снят в тот же день поста (day) — вчерашний
+              прогноз или курс за сегодняшний не выдаётся (JSON-кэш SECTIONS_CACHE);
+  • omitted — не рендерится (get() отдаёт default).
+
+Зависший источник не держит процесс: поток daemon, результат после дедлайна
+просто не используется. Деградации (cached/omitted и причина — timeout,
+error, empty) пишутся в лог, в спан раздела и сводкой degraded в текущий спан —
+то есть в манифест запуска (см. tracing.py).
+
+    plan = SectionPlan("morning", day=date_local.to_date_string())
+    plan.start("kp", _kp_global_swpc, usable=lambda v: v[0] is not None, max_age_h=6)
+    plan.start("quakes", _kld_quake_line_24h, usable=always)
+    ...
+    kp_val, kp_status, kp_age, kp_src = plan.get("kp", (None, "н/д", None, "n/d"))
+    plan.finish()   # сохранить свежие результаты в кэш
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import tracing
+from send_pipeline import Deadline
+
+DEADLINE_S = float(os.getenv("SECTIONS_DEADLINE_S", "60"))
+DEFAULT_MAX_AGE_H = float(os.getenv("SECTIONS_CACHE_MAX_AGE_H", "12"))
+
+
+def cache_path() -> Optional[Path]:
+    """Файл кэша разделов; SECTIONS_CACHE=0 — кэш выключен."""
+    raw = (os.getenv("SECTIONS_CACHE") or "").strip()
+    if raw.lower() in ("0", "false", "no", "off"):
+        return None
+    if raw:
+        return Path(raw)
+    return Path(os.getenv("VAYBOMETER_CACHE_DIR") or ".cache") / "sections.json"
+
+
+def always(_value: Any) -> bool:
+    """usable для разделов, где пустой результат — тоже ответ (нет толчков и т. п.)."""
+    return True
+
+
+def _present(value: Any) -> bool:
+    return value is not None and value != {} and value != [] and value != ""
+
+
+def _load(path: Optional[Path]) -> Dict[str, Any]:
+    if path is None or not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception as e:
+        logging.warning("sections: кэш %s не прочитан: %s", path, e)
+        return {}
+
+
+class _Task:
+    def __init__(self, name: str, usable: Callable[[Any], bool], max_age_h: float, cache: bool):
+        self.name = name
+        self.usable = usable
+        self.max_age_h = max_age_h
+        self.cache = cache
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.span: Any = None
+        self.outcome: Optional[Dict[str, Any]] = None
+
+
+class SectionPlan:
+    """Набор разделов одного поста с общим дедлайном и кэшем последних удачных данных."""
+
+    def __init__(self, kind: str, deadline_s: Optional[float] = None, day: Optional[str] = None) -> None:
+        self.kind = kind
+        self.day = day
+        self.deadline = Deadline(DEADLINE_S if deadline_s is None else deadline_s)
+        self._path = cache_path()
+        self._cached: Dict[str, Any] = (_load(self._path).get(kind) or {}) if self._path else {}
+        self._fresh: Dict[str, Any] = {}
+        self._tasks: Dict[str, _Task] = {}
+
+    # ───────────────────────── запуск ─────────────────────────
+    def start(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        usable: Callable[[Any], bool] = _present,
+        max_age_h: Optional[float] = None,
+        cache: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        """Запустить источник раздела в daemon-потоке (внутри текущего спана)."""
+        task = _Task(name, usable, DEFAULT_MAX_AGE_H if max_age_h is None else max_age_h, cache)
+        self._tasks[name] = task
+
+        def _run() -> None:
+            try:
+                with tracing.span(f"section.{name}") as sp:
+                    task.span = sp
+                    task.value = fn(*args, **kwargs)
+            except BaseException as e:  # noqa: BLE001 — ошибка уходит в outcome раздела
+                task.error = e
+            finally:
+                task.done.set()
+
+        ctx = contextvars.copy_context()
+        threading.Thread(target=ctx.run, args=(_run,), name=f"section-{name}", daemon=True).start()
+
+    # ───────────────────────── результат ─────────────────────────
+    def get(self, name: str, default: Any = None) -> Any:
+        """Свежий результат, иначе кэш не старше max_age_h, иначе default."""
+        task = self._tasks.get(name)
+        if task is None:
+            return default
+        if task.outcome is not None:
+            return task.value if task.outcome["outcome"] == "fresh" else self._fallback(task, default)[0]
+
+        if not task.done.wait(self.deadline.left()):
+            reason = "timeout"
+        elif task.error is not None:
+            reason = "error"
+            logging.warning("sections: %s — ошибка: %s", name, task.error)
+        elif not task.usable(task.value):
+            reason = "empty"
+        else:
+            task.outcome = {"outcome": "fresh"}
+            if task.span is not None:
+                task.span.set(outcome="fresh")
+            if task.cache:
+                self._fresh[name] = task.value
+            return task.value
+
+        value, age_s = self._fallback(task, default)
+        task.outcome = {"outcome": "omitted" if age_s is None else "cached", "reason": reason}
+        if age_s is not None:
+            task.outcome["cache_age_s"] = age_s
+        if task.span is not None:
+            task.span.set(**task.outcome)
+        logging.warning(
+            "sections: %s — %s (%s)%s",
+            name,
+            task.outcome["outcome"],
+            reason,
+            f", кэш {age_s // 60} мин" if age_s is not None else "",
+        )
+        return value
+
+    def _fallback(self, task: _Task, default: Any) -> tuple:
+        entry = self._cached.get(task.name) if task.cache else None
+        if not isinstance(entry, dict) or "value" not in entry:
+            return default, None
+        if self.day and entry.get("day") != self.day:
+            return default, None
+        age_s = int(time.time() - float(entry.get("at") or 0))
+        if age_s < 0 or age_s > task.max_age_h * 3600:
+            return default, None
+        return entry["value"], age_s
+
+    def degraded(self) -> Dict[str, Dict[str, Any]]:
+        """Разделы, отрисованные не из свежих данных: name → outcome."""
+        return {n: t.outcome for n, t in self._tasks.items() if t.outcome and t.outcome["outcome"] != "fresh"}
+
+    # ───────────────────────── завершение ─────────────────────────
+    def finish(self) -> Dict[str, Dict[str, Any]]:
+        """Сводка деградаций — в текущий спан; свежие результаты — в кэш."""
+        degraded = self.degraded()
+        tracing.note(degraded=degraded)
+        if degraded:
+            logging.warning("sections %s: деградировали %s", self.kind, ", ".join(sorted(degraded)))
+        if self._path is not None and self._fresh:
+            self._save()
+        return degraded
+
+    def _save(self) -> None:
+        assert self._path is not None
+        now = time.time()
+        data = _load(self._path)
+        entries = data.setdefault(self.kind, {})
+        skipped: List[str] = []
+        for name, value in self._fresh.items():
+            try:
+                json.dumps(value, ensure_ascii=False)
+            except (TypeError, ValueError):
+                skipped.append(name)
+                continue
+            entries[name] = {"at": now, "day": self.day, "value": value}
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self._path)
+        except Exception as e:
+            logging.warning("sections: кэш %s не записан: %s", self._path, e)
+        if skipped:
+            logging.debug("sections: не в JSON, без кэша: %s", ", ".join(skipped))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+send_pipeline.py — асинхронная доставка поста: текст не ждёт картинку.
+
+Блокирующие шаги (build_message с десятками HTTP-запросов, генерация
+картинки у провайдеров) выполняются в фоновых daemon-потоках и не держат
+event loop. Текст уходит, как только готов; фото — следом, как только
+готово, но не позже общего дедлайна POST_IMAGE_DEADLINE_S (отсчёт от
+старта пайплайна). Просроченная картинка просто не отправляется: daemon-поток
+не задерживает завершение процесса (ThreadPoolExecutor/asyncio.to_thread
+ждали бы его при выходе из asyncio.run).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from tg_delivery import delivery_for
+
+T = TypeVar("T")
+
+IMAGE_DEADLINE_S = float(os.getenv("POST_IMAGE_DEADLINE_S", "300"))
+
+
+def in_thread(fn: Callable[..., T], *args: Any, name: str = "post-worker", **kwargs: Any) -> "asyncio.Future[T]":
+    """Запускает fn в daemon-потоке; результат/исключение — в asyncio.Future текущего loop."""
+    loop = asyncio.get_running_loop()
+    fut: "asyncio.Future[T]" = loop.create_future()
+
+    def _settle(ok: bool, value: Any) -> None:
+        if fut.done():
+            return
+        if ok:
+            fut.set_result(value)
+        else:
+            fut.set_exception(value)
+
+    def _run() -> None:
+        try:
+            res = fn(*args, **kwargs)
+        except BaseException as e:  # noqa: BLE001 — исключение уходит в Future
+            ok, res = False, e
+        else:
+            ok = True
+        try:
+            loop.call_soon_threadsafe(_settle, ok, res)
+        except RuntimeError:
+            pass  # loop уже закрыт — результат никому не нужен
+
+    # контекст вызывающего (текущий спан tracing) — и в потоке
+    threading.Thread(target=contextvars.copy_context().run, args=(_run,), name=name, daemon=True).start()
+    return fut
+
+
+class Deadline:
+    """Общий дедлайн пайплайна: сколько секунд осталось от старта."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = float(seconds)
+        self.started = time.monotonic()
+
+    def left(self) -> float:
+        return max(0.0, self.seconds - (time.monotonic() - self.started))
+
+
+async def wait_or_none(fut: "Awaitable[T]", deadline: Deadline, what: str) -> Optional[T]:
+    """Ждёт результат не дольше остатка дедлайна; ошибка/таймаут → None (с логом)."""
+    try:
+        return await asyncio.wait_for(asyncio.shield(fut), timeout=deadline.left())
+    except asyncio.TimeoutError:
+        logging.warning("%s: не успели за %.0f с — пропускаем", what, deadline.seconds)
+    except Exception:
+        logging.exception("%s: ошибка", what)
+    return None
+
+
+async def send_photo_file(bot: Any, chat_id: Any, path: Optional[str], caption: str, **kwargs: Any) -> Any:
+    """send_photo из файла через tg_delivery (темп, RetryAfter, file_id); None, если файла нет."""
+    if not path or not Path(path).exists():
+        return None
+    res = (await delivery_for(bot).send_photo([chat_id], path, caption, **kwargs)).get(chat_id)
+    if isinstance(res, BaseException):
+        raise res
+    return res
@@ -12,8 +12,11 @@ import re
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
+from zoneinfo import ZoneInfo
 
 from editorial_voice import build_weekly_meaning
+from lunar import get_moment_lunar_info
+from lunar_ephemeris import EphemerisSamples, ephemeris_from_calendar
 
 REGION_NAME = "Калининград"
 TZ_STR = os.getenv("TZ", "Europe/Kaliningrad")
@@ -113,6 +116,9 @@ def _fetch_sea_temps() -> list[float]:
     temps: list[float] = []
     try:
         from air import get_sst  # type: ignore
+        from marine import prefetch  # type: ignore
+
+        prefetch(coords for _name, coords in SEA_POINTS)
     except Exception:
         return temps
     for _name, coords in SEA_POINTS:
@@ -134,11 +140,25 @@ def _fetch_kp() -> tuple[float | None, str, int | None, str]:
         return None, "н/д", None, "n/d"
 
 
+# daily-ключ строки → почасовая переменная, из суточной сводки которой берётся замена
+_HOURLY_FALLBACK = {
+    "tmax": ("temperature_2m", "max"),
+    "tmin": ("temperature_2m", "min"),
+    "wind": ("wind_speed_10m", "max"),
+    "gust": ("wind_gusts_10m", "max"),
+    "rain_prob": ("precipitation_probability", "max"),
+    "uv": ("uv_index", "max"),
+}
+
+
 def _daily_rows(weather_payload: dict[str, Any], start: date) -> list[dict[str, Any]]:
     daily = weather_payload.get("daily") if isinstance(weather_payload, dict) else {}
     if not isinstance(daily, dict):
         return []
-    times = daily.get("time") or daily.get("date") or []
+    from forecast import Forecast
+
+    fc = Forecast.of(weather_payload)
+    n_times = len(fc.days)
     dates = _week_dates(start)
 
     def arr(*names: str) -> list[Any]:
@@ -158,19 +178,23 @@ def _daily_rows(weather_payload: dict[str, Any], start: date) -> list[dict[str,
         "code": arr("weathercode", "weather_code"),
         "uv": arr("uv_index_max"),
     }
+    aggs = fc.aggregate(TZ_STR) if len(fc) else {}
     rows: list[dict[str, Any]] = []
     for idx in range(7):
         row_date = dates[idx]
-        src_idx = idx
-        if isinstance(times, list) and times:
-            try:
-                src_idx = [str(x)[:10] for x in times].index(row_date.isoformat())
-            except ValueError:
-                if idx >= len(times):
-                    continue
+        src_idx = fc.daily_index(row_date) if n_times else idx
+        if src_idx is None:
+            if idx >= n_times:
+                continue
+            src_idx = idx
         row = {"date": row_date}
         for key, values in arrays.items():
             row[key] = values[src_idx] if src_idx < len(values) else None
+        day = aggs.get(row_date)
+        if day is not None:
+            for key, (var, kind) in _HOURLY_FALLBACK.items():
+                if row[key] is None:
+                    row[key] = day.stat(var, kind)
         rows.append(row)
     return rows
 
@@ -343,21 +367,64 @@ def _load_astro_events(start: date, paths: list[Path] | None = None) -> list[dic
     return events
 
 
+_MOON_PEAKS = {
+    "full": ("🌕", "Полнолуние — лучше закрывать хвосты и подводить итоги."),
+    "new": ("🌑", "Новолуние — мягко планировать новое без рывков."),
+}
+
+
+def _exact_moon_peak(start: date, eph: EphemerisSamples | None) -> str | None:
+    """Точный момент полнолуния/новолуния недели по сетке эфемерид (местное время)."""
+    if eph is None:
+        return None
+    week = set(_week_dates(start))
+    tz = ZoneInfo(TZ_STR)
+    for event in eph.phase_instants():
+        if event["phase"] not in _MOON_PEAKS:
+            continue
+        local = datetime.fromtimestamp(event["ts"], tz)
+        if local.date() in week:
+            icon, text = _MOON_PEAKS[event["phase"]]
+            return f"{icon} {local.day:02d}.{local.month:02d}, {local:%H:%M}: {text}"
+    return None
+
+
+def _week_illumination(start: date, eph: EphemerisSamples | None) -> list[float]:
+    """Освещённость в местный полдень первого и последнего дня недели по сетке."""
+    if eph is None:
+        return []
+    tz = ZoneInfo(TZ_STR)
+    out: list[float] = []
+    for d in (start, start + timedelta(days=6)):
+        info = get_moment_lunar_info(datetime(d.year, d.month, d.day, 12, tzinfo=tz), eph)
+        if info is None:
+            return []
+        out.append(info["illumination"])
+    return out
+
+
 def _lunar_lines(start: date, lunar_data: dict[str, Any] | None, astro_events: list[dict[str, Any]]) -> list[str]:
     days = _calendar_days(lunar_data)
     records = [(d, days.get(d.isoformat(), {})) for d in _week_dates(start) if isinstance(days.get(d.isoformat(), {}), dict)]
+    eph = ephemeris_from_calendar(lunar_data)
     out: list[str] = []
-    for d, rec in records:
-        phase = str(rec.get("phase_name") or rec.get("phase") or "")
-        low = phase.lower()
-        if "полн" in low:
-            out.append(f"🌕 {d.day:02d}.{d.month:02d}: Полнолуние — лучше закрывать хвосты и подводить итоги.")
-            break
-        if "новол" in low:
-            out.append(f"🌑 {d.day:02d}.{d.month:02d}: Новолуние — мягко планировать новое без рывков.")
-            break
-    percents = [_num(rec.get("percent") or rec.get("illumination")) for _d, rec in records]
-    percents = [p for p in percents if p is not None]
+    peak = _exact_moon_peak(start, eph)
+    if peak:
+        out.append(peak)
+    else:
+        for d, rec in records:
+            phase = str(rec.get("phase_name") or rec.get("phase") or "")
+            low = phase.lower()
+            if "полн" in low:
+                out.append(f"🌕 {d.day:02d}.{d.month:02d}: {_MOON_PEAKS['full'][1]}")
+                break
+            if "новол" in low:
+                out.append(f"🌑 {d.day:02d}.{d.month:02d}: {_MOON_PEAKS['new'][1]}")
+                break
+    percents = _week_illumination(start, eph)
+    if not percents:
+        percents = [_num(rec.get("percent") or rec.get("illumination")) for _d, rec in records]
+        percents = [p for p in percents if p is not None]
     if percents:
         out.append(f"✨ Освещённость Луны: примерно {_fmt_num(percents[0])}→{_fmt_num(percents[-1])}% — темп недели лучше держать ровным.")
     voc = []
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sensor_stats.py — инкрементальная статистика и оценка аномальности рядов датчиков.
+
+Для каждой метрики (частота/амплитуда Шумана, γ-фон станции, Safecast µSv/h)
+хранится небольшое состояние:
+• EWMA среднего и дисперсии с полураспадом по времени (STATS_HALF_LIFE_H);
+• скользящее окно последних STATS_WINDOW_DAYS суток (ts, value) + отсортированная
+  копия значений → медиана и MAD без пересканирования истории.
+
+Обновление — O(1) по числу операций (bisect + сдвиг в окне из сотен точек),
+повтор того же ts (upsert текущего часа) заменяет последнюю точку, а не
+учитывает её дважды. Состояние лежит рядом с историей: x.json → x.stats.json.
+
+Посты читают готовое состояние: describe(value) даёт z-оценки и флаг
+«необычно для последних 7 дней» без загрузки полной истории.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+WINDOW_DAYS = float(os.getenv("STATS_WINDOW_DAYS", "7"))
+HALF_LIFE_H = float(os.getenv("STATS_HALF_LIFE_H", "24"))
+MIN_SAMPLES = int(os.getenv("STATS_MIN_SAMPLES", "12"))
+UNUSUAL_Z = float(os.getenv("STATS_UNUSUAL_Z", "3"))
+
+_MAD_TO_SIGMA = 1.4826  # MAD нормального распределения → σ
+
+
+class RollingStats:
+    """EWMA + скользящее окно (медиана/MAD) одной метрики."""
+
+    def __init__(self, window_s: Optional[float] = None, half_life_s: Optional[float] = None) -> None:
+        self.window_s = float(window_s if window_s is not None else WINDOW_DAYS * 86400)
+        self.half_life_s = float(half_life_s if half_life_s is not None else HALF_LIFE_H * 3600)
+        self.mean: Optional[float] = None
+        self.var = 0.0
+        self.last_ts: Optional[int] = None
+        self._prev: Optional[Tuple[Optional[float], float, Optional[int]]] = None  # до последней точки
+        self._window: deque = deque()
+        self._sorted: List[float] = []
+
+    # ───── обновление ─────
+    def update(self, ts: int, value: Optional[float]) -> bool:
+        """Добавляет точку; тот же ts — замена последней. Старые ts игнорируются."""
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+            return False
+        ts, value = int(ts), float(value)
+        if self.last_ts is not None and ts < self.last_ts:
+            return False
+        if self.last_ts is not None and ts == self.last_ts and self._prev is not None:
+            self.mean, self.var, self.last_ts = self._prev
+            _ts, old = self._window.pop()
+            del self._sorted[bisect_left(self._sorted, old)]
+
+        self._prev = (self.mean, self.var, self.last_ts)
+        if self.mean is None:
+            self.mean, self.var = value, 0.0
+        else:
+            dt = max(0, ts - (self.last_ts or ts))
+            alpha = 1.0 - 0.5 ** (dt / self.half_life_s) if self.half_life_s > 0 else 1.0
+            diff = value - self.mean
+            incr = alpha * diff
+            self.mean += incr
+            self.var = (1.0 - alpha) * (self.var + diff * incr)
+        self.last_ts = ts
+
+        self._window.append((ts, value))
+        insort(self._sorted, value)
+        while self._window and self._window[0][0] <= ts - self.window_s:
+            _ts, old = self._window.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+        return True
+
+    # ───── оценки ─────
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    @property
+    def median(self) -> Optional[float]:
+        s, n = self._sorted, len(self._sorted)
+        if not n:
+            return None
+        return s[n // 2] if n % 2 else (s[n // 2 - 1] + s[n // 2]) / 2.0
+
+    @property
+    def mad(self) -> Optional[float]:
+        med = self.median
+        if med is None:
+            return None
+        dev = sorted(abs(v - med) for v in self._sorted)
+        n = len(dev)
+        return dev[n // 2] if n % 2 else (dev[n // 2 - 1] + dev[n // 2]) / 2.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(max(self.var, 0.0))
+
+    def zscore(self, value: float) -> Optional[float]:
+        """Отклонение от EWMA в σ; None, пока данных мало или разброса нет."""
+        if self.mean is None or len(self) < MIN_SAMPLES or self.std <= 0:
+            return None
+        return (float(value) - self.mean) / self.std
+
+    def robust_z(self, value: float) -> Optional[float]:
+        """Отклонение от медианы окна в единицах MAD·1.4826 (устойчиво к выбросам)."""
+        med, mad = self.median, self.mad
+        if med is None or len(self) < MIN_SAMPLES or not mad:
+            return None
+        return (float(value) - med) / (mad * _MAD_TO_SIGMA)
+
+    def describe(self, value: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Сводка для постов: {"n", "median", "mad", "ewma", "std", "z", "robust_z",
+        "unusual": bool, "direction": "↑|↓|→"}; value по умолчанию — последняя точка.
+        """
+        if value is None and self._window:
+            value = self._window[-1][1]
+        z = self.zscore(value) if value is not None else None
+        rz = self.robust_z(value) if value is not None else None
+        score = rz if rz is not None else z
+        unusual = score is not None and abs(score) >= UNUSUAL_Z
+        return {
+            "n": len(self),
+            "median": self.median,
+            "mad": self.mad,
+            "ewma": self.mean,
+            "std": self.std,
+            "z": z,
+            "robust_z": rz,
+            "unusual": unusual,
+            "direction": ("↑" if score > 0 else "↓") if unusual else "→",
+        }
+
+    # ───── сериализация ─────
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "window_s": self.window_s,
+            "half_life_s": self.half_life_s,
+            "mean": self.mean,
+            "var": self.var,
+            "last_ts": self.last_ts,
+            "prev": list(self._prev) if self._prev is not None else None,
+            "window": [[t, v] for t, v in self._window],
+        }
+
+    @classmethod
+    def from_json(cls, obj: Dict[str, Any]) -> "RollingStats":
+        st = cls(obj.get("window_s"), obj.get("half_life_s"))
+        st.mean = obj.get("mean")
+        st.var = float(obj.get("var") or 0.0)
+        st.last_ts = obj.get("last_ts")
+        prev = obj.get("prev")
+        st._prev = (prev[0], float(prev[1]), prev[2]) if isinstance(prev, list) and len(prev) == 3 else None
+        st._window = deque((int(t), float(v)) for t, v in obj.get("window") or [])
+        st._sorted = sorted(v for _t, v in st._window)
+        return st
+
+
+# ───── набор метрик в файле рядом с историей ─────
+def stats_path_for(path: str) -> str:
+    """x.json / x.bin → x.stats.json."""
+    root, ext = os.path.splitext(str(path))
+    return (root if ext.lower() in (".json", ".bin") else str(path)) + ".stats.json"
+
+
+class StatsBook:
+    """Именованные RollingStats, сохраняемые одним JSON (атомарно)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+        self.series: Dict[str, RollingStats] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, obj in (data.get("series") or {}).items():
+                self.series[key] = RollingStats.from_json(obj)
+        except Exception:
+            self.series = {}
+
+    def get(self, key: str) -> Optional[RollingStats]:
+        return self.series.get(key)
+
+    def update(
+        self,
+        key: str,
+        ts: int,
+        value: Optional[float],
+        seed: Optional[Callable[[float], Iterable[Tuple[int, Optional[float]]]]] = None,
+    ) -> RollingStats:
+        """
+        Обновляет метрику key. Если её ещё нет, seed(since_ts) отдаёт точки
+        (ts, value) истории за окно — они проигрываются один раз, дальше
+        только инкрементальные обновления.
+        """
+        st = self.series.get(key)
+        if st is None:
+            st = self.series[key] = RollingStats()
+            for t, v in (seed(int(ts) - st.window_s) if seed else ()):
+                st.update(t, v)
+        st.update(ts, value)
+        return st
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"series": {k: s.to_json() for k, s in self.series.items()}}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def describe_latest(history_path: str, key: str, value: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """describe() метрики key из состояния рядом с history_path; None, если состояния нет."""
+    st = StatsBook(stats_path_for(history_path)).get(key)
+    return st.describe(value) if st is not None and len(st) else None
@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+snapshots.py
+~~~~~~~~~~~~
+
+Архив сырых ответов API за запуск поста и офлайн-повтор (replay).
+
+Запись: recording(label, ...) на время сборки поста перехватывает HTTP
+(requests — погода, воздух, marine, ЦБ, землетрясения, Safecast …;
+urllib.request.urlopen со строковым URL — Kp SWPC) и ответы LLM
+(gpt.gpt_complete через memo("llm", …)). На выходе — один сжатый файл
+SNAPSHOT_DIR/<UTC-время, мс>-<label>.json.gz: ответы, итоговый текст поста,
+момент «сейчас» поста, зерно random и флаги окружения, влияющие на текст.
+
+Хранение — дельтой к предыдущему снимку: каждый массив скаляров длиной от
+SNAPSHOT_MIN_ARRAY заменяется ссылкой {"$a": хэш}, а сам массив пишется, только
+если его нет ни в этом снимке, ни в цепочке предыдущих (оси времени, не
+изменившиеся за час ряды и т. п.). Каждые SNAPSHOT_KEYFRAME снимков цепочка
+начинается заново; хранится SNAPSHOT_KEEP последних снимков (плюс их базы).
+
+Повтор: replaying(path) отдаёт записанные ответы вместо сети (неизвестный
+запрос — ConnectionError, как при недоступном API), фиксирует time.time(),
+datetime.now()/date.today() и pendulum.now() на моменте записи, гасит
+time.sleep и сеет random тем же зерном — пост собирается детерминированно,
+на день записи и за миллисекунды:
+
+    python post_kld.py --replay latest
+    python safe_test_post.py --replay .cache/snapshots/20261018T003012417Z-safe-morning.json.gz
+
+Ключи API в URL (appid, key, token …, токен бота в пути) в архив не попадают:
+ключ запроса и тексты ошибок проходят через _redact — и при записи, и при
+поиске ответа на повторе. Локальные файлы состояния (fx_cache.json, кэши
+Kp/Шумана) читаются как есть. SNAPSHOTS=0 выключает запись.
+"""
+
+from __future__ import annotations
+
+import base64
+import contextlib
+import datetime as _dt
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pendulum
+import requests
+from requests.structures import CaseInsensitiveDict
+
+SNAPSHOT_DIR = Path(
+    os.getenv("SNAPSHOT_DIR")
+    or Path(os.getenv("VAYBOMETER_CACHE_DIR") or ".cache") / "snapshots"
+)
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "60"))
+SNAPSHOT_KEYFRAME = int(os.getenv("SNAPSHOT_KEYFRAME", "24"))
+SNAPSHOT_MIN_ARRAY = int(os.getenv("SNAPSHOT_MIN_ARRAY", "8"))
+SNAPSHOT_MAX_BODY = int(os.getenv("SNAPSHOT_MAX_BODY", str(2 * 1024 * 1024)))
+
+# флаги окружения, от которых зависит текст поста (секреты и чаты — никогда)
+_ENV_PREFIXES = (
+    "FORMAT_V2", "MORNING_", "EVENING_", "KLD_", "SHOW_", "DAY_OFFSET", "ASTRO_OFFSET",
+    "POST_MODE", "DISABLE_", "GEN_", "REGION_GRID", "WEATHER_", "TZ",
+)
+_ENV_SECRET = ("KEY", "TOKEN", "SECRET", "PASSWORD", "CHANNEL", "CHAT")
+# секретные параметры запроса (OpenWeather appid, IQAir key …) и токен бота в пути
+_SECRET_PARAM = re.compile(
+    r"([?&](?:appid|key|api_?key|apikey|token|access_token|secret|password|auth)=)[^&#\s'\"]*",
+    re.IGNORECASE,
+)
+_BOT_TOKEN = re.compile(r"/bot\d+:[\w-]+")
+
+_real_request = requests.sessions.Session.request
+_real_urlopen = urllib.request.urlopen
+_real_time = time.time
+_real_sleep = time.sleep
+_real_datetime = _dt.datetime
+_real_date = _dt.date
+
+_ACTIVE: Optional["_Session"] = None
+_LOCK = threading.Lock()
+
+
+def _env_on(name: str, default: bool) -> bool:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return str(v).strip().lower() in ("1", "true", "yes", "on")
+
+
+def enabled() -> bool:
+    return _env_on("SNAPSHOTS", True)
+
+
+# ───────────────────────── тела ответов ─────────────────────────
+def _redact(text: str) -> str:
+    """Значения секретных параметров и токен бота → ***."""
+    return _BOT_TOKEN.sub("/bot***", _SECRET_PARAM.sub(r"\1***", text))
+
+
+def _request_key(method: str, url: str, params: Any = None, body: Any = None) -> str:
+    full = requests.Request(method.upper(), url, params=params).prepare().url or url
+    key = f"{method.upper()} {_redact(full)}"
+    if body:
+        raw = body if isinstance(body, bytes) else json.dumps(body, sort_keys=True, default=str).encode()
+        key += " #" + hashlib.sha1(raw).hexdigest()[:12]
+    return key
+
+
+def _path_of(key: str) -> str:
+    return key.split("?", 1)[0].split(" #", 1)[0]
+
+
+def _encode_body(content: bytes, content_type: str) -> Dict[str, Any]:
+    if len(content) > SNAPSHOT_MAX_BODY:
+        return {"skipped": len(content)}
+    try:
+        text = content.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(content).decode("ascii")}
+    if "json" in content_type or text[:1] in ("{", "["):
+        try:
+            return {"json": json.loads(text)}
+        except ValueError:
+            pass
+    return {"text": text}
+
+
+def _decode_body(rec: Dict[str, Any]) -> bytes:
+    if "json" in rec:
+        return json.dumps(rec["json"], ensure_ascii=False).encode("utf-8")
+    if "text" in rec:
+        return rec["text"].encode("utf-8")
+    return base64.b64decode(rec.get("b64") or "")
+
+
+class _UrlBody(BytesIO):
+    """Ответ urlopen, уже прочитанный в память (read()/with/status/headers)."""
+
+    def __init__(self, content: bytes, url: str, status: int, content_type: str):
+        super().__init__(content)
+        self.url = url
+        self.status = status
+        self.headers = {"Content-Type": content_type}
+
+    def geturl(self) -> str:
+        return self.url
+
+    def getcode(self) -> int:
+        return self.status
+
+
+# ───────────────────────── дельта-хранилище ─────────────────────────
+def _digest(arr: List[Any]) -> str:
+    raw = json.dumps(arr, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _is_unit(obj: Any) -> bool:
+    return (
+        isinstance(obj, list)
+        and len(obj) >= SNAPSHOT_MIN_ARRAY
+        and all(v is None or isinstance(v, (int, float, str, bool)) for v in obj)
+    )
+
+
+def _pack(obj: Any, blobs: Dict[str, list], inherited: set) -> Any:
+    if _is_unit(obj):
+        h = _digest(obj)
+        if h not in inherited:
+            blobs.setdefault(h, obj)
+        return {"$a": h}
+    if isinstance(obj, dict):
+        return {k: _pack(v, blobs, inherited) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_pack(v, blobs, inherited) for v in obj]
+    return obj
+
+
+def _unpack(obj: Any, blobs: Dict[str, list]) -> Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and "$a" in obj:
+            return list(blobs[obj["$a"]])
+        return {k: _unpack(v, blobs) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_unpack(v, blobs) for v in obj]
+    return obj
+
+
+def _read_raw(path: Path) -> Dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _chain(path: Path) -> List[Dict[str, Any]]:
+    """Снимок и его базы (от новых к старым)."""
+    out: List[Dict[str, Any]] = []
+    cur: Optional[Path] = path
+    while cur is not None:
+        raw = _read_raw(cur)
+        out.append(raw)
+        cur = path.parent / raw["base"] if raw.get("base") else None
+    return out
+
+
+def load(path: str | Path) -> Dict[str, Any]:
+    """Снимок с развёрнутыми массивами (ответы, текст, мета)."""
+    chain = _chain(Path(path))
+    blobs: Dict[str, list] = {}
+    for raw in reversed(chain):
+        blobs.update(raw.get("blobs") or {})
+    snap = dict(chain[0])
+    snap.pop("blobs", None)
+    snap["exchanges"] = _unpack(snap.get("exchanges") or [], blobs)
+    return snap
+
+
+def list_snapshots(directory: Path | None = None, label: str = "") -> List[Path]:
+    d = directory or SNAPSHOT_DIR
+    files = sorted(d.glob("*.json.gz")) if d.is_dir() else []
+    return [p for p in files if not label or p.name.endswith(f"-{label}.json.gz")]
+
+
+def resolve(spec: str, label: str = "") -> Path:
+    """Путь к снимку: файл или 'latest' (последний, с label — последний такого типа)."""
+    if spec and spec != "latest":
+        return Path(spec)
+    found = list_snapshots(label=label) or list_snapshots()
+    if not found:
+        raise FileNotFoundError(f"нет снимков в {SNAPSHOT_DIR}")
+    return found[-1]
+
+
+def save(snap: Dict[str, Any], directory: Path | None = None) -> Path:
+    """Записать снимок дельтой к последнему в directory и подрезать архив."""
+    d = directory or SNAPSHOT_DIR
+    d.mkdir(parents=True, exist_ok=True)
+    previous = list_snapshots(d)
+    base: Optional[Path] = previous[-1] if previous else None
+    inherited: set = set()
+    depth = 0
+    if base is not None:
+        try:
+            chain = _chain(base)
+            depth = len(chain)
+            if depth >= SNAPSHOT_KEYFRAME:
+                base, depth = None, 0
+            else:
+                for raw in chain:
+                    inherited.update((raw.get("blobs") or {}).keys())
+        except Exception as e:
+            logging.warning("snapshots: база %s не читается (%s) — пишу полный снимок", base, e)
+            base, depth, inherited = None, 0, set()
+
+    blobs: Dict[str, list] = {}
+    body = dict(snap)
+    body["exchanges"] = _pack(snap.get("exchanges") or [], blobs, inherited)
+    body.update(version=1, base=base.name if base else None, depth=depth, blobs=blobs)
+
+    now = _real_time()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"{int(now * 1000) % 1000:03d}Z"
+    path = d / f"{stamp}-{snap.get('label') or 'run'}.json.gz"
+    n = 1
+    while path.exists():
+        n += 1
+        path = d / f"{stamp}.{n}-{snap.get('label') or 'run'}.json.gz"
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=9) as fh:
+        json.dump(body, fh, ensure_ascii=False, separators=(",", ":"), default=str)
+    os.replace(tmp, path)
+    prune(SNAPSHOT_KEEP, d)
+    return path
+
+
+def prune(keep: int, directory: Path | None = None) -> List[Path]:
+    """Оставить keep последних снимков и всё, на что они ссылаются."""
+    files = list_snapshots(directory)
+    if keep <= 0 or len(files) <= keep:
+        return []
+    needed = set()
+    for p in files[-keep:]:
+        cur: Optional[Path] = p
+        while cur is not None and cur.name not in needed:
+            needed.add(cur.name)
+            try:
+                base = _read_raw(cur).get("base")
+            except Exception:
+                base = None
+            cur = cur.parent / base if base else None
+    removed = [p for p in files if p.name not in needed]
+    for p in removed:
+        p.unlink(missing_ok=True)
+    return removed
+
+
+# ───────────────────────── перехват ─────────────────────────
+class _Session:
+    def _install(self) -> None:
+        global _ACTIVE
+        with _LOCK:
+            if _ACTIVE is not None:
+                raise RuntimeError("snapshots: запись/повтор уже активны")
+            _ACTIVE = self
+        requests.sessions.Session.request = _patched_request  # type: ignore[method-assign]
+        urllib.request.urlopen = _patched_urlopen  # type: ignore[assignment]
+
+    def _uninstall(self) -> None:
+        global _ACTIVE
+        requests.sessions.Session.request = _real_request  # type: ignore[method-assign]
+        urllib.request.urlopen = _real_urlopen  # type: ignore[assignment]
+        with _LOCK:
+            _ACTIVE = None
+
+
+class Recorder(_Session):
+    def __init__(self, label: str, meta: Dict[str, Any]):
+        self.label = label
+        self.meta = meta
+        self.seed = int(_real_time())
+        self.exchanges: List[Dict[str, Any]] = []
+        self.llm: Dict[str, str] = {}
+        self.text: Optional[str] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add(self, key: str, **rec: Any) -> None:
+        with self._lock:
+            self.exchanges.append({"key": key, **rec})
+
+    def snapshot(self) -> Dict[str, Any]:
+        env = {
+            k: v for k, v in os.environ.items()
+            if k.startswith(_ENV_PREFIXES) and not any(s in k for s in _ENV_SECRET)
+        }
+        return {
+            "label": self.label,
+            "taken_at": _real_time(),
+            "seed": self.seed,
+            "meta": self.meta,
+            "env": env,
+            "exchanges": self.exchanges,
+            "llm": self.llm,
+            "text": self.text,
+            "error": self.error,
+        }
+
+
+class Replayer(_Session):
+    def __init__(self, snap: Dict[str, Any]):
+        self.snap = snap
+        self._exact: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_path: Dict[str, List[Dict[str, Any]]] = {}
+        for rec in snap.get("exchanges") or []:
+            self._exact.setdefault(rec["key"], []).append(rec)
+            self._by_path.setdefault(_path_of(rec["key"]), []).append(rec)
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.misses: List[str] = []
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return self.snap.get("meta") or {}
+
+    @property
+    def text(self) -> Optional[str]:
+        return self.snap.get("text")
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Ответ на запрос: сначала точное совпадение URL+параметров, иначе тот же
+        путь (параметры со временем «сейчас», как у землетрясений); записи одного
+        ключа отдаются по порядку, последняя — повторно.
+        """
+        with self._lock:
+            for table, k in ((self._exact, key), (self._by_path, _path_of(key))):
+                recs = table.get(k)
+                if recs:
+                    i = self._served.get(k, 0)
+                    self._served[k] = i + 1
+                    return recs[min(i, len(recs) - 1)]
+            self.misses.append(key)
+            return None
+
+
+def _patched_request(session, method, url, *args, **kwargs):
+    active = _ACTIVE
+    params = kwargs.get("params", args[0] if args else None)
+    body = kwargs.get("json") or kwargs.get("data")
+    key = _request_key(method, url, params, body)
+    if isinstance(active, Replayer):
+        rec = active.lookup(key)
+        if rec is None or "skipped" in rec:
+            raise requests.ConnectionError(f"replay: {key} нет в снимке")
+        if "error" in rec:
+            raise requests.ConnectionError(f"replay: {rec['error']}")
+        resp = requests.models.Response()
+        resp.status_code = int(rec.get("status") or 200)
+        resp.reason = "replay"
+        resp.url = key.split(" ", 1)[1].split(" #", 1)[0]
+        resp.headers = CaseInsensitiveDict({"Content-Type": rec.get("content_type") or ""})
+        resp._content = _decode_body(rec)
+        resp.encoding = "utf-8"
+        return resp
+
+    try:
+        resp = _real_request(session, method, url, *args, **kwargs)
+    except Exception as e:
+        if isinstance(active, Recorder):
+            active.add(key, error=_redact(f"{type(e).__name__}: {e}"))
+        raise
+    if isinstance(active, Recorder) and not kwargs.get("stream"):
+        ctype = resp.headers.get("Content-Type", "")
+        active.add(key, status=resp.status_code, content_type=ctype, **_encode_body(resp.content, ctype))
+    return resp
+
+
+def _patched_urlopen(url, *args, **kwargs):
+    active = _ACTIVE
+    if not isinstance(url, str):  # Request-объекты (генерация картинок) — мимо архива
+        if isinstance(active, Replayer):
+            raise urllib.error.URLError("replay: сеть отключена")
+        return _real_urlopen(url, *args, **kwargs)
+    key = _request_key("GET", url)
+    if isinstance(active, Replayer):
+        rec = active.lookup(key)
+        if rec is None or "error" in rec or "skipped" in rec:
+            raise urllib.error.URLError(f"replay: {key} нет в снимке")
+        return _UrlBody(_decode_body(rec), url, int(rec.get("status") or 200), rec.get("content_type") or "")
+
+    try:
+        with _real_urlopen(url, *args, **kwargs) as resp:
+            content = resp.read()
+            status = int(getattr(resp, "status", 200) or 200)
+            ctype = resp.headers.get("Content-Type", "") if getattr(resp, "headers", None) else ""
+    except Exception as e:
+        if isinstance(active, Recorder):
+            active.add(key, error=_redact(f"{type(e).__name__}: {e}"))
+        raise
+    if isinstance(active, Recorder):
+        active.add(key, status=status, content_type=ctype, **_encode_body(content, ctype))
+    return _UrlBody(content, url, status, ctype)
+
+
+# ───────────────────────── часы повтора ─────────────────────────
+class _FrozenMeta(type):
+    """isinstance/issubclass с подменённым классом смотрят на настоящий datetime/date."""
+
+    def __instancecheck__(cls, obj: Any) -> bool:
+        return isinstance(obj, cls._real)  # type: ignore[attr-defined]
+
+    def __subclasscheck__(cls, sub: type) -> bool:
+        return issubclass(sub, cls._real)  # type: ignore[attr-defined]
+
+
+class _FrozenDatetime(_real_datetime, metaclass=_FrozenMeta):
+    """datetime, у которого «сейчас» — подменённое time.time() повтора."""
+
+    _real = _real_datetime
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> Any:
+        return _real_datetime(*args, **kwargs)
+
+    @classmethod
+    def now(cls, tz: Optional[_dt.tzinfo] = None) -> Any:
+        return _real_datetime.fromtimestamp(time.time(), tz)
+
+    @classmethod
+    def utcnow(cls) -> Any:
+        return _real_datetime.fromtimestamp(time.time(), _dt.timezone.utc).replace(tzinfo=None)
+
+    @classmethod
+    def today(cls) -> Any:
+        return cls.now()
+
+
+class _FrozenDate(_real_date, metaclass=_FrozenMeta):
+    _real = _real_date
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> Any:
+        return _real_date(*args, **kwargs)
+
+    @classmethod
+    def today(cls) -> Any:
+        return _real_date.fromtimestamp(time.time())
+
+
+def _freeze_clock_classes() -> List[tuple]:
+    """
+    Подменить datetime.datetime/datetime.date и их копии, импортированные
+    модулями (from datetime import datetime, date) — как это делает freezegun.
+    pendulum.now() берёт время через datetime.datetime.now и замораживается тоже.
+    """
+    swapped: List[tuple] = []
+    for name, mod in list(sys.modules.items()):
+        if mod is None or name == __name__ or name in ("_datetime", "_pydatetime"):
+            continue
+        namespace = getattr(mod, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for attr, value in list(namespace.items()):
+            if value is _real_datetime:
+                fake: type = _FrozenDatetime
+            elif value is _real_date:
+                fake = _FrozenDate
+            else:
+                continue
+            swapped.append((namespace, attr, value))
+            namespace[attr] = fake
+    return swapped
+
+
+def _thaw_clock_classes(swapped: List[tuple]) -> None:
+    for namespace, attr, value in reversed(swapped):
+        namespace[attr] = value
+
+
+def memo(kind: str, key: str, compute: Callable[[], str]) -> str:
+    """
+    Нетранспортные ответы (LLM): при записи — вычислить и запомнить, при
+    повторе — записанное значение ("" если его не было), иначе — просто compute().
+    """
+    active = _ACTIVE
+    if isinstance(active, Replayer):
+        return (active.snap.get(kind) or {}).get(key, "")
+    value = compute()
+    if isinstance(active, Recorder):
+        with active._lock:
+            getattr(active, kind)[key] = value
+    return value
+
+
+# ───────────────────────── контексты ─────────────────────────
+@contextlib.contextmanager
+def recording(label: str, directory: Path | None = None, **meta: Any) -> Iterator[Optional[Recorder]]:
+    """
+    Записать ответы API за время блока в снимок (rec.text — итоговый пост).
+    При SNAPSHOTS=0 или уже активной записи отдаёт None и ничего не пишет.
+    """
+    if not enabled() or _ACTIVE is not None:
+        yield None
+        return
+    rec = Recorder(label, meta)
+    random.seed(rec.seed)
+    rec._install()
+    try:
+        yield rec
+    except BaseException as e:
+        rec.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        rec._uninstall()
+        try:
+            path = save(rec.snapshot(), directory)
+            logging.info("snapshots: %d ответ(ов) → %s", len(rec.exchanges), path)
+        except Exception as e:
+            logging.warning("snapshots: снимок не записан: %s", e)
+
+
+@contextlib.contextmanager
+def replaying(source: str | Path | Dict[str, Any]) -> Iterator[Replayer]:
+    """
+    Собрать пост офлайн из снимка (путь или уже загруженный dict): сеть,
+    время (time.time, datetime.now/date.today, pendulum.now), sleep и random —
+    из записи: повтор в другой день собирает пост на день записи.
+    """
+    snap = source if isinstance(source, dict) else load(source)
+    rep = Replayer(snap)
+    saved_env = {k: os.environ.get(k) for k in snap.get("env") or {}}
+    os.environ.update(snap.get("env") or {})
+    t0 = time.monotonic()
+    taken_at = float(snap.get("taken_at") or _real_time())
+    time.time = lambda: taken_at + (time.monotonic() - t0)  # type: ignore[assignment]
+    time.sleep = lambda _s=0: None  # type: ignore[assignment]
+    frozen = _freeze_clock_classes()
+    try:
+        # с time-machine (extra «test» у pendulum) — штатная заморозка pendulum;
+        # без неё pendulum.now() и так идёт через подменённый datetime.now
+        pendulum.travel_to(pendulum.from_timestamp(taken_at), freeze=True)
+        travelled = True
+    except NotImplementedError:
+        travelled = False
+    random.seed(snap.get("seed"))
+    rep._install()
+    try:
+        yield rep
+    finally:
+        rep._uninstall()
+        if travelled:
+            pendulum.travel_back()
+        _thaw_clock_classes(frozen)
+        time.time, time.sleep = _real_time, _real_sleep  # type: ignore[assignment]
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        if rep.misses:
+            logging.info("snapshots: %d запрос(ов) нет в снимке: %s", len(rep.misses), rep.misses[:5])
+
+
+def report_match(rep: Replayer, text: str) -> bool:
+    """Сравнить пост повтора с записанным; расхождение — в лог (unified diff)."""
+    recorded = rep.text
+    if recorded is None:
+        logging.info("snapshots: в снимке нет текста поста — сравнивать не с чем")
+        return False
+    if recorded == text:
+        logging.info("snapshots: повтор совпал с записанным постом")
+        return True
+    import difflib
+
+    diff = "\n".join(difflib.unified_diff(
+        recorded.splitlines(), text.splitlines(), "snapshot", "replay", lineterm="", n=1,
+    ))
+    logging.warning("snapshots: повтор отличается от записанного поста:\n%s", diff)
+    return False
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tg_delivery.py — доставка в Telegram с учётом лимитов и повторным
+использованием загруженных файлов.
+
+• Темп: не чаще TG_CHAT_INTERVAL_S на чат, для групп/каналов (id < 0, @name)
+  ещё и не больше TG_GROUP_PER_MIN в минуту, на бота — TG_GLOBAL_PER_S.
+  Слот резервируется заранее, поэтому куски поста уходят подряд: пауза
+  выдерживается только если сама отправка была быстрее интервала.
+• RetryAfter (429): ждём retry_after и повторяем; чат «замораживается» на
+  это время и для параллельных отправок. Сетевой сбой без ответа сервера —
+  повтор с экспоненциальной паузой; BadRequest и TimedOut не повторяются
+  (TimedOut мог дойти — дубль хуже пропуска).
+• Фото/альбом грузятся один раз: file_id из ответа первого чата
+  переиспользуется остальными (тест + прод = одна загрузка) и кэшируется в
+  TG_FILE_ID_CACHE по sha1 содержимого и id бота.
+• Несколько чатов — параллельно (asyncio.gather); внутри чата порядок
+  сохраняется. Ошибка одного чата не мешает остальным.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import tracing
+
+ChatId = Union[int, str]
+
+CHAT_INTERVAL_S = float(os.getenv("TG_CHAT_INTERVAL_S", "1.0"))
+GROUP_PER_MIN = int(os.getenv("TG_GROUP_PER_MIN", "20"))
+GLOBAL_PER_S = float(os.getenv("TG_GLOBAL_PER_S", "30"))
+SEND_RETRIES = int(os.getenv("TG_SEND_RETRIES", "3"))
+FILE_ID_CACHE = os.getenv("TG_FILE_ID_CACHE", os.path.join(".cache", "tg_file_ids.json"))
+FILE_ID_TTL_DAYS = float(os.getenv("TG_FILE_ID_TTL_DAYS", "30"))
+
+
+# ───── темп отправки ─────
+class _Pace:
+    """Минимальный интервал + (опционально) не больше per_min за 60 с."""
+
+    def __init__(self, interval: float, per_min: int = 0) -> None:
+        self.interval = max(0.0, float(interval))
+        self.per_min = max(0, int(per_min))
+        self.next_at = 0.0
+        self.recent: Deque[float] = deque()
+
+    def earliest(self, now: float) -> float:
+        at = max(now, self.next_at)
+        if self.per_min and len(self.recent) >= self.per_min:
+            at = max(at, self.recent[-self.per_min] + 60.0)
+        return at
+
+    def commit(self, at: float) -> None:
+        self.next_at = max(self.next_at, at + self.interval)
+        if self.per_min:
+            self.recent.append(at)
+            while len(self.recent) > self.per_min:
+                self.recent.popleft()
+
+    def hold(self, until: float) -> None:
+        self.next_at = max(self.next_at, until)
+
+
+def _is_group(chat_id: ChatId) -> bool:
+    if isinstance(chat_id, int):
+        return chat_id < 0
+    s = str(chat_id).strip()
+    return s.startswith("@") or s.startswith("-")
+
+
+def _retry_after_s(e: Exception) -> float:
+    ra = getattr(e, "retry_after", 1)
+    if isinstance(ra, timedelta):
+        return ra.total_seconds()
+    try:
+        return float(ra)
+    except Exception:
+        return 1.0
+
+
+def _photo_file_id(msg: Any) -> Optional[str]:
+    sizes = getattr(msg, "photo", None) or ()
+    return getattr(sizes[-1], "file_id", None) if sizes else None
+
+
+# ───── кэш file_id ─────
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _FileIdCache:
+    """{ "<bot_id>:<sha1>": {"file_id", "ts"} } — file_id привязан к боту."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path or None
+        self.items: Dict[str, Dict[str, Any]] = {}
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            cutoff = time.time() - FILE_ID_TTL_DAYS * 86400
+            self.items = {k: v for k, v in data.items() if isinstance(v, dict) and float(v.get("ts") or 0) >= cutoff}
+        except Exception:
+            self.items = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return (self.items.get(key) or {}).get("file_id")
+
+    def put(self, key: str, file_id: str) -> None:
+        self.items[key] = {"file_id": file_id, "ts": int(time.time())}
+        self._save()
+
+    def drop(self, key: str) -> None:
+        if self.items.pop(key, None) is not None:
+            self._save()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.items, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logging.warning("tg_delivery: file_id cache not saved: %s", e)
+
+
+# ───── доставка ─────
+class TelegramDelivery:
+    """Обёртка над telegram.Bot: темп, повторы, file_id, рассылка по чатам."""
+
+    def __init__(
+        self,
+        bot: Any,
+        *,
+        chat_interval: Optional[float] = None,
+        group_per_min: Optional[int] = None,
+        global_per_s: Optional[float] = None,
+        retries: Optional[int] = None,
+        cache_path: Optional[str] = FILE_ID_CACHE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.bot = bot
+        self.chat_interval = CHAT_INTERVAL_S if chat_interval is None else float(chat_interval)
+        self.group_per_min = GROUP_PER_MIN if group_per_min is None else int(group_per_min)
+        rate = GLOBAL_PER_S if global_per_s is None else float(global_per_s)
+        self.retries = SEND_RETRIES if retries is None else int(retries)
+        self.clock = clock
+        self._global = _Pace(1.0 / rate if rate > 0 else 0.0)
+        self._chats: Dict[str, _Pace] = {}
+        self._file_ids = _FileIdCache(cache_path)
+        self._bot_key = str(getattr(bot, "token", "") or "").split(":", 1)[0] or "bot"
+        self.uploads = 0
+
+    def _pace(self, chat_id: ChatId) -> _Pace:
+        key = str(chat_id)
+        pace = self._chats.get(key)
+        if pace is None:
+            per_min = self.group_per_min if _is_group(chat_id) else 0
+            pace = self._chats[key] = _Pace(self.chat_interval, per_min)
+        return pace
+
+    async def _slot(self, chat_id: ChatId) -> None:
+        pace = self._pace(chat_id)
+        now = self.clock()
+        at = max(pace.earliest(now), self._global.earliest(now))
+        pace.commit(at)
+        self._global.commit(at)
+        if at > now:
+            await asyncio.sleep(at - now)
+
+    async def call(self, method: str, chat_id: ChatId, **kwargs: Any) -> Any:
+        """bot.<method>(chat_id=..., **kwargs) в темпе чата, с повторами."""
+        from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+        attempt = 0
+        with tracing.span(f"telegram.{method}") as sp:
+            while True:
+                await self._slot(chat_id)
+                try:
+                    return await getattr(self.bot, method)(chat_id=chat_id, **kwargs)
+                except RetryAfter as e:
+                    wait = _retry_after_s(e)
+                    if attempt >= self.retries:
+                        raise
+                    self._pace(chat_id).hold(self.clock() + wait)
+                    logging.warning("tg_delivery: %s chat=%s RetryAfter %.1f s", method, chat_id, wait)
+                except (BadRequest, TimedOut):
+                    raise
+                except NetworkError as e:
+                    if attempt >= self.retries:
+                        raise
+                    wait = 2.0 ** attempt
+                    logging.warning("tg_delivery: %s chat=%s network error (%s), retry in %.0f s", method, chat_id, e, wait)
+                    await asyncio.sleep(wait)
+                attempt += 1
+                sp.incr("retries")
+
+    async def _fan_out(self, chat_ids: Sequence[ChatId], job: Callable[[ChatId], Any]) -> Dict[ChatId, Any]:
+        """job(chat) параллельно по чатам → {chat: результат | исключение}."""
+        results = await asyncio.gather(*(job(c) for c in chat_ids), return_exceptions=True)
+        out: Dict[ChatId, Any] = {}
+        for chat_id, res in zip(chat_ids, results):
+            if isinstance(res, BaseException):
+                logging.error("tg_delivery: chat=%s failed: %r", chat_id, res)
+            out[chat_id] = res
+        return out
+
+    # ───── текст ─────
+    async def send_chunks(self, chat_id: ChatId, chunks: Iterable[str], **kwargs: Any) -> List[Any]:
+        """Куски по порядку, подряд в одном чате."""
+        return [await self.call("send_message", chat_id, text=chunk, **kwargs) for chunk in chunks]
+
+    async def send_text(self, chat_ids: Sequence[ChatId], chunks: Sequence[str], **kwargs: Any) -> Dict[ChatId, Any]:
+        chunks = list(chunks)
+        return await self._fan_out(_unique(chat_ids), lambda c: self.send_chunks(c, chunks, **kwargs))
+
+    # ───── фото ─────
+    async def send_photo(self, chat_ids: Sequence[ChatId], path: str, caption: str = "", **kwargs: Any) -> Dict[ChatId, Any]:
+        """
+        Одно фото в несколько чатов: загрузка — в первый (или по file_id из
+        кэша), остальные чаты получают file_id параллельно.
+        """
+        from telegram.error import BadRequest
+
+        chats = _unique(chat_ids)
+        if not chats:
+            return {}
+        key = f"{self._bot_key}:{_file_digest(path)}"
+        out: Dict[ChatId, Any] = {}
+        file_id = self._file_ids.get(key)
+        rest = chats
+        if file_id is None:
+            rest = []
+            for i, chat_id in enumerate(chats):
+                try:
+                    msg = await self._upload_photo(chat_id, path, caption, **kwargs)
+                except Exception as e:  # загрузим в следующий чат
+                    logging.error("tg_delivery: photo upload to chat=%s failed: %r", chat_id, e)
+                    out[chat_id] = e
+                    continue
+                out[chat_id] = msg
+                file_id = _photo_file_id(msg)
+                rest = chats[i + 1:]
+                break
+            if file_id is None:  # ответ без file_id — грузим в каждый чат
+                out.update(await self._fan_out(rest, lambda c: self._upload_photo(c, path, caption, **kwargs)))
+                return out
+            self._file_ids.put(key, file_id)
+
+        async def reuse(chat_id: ChatId) -> Any:
+            try:
+                return await self.call("send_photo", chat_id, photo=file_id, caption=caption, **kwargs)
+            except BadRequest:  # file_id протух/чужой — загрузим заново
+                self._file_ids.drop(key)
+                return await self._upload_photo(chat_id, path, caption, **kwargs)
+
+        out.update(await self._fan_out(rest, reuse))
+        return out
+
+    async def _upload_photo(self, chat_id: ChatId, path: str, caption: str, **kwargs: Any) -> Any:
+        with open(path, "rb") as f:
+            self.uploads += 1
+            return await self.call("send_photo", chat_id, photo=f, caption=caption, **kwargs)
+
+    # ───── альбом ─────
+    async def send_album(
+        self,
+        chat_ids: Sequence[ChatId],
+        photos: Sequence[Tuple[str, str]],
+        **kwargs: Any,
+    ) -> Dict[ChatId, Any]:
+        """
+        Альбом (send_media_group) из [(path, caption), ...]: загрузка в первый
+        чат, остальным — те же file_id. Один элемент — обычное фото.
+        """
+        from telegram import InputMediaPhoto
+        from telegram.error import BadRequest
+
+        chats = _unique(chat_ids)
+        if not chats or not photos:
+            return {}
+        if len(photos) == 1:
+            path, caption = photos[0]
+            return await self.send_photo(chats, path, caption, **kwargs)
+
+        keys = [f"{self._bot_key}:{_file_digest(p)}" for p, _c in photos]
+        ids: List[Optional[str]] = [self._file_ids.get(k) for k in keys]
+        out: Dict[ChatId, Any] = {}
+        rest = chats
+        if not all(ids):
+            rest = []
+            for i, chat_id in enumerate(chats):
+                try:
+                    msgs = await self._upload_album(chat_id, photos, ids, **kwargs)
+                except Exception as e:
+                    logging.error("tg_delivery: album upload to chat=%s failed: %r", chat_id, e)
+                    out[chat_id] = e
+                    continue
+                out[chat_id] = msgs
+                got = [_photo_file_id(m) for m in (msgs or ())]
+                if len(got) == len(photos) and all(got):
+                    ids = got
+                    for k, fid in zip(keys, got):
+                        self._file_ids.put(k, fid)  # type: ignore[arg-type]
+                rest = chats[i + 1:]
+                break
+
+        async def job(chat_id: ChatId) -> Any:
+            if all(ids):
+                media = [InputMediaPhoto(fid, caption=cap) for fid, (_p, cap) in zip(ids, photos)]
+                try:
+                    return await self.call("send_media_group", chat_id, media=media, **kwargs)
+                except BadRequest:
+                    for k in keys:
+                        self._file_ids.drop(k)
+            return await self._upload_album(chat_id, photos, [None] * len(photos), **kwargs)
+
+        out.update(await self._fan_out(rest, job))
+        return out
+
+    async def _upload_album(
+        self,
+        chat_id: ChatId,
+        photos: Sequence[Tuple[str, str]],
+        ids: Sequence[Optional[str]],
+        **kwargs: Any,
+    ) -> Any:
+        from telegram import InputMediaPhoto
+
+        files = []
+        try:
+            media = []
+            for (path, cap), fid in zip(photos, ids):
+                if fid:
+                    media.append(InputMediaPhoto(fid, caption=cap))
+                    continue
+                f = open(path, "rb")
+                files.append(f)
+                self.uploads += 1
+                media.append(InputMediaPhoto(f, caption=cap))
+            return await self.call("send_media_group", chat_id, media=media, **kwargs)
+        finally:
+            for f in files:
+                f.close()
+
+
+def _unique(chat_ids: Iterable[ChatId]) -> List[ChatId]:
+    seen, out = set(), []
+    for c in chat_ids:
+        if c in (None, "") or str(c) in seen:
+            continue
+        seen.add(str(c))
+        out.append(c)
+    return out
+
+
+_DELIVERIES: Dict[Tuple[int, int], Tuple[Any, TelegramDelivery]] = {}
+
+
+def delivery_for(bot: Any) -> TelegramDelivery:
+    """Общий TelegramDelivery на бота в текущем event loop (лимиты считаются вместе)."""
+    try:
+        loop_id = id(asyncio.get_running_loop())
+    except RuntimeError:
+        loop_id = 0
+    key = (id(bot), loop_id)
+    hit = _DELIVERIES.get(key)
+    if hit is None or hit[0] is not bot:
+        hit = _DELIVERIES[key] = (bot, TelegramDelivery(bot))
+    return hit[1]
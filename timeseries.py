@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+timeseries.py — компактное хранилище временных рядов фиксированной ширины.
+
+Формат файла:
+• заголовок HEADER_SIZE байт: b"VBTS" + u16 версия + u16 длина JSON +
+  JSON-описание колонок и enum-таблиц (дополнен нулями);
+• далее записи одной длины, отсортированные по ts:
+  ts:int32 + колонки ("f" float32, NaN = null; "i" int32, INT32_MIN = null;
+  "b" int8 -1/0/1 = null/False/True; "e" uint8 индекс в enum-таблице, 0 = null).
+
+Свойства:
+• append/upsert последней точки — O(1) (дозапись или перезапись на месте);
+  append допускает равные ts (несколько станций в одну секунду), upsert
+  рассчитан на ряды с уникальным ts;
+• upsert более старой точки — бинарный поиск по ts, вставка в середину —
+  атомарная перезапись файла (редко);
+• tail(n)/iter_reverse() читают только хвост файла;
+• недописанная при сбое последняя запись отбрасывается при открытии;
+• range()/aggregate() — выборка [start, end) бинарным поиском и
+  min/mean/max по часовым/суточным корзинам;
+• retain() — хранение по числу точек и/или возрасту;
+• rewrite() (компакция) и export_json() пишут через tmp + os.replace;
+• open_series() — открыть ряд рядом с legacy-JSON (x.json → x.bin) с
+  однократной миграцией старого JSON-списка.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+import time
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+MAGIC = b"VBTS"
+VERSION = 1
+HEADER_SIZE = 1024
+_INT_NULL = -(2 ** 31)
+_COL_FMT = {"f": "f", "i": "i", "b": "b", "e": "B"}
+HOUR = 3600
+DAY = 86400
+
+Record = Dict[str, Any]
+
+
+def _f32(v: float) -> float:
+    """float32 → кратчайшее десятичное (7.829999923 → 7.83)."""
+    return float(f"{v:.7g}")
+
+
+class TimeSeriesStore:
+    """Ряд записей {"ts": int, <col>: value, ...} в одном бинарном файле."""
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[Tuple[str, str]],
+        *,
+        enums: Optional[Mapping[str, Sequence[str]]] = None,
+        create: bool = True,
+    ) -> None:
+        self.path = str(path)
+        self.columns: List[Tuple[str, str]] = [(str(n), str(t)) for n, t in columns]
+        for name, typ in self.columns:
+            if typ not in _COL_FMT:
+                raise ValueError(f"timeseries: unknown column type {typ!r} for {name}")
+        self.enums: Dict[str, List[str]] = {
+            name: list((enums or {}).get(name, [])) for name, typ in self.columns if typ == "e"
+        }
+        self._struct = struct.Struct("<i" + "".join(_COL_FMT[t] for _n, t in self.columns))
+        self.record_size = self._struct.size
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER_SIZE:
+            self._read_header()
+            self._truncate_partial()
+        elif create:
+            self._write_file([])
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # ───── заголовок ─────
+    def _header_bytes(self) -> bytes:
+        meta = json.dumps({"columns": self.columns, "enums": self.enums}, ensure_ascii=False).encode("utf-8")
+        head = MAGIC + struct.pack("<HH", VERSION, len(meta)) + meta
+        if len(head) > HEADER_SIZE:
+            raise ValueError("timeseries: header overflow (too many enum values)")
+        return head + b"\0" * (HEADER_SIZE - len(head))
+
+    def _read_header(self) -> None:
+        with open(self.path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if raw[:4] != MAGIC:
+            raise ValueError(f"timeseries: {self.path} is not a VBTS file")
+        version, n = struct.unpack("<HH", raw[4:8])
+        if version != VERSION:
+            raise ValueError(f"timeseries: unsupported version {version}")
+        meta = json.loads(raw[8:8 + n].decode("utf-8"))
+        columns = [(str(a), str(b)) for a, b in meta.get("columns", [])]
+        if columns != self.columns:
+            raise ValueError(f"timeseries: column mismatch in {self.path}: {columns} != {self.columns}")
+        for name, values in (meta.get("enums") or {}).items():
+            known = list(values)
+            for v in self.enums.get(name, []):
+                if v not in known:
+                    known.append(v)
+            self.enums[name] = known
+
+    def _flush_header(self) -> None:
+        with open(self.path, "r+b") as f:
+            f.write(self._header_bytes())
+
+    def _truncate_partial(self) -> None:
+        extra = (os.path.getsize(self.path) - HEADER_SIZE) % self.record_size
+        if extra:
+            with open(self.path, "r+b") as f:
+                f.truncate(os.path.getsize(self.path) - extra)
+
+    # ───── кодирование ─────
+    def _enum_index(self, name: str, value: Any) -> int:
+        if value is None or value == "":
+            return 0
+        table = self.enums[name]
+        value = str(value)
+        if value not in table:
+            if len(table) >= 255:
+                raise ValueError(f"timeseries: enum {name} is full")
+            table.append(value)
+            if self.exists:
+                self._flush_header()
+        return table.index(value) + 1
+
+    def _pack(self, rec: Record) -> bytes:
+        vals: List[Any] = [int(rec["ts"])]
+        for name, typ in self.columns:
+            v = rec.get(name)
+            if typ == "f":
+                vals.append(float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) else math.nan)
+            elif typ == "i":
+                vals.append(int(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else _INT_NULL)
+            elif typ == "b":
+                vals.append(-1 if v is None else int(bool(v)))
+            else:
+                vals.append(self._enum_index(name, v))
+        return self._struct.pack(*vals)
+
+    def _unpack(self, raw: bytes) -> Record:
+        vals = self._struct.unpack(raw)
+        rec: Record = {"ts": vals[0]}
+        for (name, typ), v in zip(self.columns, vals[1:]):
+            if typ == "f":
+                rec[name] = None if math.isnan(v) else _f32(v)
+            elif typ == "i":
+                rec[name] = None if v == _INT_NULL else v
+            elif typ == "b":
+                rec[name] = None if v < 0 else bool(v)
+            else:
+                rec[name] = self.enums[name][v - 1] if 0 < v <= len(self.enums[name]) else None
+        return rec
+
+    # ───── чтение ─────
+    def __len__(self) -> int:
+        if not self.exists:
+            return 0
+        return max(0, (os.path.getsize(self.path) - HEADER_SIZE) // self.record_size)
+
+    def _read_range(self, start: int, stop: int) -> List[Record]:
+        if stop <= start:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(HEADER_SIZE + start * self.record_size)
+            blob = f.read((stop - start) * self.record_size)
+        size = self.record_size
+        return [self._unpack(blob[i:i + size]) for i in range(0, len(blob) - size + 1, size)]
+
+    def _ts_at(self, f, idx: int) -> int:
+        f.seek(HEADER_SIZE + idx * self.record_size)
+        return struct.unpack("<i", f.read(4))[0]
+
+    def _bisect(self, ts: int) -> int:
+        """Первый индекс с ts_i >= ts."""
+        lo, hi = 0, len(self)
+        with open(self.path, "rb") as f:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._ts_at(f, mid) < ts:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return lo
+
+    def read_all(self) -> List[Record]:
+        return self._read_range(0, len(self))
+
+    def tail(self, n: int) -> List[Record]:
+        total = len(self)
+        return self._read_range(max(0, total - int(n)), total)
+
+    def last(self) -> Optional[Record]:
+        rows = self.tail(1)
+        return rows[0] if rows else None
+
+    def iter_reverse(self, chunk: int = 256) -> Iterator[Record]:
+        """От новых к старым, читая файл блоками с конца."""
+        stop = len(self)
+        while stop > 0:
+            start = max(0, stop - chunk)
+            yield from reversed(self._read_range(start, stop))
+            stop = start
+
+    def range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Record]:
+        """Записи с start_ts <= ts < end_ts (None — без границы)."""
+        lo = 0 if start_ts is None else self._bisect(int(start_ts))
+        hi = len(self) if end_ts is None else self._bisect(int(end_ts))
+        return self._read_range(lo, hi)
+
+    def aggregate(
+        self,
+        column: str,
+        bucket_s: int = HOUR,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        where: Optional[Callable[[Record], bool]] = None,
+    ) -> List[Record]:
+        """
+        Даунсэмплинг: [{"ts": начало корзины (UTC), "n", "min", "mean", "max"}, ...]
+        по непустым значениям column; корзины без данных пропускаются.
+        """
+        out: List[Record] = []
+        cur: Optional[Record] = None
+        for r in self.range(start_ts, end_ts):
+            v = r.get(column)
+            if v is None or isinstance(v, bool) or (where is not None and not where(r)):
+                continue
+            b = r["ts"] - r["ts"] % bucket_s
+            if cur is None or cur["ts"] != b:
+                cur = {"ts": b, "n": 0, "min": v, "mean": 0.0, "max": v}
+                out.append(cur)
+            cur["n"] += 1
+            cur["min"] = min(cur["min"], v)
+            cur["max"] = max(cur["max"], v)
+            cur["mean"] += v
+        for c in out:
+            c["mean"] = _f32(c["mean"] / c["n"])
+        return out
+
+    # ───── запись ─────
+    def _write_file(self, records: Sequence[Record]) -> None:
+        body = b"".join(self._pack(r) for r in records)  # enum-таблицы пополняются до заголовка
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._header_bytes())
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _write_at(self, idx: int, rec: Record) -> None:
+        raw = self._pack(rec)
+        with open(self.path, "r+b") as f:
+            f.seek(HEADER_SIZE + idx * self.record_size)
+            f.write(raw)
+
+    def append(self, rec: Record) -> None:
+        last = self.last()
+        if last is not None and int(rec["ts"]) < last["ts"]:
+            raise ValueError("timeseries: append requires non-decreasing ts; use upsert()")
+        self._write_at(len(self), rec)
+
+    def upsert(self, rec: Record, merge: Optional[Callable[[Record, Record], Record]] = None) -> Record:
+        """
+        Вставляет запись или заменяет запись с тем же ts (merge(old, new) → итог).
+        Последняя точка/дозапись — O(1); середина — бинарный поиск.
+        """
+        ts = int(rec["ts"])
+        total = len(self)
+        last = self.last()
+        if last is None or ts > last["ts"]:
+            self._write_at(total, rec)
+            return rec
+        idx = total - 1 if ts == last["ts"] else self._bisect(ts)
+        if idx < total:
+            old = last if idx == total - 1 else self._read_range(idx, idx + 1)[0]
+            if old["ts"] == ts:
+                out = merge(old, rec) if merge else rec
+                self._write_at(idx, out)
+                return out
+        rows = self.read_all()
+        rows.insert(idx, rec)
+        self._write_file(rows)
+        return rec
+
+    def rewrite(self, records: Sequence[Record]) -> None:
+        """Атомарная перезапись (компакция); records должны быть отсортированы по ts."""
+        self._write_file(list(records))
+
+    def retain(
+        self,
+        max_len: Optional[int] = None,
+        max_age_s: Optional[int] = None,
+        *,
+        now: Optional[float] = None,
+        slack: float = 0.1,
+    ) -> bool:
+        """
+        Хранение: не больше max_len последних точек и/или не старше max_age_s.
+        Файл перезаписывается только когда лишнего накопилось больше slack
+        (иначе каждая часовая дозапись превращалась бы в перезапись).
+        """
+        total = len(self)
+        over_len = total - max_len if max_len and max_len > 0 else 0
+        over_age = 0
+        if max_age_s and max_age_s > 0:
+            over_age = self._bisect(int((time.time() if now is None else now) - max_age_s))
+        due = over_len > max_len * slack if over_len > 0 else False
+        due = due or over_age >= max(1, int(total * slack))
+        cut = max(over_len, over_age)
+        if not due or cut <= 0:
+            return False
+        self._write_file(self._read_range(cut, total))
+        return True
+
+    def trim(self, max_len: int, slack: float = 0.1) -> bool:
+        """Оставляет max_len последних записей; перезапись — только при превышении на slack."""
+        return self.retain(max_len=max_len, slack=slack)
+
+    def export_json(self, path: str, extra: Optional[Mapping[str, Any]] = None) -> int:
+        """Совместимый JSON-список записей (extra — константные поля, например ver)."""
+        rows = [{**r, **(extra or {})} for r in self.read_all()]
+        tmp = str(path) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return len(rows)
+
+
+# ───── ряд рядом с legacy-JSON ─────
+def bin_path_for(path: str) -> str:
+    """x.json → x.bin (другие расширения не трогаем)."""
+    root, ext = os.path.splitext(str(path))
+    return root + ".bin" if ext.lower() == ".json" else str(path)
+
+
+def load_json_list(path: str) -> List[Record]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception:
+        return []
+
+
+def open_series(
+    path: str,
+    columns: Sequence[Tuple[str, str]],
+    *,
+    enums: Optional[Mapping[str, Sequence[str]]] = None,
+    to_record: Optional[Callable[[Record], Optional[Record]]] = None,
+    merge: Optional[Callable[[Record, Record], Record]] = None,
+    create: bool = False,
+) -> Optional[TimeSeriesStore]:
+    """
+    Бинарный ряд для path (x.json → x.bin). Если .bin ещё нет: при create=True
+    он создаётся и заполняется из JSON-списка path (to_record нормализует
+    запись, merge разрешает дубли по ts; без merge дубли сохраняются),
+    иначе возвращается None.
+    """
+    bin_path = bin_path_for(path)
+    if os.path.exists(bin_path):
+        return TimeSeriesStore(bin_path, columns, enums=enums)
+    if not create:
+        return None
+    store = TimeSeriesStore(bin_path, columns, enums=enums)
+    if bin_path != str(path):
+        rows: List[Record] = []
+        for r in load_json_list(str(path)):
+            rr = to_record(r) if to_record else r
+            if isinstance(rr, dict) and isinstance(rr.get("ts"), (int, float)):
+                rows.append(rr)
+        rows.sort(key=lambda r: int(r["ts"]))  # стабильная: порядок дублей сохраняется
+        if merge is not None:
+            merged: List[Record] = []
+            for rr in rows:
+                if merged and int(merged[-1]["ts"]) == int(rr["ts"]):
+                    merged[-1] = merge(merged[-1], rr)
+                else:
+                    merged.append(rr)
+            rows = merged
+        if rows:
+            store.rewrite(rows)
+    return store
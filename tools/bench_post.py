@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of the KLD post build on recorded payloads: morning and
+evening runs of build_message → sanitize → FORMAT_V2 → postprocess → image
+prompt, the same chain safe_test_post.py runs. Offline and deterministic: the
+network is served by snapshots.replaying() from tools/golden/bench_post_fixture.json
+(one payload per endpoint, matched by request path), "now" is pinned to the
+fixture's run time, LLM answers are empty.
+
+Per stage: median wall time over --rounds cold builds (caches reset), peak and
+net tracemalloc allocations, Python call counts (cProfile); per run: HTTP
+requests per endpoint. Results are compared with tools/golden/bench_post_baseline.json;
+a metric above baseline × (1 + --threshold) (and above the noise floor), or any
+extra HTTP request, is a regression → exit code 1. Wall times are machine
+specific: refresh the baseline on the machine that runs the comparison.
+
+  python tools/bench_post.py [--rounds 5] [--mode morning|evening|all]
+  python tools/bench_post.py --update-baseline
+  python tools/bench_post.py --snapshot latest --mode morning    # a real run from .cache/snapshots
+  python tools/bench_post.py --record-fixture .cache/snapshots/<run>.json.gz
+"""
+from __future__ import annotations
+
+import argparse
+import cProfile
+import collections
+import contextlib
+import json
+import logging
+import pstats
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import air  # noqa: E402
+import forecast  # noqa: E402
+import om_plan  # noqa: E402
+import snapshots  # noqa: E402
+import weather  # noqa: E402
+from post_safety import sanitize_post_text  # noqa: E402
+from safe_test_post import (  # noqa: E402
+    OTHER_CITIES_ALL,
+    OTHER_LABEL,
+    SEA_CITIES_ORDERED,
+    SEA_LABEL,
+    TZ_STR,
+    _apply_format_v2_safe_postprocess,
+    _finalize_kld_morning_safe_text,
+    _TodayPatch,
+    build_message,
+)
+
+GOLDEN = ROOT / "tools" / "golden"
+FIXTURE = GOLDEN / "bench_post_fixture.json"
+BASELINE = GOLDEN / "bench_post_baseline.json"
+REGION = "Калининградская область"
+STAGES = ("build_message", "sanitize", "format_v2", "postprocess", "image_prompt")
+
+# как в .github/workflows/daily_post_klg.yml
+MODE_ENV = {
+    "morning": {
+        "POST_MODE": "morning", "DAY_OFFSET": "0", "ASTRO_OFFSET": "0",
+        "SHOW_AIR": "1", "SHOW_SPACE": "1", "SHOW_SCHUMANN": "1",
+    },
+    "evening": {
+        "POST_MODE": "evening", "DAY_OFFSET": "1", "ASTRO_OFFSET": "1",
+        "SHOW_AIR": "0", "SHOW_SPACE": "0", "SHOW_SCHUMANN": "0",
+    },
+}
+COMMON_ENV = {
+    "FORMAT_V2": "1", "MORNING_FEELS_LIKE": "1", "MORNING_BEST_WINDOW": "1",
+    "MORNING_SMART_PLAN": "1", "MORNING_VAYBOMETER_SCORE": "1", "EVENING_VAYBOMETER_SCORE": "1",
+    "DISABLE_LLM_DAILY": "1", "SNAPSHOTS": "0", "SECTIONS_CACHE": "0",
+}
+# ниже этих приростов разница — шум, а не регрессия
+NOISE_FLOOR = {"ms": 5.0, "peak_kib": 256.0, "alloc_kib": 256.0, "calls": 2000}
+
+
+# ───────────────────────── входные данные ─────────────────────────
+def _session(source: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    """Снимок для snapshots.replaying(): ответы фикстуры + окружение и «сейчас» режима."""
+    run = (source.get("runs") or {}).get(mode) or {}
+    return {
+        "exchanges": source.get("exchanges") or [],
+        "llm": source.get("llm") or {},
+        "env": {**COMMON_ENV, **MODE_ENV[mode], **(source.get("env") or {})},
+        "taken_at": run.get("taken_at") or source.get("taken_at"),
+        "seed": 0,
+        "meta": {"mode": mode, "base_date": run.get("base_date") or (source.get("meta") or {}).get("base_date")},
+    }
+
+
+def _from_snapshot(spec: str) -> Dict[str, Any]:
+    snap = snapshots.load(snapshots.resolve(spec))
+    mode = (snap.get("meta") or {}).get("mode") or "morning"
+    snap["runs"] = {mode: {"base_date": snap["meta"].get("base_date"), "taken_at": snap.get("taken_at")}}
+    return snap
+
+
+def record_fixture(spec: str, path: Path = FIXTURE) -> Path:
+    """Влить удачные ответы снимка реального запуска в фикстуру (режим — из снимка)."""
+    snap = _from_snapshot(spec)
+    fixture = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    fixture.setdefault("runs", {}).update(snap["runs"])
+    fresh = [r for r in snap.get("exchanges") or [] if "error" not in r and "skipped" not in r]
+    fresh_paths = {snapshots._path_of(r["key"]) for r in fresh}
+    kept = [r for r in fixture.get("exchanges") or [] if snapshots._path_of(r["key"]) not in fresh_paths]
+    fixture["exchanges"] = kept + fresh
+    fixture["llm"] = {**(fixture.get("llm") or {}), **(snap.get("llm") or {})}
+    path.write_text(json.dumps(fixture, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    return path
+
+
+# ───────────────────────── сборка ─────────────────────────
+def _cold() -> None:
+    """Каждый раунд — как новый запуск: без кэшей в памяти."""
+    om_plan.reset()
+    weather._WEATHER_CACHE.clear()
+    forecast._CACHE.clear()
+
+
+def _stages(mode: str, base_date: pendulum.DateTime) -> List[Tuple[str, Callable[[Dict[str, Any]], Any]]]:
+    def build(st):
+        with _TodayPatch(base_date):
+            st["raw"] = build_message(
+                region_name=REGION,
+                sea_label=SEA_LABEL,
+                sea_cities=SEA_CITIES_ORDERED,
+                other_label=OTHER_LABEL,
+                other_cities=OTHER_CITIES_ALL,
+                tz=TZ_STR,
+                mode=mode,
+            )
+
+    def sanitize(st):
+        st["legacy"] = sanitize_post_text(st["raw"]).text
+
+    def v2(st):
+        from format_v2 import build_format_v2
+        st["v2"] = build_format_v2(REGION, mode, st["legacy"])
+
+    def postprocess(st):
+        text = _apply_format_v2_safe_postprocess(st["v2"], st["raw"], st["legacy"], mode)
+        text = sanitize_post_text(text).text
+        st["final"] = _finalize_kld_morning_safe_text(text, st["raw"], st["legacy"], mode)
+
+    def prompt(st):
+        visibility = getattr(st["raw"], "visibility_context", None)
+        with _TodayPatch(base_date):
+            if mode == "morning":
+                from image_prompt_kld_morning import build_kld_morning_prompt
+                st["prompt"] = build_kld_morning_prompt(st["final"], visibility_context=visibility)
+            else:
+                from image_prompt_kld import build_kld_evening_prompt
+                st["prompt"] = build_kld_evening_prompt(
+                    base_date.date(), "", "", final_format_v2_message=st["final"], visibility_context=visibility
+                )
+
+    return list(zip(STAGES, (build, sanitize, v2, postprocess, prompt)))
+
+
+@contextlib.contextmanager
+def _offline(source: Dict[str, Any], mode: str):
+    """Сеть — из фикстуры (с подсчётом запросов по эндпоинтам), файловые кэши — во временной папке."""
+    snap = _session(source, mode)
+    hits: collections.Counter = collections.Counter()
+    saved_air = air.KP_CACHE, air.SW_CACHE
+    with tempfile.TemporaryDirectory() as tmp, snapshots.replaying(snap) as rep:
+        air.KP_CACHE, air.SW_CACHE = Path(tmp) / "kp.json", Path(tmp) / "solar_wind.json"
+        lookup = rep.lookup
+
+        def counted(key: str):
+            hits[snapshots._path_of(key).split(" ", 1)[1]] += 1
+            rec = lookup(key)
+            # multi-location запрос Open-Meteo при ответе фикстуры на одну точку
+            points = urllib.parse.parse_qs(urllib.parse.urlsplit(key.split(" ", 1)[1]).query).get("latitude", [""])[0]
+            if rec and "," in points and isinstance(rec.get("json"), dict):
+                rec = {**rec, "json": [rec["json"]] * len(points.split(","))}
+            return rec
+
+        rep.lookup = counted  # type: ignore[method-assign]
+        try:
+            yield hits, rep
+        finally:
+            air.KP_CACHE, air.SW_CACHE = saved_air
+
+
+@contextlib.contextmanager
+def _profile_threads(profiles: List[cProfile.Profile]) -> Iterator[None]:
+    """
+    cProfile видит только свой поток, а разделы утреннего поста, провайдеры
+    погоды и региональная сетка работают в фоновых: каждый поток, стартовавший
+    внутри, профилируется своим Profile (его вызовы суммируются с основным).
+    """
+    real_run = threading.Thread.run
+    lock = threading.Lock()
+
+    def run(self):
+        prof = cProfile.Profile()
+        with lock:
+            profiles.append(prof)
+        prof.runcall(real_run, self)
+
+    threading.Thread.run = run  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        threading.Thread.run = real_run  # type: ignore[method-assign]
+
+
+def _total_calls(profiles: List[cProfile.Profile]) -> int:
+    total = 0
+    for prof in profiles:
+        try:
+            total += pstats.Stats(prof).total_calls
+        except TypeError:  # поток не успел сделать ни одного вызова
+            pass
+    return total
+
+
+def _run_once(source: Dict[str, Any], mode: str, probe: str = "") -> Tuple[Dict[str, Dict[str, float]], Dict[str, Any]]:
+    """
+    Один холодный прогон: метрики по этапам и сводка. probe — "" (время),
+    "mem" (tracemalloc) или "calls" (cProfile по всем потокам этапа):
+    инструменты искажают время и друг друга, поэтому меряются отдельными
+    прогонами.
+    """
+    base_date = pendulum.parse(_session(source, mode)["meta"]["base_date"]).in_tz(TZ_STR)
+    metrics: Dict[str, Dict[str, float]] = {}
+    st: Dict[str, Any] = {}
+    _cold()
+    with _offline(source, mode) as (hits, rep):
+        for name, fn in _stages(mode, base_date):
+            if probe == "mem":
+                tracemalloc.start()
+                fn(st)
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                metrics[name] = {"peak_kib": peak / 1024, "alloc_kib": current / 1024}
+            elif probe == "calls":
+                prof = cProfile.Profile()
+                profiles = [prof]
+                with _profile_threads(profiles):
+                    prof.runcall(fn, st)
+                metrics[name] = {"calls": _total_calls(profiles)}
+            else:
+                t = time.perf_counter()
+                fn(st)
+                metrics[name] = {"ms": (time.perf_counter() - t) * 1000}
+        summary = {"requests": dict(sorted(hits.items())), "misses": len(rep.misses), "chars": len(st.get("final") or "")}
+    return metrics, summary
+
+
+def bench(source: Dict[str, Any], mode: str, rounds: int) -> Dict[str, Any]:
+    timings = [_run_once(source, mode)[0] for _ in range(max(1, rounds))]
+    mem, _ = _run_once(source, mode, "mem")
+    calls, summary = _run_once(source, mode, "calls")
+    stages = {
+        name: {
+            "ms": round(statistics.median(t[name]["ms"] for t in timings), 2),
+            "peak_kib": round(mem[name]["peak_kib"], 1),
+            "alloc_kib": round(mem[name]["alloc_kib"], 1),
+            "calls": calls[name]["calls"],
+        }
+        for name in STAGES
+    }
+    return {"stages": stages, **summary}
+
+
+# ───────────────────────── сравнение ─────────────────────────
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Регрессии относительно baseline: «mode stage metric: было → стало»."""
+    found = []
+    for mode, res in current.items():
+        base = baseline.get(mode)
+        if not base:
+            continue
+        for stage, values in res["stages"].items():
+            for metric, now in values.items():
+                was = (base.get("stages") or {}).get(stage, {}).get(metric)
+                if was is None:
+                    continue
+                if now > was * (1 + threshold) and now - was > NOISE_FLOOR[metric]:
+                    found.append(f"{mode} {stage} {metric}: {was} → {now}")
+        for endpoint, n in res["requests"].items():
+            was = (base.get("requests") or {}).get(endpoint, 0)
+            if n > was:
+                found.append(f"{mode} requests {endpoint}: {was} → {n}")
+    return found
+
+
+def _print(results: Dict[str, Any]) -> None:
+    for mode, res in results.items():
+        print(f"\n{mode}: {res['chars']} chars, {sum(res['requests'].values())} requests, {res['misses']} unanswered")
+        print(f"{'stage':14} {'ms':>9} {'peak KiB':>10} {'alloc KiB':>10} {'calls':>9}")
+        for stage, v in res["stages"].items():
+            print(f"{stage:14} {v['ms']:9.1f} {v['peak_kib']:10.1f} {v['alloc_kib']:10.1f} {v['calls']:9d}")
+        for endpoint, n in res["requests"].items():
+            print(f"  {n:3d} × {endpoint}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--mode", choices=["morning", "evening", "all"], default="all")
+    ap.add_argument("--snapshot", default="", help="benchmark a recorded run (path or 'latest') instead of the fixture")
+    ap.add_argument("--record-fixture", default="", metavar="SNAPSHOT", help="merge a recorded run into the fixture and exit")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative growth per metric")
+    args = ap.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    if args.record_fixture:
+        print(f"fixture updated: {record_fixture(args.record_fixture)}")
+        return 0
+
+    source = _from_snapshot(args.snapshot) if args.snapshot else json.loads(FIXTURE.read_text(encoding="utf-8"))
+    modes = [m for m in ("morning", "evening") if args.mode in (m, "all") and m in source.get("runs", {})]
+    results = {mode: bench(source, mode, args.rounds) for mode in modes}
+    _print(results)
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        old = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+        baseline_path.write_text(json.dumps({**old, **results}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\nbaseline written: {baseline_path}")
+        return 0
+    if args.snapshot or not baseline_path.exists():
+        return 0
+    regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION: {line}")
+    if not regressions:
+        print(f"\nOK: no regressions above {args.threshold:.0%} vs {baseline_path.name}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
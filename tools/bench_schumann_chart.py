@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for schumann_chart: cold render, warm render (cached axes, one new
+hourly point) and the no-op path (no new points). Synthetic history, offline.
+
+  python tools/bench_schumann_chart.py [--rounds 5]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import schumann_chart  # noqa: E402
+
+T_END = 1_787_436_000
+
+
+def _points(n: int):
+    return [(T_END - (n - 1 - i) * 3600, 20.0 + 5.0 * math.sin(i / 5.0)) for i in range(n)]
+
+
+def _ms(fn) -> float:
+    t = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    results = {}
+    for name, (hours, tick_s, fname) in schumann_chart.CHARTS.items():
+        cold, warm, noop = [], [], []
+        for _ in range(args.rounds):
+            with tempfile.TemporaryDirectory() as tmp:
+                schumann_chart._AXES_MEM.clear()
+                out = str(Path(tmp) / fname)
+                pts = _points(hours + 24)
+                cold.append(_ms(lambda: schumann_chart.render_chart(pts, hours, tick_s, out, cache_dir=tmp)))
+                pts.append((pts[-1][0] + 3600, 21.0))
+                warm.append(_ms(lambda: schumann_chart.render_chart(pts, hours, tick_s, out, cache_dir=tmp)))
+                noop.append(_ms(lambda: schumann_chart.render_chart(pts, hours, tick_s, out, cache_dir=tmp)))
+        results[name] = (statistics.median(cold), statistics.median(warm), statistics.median(noop))
+
+    print(f"{'chart':6} {'cold ms':>9} {'warm ms':>9} {'no-op ms':>9}")
+    for name, (c, w, n) in results.items():
+        print(f"{name:6} {c:9.1f} {w:9.1f} {n:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
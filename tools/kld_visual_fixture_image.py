@@ -39,6 +39,7 @@ from image_prompt_kld import (  # noqa: E402
     kld_visual_cache_key,
 )
 from image_prompt_kld_morning import build_kld_morning_prompt  # noqa: E402
+import tracing  # noqa: E402
 from kld_informative_cover import (  # noqa: E402
     RENDERER_VERSION as LOCAL_COVER_RENDERER_VERSION,
     render_kld_informative_cover,
@@ -355,7 +356,8 @@ def _send_and_record(
         return outcome
 
     try:
-        message_id = send_photo(image_path, _caption(args), chat_id_override=args.chat_id)
+        with tracing.span("telegram.send_photo"):
+            message_id = send_photo(image_path, _caption(args), chat_id_override=args.chat_id)
     except Exception as exc:
         error = _error_payload(exc)
         outcome.update(
@@ -672,7 +674,8 @@ def execute_image_delivery(
                     "negative_separated": True,
                 }
             try:
-                img_path = generator(**generation_kwargs)
+                with tracing.span("image.generate", backend=backend, variation=int(candidate["variation_attempt"])):
+                    img_path = generator(**generation_kwargs)
             except Exception as exc:
                 provider_failed = True
                 error = _error_payload(exc)
@@ -803,14 +806,15 @@ def execute_image_delivery(
     outcome["cover_attempted"] = True
     cover_path = str(Path(args.cover_path))
     try:
-        cover_metadata = dict(
-            cover_renderer(
-                message,
-                post_type=args.post_type,
-                visibility_context=visibility_context,
-                output_path=cover_path,
+        with tracing.span("image.cover"):
+            cover_metadata = dict(
+                cover_renderer(
+                    message,
+                    post_type=args.post_type,
+                    visibility_context=visibility_context,
+                    output_path=cover_path,
+                )
             )
-        )
         outcome["cover_metadata"] = cover_metadata
         cover_validation = dict(
             validate_cover(
@@ -1022,4 +1026,6 @@ def main(argv: list[str] | None = None) -> int:
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    with tracing.run("kld_visual_image"):
+        exit_code = main()
+    raise SystemExit(exit_code)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for tools/bench_post.py: fixture replay covers the build, regressions are flagged."""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+TOOLS = ROOT / "tools"
+if str(TOOLS) not in sys.path:
+    sys.path.insert(0, str(TOOLS))
+
+import bench_post  # noqa: E402
+
+
+def test_fixture_answers_every_request() -> None:
+    source = json.loads(bench_post.FIXTURE.read_text(encoding="utf-8"))
+    for mode in ("morning", "evening"):
+        res = bench_post.bench(source, mode, rounds=1)
+        assert res["misses"] == 0, (mode, res["requests"])
+        assert res["chars"] > 300 and set(res["stages"]) == set(bench_post.STAGES)
+        assert all(v["calls"] > 0 for v in res["stages"].values())
+
+
+def test_compare_flags_regressions() -> None:
+    base = {"morning": {"stages": {"build_message": {"ms": 100.0, "calls": 40000}}, "requests": {"/forecast": 2}}}
+    same = {"morning": {"stages": {"build_message": {"ms": 104.0, "calls": 41000}}, "requests": {"/forecast": 2}}}
+    assert bench_post.compare(same, base, 0.25) == []
+    slow = {"morning": {"stages": {"build_message": {"ms": 160.0, "calls": 40000}}, "requests": {"/forecast": 3}}}
+    found = bench_post.compare(slow, base, 0.25)
+    assert found == ["morning build_message ms: 100.0 → 160.0", "morning requests /forecast: 2 → 3"], found
+    # мелкий этап: +100% в пределах шума — не регрессия
+    tiny = {"morning": {"stages": {"sanitize": {"ms": 1.2}}, "requests": {}}}
+    assert bench_post.compare(tiny, {"morning": {"stages": {"sanitize": {"ms": 0.6}}}}, 0.25) == []
+
+
+def main() -> None:
+    checks = [
+        test_fixture_answers_every_request,
+        test_compare_flags_regressions,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} bench_post checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for forecast.Forecast: time axis, local-day index, columns, cache, day aggregates."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import random  # noqa: E402
+
+from forecast import Forecast, circular_mean_deg  # noqa: E402
+
+KLD = pendulum.timezone("Europe/Kaliningrad")
+BERLIN = pendulum.timezone("Europe/Berlin")
+
+
+def _payload(start: pendulum.DateTime, hours: int, **extra) -> dict:
+    times = [start.add(hours=i).format("YYYY-MM-DDTHH:mm") for i in range(hours)]
+    return {
+        "hourly": {"time": times, "windspeed_10m": [float(i) for i in range(hours)], **extra},
+        "daily": {"time": [start.add(days=d).to_date_string() for d in range(hours // 24)]},
+    }
+
+
+def _brute_nearest(fc: Forecast, date_obj, hour: int, tz) -> int | None:
+    target = pendulum.datetime(date_obj.year, date_obj.month, date_obj.day, hour, tz=tz)
+    best = None
+    for i, e in enumerate(fc.times):
+        local = pendulum.from_timestamp(e, tz=tz)
+        if local.date() != date_obj:
+            continue
+        if best is None or abs(e - target.int_timestamp) < abs(fc.times[best] - target.int_timestamp):
+            best = i
+    return best
+
+
+def test_time_axis_and_local_days() -> None:
+    fc = Forecast(_payload(pendulum.datetime(2026, 6, 18, tz="UTC"), 72))
+    assert fc.step == 3600 and len(fc) == 72
+    assert fc.times[0] == pendulum.datetime(2026, 6, 18, tz="UTC").int_timestamp
+    # UTC-метки → сутки Калининграда (UTC+2): 19.06 = 22:00 UTC 18.06 … 21:00 UTC 19.06
+    day = pendulum.date(2026, 6, 19)
+    idxs = fc.day_indices(day, KLD)
+    assert idxs == list(range(22, 46)), idxs
+    for hour in (0, 6, 12, 23):
+        assert fc.nearest_index(day, hour, KLD) == _brute_nearest(fc, day, hour, KLD) == 22 + hour
+    assert fc.day_indices(pendulum.date(2026, 7, 1), KLD) == [] and fc.nearest_index(pendulum.date(2026, 7, 1), 12, KLD) is None
+    assert fc.daily_index(pendulum.date(2026, 6, 19)) == 1
+
+    # локальные метки с utc_offset_seconds (как отдаёт marine-api с timezone=…)
+    local = _payload(pendulum.datetime(2026, 6, 19, tz="UTC"), 24)
+    local["utc_offset_seconds"] = 7200
+    assert Forecast(local).nearest_index(day, 12, KLD) == 12
+
+    # переход на зимнее время: 25 часов в сутках, сетка нерегулярна по местному времени
+    dst = Forecast(_payload(pendulum.datetime(2026, 10, 24, tz="UTC"), 96))
+    dst_day = pendulum.date(2026, 10, 25)
+    assert len(dst.day_indices(dst_day, BERLIN)) == 25
+    for hour in range(24):
+        assert dst.nearest_index(dst_day, hour, BERLIN) == _brute_nearest(dst, dst_day, hour, BERLIN), hour
+
+    # битая метка не сдвигает индексы остальных часов
+    broken = _payload(pendulum.datetime(2026, 6, 18, tz="UTC"), 48)
+    broken["hourly"]["time"][5] = "not a time"
+    fb = Forecast(broken)
+    assert fb.step is None and 5 not in fb.day_indices(pendulum.date(2026, 6, 18), "UTC")
+    assert fb.nearest_index(pendulum.date(2026, 6, 18), 6, "UTC") == 6
+
+
+def test_columns_and_aliases() -> None:
+    fc = Forecast(_payload(pendulum.datetime(2026, 6, 18, tz="UTC"), 24, rain=[None, "1.5", "x"] + [0] * 21))
+    assert fc.at(fc.hourly("wind_speed_10m"), 3) == 3.0  # алиас windspeed_10m
+    rain = fc.hourly("rain")
+    assert fc.at(rain, 0) is None and fc.at(rain, 1) == 1.5 and fc.at(rain, 2) is None
+    assert fc.at(rain, 99) is None and fc.at(rain, None) is None
+    assert fc.pick(rain, [0, 1, 2, 3, 99]) == [1.5, 0.0]
+    assert len(fc.hourly("missing")) == 0
+    assert fc.hourly("wind_speed_10m") is fc.hourly("wind_speed_10m")
+
+
+def test_of_reuses_until_payload_changes() -> None:
+    wm = _payload(pendulum.datetime(2026, 6, 18, tz="UTC"), 24)
+    fc = Forecast.of(wm)
+    assert Forecast.of(wm) is fc and Forecast.of(fc) is fc
+    wm["hourly"] = dict(wm["hourly"], time=wm["hourly"]["time"][:12])
+    fc2 = Forecast.of(wm)
+    assert fc2 is not fc and len(fc2) == 12
+    assert len(Forecast.of(None)) == 0 and len(Forecast.of({})) == 0
+
+
+def test_aggregate_matches_per_day_loops() -> None:
+    rnd = random.Random(42)
+    start = pendulum.datetime(2026, 10, 23, tz="UTC")
+    hours = 120
+    def col(lo, hi):
+        return [None if rnd.random() < 0.1 else round(rnd.uniform(lo, hi), 1) for _ in range(hours)]
+    wm = _payload(start, hours, temperature_2m=col(-5, 25), rain=col(0, 10), surface_pressure=col(990, 1030),
+                  wind_direction_10m=col(0, 359), thunderstorm_probability=[None] * hours)
+    wm["daily"]["temperature_2m_max"] = [20.0, None, 18.5, 17.0, 16.0]
+    fc = Forecast(wm)
+    aggs = fc.aggregate(BERLIN, windows={"day": (9, 18), "night": (0, 6)})
+    assert fc.aggregate(BERLIN, windows={"night": (0, 6), "day": (9, 18)}) is aggs
+
+    for d, day in aggs.items():
+        idxs = fc.day_indices(d, BERLIN)
+        assert day.idx == idxs
+        if not idxs:  # день есть только в daily-массивах
+            assert day.values("temperature_2m").n == 0 and day.wind_dir is None
+            continue
+        for name in ("temperature_2m", "rain", "windspeed_10m", "wind_speed_10m"):
+            vals = fc.pick(fc.hourly(name), idxs)
+            agg = day.values(name)
+            assert agg.n == len(vals) and agg.min == min(vals, default=None) and agg.max == max(vals, default=None), (d, name)
+            assert (agg.mean is None) if not vals else abs(agg.mean - sum(vals) / len(vals)) < 1e-9, (d, name)
+        night = [fc.at(fc.hourly("temperature_2m"), i) for i in idxs
+                 if pendulum.from_timestamp(fc.times[i], tz=BERLIN).hour <= 6]
+        night = [v for v in night if v is not None]
+        assert day.stat("temperature_2m", "min", window="night") == (min(night) if night else None), d
+        assert day.values("thunderstorm_probability").n == 0 and day.stat("thunderstorm_probability") is None
+        p = fc.hourly("surface_pressure")
+        p12, p06 = fc.at(p, fc.nearest_index(d, 12, BERLIN)), fc.at(p, fc.nearest_index(d, 6, BERLIN))
+        assert day.pressure_trend == (p12 - p06 if p12 is not None and p06 is not None else None), d
+        assert day.wind_dir == circular_mean_deg(fc.pick(fc.hourly("wind_direction_10m"), idxs)), d
+
+    dst_day = pendulum.date(2026, 10, 25)
+    assert aggs[dst_day].values("wind_speed_10m").n == 25
+    assert aggs[pendulum.date(2026, 10, 23)].daily["temperature_2m_max"] == 20.0
+    assert aggs[pendulum.date(2026, 10, 24)].daily["temperature_2m_max"] is None
+    assert round(circular_mean_deg([350, 10])) % 360 == 0 and circular_mean_deg([]) is None
+
+
+def test_named_timezone_payload() -> None:
+    # Open-Meteo с timezone=Europe/Berlin: наивные локальные метки, смещение меняется на переходе
+    local = [f"2026-10-25T{h:02d}:00" for h in range(24)]
+    fc = Forecast({"timezone": "Europe/Berlin", "utc_offset_seconds": 7200, "hourly": {"time": local}})
+    assert fc.times[0] == pendulum.datetime(2026, 10, 25, 0, tz=BERLIN).int_timestamp
+    assert fc.times[12] == pendulum.datetime(2026, 10, 25, 12, tz=BERLIN).int_timestamp
+    assert fc.day_indices(pendulum.date(2026, 10, 25), BERLIN) == list(range(24))
+
+
+def main() -> None:
+    checks = [
+        test_time_axis_and_local_days,
+        test_columns_and_aliases,
+        test_of_reuses_until_payload_changes,
+        test_aggregate_matches_per_day_loops,
+        test_named_timezone_payload,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} forecast checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import os
 import re
 import subprocess
 import sys
+import tempfile
 import types
 from pathlib import Path
 from types import SimpleNamespace
@@ -81,6 +82,10 @@ def _import_gpt_fresh():
         "GROQ_FALLBACK_MODEL",
     ):
         os.environ.pop(name, None)
+    # provider health and response cache are persistent; keep every check hermetic
+    state_dir = Path(tempfile.mkdtemp(prefix="gpt-state-"))
+    os.environ["GPT_HEALTH_PATH"] = str(state_dir / "llm_health.json")
+    os.environ["GPT_CACHE_PATH"] = str(state_dir / "llm_cache.json")
     sys.modules.pop("gpt", None)
     import gpt  # type: ignore
 
@@ -212,6 +217,163 @@ def test_total_groq_failure_uses_local_blurb_fallback() -> None:
     assert all(isinstance(tip, str) and tip for tip in tips)
 
 
+def test_llm_cache_hits_per_site_and_respects_bypass() -> None:
+    gpt = _import_gpt_fresh()
+    client = _FakeGroqClient(failures=set())
+    _force_groq_only(gpt, client)
+    with tempfile.TemporaryDirectory() as tmp:
+        gpt.GPT_CACHE_PATH = Path(tmp) / "llm_cache.json"
+        gpt.GPT_CACHE_MAX_ENTRIES = 2
+
+        first = gpt.gpt_complete("cache prompt", system="sys", max_tokens=80, cache_site="blurb")
+        second = gpt.gpt_complete("cache prompt", system="sys", max_tokens=80, cache_site="blurb")
+        assert first == second and first.startswith("Если завтра")
+        assert client.calls == [PRIMARY_MODEL]
+
+        gpt.gpt_complete("cache prompt", system="sys", max_tokens=80)
+        gpt.gpt_complete("cache prompt", system="sys", max_tokens=80, cache_site="blurb", cache_bypass=True)
+        gpt.gpt_complete("cache prompt", system="sys", max_tokens=81, cache_site="blurb")
+        assert len(client.calls) == 4
+
+        gpt.GROQ_MODELS = [FALLBACK_MODEL]
+        gpt.gpt_complete("cache prompt", system="sys", max_tokens=80, cache_site="blurb")
+        assert client.calls[-1] == FALLBACK_MODEL, "provider/model change must miss the cache"
+
+        stats = gpt.llm_cache_stats()
+        assert stats["hit"] == 1 and stats["miss"] == 4, stats
+        assert len(gpt._cache_load()) <= 2
+
+
+def _reimport_gpt_keeping_state():
+    sys.modules.pop("gpt", None)
+    import gpt  # type: ignore
+
+    return gpt
+
+
+def test_rate_limited_model_is_deferred_in_next_run() -> None:
+    gpt = _import_gpt_fresh()
+    client = _FakeGroqClient(failures={PRIMARY_MODEL})
+    _force_groq_only(gpt, client)
+    gpt.gpt_complete("health prompt", max_tokens=80)
+    assert client.calls == [PRIMARY_MODEL, FALLBACK_MODEL]
+
+    gpt = _reimport_gpt_keeping_state()
+    client = _FakeGroqClient(failures=set())
+    _force_groq_only(gpt, client)
+    text = gpt.gpt_complete("health prompt", max_tokens=80)
+    assert text.startswith("Если завтра")
+    assert client.calls == [FALLBACK_MODEL], client.calls
+
+    report = gpt.provider_health_report()
+    primary = report[f"groq:{PRIMARY_MODEL}"]
+    assert primary["cooldown_s"] > 0 and "429" in (primary["last_quota_error"] or "")
+    assert report[f"groq:{FALLBACK_MODEL}"]["success_rate"] == 1.0
+
+
+def test_routing_prefers_lower_expected_latency() -> None:
+    gpt = _import_gpt_fresh()
+    client = _FakeGroqClient(failures=set())
+    _force_groq_only(gpt, client)
+    for _ in range(3):
+        gpt._health_record("groq", PRIMARY_MODEL, ok=True, latency=9.0)
+        gpt._health_record("groq", FALLBACK_MODEL, ok=True, latency=1.5)
+
+    gpt.gpt_complete("latency prompt", max_tokens=80)
+
+    assert client.calls == [FALLBACK_MODEL]
+    assert gpt.provider_health_report()[f"groq:{PRIMARY_MODEL}"]["p95_s"] == 9.0
+
+
+def test_always_failing_model_sorts_behind_healthy_one() -> None:
+    gpt = _import_gpt_fresh()
+    client = _FakeGroqClient(failures=set())
+    _force_groq_only(gpt, client)
+    # ни одной удачной задержки у основной модели: без доли успехов она держалась бы на приоре
+    for _ in range(3):
+        gpt._health_record("groq", PRIMARY_MODEL, ok=False, err=RuntimeError("500 upstream error"))
+    gpt._health_record("groq", FALLBACK_MODEL, ok=True, latency=6.0)
+    now = gpt.time.time()
+    assert gpt._expected_latency("groq", PRIMARY_MODEL, now) > gpt._expected_latency("groq", FALLBACK_MODEL, now)
+    assert gpt._health_cooldown_left("groq", PRIMARY_MODEL, now) == 0  # не квота — без паузы
+
+    gpt.gpt_complete("failing prompt", max_tokens=80)
+
+    assert client.calls == [FALLBACK_MODEL], client.calls
+
+
+def test_gemini_model_list_is_cached_between_runs() -> None:
+    gpt = _import_gpt_fresh()
+    client = _FakeGeminiClient(failures=set())
+    listed: list[int] = []
+    real_list = client.models.list
+    client.models.list = lambda: listed.append(1) or real_list()
+    gpt.OPENAI_KEY, gpt.GEMINI_KEY, gpt.GROQ_KEY = "", "test", ""
+    gpt._gemini_openai_compat_client = lambda: client
+    assert gpt.gpt_complete("models prompt", max_tokens=80) == "Gemini fallback text"
+
+    gpt = _reimport_gpt_keeping_state()
+    gpt.OPENAI_KEY, gpt.GEMINI_KEY, gpt.GROQ_KEY = "", "test", ""
+    gpt._gemini_openai_compat_client = lambda: client
+    assert gpt.gpt_complete("models prompt", max_tokens=80) == "Gemini fallback text"
+    assert listed == [1], "models.list() must be served from the TTL cache on the second run"
+
+
+class _SlowGroqClient(_FakeGroqClient):
+    def __init__(self, delays: dict[str, float]) -> None:
+        super().__init__(failures=set())
+        self.delays = delays
+        self.started: list[str] = []
+
+    def create(self, *, model: str, messages, temperature: float, max_tokens: int):
+        import time
+
+        self.started.append(model)
+        time.sleep(self.delays.get(model, 0.0))
+        return super().create(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+
+
+def test_hedged_request_takes_first_answer_within_deadline() -> None:
+    import time
+
+    gpt = _import_gpt_fresh()
+    client = _SlowGroqClient({PRIMARY_MODEL: 1.5, FALLBACK_MODEL: 0.0})
+    _force_groq_only(gpt, client)
+
+    t0 = time.monotonic()
+    text = gpt.gpt_complete("hedge prompt", max_tokens=80, deadline_s=3.0, hedge_delay_s=0.1)
+    elapsed = time.monotonic() - t0
+
+    assert text.startswith("Если завтра")
+    assert client.started == [PRIMARY_MODEL, FALLBACK_MODEL]
+    assert client.calls == [FALLBACK_MODEL], "the hedge must answer before the slow primary"
+    assert elapsed < 1.0, elapsed
+
+
+def test_deadline_and_exhausted_budget_fall_back_instantly() -> None:
+    import time
+
+    gpt = _import_gpt_fresh()
+    client = _SlowGroqClient({PRIMARY_MODEL: 1.0, FALLBACK_MODEL: 1.0})
+    _force_groq_only(gpt, client)
+
+    t0 = time.monotonic()
+    assert gpt.gpt_complete("slow prompt", max_tokens=80, deadline_s=0.3, hedge_delay_s=0.05) == ""
+    assert time.monotonic() - t0 < 0.8
+
+    gpt.llm_budget_start(0.01)
+    time.sleep(0.02)
+    started_before = len(client.started)
+    t0 = time.monotonic()
+    summary, tips = gpt.gpt_blurb("жара")
+    assert time.monotonic() - t0 < 0.1
+    assert len(client.started) == started_before
+    assert summary.startswith("Если завтра") and len(tips) == 3
+    assert all(tip in gpt.CULPRITS["жара"]["tips"] for tip in tips)
+    gpt.llm_budget_start(0)
+    assert gpt.llm_budget_left() is None
+
+
 MISSING_CORE_MORNING = """<b>🌅 Калининградская область: погода на сегодня (03.07.2026)</b>
 ✨ VayboMeter: 8.6/10 — хорошо.
 🌡 По области: тепло; у Балтики свежее и ветренее.
@@ -282,6 +444,13 @@ def main() -> None:
         test_removed_gemini_preview_ids_are_not_runtime_candidates,
         test_primary_failure_attempts_fallback_model,
         test_total_groq_failure_uses_local_blurb_fallback,
+        test_llm_cache_hits_per_site_and_respects_bypass,
+        test_rate_limited_model_is_deferred_in_next_run,
+        test_routing_prefers_lower_expected_latency,
+        test_always_failing_model_sorts_behind_healthy_one,
+        test_gemini_model_list_is_cached_between_runs,
+        test_hedged_request_takes_first_answer_within_deadline,
+        test_deadline_and_exhausted_budget_fall_back_instantly,
         kld_missing_core_morning_fails_closed,
     ]
     for test in tests:
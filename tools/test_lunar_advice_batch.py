@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for batched per-day lunar advice in gen_lunar_calendar."""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import gen_lunar_calendar as gen  # noqa: E402
+
+DAYS = [(f"2026-08-{d:02d}", "Растущая Луна") for d in range(1, 6)]
+
+
+class _FakeLLM:
+    def __init__(self, batch_reply: str) -> None:
+        self.batch_reply = batch_reply
+        self.prompts: list[str] = []
+
+    def __call__(self, prompt: str, system=None, temperature=0.7, max_tokens=600, **_kw) -> str:
+        self.prompts.append(prompt)
+        if "Даты и фазы Луны" in prompt:
+            return self.batch_reply
+        return "💼 Один день\n⛔ Без спешки\n🪄 Тишина"
+
+
+def _run(fake: _FakeLLM) -> dict[str, list[str]]:
+    old = gen.gpt_complete
+    gen.gpt_complete = fake
+    try:
+        return asyncio.run(gen._collect_short_advice(DAYS))
+    finally:
+        gen.gpt_complete = old
+
+
+def test_single_request_covers_every_valid_day() -> None:
+    reply = json.dumps(
+        {d: ["💼 Работа по плану", "⛔ Отложи споры", "🪄 Вечерняя прогулка"] for d, _ in DAYS},
+        ensure_ascii=False,
+    )
+    fake = _FakeLLM("```json\n" + reply + "\n```")
+    out = _run(fake)
+    assert len(fake.prompts) == 1, len(fake.prompts)
+    assert sorted(out) == [d for d, _ in DAYS]
+    assert out["2026-08-03"] == ["💼 Работа по плану", "⛔ Отложи споры", "🪄 Вечерняя прогулка"]
+
+
+def test_missing_and_invalid_days_fall_back_per_day() -> None:
+    reply = json.dumps(
+        {
+            "2026-08-01": ["💼 Работа OK по плану", "⛔ Отложи споры"],
+            "2026-08-02": ["💼 только одна строка"],
+            "2026-08-03": "не список",
+            "2026-08-04": ["💼 Фокус", "⛔ Пауза", "🪄 Чай"],
+            "2026-09-01": ["💼 лишний день", "⛔ не из месяца"],
+        },
+        ensure_ascii=False,
+    )
+    fake = _FakeLLM(reply)
+    out = _run(fake)
+    # 1 batch + per-day retries for 02, 03 and the missing 05
+    assert len(fake.prompts) == 4, len(fake.prompts)
+    assert out["2026-08-01"] == ["💼 Работа по плану", "⛔ Отложи споры"], "latin must be sanitized"
+    assert out["2026-08-04"] == ["💼 Фокус", "⛔ Пауза", "🪄 Чай"]
+    for day in ("2026-08-02", "2026-08-03", "2026-08-05"):
+        assert out[day] == ["💼 Один день", "⛔ Без спешки", "🪄 Тишина"], day
+    assert "2026-09-01" not in out
+
+
+def test_unparseable_batch_degrades_to_per_day_mode() -> None:
+    fake = _FakeLLM("извините, не могу")
+    out = _run(fake)
+    assert len(fake.prompts) == 1 + len(DAYS)
+    assert len(out) == len(DAYS)
+
+
+def main() -> None:
+    checks = [
+        test_single_request_covers_every_valid_day,
+        test_missing_and_invalid_days_fall_back_per_day,
+        test_unparseable_batch_degrades_to_per_day_mode,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} lunar advice batch checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the packed Sun/Moon ephemeris grid."""
+from __future__ import annotations
+
+import json
+import sys
+from array import array
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from lunar_ephemeris import EphemerisSamples  # noqa: E402
+
+START_TS = 1_785_974_400  # 2026-08-06T00:00:00Z
+STEP_S = 3600
+
+
+def _synthetic(hours: int = 24 * 30, moon0: float = 350.0) -> EphemerisSamples:
+    """Sun at ~1°/day, Moon at ~13.2°/day, elongation wraps through 0°."""
+    sun, moon = array("f"), array("f")
+    for i in range(hours + 1):
+        sun.append((130.0 + i / 24.0 * 0.9856) % 360.0)
+        moon.append((moon0 + i / 24.0 * 13.176) % 360.0)
+    return EphemerisSamples(START_TS, STEP_S, sun, moon)
+
+
+def test_json_round_trip_is_compact_and_exact() -> None:
+    eph = _synthetic()
+    blob = json.dumps(eph.to_json())
+    back = EphemerisSamples.from_json(json.loads(blob))
+    assert len(back) == len(eph) == 24 * 30 + 1
+    assert list(back.moon) == list(eph.moon)
+    assert "illum" not in eph.to_json()
+    # 2 float32 arrays ≈ 8 bytes/sample before base64
+    assert len(blob) < len(eph) * 8 * 1.4 + 400, len(blob)
+    # блоки прежних генераций с массивом illum читаются как раньше
+    legacy = {**json.loads(blob), "illum": json.loads(blob)["moon_lon"]}
+    assert list(EphemerisSamples.from_json(legacy).sun) == list(eph.sun)
+
+
+def test_interpolation_handles_longitude_wrap() -> None:
+    eph = _synthetic(moon0=359.9)
+    lon = eph.moon_longitude(START_TS + 1800)
+    assert 359.9 < lon < 360.0 or 0.0 <= lon < 0.2, lon
+    mid = eph.phase_angle(START_TS + 10 * STEP_S + 1800)
+    a = eph.phase_angle(START_TS + 10 * STEP_S)
+    b = eph.phase_angle(START_TS + 11 * STEP_S)
+    assert abs(mid - (a + b) / 2) < 1e-3, (a, mid, b)
+    assert 0.0 <= eph.illumination(START_TS + 7 * 86400) <= 100.0
+
+
+def test_phase_instants_follow_synodic_order() -> None:
+    eph = _synthetic(moon0=100.0)
+    events = eph.phase_instants()
+    keys = [e["phase"] for e in events]
+    assert keys[:4] == ["new", "first_quarter", "full", "last_quarter"], keys
+    full = next(e for e in events if e["phase"] == "full")
+    assert abs(eph.phase_angle(full["ts"]) - 180.0) < 0.05
+    assert eph.illumination(full["ts"]) > 99.9
+    assert full["utc"].endswith("Z")
+
+
+def test_out_of_range_moment_is_rejected() -> None:
+    eph = _synthetic(hours=48)
+    assert not eph.covers(START_TS - 1)
+    try:
+        eph.phase_angle(START_TS + 49 * STEP_S)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("moment past the grid must raise ValueError")
+
+
+def test_swisseph_grid_matches_scalar_daily_phase() -> None:
+    try:
+        import swisseph as swe
+        import gen_lunar_calendar as gen
+    except Exception as exc:  # swisseph/pendulum are optional for this offline suite
+        print(f"SKIP swisseph grid check: {exc}")
+        return
+    from lunar_ephemeris import sample_month
+
+    eph = sample_month(2026, 8)
+    for day in range(1, 32):
+        jd = swe.julday(2026, 8, day, 0.0)
+        assert gen.compute_phase_from_samples(eph, jd) == gen._phase_from_lons(gen.sun_lon(jd), gen.moon_lon(jd)), day
+    full = [e for e in eph.phase_instants() if e["phase"] == "full"]
+    assert full and full[0]["utc"].startswith("2026-08-28T04:"), full
+
+
+def main() -> None:
+    checks = [
+        test_json_round_trip_is_compact_and_exact,
+        test_interpolation_handles_longitude_wrap,
+        test_phase_instants_follow_synodic_order,
+        test_out_of_range_moment_is_rejected,
+        test_swisseph_grid_matches_scalar_daily_phase,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} lunar ephemeris checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for marine: one multi-location marine request for all sea points."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import marine  # noqa: E402
+import om_plan  # noqa: E402
+
+KLD = pendulum.timezone("Europe/Kaliningrad")
+
+
+def _fake_marine(calls: list):
+    start = pendulum.today("UTC").subtract(days=1)
+    times = [start.add(hours=i).format("YYYY-MM-DDTHH:mm") for i in range(96)]
+
+    def one(lat: float) -> dict:
+        base = round(lat - 54, 2)  # у каждой точки — свои значения
+        return {
+            "timezone": "GMT",
+            "hourly": {
+                "time": times,
+                "wave_height": [base + (i % 24) / 100 for i in range(96)],
+                "wave_period": [4.0] * 96,
+                "sea_surface_temperature": [15.0 + base] * 96,
+            },
+        }
+
+    def fake_get(url, **params):
+        calls.append(params)
+        lats = [float(x) for x in str(params["latitude"]).split(",")]
+        answers = [one(la) for la in lats]
+        return answers if "," in str(params["latitude"]) else answers[0]
+
+    return fake_get
+
+
+def test_prefetch_serves_all_points() -> None:
+    calls: list = []
+    points = [(54.649, 20.055), (54.959, 20.478), (54.952, 20.160)]
+    saved = om_plan._get
+    try:
+        om_plan.reset()
+        om_plan._get = _fake_marine(calls)
+        marine.prefetch(points)
+        assert len(calls) == 1 and calls[0]["latitude"] == "54.649,54.959,54.952"
+        assert {"wave_height", "wave_period", "sea_surface_temperature"} <= set(calls[0]["hourly"].split(","))
+
+        tomorrow = pendulum.now(KLD).add(days=1).date()
+        for la, lo in points:
+            base = round(la - 54, 2)
+            assert marine.sst_now(la, lo) == 15.0 + base
+            # 12:00 по Калининграду = 10:00 UTC
+            assert marine.wave_at(la, lo, tomorrow, 12, KLD) == (base + 0.10, 4.0)
+            assert marine.wave_day_max(la, lo, tomorrow, KLD) == base + 0.23
+        assert len(calls) == 1 and om_plan.request_counts() == {"marine": 1}
+
+        marine.prefetch(points[:2])  # уже в кэше — без запроса
+        assert len(calls) == 1
+        assert marine.sst_now(55.0, 21.0) == 16.0  # точка вне prefetch — одиночный запрос
+        assert len(calls) == 2 and calls[1]["latitude"] == 55.0
+    finally:
+        om_plan._get = saved
+        om_plan.reset()
+
+
+def test_weekly_sea_temps_use_one_request() -> None:
+    import send_weekly_forecast as weekly
+
+    calls: list = []
+    saved = om_plan._get
+    try:
+        om_plan.reset()
+        om_plan._get = _fake_marine(calls)
+        temps = weekly._fetch_sea_temps()
+        assert len(temps) == len(weekly.SEA_POINTS) and len(calls) == 1, (temps, calls)
+    finally:
+        om_plan._get = saved
+        om_plan.reset()
+
+
+def main() -> None:
+    checks = [
+        test_prefetch_serves_all_points,
+        test_weekly_sea_temps_use_one_request,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} marine checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for om_plan: one Open-Meteo request per API and point, shared by sections."""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import om_plan  # noqa: E402
+
+
+def _fake_api(calls: list, *, fail: bool = False):
+    hours = [time.strftime("%Y-%m-%dT%H:00", time.gmtime(time.time() + 3600 * (i - 2))) for i in range(5)]
+
+    def fake_get(url, **params):
+        calls.append((url, params))
+        time.sleep(0.05)
+        if fail:
+            return None
+        hourly = {"time": hours}
+        for name in params["hourly"].split(","):
+            hourly[name] = [10.0 + i for i in range(len(hours))]
+        return {"timezone": "GMT", "hourly": hourly}
+
+    return fake_get
+
+
+def test_sections_share_one_request_per_api() -> None:
+    import air
+    import pollen
+
+    calls: list = []
+    saved = om_plan._get
+    try:
+        om_plan.reset()
+        om_plan._get = _fake_api(calls)
+        threads = [threading.Thread(target=air.get_sst, args=(54.65, 20.05)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert air._src_openmeteo(54.71, 20.51)["pm25"] == 12.0
+        assert pollen.get_pollen(54.71, 20.51)["tree"] == 12.0
+        assert om_plan.view("waves", 54.65, 20.05).hourly("wave_height")[2] == 12.0
+        assert air.get_sst(54.65, 20.05) == 12.0
+        assert om_plan.request_counts() == {"air": 1, "marine": 1}, om_plan.request_counts()
+        air_params = next(p for url, p in calls if "air-quality" in url)
+        assert set(air_params["hourly"].split(",")) == {
+            "pm10", "pm2_5", "us_aqi", "birch_pollen", "grass_pollen", "ragweed_pollen",
+        }
+
+        # переменная вне PLAN → один дозапрос с объединённым набором, дальше снова кэш
+        assert om_plan.fetch("marine", 54.65, 20.05, ("swell_wave_height",))["hourly"]["swell_wave_height"]
+        assert "wave_height" in om_plan.fetch("marine", 54.65, 20.05)["hourly"]
+        assert om_plan.request_counts()["marine"] == 2
+
+        om_plan.count_url("https://api.open-meteo.com/v1/forecast?x=1")
+        om_plan.count_url("https://api.airvisual.com/v2/nearest_city")
+        assert om_plan.request_counts() == {"air": 1, "marine": 2, "forecast": 1}
+    finally:
+        om_plan._get = saved
+        om_plan.reset()
+
+
+def test_failures_are_not_cached() -> None:
+    calls: list = []
+    saved = om_plan._get
+    try:
+        om_plan.reset()
+        om_plan._get = _fake_api(calls, fail=True)
+        assert len(om_plan.view("air", 1.0, 2.0)) == 0 and om_plan.fetch("air", 1.0, 2.0) is None
+        assert len(calls) == 2
+    finally:
+        om_plan._get = saved
+        om_plan.reset()
+
+
+def main() -> None:
+    checks = [
+        test_sections_share_one_request_per_api,
+        test_failures_are_not_cached,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} Open-Meteo request plan checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for post_pipeline and the safe_test_post FORMAT_V2 stage table."""
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from post_pipeline import LineDoc, Stage, format_runs, run_stages  # noqa: E402
+
+
+@contextlib.contextmanager
+def _env(**values: str):
+    saved = {k: os.environ.get(k) for k in values}
+    try:
+        os.environ.update(values)
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def test_linedoc_matches_splitlines_join() -> None:
+    for text in ("", "a", "a\n", "a\n\n", "a\r\nb\n", "\n\n x \n", "a\n\nb"):
+        doc = LineDoc(text)
+        doc.normalize()
+        assert doc.text == "\n".join(text.splitlines()), repr(text)
+        doc = LineDoc(text)
+        doc.set_lines(list(doc.lines) + [""])
+        assert doc.text == "\n".join(text.splitlines() + [""]), repr(text)
+        assert doc.lines == doc.text.splitlines(), repr(text)
+
+    doc = LineDoc("x\n 🧪 Safecast\n🌙 <b>Астроритм</b>\n🧪 датчик")
+    assert doc.find("🧪") == [1, 3]
+    assert doc.first(("🌙 <b>Астроритм", "☀️")) == 2
+    assert doc.first("📌") is None
+    version = doc.version
+    doc.set_text(doc.text)
+    assert doc.version == version
+    doc.set_lines(["🧪 one"])
+    assert doc.find("🧪") == [0] and doc.version == version + 1
+
+
+def test_stage_gating_and_skip() -> None:
+    calls: list = []
+
+    def mark(name):
+        def fn(text, _ctx):
+            calls.append(name)
+            return text + name
+        return fn
+
+    def drop_b(doc, _ctx):
+        calls.append("doc")
+        doc.set_lines([ln for ln in doc.lines if ln != "b"])
+
+    stages = (
+        Stage("m", mark("\nm"), mode="morning"),
+        Stage("e", mark("\ne"), mode="evening"),
+        Stage("flag", mark("\nb"), flags=("PP_TEST_A", "PP_TEST_B")),
+        Stage("drop", drop_b, kind="doc"),
+        Stage("same", lambda t, c: t),
+    )
+    with _env(PP_TEST_A="0", PP_TEST_B="1", POSTPROC_SKIP=""):
+        runs: list = []
+        out = run_stages("x", stages, SimpleNamespace(), mode="morning", runs=runs)
+    assert out == "x\nm", out
+    assert calls == ["\nm", "\nb", "doc"], calls
+    assert [(r.name, r.status) for r in runs] == [
+        ("m", "changed"), ("e", "off"), ("flag", "changed"), ("drop", "changed"), ("same", "same"),
+    ], runs
+    assert "total" in format_runs(runs)
+
+    calls.clear()
+    with _env(PP_TEST_A="0", PP_TEST_B="0", POSTPROC_SKIP="m, drop"):
+        runs = []
+        out = run_stages("x", stages, SimpleNamespace(), mode="evening", runs=runs, debug=True)
+    assert out == "x\ne" and calls == ["\ne"], (out, calls)
+    diff = next(r.diff for r in runs if r.name == "e")
+    assert "+e" in diff, diff
+
+
+def test_safe_test_post_stage_table() -> None:
+    with _env(TELEGRAM_TOKEN_KLG=os.environ.get("TELEGRAM_TOKEN_KLG") or "test-token"):
+        import safe_test_post as stp
+
+    names = [s.name for s in stp._V2_POSTPROCESS_STAGES]
+    assert len(names) == len(set(names)), names
+    text = (
+        "<b>Калининград</b>\n"
+        "🧭 <b>Главный сценарий</b>\nПервое.\nВторое.\nТретье.\n"
+        "🧜‍♂️ Отлично: вода\n"
+        "Лучшее окно: н/д\n"
+        "🧪 датчик во дворе\n"
+        "🌙 <b>Астроритм</b>\n" + "".join(f"• пункт {i}\n" for i in range(10)) + "\n"
+    )
+    with _env(FORMAT_V2_ASTRO_CLEANUP="1", FORMAT_V2_COMPACT="1"):
+        for fn, doc_fn in (
+            (stp._apply_astro_cleanup, stp._astro_cleanup_doc),
+            (stp._apply_compact, stp._compact_doc),
+            (stp._remove_invalid_best_window, stp._remove_invalid_best_window_doc),
+            (stp._soften_private_sensor_wording, stp._soften_private_sensor_doc),
+        ):
+            run = run_stages(text, (Stage("s", doc_fn, kind="doc"),), None)
+            assert fn(text) == run, fn.__name__
+            plain = "без совпадений\n\n"
+            assert fn(plain) == "\n".join(plain.splitlines()), fn.__name__
+
+        runs: list = []
+        stp._apply_format_v2_safe_postprocess(text, text, text, "morning", runs=runs)
+    assert [r.name for r in runs] == names
+    assert {r.name for r in runs if r.status == "off"} >= {"evening_score", "finalize_evening"}
+
+
+def main() -> None:
+    checks = [
+        test_linedoc_matches_splitlines_join,
+        test_stage_gating_and_skip,
+        test_safe_test_post_stage_table,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} post pipeline checks passed")
+
+
+if __name__ == "__main__":
+    main()
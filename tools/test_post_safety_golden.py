@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Golden-output checks for post_safety.sanitize_post_text.
+
+tools/golden/post_safety_sanitize.json holds every input that the
+tools/test_format_v2_* fixtures feed into sanitize_post_text (plus a few
+synthetic edge cases) together with the env flags active at that moment and
+the exact text/issues produced. Rewrites of the sanitizer must reproduce them
+byte for byte.
+
+  python tools/test_post_safety_golden.py            # check
+  python tools/test_post_safety_golden.py --update   # re-record from the current implementation
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+TOOLS = ROOT / "tools"
+if str(TOOLS) not in sys.path:
+    sys.path.insert(0, str(TOOLS))
+
+import post_safety  # noqa: E402
+
+GOLDEN = TOOLS / "golden" / "post_safety_sanitize.json"
+ENV_KEYS = ("FORMAT_V2", "FORMAT_V2_MORNING_SPACING")
+FIXTURE_MODULES = ("test_format_v2_morning_kld", "test_format_v2_evening_kld")
+
+SYNTHETIC = [
+    "",
+    "\n\n  \n",
+    "<b>🌅 Калининградская область: погода на сегодня (19.06.2026)</b>\n\n\n"
+    "Погода: 🏙️ Калининград — 22/14 °C • 💨 4.0 м/с /None • порывы — 9\n"
+    "🌊 Зеленоградск (SW/onshore) • волна 0.4 м • (NW/None)\n"
+    "——\n———\n\n"
+    "🙄 Калининград: 21/14 °C\n"
+    "  🥶 Светлогорск: 13,5/9 °C\n"
+    "🧜‍♂️ SUP: только опытным\n"
+    "✅ Общий фон: благоприятный день.\n"
+    "Луна — держи курс на простые дела\n"
+    "🌙 Освещённость: н/д\n"
+    "Kp н/д\n"
+    "Что-то оборвалось на освобо\n"
+    "🧪 Safecast: 0.12 мкЗв/ч\n"
+    "#Калининград #погода\n"
+    "——\n\n",
+    "<b>🌅 Калининград сегодня: 19.06</b>\n"
+    "Погода: дождь, порывы до 9 м/с, ветер у воды.\n"
+    "☀️ УФ: высокий\n"
+    "✨ VayboMeter: 9.4/10 — отлично; гулять\n"
+    "🌡 Ощущается: свежо\n"
+    "💱 Курсы: USD 90\n"
+    "🏭 Воздух: чисто\n"
+    "🧲 Космопогода: спокойно\n"
+    "✅ План: прогулка\n"
+    "🧪 Safecast: 0.10 мкЗв/ч\n"
+    "#Калининград",
+    "<b>🌅 Калининград сегодня: 19.06</b>\n\n"
+    "Погода: солнечно, порывы до 5 м/с 7 м/с.\n"
+    "✨ VayboMeter: 9,1/10 — отлично.\n"
+    "🧪 Safecast: 0.11\n\n"
+    "#Калининград",
+    "<b>🌅 Калининградская область: погода на завтра</b>\n"
+    "🧭 <b>Главный сценарий</b>\n"
+    "✨ VayboMeter: 7.0/10 — хорошо.\n"
+    "🧪 Safecast: 0.11\n"
+    "Конец без хештегов",
+]
+SYNTHETIC_ENVS = [
+    {},
+    {"FORMAT_V2": "1"},
+    {"FORMAT_V2": "1", "FORMAT_V2_MORNING_SPACING": "1"},
+    {"FORMAT_V2_MORNING_SPACING": "1"},
+]
+
+
+@contextlib.contextmanager
+def _env(values: dict):
+    saved = {k: os.environ.get(k) for k in ENV_KEYS}
+    try:
+        for k in ENV_KEYS:
+            if k in values:
+                os.environ[k] = values[k]
+            else:
+                os.environ.pop(k, None)
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def _harvest() -> list:
+    """Inputs seen by sanitize_post_text while the FORMAT_V2 fixture suites run."""
+    seen: dict = {}
+    original = post_safety.sanitize_post_text
+
+    def recorder(text):
+        env = {k: os.environ[k] for k in ENV_KEYS if k in os.environ}
+        seen.setdefault(json.dumps([str(text or ""), env], ensure_ascii=False), (str(text or ""), env))
+        return original(text)
+
+    constants: list = []
+    post_safety.sanitize_post_text = recorder
+    try:
+        for name in FIXTURE_MODULES:
+            module = __import__(name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                module.main()
+            # текстовые фикстуры модуля (LEGACY_FIXTURE, REAL_…) — при всех флагах
+            constants += [v for k, v in sorted(vars(module).items()) if k.isupper() and isinstance(v, str) and "\n" in v]
+    finally:
+        post_safety.sanitize_post_text = original
+    cases = list(seen.values())
+    cases += [(text, env) for text in SYNTHETIC + constants for env in SYNTHETIC_ENVS]
+    return cases
+
+
+def _run(text: str, env: dict) -> dict:
+    with _env(env):
+        res = post_safety.sanitize_post_text(text)
+    return {"text": res.text, "issues": res.issues}
+
+
+def update() -> int:
+    cases = [{"input": text, "env": env, **_run(text, env)} for text, env in _harvest()]
+    GOLDEN.parent.mkdir(parents=True, exist_ok=True)
+    GOLDEN.write_text(json.dumps(cases, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    return len(cases)
+
+
+def test_sanitize_matches_golden() -> None:
+    cases = json.loads(GOLDEN.read_text("utf-8"))
+    assert len(cases) > len(SYNTHETIC) * len(SYNTHETIC_ENVS), len(cases)
+    for i, case in enumerate(cases):
+        got = _run(case["input"], case["env"])
+        assert got["text"] == case["text"], (i, case["env"], got["text"], case["text"])
+        assert got["issues"] == case["issues"], (i, got["issues"], case["issues"])
+
+
+def test_golden_covers_current_fixtures() -> None:
+    recorded = {json.dumps([c["input"], c["env"]], ensure_ascii=False) for c in json.loads(GOLDEN.read_text("utf-8"))}
+    missing = [t for t, e in _harvest() if json.dumps([t, e], ensure_ascii=False) not in recorded]
+    assert not missing, f"{len(missing)} fixture inputs are not in the golden file; run with --update"
+
+
+def main() -> None:
+    if "--update" in sys.argv[1:]:
+        print(f"recorded {update()} cases → {GOLDEN.relative_to(ROOT)}")
+        return
+    checks = [
+        test_sanitize_matches_golden,
+        test_golden_covers_current_fixtures,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} post safety golden checks passed")
+
+
+if __name__ == "__main__":
+    main()
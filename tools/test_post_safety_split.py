@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Property checks for post_safety.split_telegram_text.
+
+Random Telegram-HTML posts (nested tags, links, entities, astral emoji, long
+words, paragraphs) are split at random limits. Every chunk must be valid
+Telegram HTML within the UTF-16 limit, and the chunks together must keep all
+visible text in order.
+"""
+from __future__ import annotations
+
+import html
+import random
+import sys
+from html.parser import HTMLParser
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from post_safety import split_telegram_text, utf16_len  # noqa: E402
+
+TG_TAGS = {"b", "strong", "i", "em", "u", "ins", "s", "strike", "del", "tg-spoiler", "a", "code", "pre", "blockquote"}
+WORDS = ["Калининград", "ветер", "порывы", "9", "м/с", "🌊", "😀", "🧜‍♂️", "SUP", "&amp;", "&lt;3", "°C", "—", "x" * 70]
+
+
+class _TgHtml(HTMLParser):
+    """Accepts only what Telegram's HTML parser accepts (known tags, properly nested)."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.stack: list = []
+        self.text: list = []
+        self.errors: list = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in TG_TAGS:
+            self.errors.append(f"unknown <{tag}>")
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack[-1] != tag:
+            self.errors.append(f"unbalanced </{tag}> with open {self.stack}")
+        else:
+            self.stack.pop()
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+
+def _parse(chunk: str) -> _TgHtml:
+    p = _TgHtml()
+    p.feed(chunk)
+    p.close()
+    if p.stack:
+        p.errors.append(f"unclosed {p.stack}")
+    return p
+
+
+def _random_post(rnd: random.Random) -> str:
+    out: list = []
+    stack: list = []
+    for _ in range(rnd.randint(5, 400)):
+        roll = rnd.random()
+        if roll < 0.08 and len(stack) < 4:
+            tag = rnd.choice(sorted(TG_TAGS - {"a"} - set(stack)) + ([] if "a" in stack else ["a"]))
+            out.append('<a href="https://example.org/?q=1&amp;r=2">' if tag == "a" else f"<{tag}>")
+            out.append(rnd.choice(WORDS))  # Telegram rejects empty entities
+            stack.append(tag)
+        elif roll < 0.14 and stack:
+            out.append(f"</{stack.pop()}>")
+        elif roll < 0.2:
+            out.append(rnd.choice(["\n", "\n\n", "\n \n\n"]))
+        else:
+            out.append(rnd.choice(WORDS) + rnd.choice([" ", " ", "", "\n"]))
+    out.extend(f"</{tag}>" for tag in reversed(stack))
+    return "".join(out)
+
+
+def _visible(chunk_or_text: str) -> str:
+    return "".join("".join(_parse(chunk_or_text).text).split())
+
+
+def test_chunks_are_valid_telegram_html() -> None:
+    rnd = random.Random(4096)
+    for case in range(600):
+        text = _random_post(rnd)
+        limit = rnd.choice([150, 197, 260, 400, 3800])  # above the deepest reopened tag prefix
+        chunks = split_telegram_text(text, limit)
+        assert chunks or not text.strip(), case
+        for chunk in chunks:
+            parsed = _parse(chunk)
+            assert not parsed.errors, (case, limit, parsed.errors, chunk)
+            assert "".join(parsed.text).strip(), (case, chunk)
+            assert utf16_len(chunk) <= limit, (case, limit, utf16_len(chunk), chunk)
+        assert "".join(_visible(c) for c in chunks) == _visible(text), case
+
+
+def test_break_preferences() -> None:
+    para = "<b>Заголовок</b>\n\n" + "слово " * 30
+    assert split_telegram_text(para, 100)[0] == "<b>Заголовок</b>"
+    assert split_telegram_text("короткий <b>пост</b>") == ["короткий <b>пост</b>"]
+    assert split_telegram_text("  \n ") == []
+
+    lines = "\n".join(f"строка {i:02d} " + "a" * 10 for i in range(20))
+    chunks = split_telegram_text(lines, 120)
+    assert all(c.startswith("строка") for c in chunks), chunks
+
+    # 😀 is two UTF-16 units: 50 of them do not fit in 60
+    emoji = split_telegram_text("😀" * 50, 60)
+    assert [len(c) for c in emoji] == [30, 20], emoji
+
+    tagged = split_telegram_text("<i>" + "длинное слово " * 20 + "</i>", 80)
+    assert all(c.startswith("<i>") and c.endswith("</i>") for c in tagged), tagged
+    assert not any(c.endswith(" </i>") for c in tagged[:-1]), tagged
+
+    entity = split_telegram_text("&amp;" * 30, 12)
+    assert all(html.unescape(c) == "&" * (len(c) // 5) for c in entity), entity
+
+
+def main() -> None:
+    checks = [
+        test_chunks_are_valid_telegram_html,
+        test_break_preferences,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} post safety split checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for regional_grid: anchor selection, IDW, tolerance fallback."""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("TELEGRAM_TOKEN_KLG", "test-token")
+
+import regional_grid  # noqa: E402
+from post_kld import OTHER_CITIES_ALL, SEA_CITIES_ORDERED  # noqa: E402
+
+
+def _smooth(calls: list):
+    """Плавное поле: тепло растёт на восток, код погоды — по широте."""
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        return 20.0 + 2.0 * (lon - 20.0), 10.0 + (lat - 54.5), 3 if lat > 54.7 else 61
+    return fetch
+
+
+def test_grid_uses_few_requests_within_tolerance() -> None:
+    calls: list = []
+    fetch = _smooth(calls)
+    known = {name: (p, fetch(*p)) for name, p in SEA_CITIES_ORDERED}
+    calls.clear()
+
+    values, report = regional_grid.city_values(OTHER_CITIES_ALL, fetch, known=known, grid=True)
+    assert report.mode == "grid", report.summary()
+    assert len(calls) == report.requests < len(OTHER_CITIES_ALL) // 2, report.summary()
+    assert set(values) == {name for name, _p in OTHER_CITIES_ALL}
+    assert report.max_error is not None and report.max_error <= regional_grid.REGION_GRID_TOL_C
+    for name, (lat, lon) in OTHER_CITIES_ALL:
+        tmax, tmin, code = values[name]
+        exact = fetch(lat, lon)
+        assert abs(tmax - exact[0]) < 2.0 and abs(tmin - exact[1]) < 1.0, (name, values[name], exact)
+        assert code in (3, 61)
+
+    rows = regional_grid.accuracy_report(OTHER_CITIES_ALL, fetch, known=known)
+    assert len(rows) == len(OTHER_CITIES_ALL) and all(err is not None for _g, _d, err in rows.values())
+
+    calls.clear()
+    _values, report = regional_grid.city_values(OTHER_CITIES_ALL, fetch, grid=False)
+    assert report.mode == "direct" and len(calls) == len(OTHER_CITIES_ALL)
+
+
+def test_rough_field_falls_back_to_direct() -> None:
+    calls: list = []
+
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        bump = 8.0 if int(lon * 1000) % 2 else 0.0  # соседние города расходятся на 8°C
+        return 15.0 + bump, 5.0, None
+
+    values, report = regional_grid.city_values(OTHER_CITIES_ALL, fetch, grid=True)
+    assert report.mode == "fallback" and report.max_error > regional_grid.REGION_GRID_TOL_C
+    assert len(calls) == len(OTHER_CITIES_ALL) == report.requests
+    for name, (lat, lon) in OTHER_CITIES_ALL:
+        assert values[name] == fetch(lat, lon)
+
+    assert regional_grid.pick_anchors([(54.0, 20.0), (54.0, 20.1), (55.0, 22.0)], 2) == [1, 2]
+    assert regional_grid.idw((54.0, 20.0), [((54.0, 20.0), 7.0), ((55.0, 21.0), 1.0)]) == 7.0
+
+
+def main() -> None:
+    checks = [
+        test_grid_uses_few_requests_within_tolerance,
+        test_rough_field_falls_back_to_direct,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} regional grid checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the Pillow Schumann chart renderer."""
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PIL import Image  # noqa: E402
+
+import schumann  # noqa: E402
+import schumann_chart  # noqa: E402
+
+T_END = 1_787_436_000  # ровно час, не кратно 6 ч
+
+
+def _points(n: int):
+    return [(T_END - (n - 1 - i) * 3600, 20.0 + 5.0 * math.sin(i / 5.0)) for i in range(n)]
+
+
+def test_renders_and_skips_unchanged_data() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        schumann_chart._AXES_MEM.clear()
+        out = os.path.join(tmp, "amp_48h.png")
+        pts = _points(80)
+        first = schumann_chart.render_chart(pts, 48, 6 * 3600, out, cache_dir=tmp)
+        assert first["status"] == "rendered" and not first["axes_cached"]
+        with Image.open(out) as img:
+            assert img.size == (schumann_chart.WIDTH, schumann_chart.HEIGHT)
+            rgb = img.convert("RGB")
+            assert any(rgb.getpixel((x, y)) == schumann_chart.LINE[:3]
+                       for x in range(600, 900, 3) for y in range(100, 560, 2))
+        again = schumann_chart.render_chart(pts, 48, 6 * 3600, out, cache_dir=tmp)
+        assert again["status"] == "unchanged"
+        pts.append((T_END + 3600, 21.0))  # новый час в пределах того же деления
+        warm = schumann_chart.render_chart(pts, 48, 6 * 3600, out, cache_dir=tmp)
+        assert warm["status"] == "rendered" and warm["axes_cached"] and warm["n"] == first["n"] + 1
+
+
+def test_axes_layer_is_reused_from_disk() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        schumann_chart._AXES_MEM.clear()
+        pts = _points(200)
+        schumann_chart.render_chart(pts, 168, 86400, os.path.join(tmp, "a.png"), cache_dir=tmp)
+        assert len(list(Path(tmp).glob("axes_*.png"))) == 1
+        schumann_chart._AXES_MEM.clear()  # новый процесс: только дисковый кэш
+        res = schumann_chart.render_chart(pts, 168, 86400, os.path.join(tmp, "b.png"), cache_dir=tmp)
+        assert res["status"] == "rendered" and res["axes_cached"]
+        short = schumann_chart.render_chart(pts[:1], 168, 86400, os.path.join(tmp, "c.png"), cache_dir=tmp)
+        assert short["status"] == "skipped" and not os.path.exists(os.path.join(tmp, "c.png"))
+
+
+def test_render_all_reads_history_tail() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schumann_hourly.json")
+        rows = [{"ts": ts, "freq": 7.83, "amp": round(a, 2), "src": "gci_json"} for ts, a in _points(400)]
+        Path(path).write_text(json.dumps(rows), encoding="utf-8")
+        schumann.export_history_json(path)  # создаёт .bin из JSON
+        got = schumann_chart.render_all(path, tmp, cache_dir=os.path.join(tmp, "cache"))
+        assert got["48h"]["status"] == got["7d"]["status"] == "rendered"
+        t0, _t1 = schumann_chart._window(T_END, 7 * 24, 86400)
+        assert got["7d"]["n"] == (T_END - t0) // 3600 + 1
+        assert os.path.exists(os.path.join(tmp, "schumann_amp_48h.png"))
+        assert os.path.exists(os.path.join(tmp, "schumann_amp_7d.png"))
+
+
+def main() -> None:
+    checks = [
+        test_renders_and_skips_unchanged_data,
+        test_axes_layer_is_reused_from_disk,
+        test_render_all_reads_history_tail,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} Schumann chart checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the GCI fetch chain and the streaming JSON walk in schumann."""
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import schumann  # noqa: E402
+
+PAGE = "https://gci.test/live/"
+IFRAME = "https://gci.test/live/power_levels.html"
+JSON_URL = "https://gci.test/live/data/power_levels.php?x=1"
+PAYLOAD = {"stations": {"GCI001": {"power": [1.0, 2.0]}, "GCI003": {"power": [3.0, 4.0]}}}
+
+
+class _Resp:
+    def __init__(self, status: int, body):
+        self.status_code = status
+        self._body = body
+        self.text = body if isinstance(body, str) else json.dumps(body)
+
+    def json(self):
+        return self._body if not isinstance(self._body, str) else json.loads(self._body)
+
+
+class _FakeWeb:
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def __call__(self, url, **params):
+        self.calls.append(url)
+        status, body = self.routes.get(url, (404, ""))
+        return _Resp(status, body)
+
+
+def _with_env(tmp: str, routes):
+    web = _FakeWeb(routes)
+    saved = {k: getattr(schumann, k) for k in (
+        "_get", "GCI_ENABLE", "GCI_PAGE_URL", "GCI_IFRAME_URL", "GCI_SAVED_HTML", "GCI_STATIONS",
+        "BREAKER_FILE", "GCI_DISCOVERY_FILE", "requests")}
+    schumann._get = web
+    schumann.GCI_ENABLE = True
+    schumann.GCI_PAGE_URL, schumann.GCI_IFRAME_URL, schumann.GCI_SAVED_HTML = PAGE, IFRAME, ""
+    schumann.GCI_STATIONS = ["GCI001", "GCI003"]
+    schumann.BREAKER_FILE = os.path.join(tmp, "breaker.json")
+    schumann.GCI_DISCOVERY_FILE = os.path.join(tmp, "cache", "discovery.json")
+    schumann.requests = schumann.requests or object()
+    return web, saved
+
+
+def _restore(saved) -> None:
+    for k, v in saved.items():
+        setattr(schumann, k, v)
+
+
+def _routes():
+    return {
+        PAGE: (200, f'<html><iframe src="{IFRAME}"></iframe></html>'),
+        IFRAME: (200, '<div data-load-json-from="data/power_levels.php?x=1"></div>'),
+        JSON_URL: (200, PAYLOAD),
+    }
+
+
+def test_discovered_json_path_is_cached() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        web, saved = _with_env(tmp, _routes())
+        try:
+            assert schumann.get_gci_power() == (3.0, "gci_json")
+            assert sorted(web.calls) == sorted([PAGE, IFRAME, JSON_URL])
+            assert json.loads(Path(schumann.GCI_DISCOVERY_FILE).read_text())["json_url"] == JSON_URL
+            web.calls.clear()
+            assert schumann.get_gci_power() == (3.0, "gci_json")
+            assert web.calls == [JSON_URL]  # обычный запуск — один запрос
+        finally:
+            _restore(saved)
+
+
+def test_stale_cached_path_triggers_parallel_rediscovery() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        routes = _routes()
+        web, saved = _with_env(tmp, routes)
+        try:
+            os.makedirs(os.path.dirname(schumann.GCI_DISCOVERY_FILE))
+            Path(schumann.GCI_DISCOVERY_FILE).write_text(json.dumps(
+                {"iframe_url": IFRAME, "json_rel": "old.php", "json_url": "https://gci.test/old.php",
+                 "ts": int(schumann.time.time())}))
+            assert schumann.get_gci_power() == (3.0, "gci_json")
+            assert web.calls[0] == "https://gci.test/old.php"
+            assert set(web.calls[1:3]) == {PAGE, IFRAME} and web.calls[3] == JSON_URL
+            assert json.loads(Path(schumann.GCI_DISCOVERY_FILE).read_text())["json_url"] == JSON_URL
+
+            routes[JSON_URL] = (503, "")
+            routes[IFRAME] = (200, '<script>var d = {"GCI001": 5.5};</script>')
+            os.remove(schumann.GCI_DISCOVERY_FILE)
+            assert schumann.get_gci_power() == (5.5, "gci_iframe")
+        finally:
+            _restore(saved)
+
+
+def _reference_flatten(obj, path=()):
+    out = []
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            out.extend(_reference_flatten(v, path + (str(k),)))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            out.extend(_reference_flatten(v, path + (str(i),)))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool) and math.isfinite(obj):
+        out.append((path, float(obj)))
+    return out
+
+
+def test_streaming_walk_matches_reference_and_handles_depth() -> None:
+    payload = {"meta": {"power": 9.0}, "rows": [{"GCI001_power": 1.5, "t": [1, 2]},
+                                                 {"gci003": {"vals": [2.5, float("nan"), 3.5]}}, True]}
+    assert list(schumann._flatten_numbers_with_paths(payload)) == _reference_flatten(payload)
+    assert schumann._numbers_near_station(payload, "GCI003") == [2.5, 3.5]
+    assert schumann._aggregate_stations_power(payload, ["GCI001", "GCI003"]) == (1.5 + 3.5) / 2
+    assert schumann._aggregate_stations_power(payload, ["GCI999"]) == 9.0
+    deep = 1.0
+    for _ in range(5000):
+        deep = {"power": [deep]}
+    assert schumann._aggregate_stations_power(deep, ["GCI001"]) == 1.0
+
+
+def main() -> None:
+    checks = [
+        test_discovered_json_path_is_cached,
+        test_stale_cached_path_triggers_parallel_rediscovery,
+        test_streaming_walk_matches_reference_and_handles_depth,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} Schumann GCI checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the fixed-width Schumann history store."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import schumann  # noqa: E402
+from timeseries import HEADER_SIZE, bin_path_for  # noqa: E402
+
+BASE_TS = 1_787_400_000 - 1_787_400_000 % 3600
+
+
+def _rec(hour: int, *, freq: float = 7.83, amp=None, src: str = "gci_fail") -> dict:
+    return {"ts": BASE_TS + hour * 3600, "freq": freq, "amp": amp, "h7_amp": None, "h7_spike": None, "ver": 2, "src": src}
+
+
+def _json_history(tmp: str, items: list[dict]) -> str:
+    path = os.path.join(tmp, "schumann_hourly.json")
+    Path(path).write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_json_history_migrates_and_exports_identically() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        items = [_rec(h, amp=(None if h % 3 else 10.0 + h), src="gci_json" if h % 3 == 0 else "cache") for h in range(48)]
+        path = _json_history(tmp, items)
+        schumann.upsert_record(path, _rec(47, amp=99.5, src="gci_json"))
+        store = schumann._open_store(path)
+        assert store is not None and len(store) == 48
+        assert os.path.getsize(store.path) == HEADER_SIZE + 48 * store.record_size
+        out = os.path.join(tmp, "export.json")
+        schumann.export_history_json(path, out)
+        exported = json.loads(Path(out).read_text(encoding="utf-8"))
+        assert exported[:47] == items[:47]
+        assert exported[47]["amp"] == 99.5 and exported[47]["src"] == "gci_json"
+
+
+def test_upsert_latest_hour_is_in_place_and_keeps_better_source() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _json_history(tmp, [_rec(h) for h in range(5)])
+        schumann.upsert_record(path, _rec(5, amp=12.0, src="gci_json"))
+        size = os.path.getsize(bin_path_for(path))
+        schumann.upsert_record(path, _rec(5, amp=None, src="cache"))
+        assert os.path.getsize(bin_path_for(path)) == size
+        last = schumann._open_store(path).last()
+        assert last["amp"] == 12.0 and last["src"] == "gci_json"
+        assert schumann.last_known_amp(path) == 12.0
+
+
+def test_max_len_trims_with_slack_and_partial_tail_is_dropped() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _json_history(tmp, [_rec(h) for h in range(10)])
+        for h in range(10, 13):
+            schumann.upsert_record(path, _rec(h), max_len=10)
+        store = schumann._open_store(path)
+        # 12 > 10·1.1 → обрезка до 10, затем ещё одна дозапись
+        assert len(store) == 11 and store.tail(1)[0]["ts"] == _rec(12)["ts"]
+        with open(store.path, "ab") as f:
+            f.write(b"\x01\x02\x03")  # interrupted append
+        store = schumann._open_store(path)
+        assert len(store) == 11 and store.last()["ts"] == _rec(12)["ts"]
+
+
+def test_get_schumann_reads_tail_and_fix_history_compacts() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        items = [_rec(h, freq=7.83) for h in range(30)] + [_rec(30, freq=8.2, amp=5.0, src="gci_json")]
+        path = _json_history(tmp, items)
+        old_file = schumann.DEF_FILE
+        schumann.DEF_FILE = path
+        try:
+            schumann.upsert_record(path, _rec(31, freq=8.3, amp=6.0, src="gci_json"))
+            state = schumann.get_schumann()
+            assert state["freq"] == 8.3 and state["amp"] == 6.0 and state["trend"] == "↑"
+            store = schumann._open_store(path)
+            store.upsert({"ts": _rec(3)["ts"] + 1, "freq": -1.0, "amp": -4.0, "src": None})
+            before, after = schumann.fix_history(path)
+            assert (before, after) == (33, 33)
+            fixed = schumann._open_store(path).read_all()
+            odd = next(r for r in fixed if r["ts"] == _rec(3)["ts"] + 1)
+            assert odd["freq"] == 7.83 and odd["amp"] == 4.0 and odd["src"] == "cache"
+        finally:
+            schumann.DEF_FILE = old_file
+
+
+def main() -> None:
+    checks = [
+        test_json_history_migrates_and_exports_identically,
+        test_upsert_latest_hour_is_in_place_and_keeps_better_source,
+        test_max_len_trims_with_slack_and_partial_tail_is_dropped,
+        test_get_schumann_reads_tail_and_fix_history_compacts,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} Schumann store checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for section_scheduler: fresh → cached → omitted under one deadline, manifest notes."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import section_scheduler  # noqa: E402
+import tracing  # noqa: E402
+
+
+def _boom():
+    raise RuntimeError("source down")
+
+
+def test_fresh_cached_omitted() -> None:
+    release = threading.Event()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SECTIONS_CACHE"] = str(Path(tmp) / "sections.json")
+        try:
+            plan = section_scheduler.SectionPlan("morning", deadline_s=5)
+            plan.start("fx", lambda: "💱 Курсы")
+            plan.start("kp", lambda: (2.3, "спокойно", 15, "swpc"))
+            plan.start("air", lambda: {"aqi": 20})
+            assert plan.get("fx") == "💱 Курсы" and plan.get("kp")[0] == 2.3 and plan.get("air")
+            assert plan.finish() == {}
+
+            manifest = Path(tmp) / tracing.MANIFEST_NAME
+            with tracing.run("post", manifest):
+                with tracing.span("build_message"):
+                    started = time.monotonic()
+                    plan = section_scheduler.SectionPlan("morning", deadline_s=0.3)
+                    plan.start("fx", release.wait, 10)                          # завис → кэш
+                    plan.start("kp", _boom)                                     # ошибка → кэш
+                    plan.start("air", dict)                                     # пусто → кэш
+                    plan.start("pollen", release.wait, 10)                      # завис, кэша нет → опущен
+                    plan.start("quakes", lambda: None, usable=section_scheduler.always)
+                    assert plan.get("fx") == "💱 Курсы"
+                    assert plan.get("kp", (None, "н/д", None, "n/d"))[:2] == [2.3, "спокойно"]
+                    assert plan.get("air") == {"aqi": 20}
+                    assert plan.get("pollen", {}) == {}
+                    assert plan.get("quakes", "x") is None
+                    assert plan.get("unknown", "d") == "d"
+                    assert time.monotonic() - started < 2.0   # один общий дедлайн, не сумма
+                    degraded = plan.finish()
+            release.set()
+            assert degraded["fx"] == {"outcome": "cached", "reason": "timeout", "cache_age_s": degraded["fx"]["cache_age_s"]}
+            assert degraded["kp"]["reason"] == "error" and degraded["air"]["reason"] == "empty"
+            assert degraded["pollen"] == {"outcome": "omitted", "reason": "timeout"}
+            assert "quakes" not in degraded
+
+            doc = json.loads(manifest.read_text(encoding="utf-8"))
+            spans = {s["name"]: s for s in doc["processes"][0]["spans"]}
+            assert spans["build_message"]["degraded"]["pollen"]["outcome"] == "omitted"
+            assert spans["section.kp"]["parent"] == spans["build_message"]["id"]
+            assert spans["section.kp"]["outcome"] == "cached" and "RuntimeError" in spans["section.kp"]["error"]
+            assert spans["section.quakes"]["outcome"] == "fresh"
+        finally:
+            os.environ.pop("SECTIONS_CACHE", None)
+
+
+def test_cache_age_and_json_only() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sections.json"
+        os.environ["SECTIONS_CACHE"] = str(path)
+        try:
+            old = time.time() - 7 * 3600
+            path.write_text(json.dumps({"morning": {"solar_wind": {"at": old, "value": {"speed_kms": 400}}}}))
+            plan = section_scheduler.SectionPlan("morning", deadline_s=1)
+            plan.start("solar_wind", dict, max_age_h=3)
+            plan.start("visibility", lambda: (object(), "👁 line"), cache=False)
+            plan.start("sunset", lambda: (object(), "21:58"))
+            assert plan.get("solar_wind") is None
+            assert plan.get("visibility")[1] == "👁 line"
+            assert plan.get("sunset")[1] == "21:58"
+            assert plan.finish() == {"solar_wind": {"outcome": "omitted", "reason": "empty"}}
+            saved = json.loads(path.read_text(encoding="utf-8"))["morning"]
+            assert set(saved) == {"solar_wind"}, saved   # не-JSON и cache=False не сохраняются
+        finally:
+            os.environ.pop("SECTIONS_CACHE", None)
+
+        # вчерашний курс/прогноз не выдаётся за сегодняшний, даже если он моложе max_age_h
+        os.environ["SECTIONS_CACHE"] = str(path)
+        try:
+            path.write_text(json.dumps({"morning": {"fx": {"at": time.time() - 600, "day": "2026-10-17", "value": "💱 вчера"}}}))
+            plan = section_scheduler.SectionPlan("morning", deadline_s=0.2, day="2026-10-18")
+            plan.start("fx", _boom)
+            assert plan.get("fx") is None
+            plan.finish()
+            path.write_text(json.dumps({"morning": {"fx": {"at": time.time() - 600, "day": "2026-10-18", "value": "💱 сегодня"}}}))
+            plan = section_scheduler.SectionPlan("morning", deadline_s=0.2, day="2026-10-18")
+            plan.start("fx", _boom)
+            assert plan.get("fx") == "💱 сегодня"
+        finally:
+            os.environ.pop("SECTIONS_CACHE", None)
+
+        os.environ["SECTIONS_CACHE"] = "0"
+        try:
+            assert section_scheduler.cache_path() is None
+            plan = section_scheduler.SectionPlan("morning", deadline_s=1)
+            plan.start("fx", lambda: "💱")
+            assert plan.get("fx") == "💱" and plan.finish() == {}
+        finally:
+            os.environ.pop("SECTIONS_CACHE", None)
+
+
+def main() -> None:
+    checks = [
+        test_fresh_cached_omitted,
+        test_cache_age_and_json_only,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} section_scheduler checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the async send pipeline (text first, photo under a deadline)."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("TELEGRAM_TOKEN_KLG", "test-token")
+
+import post_common  # noqa: E402
+import post_kld  # noqa: E402
+from send_pipeline import Deadline, in_thread, wait_or_none  # noqa: E402
+
+
+class _FakeBot:
+    def __init__(self):
+        self.events = []
+
+    async def send_message(self, **kw):
+        self.events.append(("text", kw["text"], time.monotonic()))
+
+    async def send_photo(self, **kw):
+        self.events.append(("photo", kw["caption"], time.monotonic()))
+
+    async def get_me(self):
+        return object()
+
+
+def _patched(module, **attrs):
+    saved = {k: getattr(module, k) for k in attrs}
+    for k, v in attrs.items():
+        setattr(module, k, v)
+    return saved
+
+
+def _run_common(image_s: float, deadline_s: float):
+    bot = _FakeBot()
+    ticks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "kld.jpg"
+        img.write_bytes(b"jpeg")
+
+        def slow_build(**_kw):
+            time.sleep(0.2)
+            return "<b>пост</b>"
+
+        def slow_image(_prompt, _path):
+            time.sleep(image_s)
+            return str(img)
+
+        saved = _patched(
+            post_common,
+            build_message=slow_build,
+            generate_astro_image=slow_image,
+            build_kld_evening_prompt=lambda **_kw: ("prompt", "style"),
+            _build_kld_image_moods_for_evening=lambda **_kw: ("", "", ""),
+            IMAGE_DEADLINE_S=deadline_s,
+        )
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        async def scenario():
+            t = asyncio.ensure_future(ticker())
+            started = time.monotonic()
+            await post_common.send_common_post(bot, 1, "KLD", "sea", [], "other", [], "Europe/Kaliningrad", mode="evening")
+            await t
+            return started, time.monotonic()
+
+        try:
+            started, finished = asyncio.run(scenario())
+        finally:
+            _patched(post_common, **saved)
+    return bot, ticks, started, finished
+
+
+def test_text_goes_first_and_loop_stays_free() -> None:
+    bot, ticks, started, finished = _run_common(image_s=0.5, deadline_s=5)
+    kinds = [e[0] for e in bot.events]
+    assert kinds == ["text", "photo"], kinds
+    text_at, photo_at = bot.events[0][2], bot.events[1][2]
+    assert text_at - started < 0.45  # текст не ждал картинку (0.2 с сборки, картинка 0.5 с)
+    assert photo_at - started >= 0.45
+    assert sum(1 for t in ticks if t - started < 0.2) >= 5  # loop не блокировался сборкой
+
+
+def test_image_past_deadline_is_dropped() -> None:
+    bot, _ticks, started, finished = _run_common(image_s=1.5, deadline_s=0.4)
+    assert [e[0] for e in bot.events] == ["text"]
+    assert finished - started < 1.0
+
+
+def test_common_image_date_ignores_global_offset() -> None:
+    bot = _FakeBot()
+    paths = []
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "kld.jpg"
+        img.write_bytes(b"jpeg")
+
+        def build_rewrites_offset(**kw):
+            post_common.DAY_OFFSET = 0  # как build_message для другого режима
+            assert kw["day_offset"] == 1 and kw["mode"] == "evening"
+            return "<b>пост</b>"
+
+        def record_image(_prompt, path):
+            time.sleep(0.1)
+            paths.append(path)
+            return str(img)
+
+        saved = _patched(
+            post_common,
+            build_message=build_rewrites_offset,
+            generate_astro_image=record_image,
+            build_kld_evening_prompt=lambda **_kw: ("prompt", "style"),
+            _build_kld_image_moods_for_evening=lambda **_kw: ("", "", ""),
+            DAY_OFFSET=post_common.DAY_OFFSET,
+            _DAY_OFFSET_ENV=None,
+        )
+        try:
+            asyncio.run(post_common.send_common_post(bot, 1, "KLD", "sea", [], "other", [], "Europe/Kaliningrad", mode="evening"))
+        finally:
+            _patched(post_common, **saved)
+    tomorrow = post_common.pendulum.today("Europe/Kaliningrad").add(days=1).date().isoformat()
+    assert len(paths) == 1 and tomorrow in paths[0], paths
+
+
+def test_kld_image_respects_shared_deadline_and_errors() -> None:
+    bot = _FakeBot()
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "kld.jpg"
+        img.write_bytes(b"jpeg")
+        saved = _patched(post_kld, _prepare_kld_image=lambda _d, msg_text: (str(img), "cap:" + msg_text))
+        try:
+            asyncio.run(post_kld._maybe_send_kld_image(bot, 1, None, "evening", False, msg_text="x",
+                                                       deadline=Deadline(5)))
+            asyncio.run(post_kld._maybe_send_kld_image(bot, 1, None, "morning", False, msg_text="y"))
+
+            async def overlapped():
+                # генерация запущена до отправки текста — ждём уже готовый future
+                job = in_thread(lambda: (str(img), "cap:early"))
+                await post_kld._maybe_send_kld_image(bot, 1, None, "evening", False, msg_text="z", prepared=job)
+            asyncio.run(overlapped())
+        finally:
+            _patched(post_kld, **saved)
+    assert [(e[0], e[1]) for e in bot.events] == [("photo", "cap:x"), ("photo", "cap:early")]
+
+    async def boom():
+        return await wait_or_none(in_thread(lambda: 1 / 0), Deadline(1), "test")
+
+    logging.disable(logging.CRITICAL)
+    try:
+        assert asyncio.run(boom()) is None
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def main() -> None:
+    checks = [
+        test_text_goes_first_and_loop_stays_free,
+        test_image_past_deadline_is_dropped,
+        test_common_image_date_ignores_global_offset,
+        test_kld_image_respects_shared_deadline_and_errors,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} send pipeline checks passed")
+
+
+if __name__ == "__main__":
+    main()
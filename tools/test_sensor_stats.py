@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for incremental sensor statistics and anomaly flags."""
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import post_common  # noqa: E402
+import radiation  # noqa: E402
+import schumann  # noqa: E402
+from sensor_stats import RollingStats, StatsBook, stats_path_for  # noqa: E402
+
+T0 = 1_787_356_800
+HOUR = 3600
+
+
+def test_window_median_mad_and_eviction() -> None:
+    st = RollingStats(window_s=24 * HOUR, half_life_s=6 * HOUR)
+    vals = [7.8 + 0.01 * (i % 5) for i in range(48)]
+    for i, v in enumerate(vals):
+        st.update(T0 + i * HOUR, v)
+    window = vals[-24:]
+    assert len(st) == 24
+    assert abs(st.median - statistics.median(window)) < 1e-12
+    med = statistics.median(window)
+    assert abs(st.mad - statistics.median(abs(v - med) for v in window)) < 1e-12
+    assert abs(st.mean - 7.82) < 0.01 and st.std < 0.02
+    assert not st.describe()["unusual"]
+    spike = st.describe(9.0)
+    assert spike["unusual"] and spike["direction"] == "↑" and spike["robust_z"] > 10
+
+
+def test_same_ts_replaces_last_point_and_roundtrips() -> None:
+    a, b = RollingStats(), RollingStats()
+    for i in range(20):
+        a.update(T0 + i * HOUR, float(i))
+        b.update(T0 + i * HOUR, float(i))
+    a.update(T0 + 19 * HOUR, 100.0)  # upsert текущего часа: первое значение
+    a.update(T0 + 19 * HOUR, 19.0)   # затем уточнённое — как будто первого не было
+    assert len(a) == len(b) and a.median == b.median
+    assert abs(a.mean - b.mean) < 1e-9 and abs(a.var - b.var) < 1e-9
+    assert not a.update(T0, 5.0) and not a.update(T0 + 20 * HOUR, None)
+    c = RollingStats.from_json(json.loads(json.dumps(a.to_json())))
+    c.update(T0 + 20 * HOUR, 20.0)
+    a.update(T0 + 20 * HOUR, 20.0)
+    assert c.to_json() == a.to_json()
+
+
+def test_schumann_upsert_keeps_stats_sidecar() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schumann_hourly.json")
+        Path(path).write_text(json.dumps([
+            {"ts": T0 + h * HOUR, "freq": 7.83 + 0.01 * (h % 3), "amp": 10.0 + (h % 4), "src": "gci_json"}
+            for h in range(30)
+        ]), encoding="utf-8")
+        schumann.upsert_record(path, {"ts": T0 + 30 * HOUR, "freq": 7.84, "amp": 40.0, "src": "gci_json"})
+        book = StatsBook(stats_path_for(path))
+        assert len(book.get("amp")) == 31 and len(book.get("freq")) == 31  # засев из истории + точка
+        old = schumann.DEF_FILE
+        schumann.DEF_FILE = path
+        try:
+            state = schumann.get_schumann()
+        finally:
+            schumann.DEF_FILE = old
+        assert state["stats"]["amp"]["unusual"] and state["stats"]["amp"]["direction"] == "↑"
+        assert not state["stats"]["freq"]["unusual"]
+
+
+def test_safecast_line_uses_rolling_baseline() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "safecast_kaliningrad.json")
+        now = int(time.time())
+        Path(path).write_text(json.dumps({"ts": now - 600, "pm25": 6.0, "pm10": None, "cpm": None,
+                                          "radiation_usvh": 0.2}), encoding="utf-8")
+        book = StatsBook(stats_path_for(path))
+        for i in range(24):
+            book.update("radiation_usvh", now - (30 - i) * 6 * HOUR, 0.10 + 0.002 * (i % 3))
+        book.save()
+        os.environ["SAFECAST_FILE"] = path
+        try:
+            line = post_common.safecast_summary_line()
+        finally:
+            os.environ.pop("SAFECAST_FILE", None)
+        assert line and "обычно 0.10" in line and "необычно для последних 7 дней ↑" in line, line
+
+
+def test_classifiers_use_rolling_state() -> None:
+    calm = {"unusual": False, "direction": "→", "robust_z": 0.4, "z": 0.3}
+    high = {"unusual": True, "direction": "↑", "robust_z": 4.2, "z": 3.5}
+    assert post_common._rad_risk(0.12) == ("🟢", "низкий")
+    assert post_common._rad_risk(0.12, calm) == ("🟢", "низкий")
+    assert post_common._rad_risk(0.12, high) == ("🟡", "повышенный")
+    assert post_common._rad_risk(0.40, calm) == ("🔴", "высокий")  # абсолютные пороги не ослабляются
+    assert post_common._pm_level(8.0, 20.0) == ("🟢", "низкий")
+    assert post_common._pm_level(8.0, 20.0, None, high) == ("🟡", "умеренный")
+    # тренд Шумана: есть состояние — по z к 7 дням, нет — к простому среднему окна
+    assert schumann._trend_arrow([7.83, 7.83, 7.84]) == "→"
+    assert schumann._trend_arrow([7.83, 7.83, 7.84], stats={"robust_z": 1.8, "z": None}) == "↑"
+    assert schumann._trend_arrow([7.90, 7.90, 7.70], stats={"robust_z": None, "z": 0.2}) == "→"
+    line = post_common.schumann_line({"freq": 8.3, "status": "🟡 колебания", "status_code": "yellow", "stats": high})
+    assert line.endswith("необычно для последних 7 дней ↑"), line
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = radiation.CACHE, radiation._try_radmon, radiation._try_eurdep
+        try:
+            radiation.CACHE = Path(tmp) / "radiation_hourly.json"
+            book = StatsBook(stats_path_for(str(radiation.CACHE)))
+            for i in range(24):
+                book.update(radiation.station_key(54.71, 20.45), T0 + i * HOUR, 0.08 + 0.001 * (i % 3))
+            book.save()
+            radiation._try_radmon, radiation._try_eurdep = (lambda _la, _lo: 0.13), (lambda _la, _lo: None)
+            line = post_common.radiation_line(54.71, 20.51)  # станция в 4 км
+        finally:
+            radiation.CACHE, radiation._try_radmon, radiation._try_eurdep = saved
+        assert line == "🟡 Радиация: 0.130 μSv/h — повышенный", line
+
+
+def main() -> None:
+    checks = [
+        test_window_median_mad_and_eviction,
+        test_same_ts_replaces_last_point_and_roundtrips,
+        test_schumann_upsert_keeps_stats_sidecar,
+        test_safecast_line_uses_rolling_baseline,
+        test_classifiers_use_rolling_state,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} sensor stats checks passed")
+
+
+if __name__ == "__main__":
+    main()
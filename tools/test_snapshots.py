@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for snapshots: delta-encoded payload archive and deterministic replay."""
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+import requests  # noqa: E402
+
+import gpt  # noqa: E402
+import kld_visual_dedup  # noqa: E402
+import snapshots  # noqa: E402
+import utils  # noqa: E402
+
+FORECAST = "https://api.open-meteo.com/v1/forecast"
+QUAKES = "https://www.seismicportal.eu/fdsnws/event/1/query"
+KP = "https://services.swpc.noaa.gov/json/planetary_k_index.json"
+TIMES = [f"2026-10-18T{h:02d}:00" for h in range(24)]
+
+
+def _fake_network(temps: list, calls: list):
+    def fake_request(_session, method, url, *args, **kwargs):
+        calls.append(url)
+        if "seismicportal" in url:
+            body = {"features": [{"id": kwargs["params"]["starttime"]}]}
+        else:
+            body = {"hourly": {"time": TIMES, "temperature_2m": temps}}
+        resp = requests.models.Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp._content = json.dumps(body).encode()
+        return resp
+
+    def fake_urlopen(url, *args, **kwargs):
+        calls.append(url)
+        return snapshots._UrlBody(b'[{"kp_index": 3.33}]', url, 200, "application/json")
+
+    return fake_request, fake_urlopen
+
+
+def _run(directory: Path, temps: list, calls: list, *, start: str, llm: str) -> Path:
+    saved = snapshots._real_request, snapshots._real_urlopen
+    try:
+        snapshots._real_request, snapshots._real_urlopen = _fake_network(temps, calls)
+        with snapshots.recording("kld-morning", directory, mode="morning") as rec:
+            assert utils._get(FORECAST, latitude=54.71, longitude=20.51)["hourly"]["temperature_2m"] == temps
+            requests.get(QUAKES, params={"starttime": start}, timeout=5)
+            with urllib.request.urlopen(KP, timeout=5) as resp:
+                assert json.loads(resp.read())[0]["kp_index"] == 3.33
+            assert snapshots.memo("llm", "prompt-1", lambda: llm) == llm
+            rec.text = f"post {temps[0]}"
+    finally:
+        snapshots._real_request, snapshots._real_urlopen = saved
+    return snapshots.list_snapshots(directory)[-1]
+
+
+def test_record_is_delta_encoded() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        calls: list = []
+        first = _run(d, [float(i) for i in range(24)], calls, start="t1", llm="совет 1")
+        second = _run(d, [float(i) for i in range(24)][::-1], calls, start="t2", llm="совет 2")
+        assert len(calls) == 6 and first != second
+
+        raw1, raw2 = (json.loads(gzip.decompress(p.read_bytes())) for p in (first, second))
+        assert raw1["base"] is None and raw2["base"] == first.name
+        # ось времени и неизменные значения уже лежат в первом снимке — во втором
+        # только развёрнутый ряд температур
+        assert len(raw1["blobs"]) == 2 and len(raw2["blobs"]) == 1
+
+        snap = snapshots.load(second)
+        hourly = snap["exchanges"][0]["json"]["hourly"]
+        assert hourly["time"] == TIMES and hourly["temperature_2m"][0] == 23.0
+        assert snap["meta"] == {"mode": "morning"} and snap["llm"] == {"prompt-1": "совет 2"}
+
+
+def test_replay_is_offline_and_deterministic() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        path = _run(d, [5.0] * 24, [], start="t1", llm="совет")
+        taken_at = snapshots.load(path)["taken_at"]
+
+        t0 = time.perf_counter()
+        with snapshots.replaying(path) as rep:
+            assert abs(time.time() - taken_at) < 1.0
+            time.sleep(30)  # повтор не ждёт
+            assert utils._get(FORECAST, latitude=54.71, longitude=20.51)["hourly"]["temperature_2m"] == [5.0] * 24
+            # параметры «сейчас» другие — ответ находится по пути запроса
+            quakes = requests.get(QUAKES, params={"starttime": "t9"}, timeout=5).json()
+            assert quakes["features"][0]["id"] == "t1"
+            with urllib.request.urlopen(KP) as resp:
+                assert json.loads(resp.read())[0]["kp_index"] == 3.33
+            assert snapshots.memo("llm", "prompt-1", lambda: "живой ответ") == "совет"
+            assert snapshots.memo("llm", "unknown", lambda: "живой ответ") == ""
+            try:
+                requests.get("https://example.invalid/x", timeout=1)
+                raise AssertionError("unrecorded request went to the network")
+            except requests.ConnectionError:
+                pass
+            assert snapshots.report_match(rep, "post 5.0") and not snapshots.report_match(rep, "other")
+        assert time.perf_counter() - t0 < 2.0
+        assert requests.sessions.Session.request is snapshots._real_request
+        assert urllib.request.urlopen is snapshots._real_urlopen and time.sleep is snapshots._real_sleep
+
+
+def test_secrets_never_reach_the_archive() -> None:
+    owm = "https://api.openweathermap.org/data/3.0/onecall"
+    iqair = "https://api.airvisual.com/v2/nearest_city"
+
+    def fake_request(_session, method, url, *args, **kwargs):
+        full = requests.Request(method, url, params=kwargs.get("params")).prepare().url
+        if "airvisual" in full:
+            raise requests.ConnectionError(f"Max retries exceeded with url: {full}")
+        resp = requests.models.Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp._content = b'{"current": {"temp": 5}}'
+        return resp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        saved = snapshots._real_request
+        try:
+            snapshots._real_request = fake_request
+            with snapshots.recording("kld-morning", d):
+                requests.get(owm, params={"lat": 54.7, "appid": "SECRET123"}, timeout=5)
+                try:
+                    requests.get(f"{iqair}?lat=54.7&key=SECRET456", timeout=5)
+                except requests.ConnectionError:
+                    pass
+        finally:
+            snapshots._real_request = saved
+        path = snapshots.list_snapshots(d)[-1]
+        raw = gzip.decompress(path.read_bytes()).decode("utf-8")
+        assert "SECRET" not in raw, raw
+        assert snapshots.load(path)["exchanges"][0]["key"].endswith("appid=***")
+
+        # на повторе запрос с настоящим ключом находит ответ по тому же ключу
+        with snapshots.replaying(path):
+            resp = requests.get(owm, params={"lat": 54.7, "appid": "OTHER"}, timeout=5)
+            assert resp.json()["current"]["temp"] == 5 and "OTHER" not in resp.url
+
+
+def test_replay_on_a_later_day_keeps_the_recorded_day() -> None:
+    recorded = pendulum.datetime(2026, 3, 1, 6, 30, tz="Europe/Kaliningrad")
+    snap = {"taken_at": recorded.timestamp(), "exchanges": [], "llm": {}}
+    with snapshots.replaying(snap):
+        assert pendulum.now("Europe/Kaliningrad").to_date_string() == "2026-03-01"
+        assert pendulum.today("Europe/Kaliningrad").add(days=1).to_date_string() == "2026-03-02"
+        assert dt.datetime.now(dt.timezone.utc).date() == dt.date(2026, 3, 1)
+        assert dt.date.today() == dt.date(2026, 3, 1)
+        # модули с «from datetime import date, datetime» видят те же часы
+        assert kld_visual_dedup._today() == dt.date(2026, 3, 1)
+        assert isinstance(kld_visual_dedup.date(2026, 3, 1), dt.date)
+        now = dt.datetime.now()
+        assert isinstance(now, dt.datetime) and type(now) is snapshots._real_datetime
+        assert isinstance(recorded, dt.datetime) and dt.datetime(2026, 1, 1).year == 2026
+    assert dt.datetime is snapshots._real_datetime and dt.date is snapshots._real_date
+    assert pendulum.now().year >= 2026 and pendulum.now().to_date_string() != "2026-03-01"
+
+
+def test_llm_replay_ignores_configured_providers() -> None:
+    saved = gpt.OPENAI_KEY, gpt.GEMINI_KEY, gpt.GROQ_KEY, gpt._complete
+    try:
+        gpt.OPENAI_KEY, gpt.GEMINI_KEY, gpt.GROQ_KEY = "sk-test", "", "gsk-test"
+        gpt._complete = lambda *a, **k: "записанный совет"
+        with tempfile.TemporaryDirectory() as tmp:
+            with snapshots.recording("kld-morning", Path(tmp)):
+                assert gpt.gpt_complete("совет на утро", system="sys") == "записанный совет"
+            path = snapshots.list_snapshots(Path(tmp))[-1]
+            # на повторе ключей нет вовсе — ответ всё равно из снимка
+            gpt.OPENAI_KEY, gpt.GEMINI_KEY, gpt.GROQ_KEY = "", "", ""
+            gpt._complete = lambda *a, **k: ""
+            with snapshots.replaying(path):
+                assert gpt.gpt_complete("совет на утро", system="sys") == "записанный совет"
+    finally:
+        gpt.OPENAI_KEY, gpt.GEMINI_KEY, gpt.GROQ_KEY, gpt._complete = saved
+
+
+def test_prune_keeps_base_chain() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        saved = snapshots.SNAPSHOT_KEYFRAME, snapshots.SNAPSHOT_KEEP
+        try:
+            snapshots.SNAPSHOT_KEYFRAME, snapshots.SNAPSHOT_KEEP = 3, 100
+            names = []
+            for i in range(5):
+                names.append(snapshots.save({"label": f"r{i}", "exchanges": [{"json": list(range(10 + i))}]}, d).name)
+            bases = [json.loads(gzip.decompress((d / n).read_bytes()))["base"] for n in names]
+            assert bases == [None, names[0], names[1], None, names[3]], bases
+            removed = snapshots.prune(1, d)
+            assert [p.name for p in removed] == names[:3]
+            assert snapshots.load(d / names[4])["exchanges"][0]["json"] == list(range(14))
+        finally:
+            snapshots.SNAPSHOT_KEYFRAME, snapshots.SNAPSHOT_KEEP = saved
+
+
+def main() -> None:
+    checks = [
+        test_record_is_delta_encoded,
+        test_replay_is_offline_and_deterministic,
+        test_secrets_never_reach_the_archive,
+        test_replay_on_a_later_day_keeps_the_recorded_day,
+        test_llm_replay_ignores_configured_providers,
+        test_prune_keeps_base_chain,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} snapshot checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for tg_delivery: pacing, RetryAfter, file_id reuse and fan-out."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from telegram.error import BadRequest, RetryAfter  # noqa: E402
+
+from tg_delivery import TelegramDelivery  # noqa: E402
+
+
+class _FakeBot:
+    token = "123456:secret"
+
+    def __init__(self, retry_after_once=(), bad_file_ids=()):
+        self.events = []
+        self._retry = set(retry_after_once)
+        self._bad = set(bad_file_ids)
+        self._n = 0
+
+    def _msg(self, chat_id, file_id=None):
+        self._n += 1
+        photo = [SimpleNamespace(file_id=file_id + "_s"), SimpleNamespace(file_id=file_id)] if file_id else None
+        return SimpleNamespace(message_id=self._n, chat=SimpleNamespace(id=chat_id), photo=photo)
+
+    async def send_message(self, chat_id, text, **_kw):
+        if (chat_id, text) in self._retry:
+            self._retry.discard((chat_id, text))
+            self.events.append(("429", chat_id, text, time.monotonic()))
+            raise RetryAfter(0.2)
+        self.events.append(("text", chat_id, text, time.monotonic()))
+        return self._msg(chat_id)
+
+    async def send_photo(self, chat_id, photo, caption="", **_kw):
+        if isinstance(photo, str):
+            if photo in self._bad:
+                raise BadRequest("Wrong file identifier")
+            self.events.append(("photo_id", chat_id, photo, time.monotonic()))
+            return self._msg(chat_id, photo)
+        self.events.append(("upload", chat_id, photo.read(), time.monotonic()))
+        return self._msg(chat_id, "fid_%d" % self._n)
+
+    async def send_media_group(self, chat_id, media, **_kw):
+        out = []
+        for m in media:
+            if isinstance(m.media, str):
+                self.events.append(("album_id", chat_id, m.media, time.monotonic()))
+                out.append(self._msg(chat_id, m.media))
+            else:
+                self.events.append(("album_upload", chat_id, m.media.input_file_content, time.monotonic()))
+                out.append(self._msg(chat_id, "afid_%d" % self._n))
+        return out
+
+
+def _delivery(bot, cache_path=None, interval=0.1):
+    return TelegramDelivery(bot, chat_interval=interval, group_per_min=20, global_per_s=1000, cache_path=cache_path)
+
+
+def test_chunks_paced_in_order_and_chats_in_parallel() -> None:
+    bot = _FakeBot()
+    d = _delivery(bot)
+    started = time.monotonic()
+    res = asyncio.run(d.send_text([-100, 200, -100], ["a", "b", "c"]))
+    elapsed = time.monotonic() - started
+    assert list(res) == [-100, 200], res
+    for chat in (-100, 200):
+        sent = [e for e in bot.events if e[1] == chat]
+        assert [e[2] for e in sent] == ["a", "b", "c"], sent
+        gaps = [b[3] - a[3] for a, b in zip(sent, sent[1:])]
+        assert all(g >= 0.09 for g in gaps), gaps
+    # два чата параллельно: ≈2 интервала, а не 5
+    assert elapsed < 0.35, elapsed
+
+
+def test_retry_after_holds_chat_and_retries() -> None:
+    bot = _FakeBot(retry_after_once=[(1, "b")])
+    d = _delivery(bot, interval=0.01)
+    res = asyncio.run(d.send_text([1], ["a", "b", "c"]))
+    assert [m.message_id for m in res[1]] == [1, 2, 3], res
+    kinds = [(e[0], e[2]) for e in bot.events]
+    assert kinds == [("text", "a"), ("429", "b"), ("text", "b"), ("text", "c")], kinds
+    t429 = next(e[3] for e in bot.events if e[0] == "429")
+    t_retry = [e[3] for e in bot.events if e[0] == "text" and e[2] == "b"][0]
+    assert t_retry - t429 >= 0.19, t_retry - t429
+
+
+def test_photo_uploaded_once_and_file_id_reused() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "kld.jpg"
+        img.write_bytes(b"jpeg-bytes")
+        cache = str(Path(tmp) / "ids.json")
+
+        bot = _FakeBot()
+        d = _delivery(bot, cache, interval=0.0)
+        res = asyncio.run(d.send_photo(["@test", -100500], str(img), "cap"))
+        assert d.uploads == 1, bot.events
+        assert [e[0] for e in bot.events] == ["upload", "photo_id"], bot.events
+        fid = res["@test"].photo[-1].file_id
+        assert bot.events[1][2] == fid
+
+        # следующий запуск (новый процесс): загрузки нет вовсе — file_id из кэша
+        bot2 = _FakeBot()
+        d2 = _delivery(bot2, cache, interval=0.0)
+        asyncio.run(d2.send_photo([-100500], str(img), "cap"))
+        assert d2.uploads == 0 and [e[0] for e in bot2.events] == ["photo_id"], bot2.events
+
+        # протухший file_id → перезагрузка в этот чат
+        bot3 = _FakeBot(bad_file_ids=[fid])
+        d3 = _delivery(bot3, cache, interval=0.0)
+        logging.disable(logging.CRITICAL)
+        try:
+            res3 = asyncio.run(d3.send_photo([-100500], str(img), "cap"))
+        finally:
+            logging.disable(logging.NOTSET)
+        assert d3.uploads == 1 and not isinstance(res3[-100500], BaseException), res3
+
+
+def test_album_uploaded_once() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(3):
+            p = Path(tmp) / f"p{i}.jpg"
+            p.write_bytes(b"img%d" % i)
+            paths.append((str(p), f"c{i}"))
+        bot = _FakeBot()
+        d = _delivery(bot, None, interval=0.0)
+        res = asyncio.run(d.send_album([1, 2, 3], paths))
+        assert d.uploads == 3, bot.events
+        assert [e[0] for e in bot.events].count("album_upload") == 3
+        assert [e[0] for e in bot.events].count("album_id") == 6
+        first_ids = [m.photo[-1].file_id for m in res[1]]
+        assert [m.photo[-1].file_id for m in res[3]] == first_ids
+
+
+def main() -> None:
+    checks = [
+        test_chunks_paced_in_order_and_chats_in_parallel,
+        test_retry_after_holds_chat_and_retries,
+        test_photo_uploaded_once_and_file_id_reused,
+        test_album_uploaded_once,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} telegram delivery checks passed")
+
+
+if __name__ == "__main__":
+    main()
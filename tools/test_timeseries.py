@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for the shared time-series layer and its collectors."""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import radiation  # noqa: E402
+import radiation_collect  # noqa: E402
+import safecast  # noqa: E402
+from timeseries import DAY, HOUR, TimeSeriesStore, bin_path_for, open_series  # noqa: E402
+
+T0 = 1_787_356_800  # 2026-08-22 00:00 UTC
+
+
+def test_range_aggregate_and_retention() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TimeSeriesStore(os.path.join(tmp, "s.bin"), [("v", "f")])
+        for i in range(216):  # трое суток по 20 минут
+            store.append({"ts": T0 + i * 1200, "v": None if i == 5 else float(i)})
+        assert [r["ts"] for r in store.range(T0 + HOUR, T0 + 2 * HOUR)] == [T0 + 3600, T0 + 4800, T0 + 6000]
+        hourly = store.aggregate("v", HOUR, end_ts=T0 + 2 * HOUR)
+        assert hourly[0] == {"ts": T0, "n": 3, "min": 0.0, "mean": 1.0, "max": 2.0}
+        assert hourly[1] == {"ts": T0 + HOUR, "n": 2, "min": 3.0, "mean": 3.5, "max": 4.0}
+        daily = store.aggregate("v", DAY)
+        assert [d["ts"] for d in daily] == [T0, T0 + DAY, T0 + 2 * DAY] and daily[2]["max"] == 215.0
+        assert not store.retain(max_age_s=3 * DAY, now=T0 + 3 * DAY)
+        assert store.retain(max_age_s=DAY, now=T0 + 3 * DAY)
+        assert len(store) == 72 and store.range()[0]["ts"] == T0 + 2 * DAY
+
+
+def test_radiation_history_appends_and_feeds_fallback() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "radiation_hourly.json"
+        legacy.write_text(json.dumps([
+            {"ts": T0, "lat": 54.71, "lon": 20.45, "val": 0.1},
+            {"ts": T0, "lat": 34.7, "lon": 33.02, "val": None},
+        ], indent=2), encoding="utf-8")
+        saved = (radiation.CACHE, radiation_collect.CACHE, radiation_collect.get_gamma,
+                 radiation._try_radmon, radiation._try_eurdep)
+        radiation.CACHE = radiation_collect.CACHE = legacy
+        radiation_collect.get_gamma = lambda lat, lon: 0.12 if lat > 50 else 0.2
+        radiation._try_radmon = radiation._try_eurdep = lambda lat, lon: None
+        try:
+            radiation_collect.append_point(54.71, 20.45)
+            radiation_collect.append_point(34.70, 33.02)
+            store = open_series(str(legacy), radiation.RAD_COLUMNS)
+            assert store is not None and len(store) == 4
+            assert legacy.read_text(encoding="utf-8").count("ts") == 2  # JSON больше не переписывается
+            got = radiation.get_radiation(54.7, 20.5)
+            assert got == {"val": 0.12, "trend": "↑", "cached": True}, got
+        finally:
+            (radiation.CACHE, radiation_collect.CACHE, radiation_collect.get_gamma,
+             radiation._try_radmon, radiation._try_eurdep) = saved
+
+
+def test_safecast_history_dedups_by_ts_and_exports() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "safecast_radiation.json")
+        rec = {"ts": T0, "uSv_h": 0.123457, "lat": 54.7, "lon": 20.5, "id": 101,
+               "unit_raw": "usv", "src": "safecast", "ver": 1, "region": "Kaliningrad"}
+        Path(path).write_text(json.dumps([rec]), encoding="utf-8")
+        changed, tail = safecast.append_history(path, rec, max_len=5000)
+        assert not changed and tail == [rec]
+        newer = {**rec, "ts": T0 + HOUR, "uSv_h": 0.2, "id": 102}
+        changed, tail = safecast.append_history(path, newer, max_len=5000)
+        assert changed and tail[-1] == newer and os.path.exists(bin_path_for(path))
+        assert safecast.load_history(path) == [rec, newer]
+        os.environ["SC_FILE"] = path
+        try:
+            assert safecast.main(["safecast.py", "--export-json"]) == 0
+        finally:
+            os.environ.pop("SC_FILE", None)
+        assert json.loads(Path(path).read_text(encoding="utf-8")) == [rec, newer]
+
+
+def main() -> None:
+    checks = [
+        test_range_aggregate_and_retention,
+        test_radiation_history_appends_and_feeds_fallback,
+        test_safecast_history_dedups_by_ts_and_exports,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} time-series checks passed")
+
+
+if __name__ == "__main__":
+    main()
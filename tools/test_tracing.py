@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for tracing: nested spans, HTTP spans, multi-process manifest, diff."""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import requests  # noqa: E402
+
+import send_pipeline  # noqa: E402
+import tracing  # noqa: E402
+
+
+def _fake_send(_adapter, request, **kwargs):
+    resp = requests.models.Response()
+    resp.status_code = 200
+    resp._content = b'{"ok": true}'
+    resp.url = request.url
+    resp.request = request
+    return resp
+
+
+def _spans(doc: dict, proc: int = 0) -> dict:
+    return {s["name"]: s for s in doc["processes"][proc]["spans"]}
+
+
+def test_nested_spans_and_http() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / tracing.MANIFEST_NAME
+        saved = tracing._real_send
+        try:
+            tracing._real_send = _fake_send
+            with tracing.run("post", path, mode="morning"):
+                with tracing.span("build_message"):
+                    with tracing.span("section.fx"):
+                        requests.get("https://www.cbr-xml-daily.ru/daily_json.js", params={"key": "secret"}, timeout=1)
+                        tracing.incr("retries")
+                        tracing.incr("retries")
+                    # поток без bind — на корень, с bind — под текущим спаном
+                    t = threading.Thread(target=lambda: tracing.incr("cache_hits"))
+                    t.start()
+                    t.join()
+                    t = threading.Thread(target=tracing.bind(lambda: tracing.note(bound=True)))
+                    t.start()
+                    t.join()
+
+                    async def _worker():
+                        def job():
+                            with tracing.span("section.kp"):
+                                return 1
+                        return await send_pipeline.in_thread(job)
+                    assert asyncio.run(_worker()) == 1
+                try:
+                    with tracing.span("send_text"):
+                        raise RuntimeError("telegram down")
+                except RuntimeError:
+                    pass
+        finally:
+            tracing._real_send = saved
+        assert requests.adapters.HTTPAdapter.send is saved
+        assert "RUN_MANIFEST_ID" not in os.environ
+
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        proc = doc["processes"][0]
+        assert proc["label"] == "post" and proc["meta"] == {"mode": "morning", "cache_hits": 1}
+        spans = _spans(doc)
+        http = spans["http www.cbr-xml-daily.ru/daily_json.js"]
+        assert http["status"] == 200 and http["bytes"] == 12 and "secret" not in json.dumps(doc)
+        assert http["parent"] == spans["section.fx"]["id"] and spans["section.fx"]["retries"] == 2
+        assert spans["section.fx"]["parent"] == spans["build_message"]["id"]
+        assert spans["build_message"]["bound"] is True
+        assert spans["section.kp"]["parent"] == spans["build_message"]["id"]
+        assert spans["send_text"]["error"] == "RuntimeError: telegram down"
+
+    # вне run() — ничего не пишется и не падает
+    with tracing.span("idle") as sp:
+        sp.set(x=1)
+        tracing.incr("retries")
+
+
+def test_child_processes_share_manifest_and_diff() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / tracing.MANIFEST_NAME
+        with tracing.run("image_first", path):
+            # дочерний процесс видит путь и id запуска в окружении
+            assert os.environ["RUN_MANIFEST"] == str(path.resolve())
+            saved = tracing._RUN
+            tracing._RUN = None
+            try:
+                with tracing.run("safe_test_post"):
+                    with tracing.span("section.air"):
+                        tracing.incr("cache_misses")
+            finally:
+                tracing._RUN = saved
+            with tracing.span("preview"):
+                pass
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        assert [p["label"] for p in doc["processes"]] == ["safe_test_post", "image_first"]
+
+        new = json.loads(json.dumps(doc))
+        new["processes"][0]["spans"][0]["ms"] = 900.0
+        new["processes"][0]["spans"][0]["cache_hits"] = 1
+        rows = tracing.diff(doc, new, min_ms=50)
+        assert rows and rows[0][0] == "safe_test_post/section.air", rows
+        assert rows[0][2]["cache_hits"] == 1
+        assert "safe_test_post/section.air" in tracing.format_diff(rows)
+        assert tracing.diff(doc, doc, min_ms=1.0) == []
+
+        other = Path(tmp) / "other.json"
+        with tracing.run("post_kld", other):
+            pass
+        assert len(json.loads(other.read_text(encoding="utf-8"))["processes"]) == 1
+
+
+def main() -> None:
+    checks = [
+        test_nested_spans_and_http,
+        test_child_processes_share_manifest_and_diff,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} tracing checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline checks for weather.get_weather: field-level provider merge, provenance, cache."""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pendulum  # noqa: E402
+
+import weather  # noqa: E402
+
+KLD = "Europe/Kaliningrad"
+
+
+def _om_payload(start: pendulum.DateTime, hours: int) -> dict:
+    times = [start.add(hours=i).format("YYYY-MM-DDTHH:mm") for i in range(hours)]
+    days = [start.add(days=d) for d in range(hours // 24)]
+    return {
+        "timezone": "GMT",
+        "utc_offset_seconds": 0,
+        "current": {"temperature": 11.0, "windspeed": 20.0, "weathercode": 3, "visibility": None},
+        "hourly": {
+            "time": times,
+            "temperature_2m": [10.0 + (i % 24) / 2 for i in range(hours)],
+            "relative_humidity_2m": [60 + i % 30 for i in range(hours)],
+            "wind_speed_10m": [18.0] * hours,
+            "uv_index": [None] * hours,
+        },
+        "daily": {
+            "time": [d.to_date_string() for d in days],
+            "temperature_2m_max": [22.0] * len(days),
+            "uv_index_max": [None] * len(days),
+            "sunrise": [d.add(hours=4, minutes=10).format("YYYY-MM-DDTHH:mm") for d in days],
+            "sunset": [d.add(hours=17, minutes=45).format("YYYY-MM-DDTHH:mm") for d in days],
+        },
+    }
+
+
+def _owm_payload(start: pendulum.DateTime, hours: int) -> dict:
+    times = [start.add(hours=i).format("YYYY-MM-DDTHH:mm") for i in range(hours)]
+    return {
+        "timezone": "GMT",
+        "utc_offset_seconds": 0,
+        "current": {"temperature": 12.5, "windspeed": None, "visibility": 9000},
+        "hourly": {
+            "time": times,
+            "temperature_2m": [99.0] * hours,
+            "uv_index": [float(i % 24 // 4) for i in range(hours)],
+            "precipitation_probability": [40.0] * hours,
+        },
+        "daily": {"time": [start.to_date_string()], "uv_index_max": [6.5]},
+    }
+
+
+def test_merge_prefers_richest_source_per_field() -> None:
+    start = pendulum.today("UTC")
+    om = _om_payload(start, 72)
+    om["hourly"]["temperature_2m"][5] = None
+    owm = _owm_payload(start, 48)
+    merged = weather.merge_forecasts([("open-meteo", om), ("openweather", owm), ("down", None)])
+    prov = merged["provenance"]
+
+    hourly = merged["hourly"]
+    assert hourly["time"] == om["hourly"]["time"]
+    # Open-Meteo длиннее → основной; дырку в 05:00 закрывает OpenWeather
+    assert hourly["temperature_2m"][5] == 99.0 and hourly["temperature_2m"][6] == 13.0
+    assert prov["hourly.temperature_2m"] == "open-meteo+openweather"
+    # у Open-Meteo UV пустой → богаче OpenWeather; за пределами его 48 ч — пропуски
+    assert prov["hourly.uv_index"] == "openweather"
+    assert hourly["uv_index"][47] is not None and hourly["uv_index"][48] is None
+    assert prov["hourly.precipitation_probability"] == "openweather"
+    assert hourly["windspeed_10m"] is hourly["wind_speed_10m"]  # алиасы на месте
+    assert prov["daily.uv_index_max"] == "openweather" and merged["daily"]["uv_index_max"][0] == 6.5
+
+    # current: наблюдение OpenWeather, пропуски — из Open-Meteo
+    assert merged["current"]["temperature"] == 12.5 and prov["current.temperature"] == "openweather"
+    assert merged["current"]["windspeed"] == 20.0 and prov["current.windspeed"] == "open-meteo"
+    assert merged["current"]["visibility"] == 9000
+    assert merged["sources"] == ["open-meteo", "openweather"]
+    assert weather.merge_forecasts([("a", None), ("b", {})]) is None
+
+
+def test_get_weather_fetches_concurrently_and_caches() -> None:
+    start = pendulum.today("UTC")
+    calls: list = []
+    threads: set = set()
+
+    def provider(payload):
+        def fetch(_lat, _lon):
+            calls.append(1)
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+            return payload
+        return fetch
+
+    saved = weather._PROVIDERS, weather._openmeteo_current_only, dict(weather._WEATHER_CACHE)
+    try:
+        weather._WEATHER_CACHE.clear()
+        weather._PROVIDERS = (
+            ("open-meteo", provider(_om_payload(start, 72))),
+            ("openweather", provider(_owm_payload(start, 48))),
+        )
+        t0 = time.monotonic()
+        wm = weather.get_weather(54.71, 20.51)
+        assert time.monotonic() - t0 < 0.35 and len(threads) == 2
+        assert weather.get_weather(54.71, 20.51) is wm and len(calls) == 2
+        assert weather.get_weather(54.71, 20.51, fresh=True) is not wm and len(calls) == 4
+
+        weather._WEATHER_CACHE.clear()
+        weather._PROVIDERS = (("open-meteo", lambda *_a: None), ("openweather", lambda *_a: 1 / 0))
+        weather._openmeteo_current_only = lambda *_a: {"current": {"temperature": 5.0}, "hourly": {}, "daily": {}}
+        wm = weather.get_weather(54.71, 20.51)
+        assert wm["current"]["temperature"] == 5.0 and wm["provenance"] == {"current.temperature": "open-meteo-current"}
+    finally:
+        weather._PROVIDERS, weather._openmeteo_current_only = saved[0], saved[1]
+        weather._WEATHER_CACHE.clear()
+        weather._WEATHER_CACHE.update(saved[2])
+
+
+def test_consumers_read_the_combined_forecast() -> None:
+    start = pendulum.today("UTC").subtract(days=1)
+    merged = weather.merge_forecasts([("open-meteo", _om_payload(start, 120)), ("openweather", _owm_payload(start, 120))])
+
+    def no_http(*_args, **_kwargs):
+        raise AssertionError("secondary fetch")
+
+    saved = weather.get_weather, weather._safe_http_get
+    try:
+        weather.get_weather = lambda *_a, **_k: merged
+        weather._safe_http_get = no_http
+        # восход 04:10 UTC → 06:10 по Калининграду (UTC+2)
+        assert weather.get_sunrise_sunset(54.71, 20.51, KLD, 1) == ("06:10", "19:45")
+        stats = weather.day_night_stats(54.71, 20.51, KLD)
+        # окно «день» 06–19 локально = 04–17 UTC → max 10 + 17/2
+        assert stats["t_day_max"] == 18.5, stats
+        assert stats["rh_min"] is not None and stats["rh_max"] >= stats["rh_avg"] >= stats["rh_min"]
+        uv = weather.get_uv_index(54.71, 20.51, KLD, 0)
+        assert uv["source"] == "hourly" and uv["uvi_max"] == 5.0, uv
+    finally:
+        weather.get_weather, weather._safe_http_get = saved
+
+
+def main() -> None:
+    checks = [
+        test_merge_prefers_richest_source_per_field,
+        test_get_weather_fetches_concurrently_and_caches,
+        test_consumers_read_the_combined_forecast,
+    ]
+    for check in checks:
+        check()
+    print(f"OK: {len(checks)} weather merge checks passed")
+
+
+if __name__ == "__main__":
+    main()
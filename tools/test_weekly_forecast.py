@@ -6,9 +6,10 @@ from __future__ import annotations
 import json
 import sys
 import tempfile
-from datetime import date
+from datetime import date, datetime
 from html.parser import HTMLParser
 from pathlib import Path
+from zoneinfo import ZoneInfo
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
@@ -131,10 +132,30 @@ def test_weekly_forecast_includes_curated_astro_events() -> None:
     assert "проверять факты" in text
 
 
+def test_weekly_moon_uses_ephemeris_grid() -> None:
+    import lunar
+    import send_weekly_forecast as weekly
+
+    calendar = json.loads((ROOT / "lunar_calendar.json").read_text(encoding="utf-8"))
+    lunar_data = {"days": {}, "ephemeris": calendar["ephemeris"]}
+    lines = weekly._lunar_lines(date(2026, 8, 24), lunar_data, [])
+    # полнолуние 28.08 04:18 UTC — в строке по местному времени (TZ)
+    local = datetime.fromtimestamp(1787890680, ZoneInfo(weekly.TZ_STR))
+    assert lines[0].startswith(f"🌕 {local:%d.%m, %H:%M}: Полнолуние"), lines
+    assert any(line.startswith("✨ Освещённость Луны: примерно ") for line in lines), lines
+    # вне сетки — прежний путь по дневным записям календаря
+    assert weekly._lunar_lines(date(2026, 7, 1), {**LUNAR, "ephemeris": calendar["ephemeris"]}, [])[0].startswith("🌕 01.07:")
+
+    info = lunar.get_moment_lunar_info(1787890680)   # ≈ момент полнолуния, блок из lunar_calendar.json
+    assert info is not None and info["illumination"] > 99.5 and info["phase_angle"] > 179, info
+    assert lunar.get_moment_lunar_info(0) is None
+
+
 def main() -> None:
     checks = (
         test_weekly_forecast_structure_without_optional_config,
         test_weekly_forecast_includes_curated_astro_events,
+        test_weekly_moon_uses_ephemeris_grid,
     )
     for check in checks:
         check()
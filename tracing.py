@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tracing.py
+~~~~~~~~~~
+
+Лёгкая трассировка запуска поста: вложенные спаны и JSON-манифест запуска.
+
+    with tracing.run("safe-morning", mode="morning"):
+        with tracing.span("section.fx"):
+            ...
+            tracing.incr("cache_hits")     # счётчик на текущем спане
+            tracing.note(source="cbr")     # атрибут текущего спана
+
+Вне run() span/note/incr ничего не делают. Вложенность — через contextvars:
+asyncio-задачи и потоки, запущенные через bind()/send_pipeline.in_thread,
+видят спан, из которого их запустили; прочие потоки вешают спаны на корень.
+
+HTTP трассируется сам, на транспортном уровне — ниже snapshots (requests —
+HTTPAdapter.send, urllib — OpenerDirector.open): спан «http <хост><путь>» со
+статусом и размером ответа; строка запроса в манифест не попадает (ключи API).
+При повторе из снимка сети нет — и http-спанов нет.
+
+Манифест пишется в RUN_MANIFEST (по умолчанию run_manifest.json в текущей
+папке — рядом с image_result.json). Публикация «картинка первой» — это
+несколько процессов (превью текста, картинка, отправка): первый run()
+выставляет RUN_MANIFEST/RUN_MANIFEST_ID в окружение, дочерние процессы с тем
+же id дописывают свой раздел в processes того же файла. RUN_MANIFEST=0
+выключает трассировку.
+
+Сравнить два запуска:
+
+    python tracing.py diff old/run_manifest.json new/run_manifest.json [--min-ms 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+MANIFEST_NAME = "run_manifest.json"
+
+_real_send = requests.adapters.HTTPAdapter.send
+_real_open = urllib.request.OpenerDirector.open
+
+_CURRENT: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("tracing_span", default=None)
+_RUN: Optional["_Run"] = None
+_LOCK = threading.Lock()
+
+
+def _env_off(name: str) -> bool:
+    return str(os.getenv(name) or "").strip().lower() in ("0", "false", "no", "off")
+
+
+# ───────────────────────── спаны ─────────────────────────
+class Span:
+    __slots__ = ("id", "parent", "name", "start", "ms", "attrs")
+
+    def __init__(self, sid: int, parent: Optional[int], name: str, start: float, attrs: Dict[str, Any]):
+        self.id = sid
+        self.parent = parent
+        self.name = name
+        self.start = start
+        self.ms: Optional[float] = None
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def incr(self, key: str, n: int = 1) -> None:
+        self.attrs[key] = int(self.attrs.get(key) or 0) + n
+
+
+class _NoSpan:
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def incr(self, key: str, n: int = 1) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Run:
+    def __init__(self, label: str, meta: Dict[str, Any]):
+        self.label = label
+        self.meta = meta
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.root = Span(0, None, label, 0.0, {})
+        self.spans: List[Span] = [self.root]
+        self._lock = threading.Lock()
+
+    def open(self, name: str, parent: Optional[Span], attrs: Dict[str, Any]) -> Span:
+        with self._lock:
+            sp = Span(len(self.spans), (parent or self.root).id, name, self._now(), attrs)
+            self.spans.append(sp)
+        return sp
+
+    def close(self, sp: Span) -> None:
+        sp.ms = round(self._now() - sp.start, 2)
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    def record(self, error: Optional[str]) -> Dict[str, Any]:
+        self.close(self.root)
+        return {
+            "label": self.label,
+            "pid": os.getpid(),
+            "argv": sys.argv[:],
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "ms": self.root.ms,
+            "meta": {**self.meta, **self.root.attrs},
+            "error": error,
+            "spans": [
+                {"id": s.id, "parent": s.parent, "name": s.name, "start_ms": round(s.start, 2), "ms": s.ms, **s.attrs}
+                for s in self.spans[1:]
+            ],
+        }
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Any]:
+    """Спан вокруг блока; исключение попадает в атрибут error и летит дальше."""
+    run_ = _RUN
+    if run_ is None:
+        yield _NO_SPAN
+        return
+    sp = run_.open(name, _CURRENT.get(), attrs)
+    token = _CURRENT.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.attrs["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        _CURRENT.reset(token)
+        run_.close(sp)
+
+
+def current() -> Any:
+    if _RUN is None:
+        return _NO_SPAN
+    return _CURRENT.get() or _RUN.root
+
+
+def note(**attrs: Any) -> None:
+    current().set(**attrs)
+
+
+def incr(key: str, n: int = 1) -> None:
+    current().incr(key, n)
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    fn, который в другом потоке выполнится внутри текущего спана. Один bind —
+    на одну задачу: контекст нельзя войти из двух потоков сразу.
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+# ───────────────────────── HTTP ─────────────────────────
+def _endpoint(url: str) -> str:
+    parts = urlsplit(str(url))
+    return f"{parts.hostname or ''}{parts.path}"
+
+
+def _traced_send(adapter, request, *args, **kwargs):
+    with span(f"http {_endpoint(request.url)}", method=request.method) as sp:
+        resp = _real_send(adapter, request, *args, **kwargs)
+        size = resp.headers.get("Content-Length")
+        if size is None and not kwargs.get("stream"):
+            size = len(resp.content or b"")
+        sp.set(status=resp.status_code, bytes=int(size) if size is not None else None)
+        return resp
+
+
+def _traced_open(opener, fullurl, *args, **kwargs):
+    url = fullurl if isinstance(fullurl, str) else fullurl.full_url
+    with span(f"http {_endpoint(url)}", method="GET" if isinstance(fullurl, str) else fullurl.get_method()) as sp:
+        resp = _real_open(opener, fullurl, *args, **kwargs)
+        size = resp.headers.get("Content-Length") if getattr(resp, "headers", None) else None
+        sp.set(status=getattr(resp, "status", None), bytes=int(size) if size else None)
+        return resp
+
+
+# ───────────────────────── манифест ─────────────────────────
+def manifest_path(path: str | Path | None = None) -> Path:
+    return Path(path or os.getenv("RUN_MANIFEST") or MANIFEST_NAME)
+
+
+def _write(path: Path, run_id: str, process: Dict[str, Any]) -> None:
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        doc = {}
+    if not isinstance(doc, dict) or doc.get("run_id") != run_id:
+        doc = {"run_id": run_id, "processes": []}
+    doc["processes"].append(process)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+@contextlib.contextmanager
+def run(label: str, path: str | Path | None = None, **meta: Any) -> Iterator[Optional[_Run]]:
+    """
+    Трассировать запуск процесса и дописать его в манифест. Вложенный run()
+    (или RUN_MANIFEST=0) ничего не делает и отдаёт None.
+    """
+    global _RUN
+    if _env_off("RUN_MANIFEST"):
+        yield None
+        return
+    with _LOCK:
+        run_ = None if _RUN is not None else _Run(label, meta)
+        if run_ is not None:
+            _RUN = run_
+    if run_ is None:
+        yield None
+        return
+
+    target = manifest_path(path).resolve()
+    saved_env = {k: os.environ.get(k) for k in ("RUN_MANIFEST", "RUN_MANIFEST_ID")}
+    run_id = os.environ.get("RUN_MANIFEST_ID") or uuid.uuid4().hex[:12]
+    os.environ.update(RUN_MANIFEST=str(target), RUN_MANIFEST_ID=run_id)  # для дочерних процессов
+    saved_http = requests.adapters.HTTPAdapter.send, urllib.request.OpenerDirector.open
+    requests.adapters.HTTPAdapter.send = _traced_send  # type: ignore[method-assign]
+    urllib.request.OpenerDirector.open = _traced_open  # type: ignore[method-assign]
+    token = _CURRENT.set(run_.root)
+    error = None
+    try:
+        yield run_
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        _CURRENT.reset(token)
+        requests.adapters.HTTPAdapter.send, urllib.request.OpenerDirector.open = saved_http  # type: ignore[method-assign]
+        with _LOCK:
+            _RUN = None
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        try:
+            _write(target, run_id, run_.record(error))
+            logging.info("tracing: %d спан(ов) → %s", len(run_.spans) - 1, target)
+        except Exception as e:
+            logging.warning("tracing: манифест не записан: %s", e)
+
+
+# ───────────────────────── сравнение ─────────────────────────
+def aggregate(doc: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Сводка манифеста по путям спанов («процесс/этап/…/спан»): число вызовов,
+    суммарные мс, байты, попадания в кэш и повторы.
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    for proc in doc.get("processes") or []:
+        label = str(proc.get("label") or "?")
+        row = out.setdefault(label, {"count": 0, "ms": 0.0})
+        row["count"] += 1
+        row["ms"] += float(proc.get("ms") or 0)
+        spans = {s["id"]: s for s in proc.get("spans") or []}
+
+        def path_of(s: Dict[str, Any]) -> str:
+            names = [s["name"]]
+            while s.get("parent") in spans:
+                s = spans[s["parent"]]
+                names.append(s["name"])
+            return "/".join([label] + names[::-1])
+
+        for s in spans.values():
+            row = out.setdefault(path_of(s), {"count": 0, "ms": 0.0})
+            row["count"] += 1
+            row["ms"] += float(s.get("ms") or 0)
+            for key in ("bytes", "cache_hits", "cache_misses", "retries"):
+                if isinstance(s.get(key), (int, float)):
+                    row[key] = row.get(key, 0) + s[key]
+    return out
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any], min_ms: float = 0.0) -> List[Tuple[str, Dict[str, float], Dict[str, float]]]:
+    """Пути, у которых время или счётчики разошлись; крупные изменения — первыми."""
+    a, b = aggregate(old), aggregate(new)
+    rows = []
+    for path in sorted(set(a) | set(b)):
+        was, now = a.get(path, {}), b.get(path, {})
+        changed_counts = any(was.get(k) != now.get(k) for k in ("count", "bytes", "cache_hits", "cache_misses", "retries"))
+        if abs(now.get("ms", 0) - was.get("ms", 0)) >= min_ms or changed_counts:
+            rows.append((path, was, now))
+    rows.sort(key=lambda r: -abs(r[2].get("ms", 0) - r[1].get("ms", 0)))
+    return rows
+
+
+def format_diff(rows: List[Tuple[str, Dict[str, float], Dict[str, float]]]) -> str:
+    def counts(r: Dict[str, float]) -> str:
+        extra = " ".join(f"{k[:5]}={int(r[k])}" for k in ("cache_hits", "retries") if r.get(k))
+        return f"×{int(r['count'])}" + (f" {extra}" if extra else "") if r else "—"
+
+    lines = [f"{'Δ ms':>9} {'old ms':>9} {'new ms':>9}  {'old':<14} {'new':<14} path"]
+    for path, was, now in rows:
+        d = now.get("ms", 0) - was.get("ms", 0)
+        lines.append(
+            f"{d:+9.1f} {was.get('ms', 0):9.1f} {now.get('ms', 0):9.1f}  {counts(was):<14} {counts(now):<14} {path}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Run manifest tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("diff", help="compare two run manifests")
+    d.add_argument("old")
+    d.add_argument("new")
+    d.add_argument("--min-ms", type=float, default=20.0, help="hide spans whose total time moved less than this")
+    args = ap.parse_args(argv)
+
+    old, new = (json.loads(Path(p).read_text(encoding="utf-8")) for p in (args.old, args.new))
+    rows = diff(old, new, args.min_ms)
+    print(format_diff(rows) if rows else "no differences")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,6 +26,8 @@ import time
 import random
 import requests
 import pendulum
+
+import tracing
 from typing import Any, Dict, Optional, List
 
 # ──────────────────────── Компас, облака, ветер ──────────────────────────
@@ -522,6 +524,7 @@ def _get_retry(url: str, retries: int = 2, **params) -> Optional[dict]:
             if attempt > retries:
                 # логируем только после последней неудачной попытки
                 return None
+            tracing.incr("retries")
             time.sleep(0.5 * attempt)
 
 def _get(url: str, **params) -> Optional[dict]:
@@ -4,11 +4,17 @@
 weather.py
 ~~~~~~~~~~
 
-1) OpenWeather One Call (v3 → v2) — если есть OWM_KEY
-2) Open-Meteo (start_date / end_date = сегодня+завтра)
-3) Фоллбэк — Open-Mетео «current_weather»
-
-Дополнительно:
+get_weather(lat, lon) — единый прогноз из нескольких провайдеров:
+  • Open-Meteo (hourly/daily на WEATHER_FORECAST_DAYS дней, UTC) и
+    OpenWeather One Call (v3 → v2, если есть OWM_KEY) запрашиваются параллельно;
+  • merge_forecasts сливает их по полям: для каждой переменной берётся
+    источник с наибольшим числом значений, пропуски добираются из остальных,
+    происхождение каждого поля — в payload["provenance"];
+  • если оба молчат — фоллбэк на Open-Meteo «current_weather».
+Результат кэшируется на WEATHER_CACHE_TTL_S секунд по координатам, так что
+все потребители одного поста читают один и тот же прогноз.
+
+Дополнительно (всё — из того же единого прогноза):
 • day_night_stats(lat, lon, tz="UTC") → {"t_day_max","t_night_min","rh_avg","rh_min","rh_max"}
 • fetch_tomorrow_temps(lat, lon, tz="UTC") → (t_day_max, t_night_min)
 • get_sunrise_sunset(lat, lon, tz="UTC", day_offset=0) → (sunrise "HH:MM", sunset "HH:MM")
@@ -18,10 +24,16 @@ weather.py
 from __future__ import annotations
 import os
 import logging
-from typing import Any, Dict, Optional, Tuple, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, List
 
 import pendulum
 
+import om_plan
+import tracing
+from forecast import DayAgg, Forecast
 from utils import _get  # HTTP-обёртка из utils.py
 
 OWM_KEY = os.getenv("OWM_KEY")            # ключ OpenWeather, может быть None
@@ -29,6 +41,10 @@ OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
 
 # Единый сетевой таймаут (сек)
 REQUEST_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+# Горизонт Open-Meteo в днях (сегодня + …): хватает и на «завтра», и на неделю
+FORECAST_DAYS = max(2, int(os.getenv("WEATHER_FORECAST_DAYS", "8")))
+# Сколько секунд единый прогноз по координатам переиспользуется в процессе
+WEATHER_CACHE_TTL_S = float(os.getenv("WEATHER_CACHE_TTL_S", "600"))
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -36,6 +52,7 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 # ────────────────────────── Безопасный HTTP-обёртка ──────────────────────────
 
 def _safe_http_get(url: str, **kwargs) -> Optional[Dict[str, Any]]:
+    om_plan.count_url(url)
     try:
         try:
             return _get(url, timeout=REQUEST_TIMEOUT, **kwargs)
@@ -72,6 +89,11 @@ def _ensure_aliases_om_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     return payload
 
 
+_ALIAS_KEYS = frozenset(
+    {"windspeed_10m", "winddirection_10m", "windgusts_10m", "windspeed_10m_max", "windgusts_10m_max"}
+)
+
+
 # ────────────────────────── Вспомогательный запрос Open-Mетео ────────────────
 
 def _openmeteo_hourly_daily(
@@ -130,36 +152,13 @@ def _openmeteo_hourly_daily(
 
 # ────────────────────────── Агрегация день/ночь/влажность ────────────────────
 
-def _filter_hours_for_date(
-    times: List[str],
-    values: List[Optional[float]],
-    date_str: str,
-    hour_from: int,
-    hour_to: int,
-) -> List[float]:
-    out: List[float] = []
-    for t, v in zip(times, values):
-        if not isinstance(v, (int, float)):
-            continue
-        if not t or not t.startswith(date_str):
-            continue
-        try:
-            hh = int(t[11:13])  # формат 'YYYY-MM-DDTHH:MM'
-        except Exception:
-            continue
-        if hour_from <= hh <= hour_to:
-            out.append(float(v))
-    return out
-
-
-def _all_hours_for_date(times: List[str], values: List[Optional[float]], date_str: str) -> List[float]:
-    out: List[float] = []
-    for t, v in zip(times, values):
-        if not isinstance(v, (int, float)):
-            continue
-        if t and t.startswith(date_str):
-            out.append(float(v))
-    return out
+def _sun_window(fc: Forecast, tz_name: str, date_obj) -> Tuple[int, int]:
+    """Часы восхода и заката (локальные) для окна «день»; без данных — 9–18."""
+    sunrise = fc.daily_moment("sunrise", date_obj, tz_name)
+    sunset = fc.daily_moment("sunset", date_obj, tz_name)
+    if sunrise is None or sunset is None:
+        return 9, 18
+    return sunrise.hour, sunset.hour
 
 
 def day_night_stats(
@@ -168,75 +167,31 @@ def day_night_stats(
     tz: str | None = "UTC",
 ) -> Dict[str, Optional[float]]:
     tz_name = tz or "UTC"
-    now = pendulum.now(tz_name)
-    tomorrow = now.add(days=1).date().to_date_string()
+    tomorrow = pendulum.now(tz_name).add(days=1).date()
 
-    j = _openmeteo_hourly_daily(
-        lat=lat,
-        lon=lon,
-        tz=tz_name,
-        start_date=tomorrow,
-        end_date=tomorrow,
-        need_sun=True,
-    )
+    j = get_weather(lat, lon)
     if not j:
-        logging.warning("day_night_stats — Open-Meteo не вернул данные")
+        logging.warning("day_night_stats — нет данных прогноза")
         return {"t_day_max": None, "t_night_min": None, "rh_avg": None, "rh_min": None, "rh_max": None}
 
-    hourly = j.get("hourly", {}) or {}
-    daily = j.get("daily", {}) or {}
-
-    times: List[str] = hourly.get("time", []) or []
-    temps: List[Optional[float]] = hourly.get("temperature_2m", []) or []
-    rhs: List[Optional[float]] = hourly.get("relative_humidity_2m", []) or []
-
-    # 1) Окно дня
-    sunrise_list = daily.get("sunrise", []) or []
-    sunset_list = daily.get("sunset", []) or []
-    if sunrise_list and sunset_list:
-        try:
-            sr_hh = int(sunrise_list[0][11:13])
-            ss_hh = int(sunset_list[0][11:13])
-            day_from, day_to = sr_hh, ss_hh
-        except Exception:
-            day_from, day_to = 9, 18
-    else:
-        day_from, day_to = 9, 18
-
-    day_vals = _filter_hours_for_date(times, temps, tomorrow, day_from, day_to)
-
-    # 2) Окно ночи
-    night_vals = _filter_hours_for_date(times, temps, tomorrow, 0, 6)
+    # 1) Окно дня — от часа восхода до часа заката; ночь — 0–6
+    fc = Forecast.of(j)
+    day_from, day_to = _sun_window(fc, tz_name, tomorrow)
+    aggs = fc.aggregate(tz_name, windows={"day": (day_from, day_to), "night": (0, 6)})
+    day = aggs.get(tomorrow) or DayAgg(tomorrow, [])
 
-    # 3) Влажность по всем 24 часам
-    rh_vals_all = _all_hours_for_date(times, rhs, tomorrow)
-
-    def _safe_max(arr: List[float]) -> Optional[float]:
-        return max(arr) if arr else None
-
-    def _safe_min(arr: List[float]) -> Optional[float]:
-        return min(arr) if arr else None
-
-    def _safe_avg(arr: List[float]) -> Optional[float]:
-        return (sum(arr) / len(arr)) if arr else None
-
-    t_day_max = _safe_max(day_vals)
-    t_night_min = _safe_min(night_vals)
-    rh_avg = _safe_avg(rh_vals_all)
-    rh_min = _safe_min(rh_vals_all)
-    rh_max = _safe_max(rh_vals_all)
+    # 2) Влажность — по всем часам суток
+    t_day_max = day.stat("temperature_2m", "max", window="day")
+    t_night_min = day.stat("temperature_2m", "min", window="night")
+    rh_avg = day.stat("relative_humidity_2m", "mean")
+    rh_min = day.stat("relative_humidity_2m", "min")
+    rh_max = day.stat("relative_humidity_2m", "max")
 
     # Бэкап на daily, если вдруг hourly пуст
-    try:
-        if t_day_max is None and daily.get("temperature_2m_max"):
-            t_day_max = float(daily["temperature_2m_max"][0])
-    except Exception:
-        pass
-    try:
-        if t_night_min is None and daily.get("temperature_2m_min"):
-            t_night_min = float(daily["temperature_2m_min"][0])
-    except Exception:
-        pass
+    if t_day_max is None:
+        t_day_max = day.daily.get("temperature_2m_max")
+    if t_night_min is None:
+        t_night_min = day.daily.get("temperature_2m_min")
 
     return {
         "t_day_max": t_day_max,
@@ -258,30 +213,6 @@ def fetch_tomorrow_temps(
     t_day_max = stats.get("t_day_max")
     t_night_min = stats.get("t_night_min")
 
-    if t_day_max is None or t_night_min is None:
-        tomorrow = pendulum.now(tz or "UTC").add(days=1).to_date_string()
-        j = None
-        try:
-            j = _openmeteo_hourly_daily(
-                lat=lat, lon=lon, tz=tz or "UTC",
-                start_date=tomorrow, end_date=tomorrow, need_sun=False
-            )
-        except Exception as e:
-            logging.warning("fetch_tomorrow_temps — HTTP error (fallback): %s", e)
-
-        if j and "daily" in j:
-            d = j.get("daily", {}) or {}
-            try:
-                if t_day_max is None and d.get("temperature_2m_max"):
-                    t_day_max = float((d["temperature_2m_max"] or [None])[0])
-            except Exception:
-                pass
-            try:
-                if t_night_min is None and d.get("temperature_2m_min"):
-                    t_night_min = float((d["temperature_2m_min"] or [None])[0])
-            except Exception:
-                pass
-
     if t_day_max is None or t_night_min is None:
         logging.warning("fetch_tomorrow_temps — не удалось получить t_day_max/t_night_min")
     return t_day_max, t_night_min
@@ -289,7 +220,24 @@ def fetch_tomorrow_temps(
 
 # ───────────────────────── OpenWeather/Open-Meteo сводки ─────────────────────
 
+def _owm_time(ts: Any) -> Optional[str]:
+    """unix-время OpenWeather → метка Open-Meteo (UTC, 'YYYY-MM-DDTHH:mm')."""
+    if not isinstance(ts, (int, float)):
+        return None
+    return pendulum.from_timestamp(ts, tz="UTC").format("YYYY-MM-DDTHH:mm")
+
+
+def _kmh(ms: Any) -> Optional[float]:
+    return ms * 3.6 if isinstance(ms, (int, float)) else None
+
+
 def _openweather(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+    """
+    One Call → payload в терминах Open-Meteo (UTC-метки, ветер в км/ч).
+    Часовой и дневной ряды — настоящие (48 ч / 8 дней), а не размноженное
+    «сейчас». Коды погоды OpenWeather (800, 741 …) не совпадают с WMO,
+    поэтому в weathercode не попадают.
+    """
     if not OWM_KEY:
         return None
 
@@ -300,7 +248,7 @@ def _openweather(lat: float, lon: float) -> Optional[Dict[str, Any]]:
             lon=lon,
             appid=OWM_KEY,
             units="metric",
-            exclude="minutely,hourly,alerts",
+            exclude="minutely,alerts",
         )
         if not ow or "current" not in ow:
             logging.debug("_openweather — нет 'current' (v%s)", version)
@@ -308,51 +256,61 @@ def _openweather(lat: float, lon: float) -> Optional[Dict[str, Any]]:
 
         try:
             cur = ow.get("current", {}) or {}
-            wind_speed_ms = cur.get("wind_speed")
-            windspeed_kmh = (wind_speed_ms * 3.6) if isinstance(wind_speed_ms, (int, float)) else None
-
             unified_current = {
                 "temperature":    cur.get("temp"),
                 "temperature_2m": cur.get("temp"),
                 "pressure":       cur.get("pressure"),
-                "clouds":         cur.get("clouds", 0),
-                "windspeed":      windspeed_kmh,          # км/ч
+                "clouds":         cur.get("clouds"),
+                "windspeed":      _kmh(cur.get("wind_speed")),          # км/ч
                 "winddirection":  cur.get("wind_deg"),
-                "weathercode":    (cur.get("weather", [{}])[0] or {}).get("id"),
                 "visibility":     cur.get("visibility"),
                 "relative_humidity_2m": cur.get("humidity"),
                 "dew_point_2m":   cur.get("dew_point"),
-                "time": (
-                    pendulum.from_timestamp(cur.get("dt"), tz="UTC").to_iso8601_string()
-                    if isinstance(cur.get("dt"), (int, float))
-                    else None
-                ),
+                "time":           _owm_time(cur.get("dt")),
             }
 
+            hours = [h for h in (ow.get("hourly") or []) if isinstance(h, dict) and _owm_time(h.get("dt"))]
             unified_hourly = {
-                "surface_pressure":    [unified_current.get("pressure")],
-                "cloud_cover":         [unified_current.get("clouds")],
-                "weathercode":         [unified_current.get("weathercode")],
-                "wind_speed_10m":      [unified_current.get("windspeed")],
-                "wind_direction_10m":  [unified_current.get("winddirection")],
-                # алиасы добавим ниже
+                "time":                 [_owm_time(h["dt"]) for h in hours],
+                "temperature_2m":       [h.get("temp") for h in hours],
+                "relative_humidity_2m": [h.get("humidity") for h in hours],
+                "dew_point_2m":         [h.get("dew_point") for h in hours],
+                "visibility":           [h.get("visibility") for h in hours],
+                "surface_pressure":     [h.get("pressure") for h in hours],
+                "cloud_cover":          [h.get("clouds") for h in hours],
+                "wind_speed_10m":       [_kmh(h.get("wind_speed")) for h in hours],
+                "wind_direction_10m":   [h.get("wind_deg") for h in hours],
+                "wind_gusts_10m":       [_kmh(h.get("wind_gust")) for h in hours],
+                "rain":                 [(h.get("rain") or {}).get("1h", 0.0) for h in hours],
+                "precipitation_probability": [
+                    h["pop"] * 100 if isinstance(h.get("pop"), (int, float)) else None for h in hours
+                ],
+                "uv_index":             [h.get("uvi") for h in hours],
             }
 
-            temp_val = unified_current.get("temperature")
-            weather_val = unified_current.get("weathercode")
+            offset = ow.get("timezone_offset") or 0
+            days = [d for d in (ow.get("daily") or []) if isinstance(d, dict) and isinstance(d.get("dt"), (int, float))]
             unified_daily = {
-                "temperature_2m_max": [temp_val, temp_val],
-                "temperature_2m_min": [temp_val, temp_val],
-                "weathercode":        [weather_val, weather_val],
+                "time": [pendulum.from_timestamp(d["dt"] + offset, tz="UTC").to_date_string() for d in days],
+                "temperature_2m_max": [(d.get("temp") or {}).get("max") for d in days],
+                "temperature_2m_min": [(d.get("temp") or {}).get("min") for d in days],
+                "wind_speed_10m_max": [_kmh(d.get("wind_speed")) for d in days],
+                "wind_gusts_10m_max": [_kmh(d.get("wind_gust")) for d in days],
+                "uv_index_max":       [d.get("uvi") for d in days],
+                "precipitation_probability_max": [
+                    d["pop"] * 100 if isinstance(d.get("pop"), (int, float)) else None for d in days
+                ],
+                "sunrise": [_owm_time(d.get("sunrise")) for d in days],
+                "sunset":  [_owm_time(d.get("sunset")) for d in days],
             }
 
-            ow["current"] = unified_current
-            ow["hourly"] = unified_hourly
-            ow["daily"] = unified_daily
-            ow["strong_wind"] = (unified_current.get("windspeed") or 0) > 30.0
-            ow["fog_alert"] = bool(unified_current.get("weathercode") in (45, 48))
-
-            return _ensure_aliases_om_payload(ow)
+            return {
+                "timezone": "GMT",
+                "utc_offset_seconds": 0,
+                "current": unified_current,
+                "hourly": unified_hourly,
+                "daily": unified_daily,
+            }
         except Exception as e:
             logging.warning("_openweather — ошибка обработки данных: %s", e)
             continue
@@ -362,7 +320,7 @@ def _openweather(lat: float, lon: float) -> Optional[Dict[str, Any]]:
 
 def _openmeteo(lat: float, lon: float) -> Optional[Dict[str, Any]]:
     today = pendulum.today("UTC").to_date_string()
-    tomorrow = pendulum.today("UTC").add(days=1).to_date_string()
+    last_day = pendulum.today("UTC").add(days=FORECAST_DAYS - 1).to_date_string()
 
     om = _safe_http_get(
         OPEN_METEO_URL,
@@ -370,13 +328,16 @@ def _openmeteo(lat: float, lon: float) -> Optional[Dict[str, Any]]:
         longitude=lon,
         timezone="UTC",
         start_date=today,
-        end_date=tomorrow,
+        end_date=last_day,
         current_weather="true",
         current=(
             "temperature_2m,relative_humidity_2m,dew_point_2m,weather_code,visibility,"
             "surface_pressure,cloud_cover,wind_speed_10m,wind_direction_10m,wind_gusts_10m"
         ),
-        daily="temperature_2m_max,temperature_2m_min,weathercode,wind_speed_10m_max,wind_gusts_10m_max,uv_index_max,sunrise,sunset",
+        daily=(
+            "temperature_2m_max,temperature_2m_min,weathercode,wind_speed_10m_max,wind_gusts_10m_max,"
+            "uv_index_max,precipitation_probability_max,sunrise,sunset"
+        ),
         hourly=(
             "temperature_2m,relative_humidity_2m,dew_point_2m,visibility,surface_pressure,"
             "cloud_cover,weathercode,wind_speed_10m,wind_direction_10m,wind_gusts_10m,"
@@ -485,24 +446,150 @@ def _openmeteo_current_only(lat: float, lon: float) -> Optional[Dict[str, Any]]:
         return None
 
 
-def get_weather(lat: float, lon: float) -> Optional[Dict[str, Any]]:
+# ────────────────────────── Слияние провайдеров ──────────────────────────────
+
+# (имя, функция): порядок — приоритет рядов при равной полноте
+_PROVIDERS: Tuple[Tuple[str, Callable[[float, float], Optional[Dict[str, Any]]]], ...] = (
+    ("open-meteo", _openmeteo),
+    ("openweather", _openweather),
+)
+# для current — наоборот: наблюдение OpenWeather свежее модельного часа
+_CURRENT_PRIORITY = ("openweather", "open-meteo", "open-meteo-current")
+
+_WEATHER_CACHE: Dict[Tuple[float, float], Tuple[float, Dict[str, Any]]] = {}
+# разделы поста тянут прогноз параллельно: одна точка — один запрос (как om_plan)
+_WEATHER_LOCK = threading.Lock()
+_WEATHER_KEY_LOCKS: Dict[Tuple[float, float], threading.Lock] = {}
+
+
+def _filled(v: Any) -> bool:
+    return v is not None and v != ""
+
+
+def _merge_series(
+    section: str,
+    series: Sequence[Tuple[str, Dict[str, Any]]],
+    provenance: Dict[str, str],
+) -> Dict[str, Any]:
     """
-    Возвращает единый словарь прогноза, стараясь:
-      1) _openweather
-      2) _openmeteo
-      3) _openmeteo_current_only
+    Сливает hourly/daily разных источников на общей оси «time» (объединение
+    меток). Для каждого поля основной источник — тот, где больше непустых
+    значений (при равенстве — порядок series); его пропуски добираются из
+    остальных по совпадающим меткам.
     """
-    for fn in (_openweather, _openmeteo, _openmeteo_current_only):
-        try:
-            data = fn(lat, lon)
-        except Exception as e:
-            logging.warning("get_weather — исключение в %s: %s", fn.__name__, e)
-            data = None
+    by_time: List[Tuple[str, Dict[str, Dict[str, Any]]]] = []
+    axis = set()
+    for name, block in series:
+        times = block.get("time") or []
+        cols: Dict[str, Dict[str, Any]] = {}
+        for key, values in block.items():
+            if key == "time" or key in _ALIAS_KEYS or not isinstance(values, list):
+                continue
+            cols[key] = {t: v for t, v in zip(times, values) if t}
+        axis.update(t for t in times if t)
+        by_time.append((name, cols))
+    if not axis:
+        return {}
+
+    axis_sorted = sorted(axis)
+    out: Dict[str, Any] = {"time": axis_sorted}
+    keys = list(dict.fromkeys(k for _name, cols in by_time for k in cols))
+    for key in keys:
+        ranked = sorted(
+            ((name, cols[key]) for name, cols in by_time if key in cols),
+            key=lambda item: -sum(_filled(v) for v in item[1].values()),
+        )
+        primary_name, primary = ranked[0]
+        merged = [primary.get(t) for t in axis_sorted]
+        fillers: List[str] = []
+        for name, values in ranked[1:]:
+            used = False
+            for i, t in enumerate(axis_sorted):
+                if not _filled(merged[i]) and _filled(values.get(t)):
+                    merged[i] = values[t]
+                    used = True
+            if used:
+                fillers.append(name)
+        out[key] = merged
+        provenance[f"{section}.{key}"] = "+".join([primary_name] + fillers)
+    return out
 
-        if data:
-            return data
 
-    return None
+def merge_forecasts(sources: Sequence[Tuple[str, Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+    """
+    Единый payload из ответов провайдеров [(имя, payload|None), …] — по полям,
+    с provenance {"current.windspeed": "openweather", "hourly.rain": "open-meteo", …}.
+    Все источники должны отдавать метки в одной TZ (у нас — UTC).
+    """
+    present = [(name, p) for name, p in sources if isinstance(p, dict) and p]
+    if not present:
+        return None
+
+    provenance: Dict[str, str] = {}
+    merged: Dict[str, Any] = {}
+    for _name, payload in present:
+        for key, value in payload.items():
+            merged.setdefault(key, value)
+
+    current: Dict[str, Any] = {}
+    rank = {name: i for i, name in enumerate(_CURRENT_PRIORITY)}
+    for name, payload in sorted(present, key=lambda item: rank.get(item[0], len(rank))):
+        for key, value in (payload.get("current") or {}).items():
+            if _filled(value) and not _filled(current.get(key)):
+                current[key] = value
+                provenance[f"current.{key}"] = name
+    merged["current"] = current
+
+    for section in ("hourly", "daily"):
+        blocks = [(name, p.get(section)) for name, p in present if isinstance(p.get(section), dict)]
+        merged[section] = _merge_series(section, blocks, provenance)
+
+    merged["provenance"] = provenance
+    merged["sources"] = [name for name, _p in present]
+    windspeed = current.get("windspeed")
+    merged["strong_wind"] = isinstance(windspeed, (int, float)) and windspeed > 30.0
+    merged["fog_alert"] = current.get("weathercode") in (45, 48) or (
+        (merged["daily"].get("weathercode") or [None])[0] in (45, 48)
+    )
+    return _ensure_aliases_om_payload(merged)
+
+
+def _call_provider(name: str, fn: Callable[[float, float], Optional[Dict[str, Any]]], lat: float, lon: float):
+    try:
+        return fn(lat, lon)
+    except Exception as e:
+        logging.warning("get_weather — исключение в %s: %s", name, e)
+        return None
+
+
+def get_weather(lat: float, lon: float, *, fresh: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Единый прогноз по координатам: провайдеры _PROVIDERS опрашиваются
+    параллельно и сливаются merge_forecasts; если не ответил ни один —
+    _openmeteo_current_only. Ответ кэшируется на WEATHER_CACHE_TTL_S
+    (fresh=True — принудительно заново, для повторных попыток).
+    """
+    key = (round(float(lat), 4), round(float(lon), 4))
+    with _WEATHER_LOCK:
+        lock = _WEATHER_KEY_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        hit = _WEATHER_CACHE.get(key)
+        if hit and not fresh and time.monotonic() - hit[0] < WEATHER_CACHE_TTL_S:
+            tracing.incr("cache_hits")
+            return hit[1]
+        tracing.incr("cache_misses")
+
+        with ThreadPoolExecutor(max_workers=len(_PROVIDERS)) as pool:
+            futures = [(name, pool.submit(tracing.bind(_call_provider), name, fn, lat, lon)) for name, fn in _PROVIDERS]
+            fetched = [(name, fut.result()) for name, fut in futures]
+
+        data = merge_forecasts(fetched)
+        if not data:
+            data = merge_forecasts([("open-meteo-current", _call_provider("open-meteo-current", _openmeteo_current_only, lat, lon))])
+        if data:
+            logging.info("get_weather — источники: %s", ", ".join(data.get("sources") or []))
+            _WEATHER_CACHE[key] = (time.monotonic(), data)
+        return data
 
 
 def get_visibility_weather(
@@ -514,9 +601,9 @@ def get_visibility_weather(
 ) -> Optional[Dict[str, Any]]:
     """Fetch the local 04:00-10:00 visibility inputs from the existing source.
 
-    Callers use this only when the primary weather payload lacks an hourly
-    visibility window (for example, when OpenWeather won the normal fallback
-    chain).  Failure is intentionally non-fatal.
+    Callers use this only when the combined weather payload lacks an hourly
+    visibility window (for example, when only the current-weather fallback
+    answered).  Failure is intentionally non-fatal.
     """
     return _openmeteo_hourly_daily(
         lat=lat,
@@ -530,21 +617,6 @@ def get_visibility_weather(
 
 # ───────────────────────────── Солнце и УФ ───────────────────────────────────
 
-def _date_for_offset(tz: str, day_offset: int) -> str:
-    return pendulum.today(tz or "UTC").add(days=day_offset).to_date_string()
-
-def _nearest_index(times: List[str], target: pendulum.DateTime) -> Optional[int]:
-    best_i, best_diff = None, None
-    for i, iso in enumerate(times or []):
-        try:
-            dt = pendulum.parse(iso)
-            diff = abs((dt - target).total_seconds())
-            if best_diff is None or diff < best_diff:
-                best_i, best_diff = i, diff
-        except Exception:
-            continue
-    return best_i
-
 def get_sunrise_sunset(
     lat: float,
     lon: float,
@@ -553,19 +625,20 @@ def get_sunrise_sunset(
 ) -> Tuple[Optional[str], Optional[str]]:
     """Возвращает (sunrise, sunset) в формате HH:MM локальной TZ для указанного дня."""
     tz_name = tz or "UTC"
-    date_str = _date_for_offset(tz_name, day_offset)
-    j = _openmeteo_hourly_daily(lat, lon, tz_name, date_str, date_str, need_sun=True)
-    if not j:
-        return None, None
-    dl = j.get("daily", {}) or {}
-    try:
-        sr = (dl.get("sunrise") or [None])[0]
-        ss = (dl.get("sunset")  or [None])[0]
-        sr_out = sr[11:16] if isinstance(sr, str) and len(sr) >= 16 else None
-        ss_out = ss[11:16] if isinstance(ss, str) and len(ss) >= 16 else None
-        return sr_out, ss_out
-    except Exception:
-        return None, None
+    day = pendulum.today(tz_name).add(days=day_offset).date()
+    fc = Forecast.of(get_weather(lat, lon) or {})
+    sunrise = fc.daily_moment("sunrise", day, tz_name)
+    sunset = fc.daily_moment("sunset", day, tz_name)
+    if sunrise is None and sunset is None:
+        # в едином прогнозе нет дня (ответил только current) — отдельный запрос
+        date_str = day.isoformat()
+        fc = Forecast.of(_openmeteo_hourly_daily(lat, lon, tz_name, date_str, date_str, need_sun=True) or {})
+        sunrise = fc.daily_moment("sunrise", day, tz_name)
+        sunset = fc.daily_moment("sunset", day, tz_name)
+    return (
+        sunrise.strftime("%H:%M") if sunrise else None,
+        sunset.strftime("%H:%M") if sunset else None,
+    )
 
 def _uvi_label(u: Optional[float]) -> str:
     if not isinstance(u, (int, float)):
@@ -590,45 +663,30 @@ def get_uv_index(
     • uvi_max — максимум за день (daily uv_index_max либо max(hourly)).
     """
     tz_name = tz or "UTC"
-    date_str = _date_for_offset(tz_name, day_offset)
-    j = _openmeteo_hourly_daily(lat, lon, tz_name, date_str, date_str, need_sun=False)
-    if not j:
+    date_obj = pendulum.today(tz_name).add(days=day_offset).date()
+    fc = Forecast.of(get_weather(lat, lon) or {})
+    if not len(fc):
         return {"uvi": None, "uvi_max": None, "label": "н/д", "source": None}
 
-    hr = j.get("hourly", {}) or {}
-    dl = j.get("daily", {}) or {}
-    times: List[str] = hr.get("time", []) or []
-    uvi_arr = hr.get("uv_index", []) or []
-    uvi_clear = hr.get("uv_index_clear_sky", []) or []
-
     # точка для выборки: «сейчас» (или полдень, если прогноз не на сегодня)
-    target = (pendulum.now(tz_name)
-              if day_offset == 0
-              else pendulum.datetime(*map(int, (date_str.split("-"))), 12, 0, tz=tz_name))
-
-    idx = _nearest_index(times, target)
-    uvi_now = None
-    source = None
-    try:
-        if idx is not None and idx < len(uvi_arr) and isinstance(uvi_arr[idx], (int, float)):
-            uvi_now = float(uvi_arr[idx]); source = "hourly"
-        elif idx is not None and idx < len(uvi_clear) and isinstance(uvi_clear[idx], (int, float)):
-            uvi_now = float(uvi_clear[idx]); source = "clear_sky"
-    except Exception:
-        pass
-
-    # максимум за день
-    uvi_max = None
-    try:
-        if dl.get("uv_index_max"):
-            uvi_max = float((dl["uv_index_max"] or [None])[0])
-        else:
-            # если daily нет, посчитаем по часовым
-            day_vals = [float(v) for t, v in zip(times, uvi_arr) if isinstance(v, (int, float)) and t and t.startswith(date_str)]
-            if day_vals:
-                uvi_max = max(day_vals)
-    except Exception:
-        pass
+    idxs = fc.day_indices(date_obj, tz_name)
+    if day_offset == 0 and idxs:
+        now_ts = pendulum.now(tz_name).int_timestamp
+        idx = min(idxs, key=lambda i: abs(fc.times[i] - now_ts))
+    else:
+        idx = fc.nearest_index(date_obj, 12, tz_name)
+
+    uvi_now = fc.at(fc.hourly("uv_index"), idx)
+    source = "hourly" if uvi_now is not None else None
+    if uvi_now is None:
+        uvi_now = fc.at(fc.hourly("uv_index_clear_sky"), idx)
+        source = "clear_sky" if uvi_now is not None else None
+
+    # максимум за день: daily uv_index_max, иначе max(hourly)
+    day = fc.aggregate(tz_name).get(date_obj) or DayAgg(date_obj, [])
+    uvi_max = day.daily.get("uv_index_max")
+    if uvi_max is None:
+        uvi_max = day.stat("uv_index")
 
     return {
         "uvi": uvi_now,